@@ -7,6 +7,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).resolve().parent / "src"))
 
 import streamlit as st
+from litoral_trace.db.tenant import establecer_organizacion
 from litoral_trace.ui.theme import apply_enterprise_theme
 from litoral_trace.ui.navigation import PANTALLA_DASHBOARD, PANTALLA_AUDITORIA, init_pantalla
 from litoral_trace.ui.screens.login import login_screen
@@ -28,6 +29,8 @@ def main() -> None:
     if not st.session_state["logged_in"]:
         login_screen()
     else:
+        # Cada rerun corre en un contexto nuevo: el tenant se restablece desde la sesión de Streamlit
+        establecer_organizacion(st.session_state.get("organization_id"))
         init_pantalla()
         pantalla = st.session_state.get("pantalla", PANTALLA_DASHBOARD)
         if pantalla == PANTALLA_AUDITORIA:
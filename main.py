@@ -1,6 +1,8 @@
 """Punto de Entrada Servidor ASGI FastAPI - Litoral Trace Enterprise B2B."""
 from __future__ import annotations
+import asyncio
 import sys
+from contextlib import asynccontextmanager
 from pathlib import Path
 from datetime import datetime, timezone
 
@@ -29,7 +31,47 @@ except ModuleNotFoundError:
     from api.settings import router as settings_router
     from api.admin import router as admin_router
 
+from litoral_trace.api.auth import evento_login
+from litoral_trace.api.rate_limit import LimiteTasaMiddleware
+from litoral_trace.auth.api_key_registry import cerrar_registro_api_keys, iniciar_registro_api_keys
+from litoral_trace.auth.login import autenticar_usuario, cerrar_servicio_login, iniciar_servicio_login
+from litoral_trace.auth.revocation import cerrar_registro_revocaciones, iniciar_registro_revocaciones, revocar_token
 from litoral_trace.auth.tokens import create_jwt_token
+from litoral_trace.db.session import base_datos_configurada, cerrar_motores, motor_sync
+from litoral_trace.services.audit_archive import cerrar_particiones_auditoria, iniciar_particiones_auditoria
+from litoral_trace.services.audit_writer import auditar, cerrar_escritor_auditoria, iniciar_escritor_auditoria
+from litoral_trace.services.pdf_pool import cerrar_pool
+from litoral_trace.services.rate_limit import cerrar_planes_licencia, iniciar_planes_licencia
+from litoral_trace.services.reevaluation import cerrar_coeficientes_vigentes, iniciar_coeficientes_vigentes
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if base_datos_configurada():
+        # Componentes en memoria respaldados por la base (motor sync: corren en hilos propios)
+        motor = motor_sync()
+        iniciar_registro_api_keys(motor)
+        iniciar_registro_revocaciones(motor)
+        iniciar_planes_licencia(motor)
+        # Los evaluadores leen RENDIMIENTO_INDUSTRIAL: debe reflejar la versión publicada de la tabla
+        iniciar_coeficientes_vigentes(motor)
+        iniciar_servicio_login(motor)
+        # Particiones de audit_logs creadas por adelantado (no depende del script de mantenimiento)
+        iniciar_particiones_auditoria(motor)
+        iniciar_escritor_auditoria(motor)
+    yield
+    # Liberar los procesos de renderizado PDF al apagar el worker
+    cerrar_pool()
+    # Volcar los eventos de auditoría diferidos antes de terminar
+    cerrar_escritor_auditoria()
+    cerrar_particiones_auditoria()
+    # Persistir los last_used_at de API Keys acumulados en memoria
+    cerrar_registro_api_keys()
+    cerrar_planes_licencia()
+    cerrar_coeficientes_vigentes()
+    # Escribir los last_login_at pendientes
+    cerrar_servicio_login()
+    cerrar_registro_revocaciones()
+    cerrar_motores()
 
 # Inicializar FastAPI
 app = FastAPI(
@@ -37,9 +79,13 @@ app = FastAPI(
     description="API REST B2B para trazabilidad foresto-industrial y cumplimiento del Reglamento (UE) 2023/1115 (EUDR).",
     version="2.4.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
+# Cuotas de requests por organización y API Key (compartidas entre workers)
+app.add_middleware(LimiteTasaMiddleware)
+
 # Incluir Routers REST API
 app.include_router(auth_router)
 app.include_router(lotes_router)
@@ -84,26 +130,12 @@ async def handle_login_form(
     u = username.strip()
     p = password.strip()
 
-    if u == "admin" and p == "admin123":
-        user_data = {
-            "sub": "admin",
-            "org_id": 1,
-            "org_name": "Exportadora Forestal del Chaco S.A.",
-            "role": "admin",
-            "email": "comercial@litoraltrace.com"
-        }
-    elif u and p:
-        user_data = {
-            "sub": u,
-            "org_id": 42,
-            "org_name": "Aserradero Gran Chaco S.R.L.",
-            "role": "manager",
-            "email": f"{u}@litoraltrace.com"
-        }
-    else:
-        return render_template(request, "login.html", {"error": "Credenciales inválidas. Ingrese usuario y clave."})
+    user_data = await autenticar_usuario(u, p) if u and p else None
+    if user_data is None:
+        return render_template(request, "login.html", {"error": "Credenciales inválidas. Verifique usuario y clave."})
 
     jwt_token = create_jwt_token(user_data, expires_in_seconds=86400)
+    await auditar(evento_login(user_data))
     
     # Redirección HTTP 303 al Dashboard con cookie de sesión
     response = RedirectResponse(url="/dashboard", status_code=status.HTTP_303_SEE_OTHER)
@@ -139,6 +171,10 @@ async def render_admin_view(request: Request):
 
 @app.get("/logout", response_class=HTMLResponse, tags=["Frontend B2B"])
 async def logout_view(request: Request):
+    # Borrar la cookie no basta: un token copiado seguiría vigente hasta su exp
+    session_jwt = request.cookies.get("session_jwt")
+    if session_jwt:
+        await asyncio.to_thread(revocar_token, session_jwt)
     response = render_template(request, "login.html", {"user": None})
     response.delete_cookie("session_jwt")
     return response
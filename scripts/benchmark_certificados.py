@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import argparse
+from functools import partial
+import hashlib
+import json
+from pathlib import Path
+import sys
+import time
+from typing import Any, Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from litoral_trace.services.reports import MOTOR_NATIVO, generar_pdf_reporte_bytes
+
+
+PRODUCTOS = (
+    "Madera Aserrada (Pino)",
+    "Madera Aserrada (Eucalipto)",
+    "Extracto de Quebracho (Tanino)",
+    "Carbón Vegetal",
+)
+
+
+class BenchmarkToolError(RuntimeError):
+    """Fail-closed certificate benchmark error."""
+
+
+def baseline_generar_pdf_reporte_bytes(
+    lote_data: dict[str, Any],
+    dictamen: str,
+    observacion: str,
+    volumen_ingresado: float,
+    volumen_exportar: float,
+    coeficiente_rendimiento: float
+) -> bytes:
+    """Frozen copy of the per-call renderer used before the cached report engine."""
+    try:
+        from fpdf import FPDF
+        
+        class PDF(FPDF):
+            def header(self):
+                self.set_font("Helvetica", "B", 11)
+                self.set_text_color(100, 100, 100)
+                self.cell(0, 8, "LITORAL TRACE | COMPLIANCE INTELLIGENCE", border=0)
+                self.cell(0, 8, "REPORTE DE AUDITORÍA DE RIESGO EUDR", border=0, align="R")
+                self.line(10, 18, 200, 18)
+                self.ln(10)
+                
+            def footer(self):
+                self.set_y(-20)
+                self.set_font("Helvetica", "I", 8)
+                self.set_text_color(128)
+                h_str = hashlib.sha256(str(time.time()).encode()).hexdigest()[:16]
+                self.cell(0, 4, f"Certificado autogenerado por Litoral Trace Engine v2.4 | Hash Inmutable: {h_str}", border=0, align="C")
+
+        pdf = PDF()
+        pdf.add_page()
+        pdf.set_font("Helvetica", "B", 14)
+        pdf.set_text_color(15, 23, 42)
+        pdf.cell(0, 10, "AUDITORÍA DE DEBIDA DILIGENCIA (REGLAMENTO UE 2023/1115)", border=0, align="C")
+        pdf.ln(5)
+
+        # Sección 1
+        pdf.set_fill_color(240, 240, 240)
+        pdf.set_font("Helvetica", "B", 10)
+        pdf.cell(0, 7, " 1. IDENTIFICACIÓN DEL ACTIVO Y PROVEEDOR", border=1, fill=True)
+        pdf.ln(7)
+        pdf.set_font("Helvetica", "", 10)
+        pdf.cell(50, 6, "Lote / Rodal:", border=0); pdf.cell(0, 6, str(lote_data.get("identificador", "N/A")), border=0)
+        pdf.ln(6)
+        pdf.cell(50, 6, "CUIT / Guía Forestal:", border=0); pdf.cell(0, 6, str(lote_data.get("productor_id", "N/A")), border=0)
+        pdf.ln(6)
+        pdf.cell(50, 6, "Materia Prima:", border=0); pdf.cell(0, 6, str(lote_data.get("producto_forestal", "N/A")), border=0)
+        pdf.ln(6)
+        pdf.cell(50, 6, "Superficie Declarada:", border=0); pdf.cell(0, 6, f"{lote_data.get('hectareas', 0.0)} ha", border=0)
+        pdf.ln(10)
+
+        # Sección 2
+        pdf.set_font("Helvetica", "B", 10)
+        pdf.cell(0, 7, " 2. BALANCE DE MASAS Y RENDIMIENTO INDUSTRIAL", border=1, fill=True)
+        pdf.ln(7)
+        pdf.set_font("Helvetica", "", 10)
+        pdf.cell(60, 6, "Materia Prima Ingresada:", border=0); pdf.cell(0, 6, f"{volumen_ingresado:.2f} Toneladas", border=0)
+        pdf.ln(6)
+        pdf.cell(60, 6, "Coeficiente de Rendimiento:", border=0); pdf.cell(0, 6, f"{coeficiente_rendimiento*100:.1f}%", border=0)
+        pdf.ln(6)
+        pdf.cell(60, 6, "Máximo Exportable Permisible:", border=0); pdf.cell(0, 6, f"{volumen_ingresado*coeficiente_rendimiento:.2f} Toneladas", border=0)
+        pdf.ln(6)
+        pdf.cell(60, 6, "Volumen a Exportar Declarado:", border=0); pdf.cell(0, 6, f"{volumen_exportar:.2f} Toneladas", border=0)
+        pdf.ln(10)
+
+        # Dictamen
+        if dictamen == "Verde":
+            pdf.set_fill_color(220, 252, 231)
+            pdf.set_text_color(22, 101, 52)
+            pdf.set_font("Helvetica", "B", 12)
+            pdf.cell(0, 10, "DICTAMEN: FAVORABLE / COMPLIANT", border=1, align="C", fill=True)
+        else:
+            pdf.set_fill_color(254, 226, 226)
+            pdf.set_text_color(153, 27, 27)
+            pdf.set_font("Helvetica", "B", 12)
+            pdf.cell(0, 10, "DICTAMEN: BLOQUEADO / RIESGO DETECTADO", border=1, align="C", fill=True)
+
+        pdf.set_text_color(0)
+        pdf.set_font("Helvetica", "", 9)
+        pdf.ln(12)
+        pdf.multi_cell(0, 4, observacion)
+
+        return bytes(pdf.output())
+    except Exception:
+        report_text = f"LITORAL TRACE AUDIT REPORT\nDictamen: {dictamen}\nObs: {observacion}\nVolIn: {volumen_ingresado}T\nVolOut: {volumen_exportar}T\n"
+        return report_text.encode("utf-8")
+
+
+def build_lots(count: int) -> list[dict[str, Any]]:
+    lots = []
+    for index in range(count):
+        volumen_ingresado = 100.0 + (index % 400)
+        lots.append(
+            {
+                "lote_data": {
+                    "identificador": f"BENCH-{index:05d}",
+                    "productor_id": f"30-{index % 97:08d}-9",
+                    "producto_forestal": PRODUCTOS[index % len(PRODUCTOS)],
+                    "hectareas": 10.0 + index % 250,
+                },
+                "dictamen": "Verde" if index % 5 else "Rojo",
+                "observacion": (
+                    "APROBADO / COMPLIANT. Biomasa estable respecto a la línea base 2020 | "
+                    f"Balance de masas válido para el lote BENCH-{index:05d}."
+                ),
+                "volumen_ingresado": volumen_ingresado,
+                "volumen_exportar": volumen_ingresado * 0.4,
+                "coeficiente_rendimiento": 0.5,
+            }
+        )
+    return lots
+
+
+def measure(renderer: Callable[..., bytes], lots: list[dict[str, Any]]) -> dict[str, Any]:
+    digest = hashlib.sha256()
+    started = time.perf_counter()
+    total_bytes = 0
+    for lot in lots:
+        pdf_bytes = renderer(**lot)
+        if not pdf_bytes.startswith(b"%PDF"):
+            raise BenchmarkToolError(f"Renderer fell back to plain text for {lot['lote_data']['identificador']}.")
+        total_bytes += len(pdf_bytes)
+        digest.update(pdf_bytes[:8])
+    elapsed = time.perf_counter() - started
+    return {
+        "certificates": len(lots),
+        "total_seconds": round(elapsed, 3),
+        "ms_per_certificate": round(elapsed * 1000 / max(len(lots), 1), 3),
+        "mean_pdf_bytes": round(total_bytes / max(len(lots), 1), 1),
+    }
+
+
+def build_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Compare the per-certificate PDF cost of the frozen baseline renderer, the cached report engine and the native writer."
+    )
+    parser.add_argument(
+        "--lotes",
+        type=int,
+        default=5000,
+        help="Number of synthetic lots in the batch (default: 5000).",
+    )
+    parser.add_argument(
+        "--skip-baseline",
+        action="store_true",
+        help="Only measure the current report engine.",
+    )
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = build_argument_parser()
+    args = parser.parse_args(argv)
+
+    try:
+        if args.lotes <= 0:
+            raise BenchmarkToolError("--lotes must be a positive integer.")
+        lots = build_lots(args.lotes)
+        # Warm-up: class, fonts and static template are built once per process
+        generar_pdf_reporte_bytes(**lots[0])
+        report: dict[str, Any] = {"engine": measure(generar_pdf_reporte_bytes, lots)}
+        native = partial(generar_pdf_reporte_bytes, motor=MOTOR_NATIVO)
+        native(**lots[0])
+        report["native"] = measure(native, lots)
+        report["native_speedup"] = round(
+            report["engine"]["ms_per_certificate"] / max(report["native"]["ms_per_certificate"], 1e-9), 2
+        )
+        if not args.skip_baseline:
+            report["baseline"] = measure(baseline_generar_pdf_reporte_bytes, lots)
+            report["speedup"] = round(
+                report["baseline"]["ms_per_certificate"] / max(report["engine"]["ms_per_certificate"], 1e-9), 2
+            )
+    except Exception as exc:
+        print(str(exc), file=sys.stderr)
+        return 1
+
+    print(json.dumps(report, ensure_ascii=False, sort_keys=True))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
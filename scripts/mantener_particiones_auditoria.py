@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from sqlalchemy import create_engine
+
+from litoral_trace.services.audit_archive import (
+    MESES_PARTICIONES_ADELANTE,
+    archivar_mes,
+    crear_particiones,
+    directorio_archivo,
+    meses_archivables,
+)
+
+
+class AuditMaintenanceToolError(RuntimeError):
+    """Fail-closed audit partition maintenance error."""
+
+
+def normalize_sqlalchemy_url(raw_url: str) -> str:
+    normalized = str(raw_url or "").strip()
+    for prefix in ("postgres://", "postgresql://"):
+        if normalized.startswith(prefix):
+            return normalized.replace(prefix, "postgresql+psycopg://", 1)
+    return normalized
+
+
+def positive_int(raw_value: str) -> int:
+    try:
+        value = int(raw_value)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"Invalid integer {raw_value!r}.") from exc
+    if value < 1:
+        raise argparse.ArgumentTypeError("Value must be >= 1.")
+    return value
+
+
+def build_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Create upcoming monthly audit_logs partitions and archive expired months to Parquet."
+    )
+    parser.add_argument(
+        "--retencion-meses",
+        type=positive_int,
+        default=None,
+        help="Months kept in the database (default: LITORAL_AUDIT_RETENCION_MESES or 24).",
+    )
+    parser.add_argument(
+        "--directorio",
+        default=None,
+        help="Archive directory (default: LITORAL_AUDIT_ARCHIVO_DIR).",
+    )
+    parser.add_argument(
+        "--meses-adelante",
+        type=int,
+        default=MESES_PARTICIONES_ADELANTE,
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only list the months that would be archived.",
+    )
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = build_argument_parser()
+    args = parser.parse_args(argv)
+
+    database_url = normalize_sqlalchemy_url(os.environ.get("DB_URL", ""))
+    try:
+        if not database_url:
+            raise AuditMaintenanceToolError("DB_URL is required.")
+        engine = create_engine(database_url)
+        particiones = [] if args.dry_run else crear_particiones(engine, meses_adelante=args.meses_adelante)
+        meses = meses_archivables(engine, args.retencion_meses)
+        archivados = [] if args.dry_run else [archivar_mes(engine, mes, args.directorio) for mes in meses]
+    except Exception as exc:
+        print(str(exc), file=sys.stderr)
+        return 1
+
+    print(
+        json.dumps(
+            {
+                "particiones": particiones,
+                "meses_archivables": [mes.isoformat() for mes in meses],
+                "archivados": [
+                    {"mes": a.mes.isoformat(), "ruta": str(a.ruta), "registros": a.registros}
+                    for a in archivados
+                ],
+                "directorio": str(directorio_archivo(args.directorio)),
+                "dry_run": bool(args.dry_run),
+            },
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
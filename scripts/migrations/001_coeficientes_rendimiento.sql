@@ -0,0 +1,29 @@
+-- Tabla versionada de coeficientes de rendimiento industrial y regla aplicada por lote.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS coeficientes_rendimiento (
+    id SERIAL PRIMARY KEY,
+    producto_forestal VARCHAR(100) NOT NULL,
+    coeficiente DOUBLE PRECISION NOT NULL,
+    version INTEGER NOT NULL,
+    motivo TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    CONSTRAINT uq_coeficiente_producto_version UNIQUE (producto_forestal, version)
+);
+CREATE INDEX IF NOT EXISTS ix_coeficientes_rendimiento_producto_forestal ON coeficientes_rendimiento (producto_forestal);
+CREATE INDEX IF NOT EXISTS ix_coeficientes_rendimiento_version ON coeficientes_rendimiento (version);
+
+-- Versión 1: valores de RENDIMIENTO_INDUSTRIAL vigentes al momento de la migración
+INSERT INTO coeficientes_rendimiento (producto_forestal, coeficiente, version, motivo) VALUES
+    ('Madera Aserrada (Pino)', 0.50, 1, 'Carga inicial'),
+    ('Madera Aserrada (Eucalipto)', 0.45, 1, 'Carga inicial'),
+    ('Extracto de Quebracho (Tanino)', 0.30, 1, 'Carga inicial'),
+    ('Rollizo Triturable', 0.95, 1, 'Carga inicial'),
+    ('Carbón Vegetal', 0.25, 1, 'Carga inicial')
+ON CONFLICT (producto_forestal, version) DO NOTHING;
+
+ALTER TABLE lotes ADD COLUMN IF NOT EXISTS regla_aplicada VARCHAR(64);
+CREATE INDEX IF NOT EXISTS ix_lotes_producto_forestal ON lotes (producto_forestal);
+
+COMMIT;
@@ -0,0 +1,17 @@
+-- Clave natural (organization_id, identificador) para el upsert masivo de dictámenes.
+BEGIN;
+
+-- Fail-closed: los identificadores duplicados deben depurarse manualmente antes de migrar
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM lotes GROUP BY organization_id, identificador HAVING count(*) > 1
+    ) THEN
+        RAISE EXCEPTION 'Existen lotes con identificador duplicado dentro de una organización.';
+    END IF;
+END $$;
+
+ALTER TABLE lotes
+    ADD CONSTRAINT uq_lotes_organizacion_identificador UNIQUE (organization_id, identificador);
+
+COMMIT;
@@ -0,0 +1,22 @@
+-- Libro mayor acumulado de balance de masas por proveedor, producto y mes.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS balances_proveedor_mensual (
+    id SERIAL PRIMARY KEY,
+    organization_id INTEGER NOT NULL REFERENCES organizations (id) ON DELETE CASCADE,
+    productor_id VARCHAR(100) NOT NULL,
+    producto_forestal VARCHAR(100) NOT NULL,
+    periodo DATE NOT NULL,
+    coeficiente_rendimiento DOUBLE PRECISION NOT NULL,
+    ingresado_mes_ton DOUBLE PRECISION NOT NULL DEFAULT 0,
+    exportado_mes_ton DOUBLE PRECISION NOT NULL DEFAULT 0,
+    ingresado_acumulado_ton DOUBLE PRECISION NOT NULL DEFAULT 0,
+    exportado_acumulado_ton DOUBLE PRECISION NOT NULL DEFAULT 0,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    -- El índice único (org, productor, producto, periodo) resuelve "saldo al día X" con un solo seek
+    CONSTRAINT uq_balance_proveedor_periodo UNIQUE (organization_id, productor_id, producto_forestal, periodo)
+);
+CREATE INDEX IF NOT EXISTS ix_balances_proveedor_mensual_organization_id ON balances_proveedor_mensual (organization_id);
+
+COMMIT;
@@ -0,0 +1,25 @@
+-- Cadena de hashes por tenant en audit_logs y checkpoints de verificación incremental.
+-- Los registros existentes quedan con secuencia NULL: la cadena comienza con el primer evento posterior.
+BEGIN;
+
+ALTER TABLE audit_logs ADD COLUMN IF NOT EXISTS secuencia INTEGER;
+ALTER TABLE audit_logs ADD COLUMN IF NOT EXISTS hash_previo VARCHAR(64);
+ALTER TABLE audit_logs ADD COLUMN IF NOT EXISTS hash_registro VARCHAR(64);
+-- Dos escritores concurrentes no pueden bifurcar la cadena: el segundo falla por clave duplicada
+ALTER TABLE audit_logs ADD CONSTRAINT uq_audit_logs_org_secuencia UNIQUE (organization_id, secuencia);
+
+CREATE TABLE IF NOT EXISTS audit_checkpoints (
+    id SERIAL PRIMARY KEY,
+    organization_id INTEGER NOT NULL REFERENCES organizations (id) ON DELETE CASCADE,
+    secuencia_desde INTEGER NOT NULL,
+    secuencia_hasta INTEGER NOT NULL,
+    hash_registro VARCHAR(64) NOT NULL,
+    raiz_merkle VARCHAR(64) NOT NULL,
+    firma VARCHAR(64) NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    CONSTRAINT uq_audit_checkpoint_org_secuencia UNIQUE (organization_id, secuencia_hasta)
+);
+CREATE INDEX IF NOT EXISTS ix_audit_checkpoints_organization_id ON audit_checkpoints (organization_id);
+
+COMMIT;
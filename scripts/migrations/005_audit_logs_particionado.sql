@@ -0,0 +1,86 @@
+-- Particionado mensual por rango de audit_logs sobre "timestamp" (UTC).
+-- PostgreSQL exige que la clave de partición forme parte de toda restricción única: la PK pasa a
+-- (id, timestamp) y la unicidad de la cadena a (organization_id, secuencia, timestamp). Esa clave ya no
+-- impide una secuencia repetida con otro timestamp: los escritores se serializan con el candado
+-- consultivo por tenant (bloquear_cadenas) y 009_audit_logs_guardas.sql agrega la cabeza por tenant
+-- y la partición DEFAULT.
+BEGIN;
+
+ALTER SEQUENCE audit_logs_id_seq OWNED BY NONE;
+ALTER TABLE audit_logs RENAME TO audit_logs_sin_particionar;
+
+CREATE TABLE audit_logs (
+    id INTEGER NOT NULL DEFAULT nextval('audit_logs_id_seq'),
+    organization_id INTEGER NOT NULL REFERENCES organizations (id) ON DELETE CASCADE,
+    user_id INTEGER REFERENCES users (id) ON DELETE SET NULL,
+    username VARCHAR(100),
+    action VARCHAR(100) NOT NULL,
+    entity_type VARCHAR(100) NOT NULL,
+    entity_id INTEGER,
+    before_data JSON,
+    after_data JSON,
+    detail TEXT,
+    ip_address VARCHAR(45),
+    "timestamp" TIMESTAMPTZ NOT NULL DEFAULT now(),
+    secuencia INTEGER,
+    hash_previo VARCHAR(64),
+    hash_registro VARCHAR(64),
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+) PARTITION BY RANGE ("timestamp");
+
+-- Crea (si falta) la partición del mes que contiene `mes`: audit_logs_pYYYY_MM, límites en UTC
+CREATE OR REPLACE FUNCTION crear_particion_audit_logs(mes DATE) RETURNS TEXT AS $$
+DECLARE
+    inicio DATE := date_trunc('month', mes)::date;
+    nombre TEXT := 'audit_logs_p' || to_char(inicio, 'YYYY_MM');
+BEGIN
+    EXECUTE format(
+        'CREATE TABLE IF NOT EXISTS %I PARTITION OF audit_logs FOR VALUES FROM (%L) TO (%L)',
+        nombre,
+        inicio::timestamp AT TIME ZONE 'UTC',
+        (inicio + INTERVAL '1 month')::timestamp AT TIME ZONE 'UTC'
+    );
+    RETURN nombre;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Particiones para el histórico existente y los próximos tres meses
+DO $$
+DECLARE
+    mes DATE;
+BEGIN
+    mes := COALESCE(
+        (SELECT date_trunc('month', min("timestamp") AT TIME ZONE 'UTC')::date FROM audit_logs_sin_particionar),
+        date_trunc('month', now() AT TIME ZONE 'UTC')::date
+    );
+    WHILE mes <= (now() AT TIME ZONE 'UTC' + INTERVAL '3 months')::date LOOP
+        PERFORM crear_particion_audit_logs(mes);
+        mes := (mes + INTERVAL '1 month')::date;
+    END LOOP;
+END;
+$$;
+
+INSERT INTO audit_logs (
+    id, organization_id, user_id, username, action, entity_type, entity_id, before_data, after_data,
+    detail, ip_address, "timestamp", secuencia, hash_previo, hash_registro, created_at, updated_at
+)
+SELECT
+    id, organization_id, user_id, username, action, entity_type, entity_id, before_data, after_data,
+    detail, ip_address, "timestamp", secuencia, hash_previo, hash_registro, created_at, updated_at
+FROM audit_logs_sin_particionar;
+
+DROP TABLE audit_logs_sin_particionar;
+ALTER SEQUENCE audit_logs_id_seq OWNED BY audit_logs.id;
+
+-- Definidos sobre la tabla madre: cada partición hereda su propio índice local
+ALTER TABLE audit_logs ADD CONSTRAINT audit_logs_pkey PRIMARY KEY (id, "timestamp");
+ALTER TABLE audit_logs ADD CONSTRAINT uq_audit_logs_org_secuencia UNIQUE (organization_id, secuencia, "timestamp");
+CREATE INDEX ix_audit_logs_organization_id ON audit_logs (organization_id);
+CREATE INDEX ix_audit_logs_user_id ON audit_logs (user_id);
+CREATE INDEX ix_audit_logs_action ON audit_logs (action);
+CREATE INDEX ix_audit_logs_entity_type ON audit_logs (entity_type);
+CREATE INDEX ix_audit_logs_entity_id ON audit_logs (entity_id);
+CREATE INDEX ix_audit_logs_timestamp ON audit_logs ("timestamp");
+
+COMMIT;
@@ -0,0 +1,16 @@
+-- Lista de revocación de JWT por claim jti (logout y cierre forzado de sesiones).
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    id SERIAL PRIMARY KEY,
+    jti VARCHAR(64) NOT NULL,
+    username VARCHAR(100),
+    expires_at TIMESTAMPTZ NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+CREATE UNIQUE INDEX IF NOT EXISTS ix_revoked_tokens_jti ON revoked_tokens (jti);
+-- Purga de filas vencidas y carga del filtro (solo revocaciones aún vigentes)
+CREATE INDEX IF NOT EXISTS ix_revoked_tokens_expires_at ON revoked_tokens (expires_at);
+
+COMMIT;
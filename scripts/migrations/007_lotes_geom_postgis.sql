@@ -0,0 +1,39 @@
+-- Geometría nativa geometry(Polygon, 4326) para Lote, derivada de polygon_wkt, con índice GiST.
+BEGIN;
+
+CREATE EXTENSION IF NOT EXISTS postgis;
+
+ALTER TABLE lotes ADD COLUMN IF NOT EXISTS geom geometry(Polygon, 4326);
+
+-- WKT ilegible o que no es polígono: el lote queda sin geometría en lugar de abortar la migración
+CREATE FUNCTION pg_temp.poligono_desde_wkt(wkt TEXT) RETURNS geometry AS $$
+DECLARE
+    g geometry;
+BEGIN
+    g := ST_GeomFromText(wkt, 4326);
+    IF GeometryType(g) <> 'POLYGON' THEN
+        RETURN NULL;
+    END IF;
+    RETURN g;
+EXCEPTION WHEN OTHERS THEN
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+UPDATE lotes SET geom = pg_temp.poligono_desde_wkt(polygon_wkt)
+WHERE polygon_wkt IS NOT NULL AND geom IS NULL;
+
+DO $$
+DECLARE
+    sin_geometria INTEGER;
+BEGIN
+    SELECT count(*) INTO sin_geometria FROM lotes WHERE polygon_wkt IS NOT NULL AND geom IS NULL;
+    IF sin_geometria > 0 THEN
+        RAISE NOTICE '% lotes con polygon_wkt no convertible a polígono quedaron sin geom.', sin_geometria;
+    END IF;
+END $$;
+
+CREATE INDEX IF NOT EXISTS ix_lotes_geom ON lotes USING gist (geom);
+ANALYZE lotes;
+
+COMMIT;
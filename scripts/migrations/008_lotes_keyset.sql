@@ -0,0 +1,8 @@
+-- Índice (organization_id, id) para el listado de lotes paginado por cursor (keyset).
+-- CONCURRENTLY no bloquea las escrituras en lotes mientras se construye y no puede correr dentro
+-- de BEGIN/COMMIT: ejecutar este archivo en modo autocommit (psql sin --single-transaction).
+-- Si la construcción falla queda un índice INVALID: eliminarlo con
+-- DROP INDEX CONCURRENTLY IF EXISTS ix_lotes_organizacion_id; y volver a ejecutar.
+
+-- Cada página es un range scan desde el último id visto: costo constante a cualquier profundidad
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_lotes_organizacion_id ON lotes (organization_id, id);
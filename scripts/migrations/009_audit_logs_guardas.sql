@@ -0,0 +1,81 @@
+-- Guardas del audit_logs particionado.
+-- 1. Cabeza de la cadena por tenant: la unicidad (organization_id, secuencia, timestamp) ya no impide que
+--    dos escritores inserten la misma secuencia con distinto timestamp. Cada INSERT encadenado avanza la
+--    fila de audit_logs_cabezas del tenant (bloqueada hasta el commit), por lo que un segundo escritor
+--    con la misma secuencia falla por clave duplicada aunque no haya tomado el candado de la aplicación.
+-- 2. Partición DEFAULT: un evento fuera de las particiones creadas (mes sin crear o ya archivado) no
+--    hace fallar el INSERT; crear_particion_audit_logs() mueve esas filas al crear la partición del mes.
+-- Requiere PostgreSQL 13+ (triggers BEFORE ROW sobre tablas particionadas).
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS audit_logs_cabezas (
+    organization_id INTEGER PRIMARY KEY REFERENCES organizations (id) ON DELETE CASCADE,
+    secuencia INTEGER NOT NULL
+);
+
+-- La cabeza continúa desde el último registro o, si el tramo ya se archivó, desde el último checkpoint
+INSERT INTO audit_logs_cabezas (organization_id, secuencia)
+SELECT organization_id, max(secuencia)
+FROM (
+    SELECT organization_id, secuencia FROM audit_logs WHERE secuencia IS NOT NULL
+    UNION ALL
+    SELECT organization_id, secuencia_hasta FROM audit_checkpoints
+) AS cabezas
+GROUP BY organization_id
+ON CONFLICT (organization_id) DO UPDATE SET secuencia = GREATEST(audit_logs_cabezas.secuencia, EXCLUDED.secuencia);
+
+CREATE OR REPLACE FUNCTION avanzar_cabeza_audit_logs() RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.secuencia IS NULL THEN
+        RETURN NEW;  -- registros previos a la cadena
+    END IF;
+    UPDATE audit_logs_cabezas SET secuencia = NEW.secuencia
+    WHERE organization_id = NEW.organization_id AND secuencia = NEW.secuencia - 1;
+    IF NOT FOUND THEN
+        IF NEW.secuencia <> 1 THEN
+            RAISE EXCEPTION 'La secuencia % no continúa la cadena de auditoría de la organización %',
+                NEW.secuencia, NEW.organization_id USING ERRCODE = 'unique_violation';
+        END IF;
+        -- Primer evento del tenant: dos escritores concurrentes chocan en la clave primaria
+        INSERT INTO audit_logs_cabezas (organization_id, secuencia) VALUES (NEW.organization_id, 1);
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS tr_audit_logs_cabeza ON audit_logs;
+CREATE TRIGGER tr_audit_logs_cabeza
+    BEFORE INSERT ON audit_logs
+    FOR EACH ROW EXECUTE FUNCTION avanzar_cabeza_audit_logs();
+
+CREATE TABLE IF NOT EXISTS audit_logs_default PARTITION OF audit_logs DEFAULT;
+
+-- Crea (si falta) la partición del mes que contiene `mes`. Las filas de ese mes que hayan caído en la
+-- partición DEFAULT se mueven a la nueva antes de adjuntarla (se insertan sin pasar por el trigger).
+CREATE OR REPLACE FUNCTION crear_particion_audit_logs(mes DATE) RETURNS TEXT AS $$
+DECLARE
+    inicio DATE := date_trunc('month', mes)::date;
+    nombre TEXT := 'audit_logs_p' || to_char(inicio, 'YYYY_MM');
+    desde TIMESTAMPTZ := inicio::timestamp AT TIME ZONE 'UTC';
+    hasta TIMESTAMPTZ := (inicio + INTERVAL '1 month')::timestamp AT TIME ZONE 'UTC';
+BEGIN
+    IF to_regclass(nombre) IS NOT NULL THEN
+        RETURN nombre;
+    END IF;
+    -- Varios workers pueden crear la misma partición a la vez
+    PERFORM pg_advisory_xact_lock(hashtext('crear_particion_audit_logs'));
+    IF to_regclass(nombre) IS NOT NULL THEN
+        RETURN nombre;
+    END IF;
+    EXECUTE format('CREATE TABLE %I (LIKE audit_logs INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', nombre);
+    EXECUTE format(
+        'WITH movidas AS (DELETE FROM audit_logs_default WHERE "timestamp" >= %L AND "timestamp" < %L RETURNING *) '
+        'INSERT INTO %I SELECT * FROM movidas',
+        desde, hasta, nombre
+    );
+    EXECUTE format('ALTER TABLE audit_logs ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)', nombre, desde, hasta);
+    RETURN nombre;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMIT;
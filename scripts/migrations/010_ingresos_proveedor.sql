@@ -0,0 +1,22 @@
+-- Ingresos de materia prima como asientos propios del libro mayor, identificados por guía/remito.
+-- Un embarque ya no acredita el volumen ingresado que declara: solo se acredita una vez cada
+-- documento y la exportación se valida contra los ingresos asentados.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS ingresos_proveedor (
+    id SERIAL PRIMARY KEY,
+    organization_id INTEGER NOT NULL REFERENCES organizations (id) ON DELETE CASCADE,
+    documento VARCHAR(100) NOT NULL,
+    productor_id VARCHAR(100) NOT NULL,
+    producto_forestal VARCHAR(100) NOT NULL,
+    periodo DATE NOT NULL,
+    volumen_ton DOUBLE PRECISION NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    CONSTRAINT uq_ingreso_proveedor_documento UNIQUE (organization_id, documento)
+);
+CREATE INDEX IF NOT EXISTS ix_ingresos_proveedor_organization_id ON ingresos_proveedor (organization_id);
+
+ALTER TABLE lotes ADD COLUMN IF NOT EXISTS guia_ingreso VARCHAR(100);
+
+COMMIT;
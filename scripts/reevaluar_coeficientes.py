@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from litoral_trace.services.reevaluation import aplicar_cambio_coeficientes
+
+
+class ReevaluationToolError(RuntimeError):
+    """Fail-closed coefficient re-evaluation error."""
+
+
+def normalize_sqlalchemy_url(raw_url: str) -> str:
+    normalized = str(raw_url or "").strip()
+    for prefix in ("postgres://", "postgresql://"):
+        if normalized.startswith(prefix):
+            return normalized.replace(prefix, "postgresql+psycopg://", 1)
+    return normalized
+
+
+def parse_coefficient(raw_value: str) -> tuple[str, float]:
+    producto, separator, coeficiente = str(raw_value).rpartition("=")
+    if not separator or not producto.strip():
+        raise argparse.ArgumentTypeError(
+            "Expected PRODUCTO=COEFICIENTE, e.g. 'Madera Aserrada (Eucalipto)=0.42'."
+        )
+    try:
+        value = float(coeficiente)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(
+            f"Invalid coefficient {coeficiente!r}."
+        ) from exc
+    if not 0.0 < value <= 1.0:
+        raise argparse.ArgumentTypeError(
+            "Coefficient must be in the interval (0, 1]."
+        )
+    return producto.strip(), value
+
+
+def build_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Publish a new yield coefficient version and re-evaluate only the affected lots."
+    )
+    parser.add_argument(
+        "--coeficiente",
+        action="append",
+        type=parse_coefficient,
+        required=True,
+        help="PRODUCTO=COEFICIENTE (repeatable).",
+    )
+    parser.add_argument(
+        "--motivo",
+        default=None,
+    )
+    parser.add_argument(
+        "--username",
+        default="sistema",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Compute the changes and roll the transaction back.",
+    )
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = build_argument_parser()
+    args = parser.parse_args(argv)
+
+    database_url = normalize_sqlalchemy_url(os.environ.get("DB_URL", ""))
+    try:
+        if not database_url:
+            raise ReevaluationToolError("DB_URL is required.")
+        engine = create_engine(database_url)
+        with Session(engine) as session:
+            result = aplicar_cambio_coeficientes(
+                session,
+                dict(args.coeficiente),
+                motivo=args.motivo,
+                username=args.username,
+            )
+            if args.dry_run:
+                session.rollback()
+            else:
+                session.commit()
+    except Exception as exc:
+        print(str(exc), file=sys.stderr)
+        return 1
+
+    print(
+        json.dumps(
+            {
+                "version": result.version,
+                "productos_afectados": list(result.productos_afectados),
+                "lotes_evaluados": result.lotes_evaluados,
+                "lotes_modificados": result.lotes_modificados,
+                "dry_run": bool(args.dry_run),
+            },
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -4,7 +4,9 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
 
-from litoral_trace.api.auth import get_current_tenant_user, UserTenantContext
+from litoral_trace.api.auth import UserTenantContext, require_permission
+from litoral_trace.auth.rbac import Permiso
+from litoral_trace.services.audit_writer import DURABILIDAD_SINCRONA, auditar
 from litoral_trace.services.admin import (
     listar_empresas_superadmin,
     crear_nueva_empresa_cliente,
@@ -23,14 +25,8 @@ class CrearEmpresaClienteRequest(BaseModel):
     monthly_lote_limit: int = Field(default=50, ge=1)
     monthly_ton_limit: float = Field(default=3000.0, ge=1.0)
 
-def require_superadmin_role(user: UserTenantContext = Depends(get_current_tenant_user)) -> UserTenantContext:
-    """Verifica que el usuario autenticado posea rol de SuperAdmin."""
-    if user.role.lower() != "admin":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Acceso Denegado: Esta función está reservada exclusivamente para el SuperAdmin."
-        )
-    return user
+# Reservado al SuperAdmin: solo el rol admin posee ADMINISTRAR_TENANTS
+require_superadmin_role = require_permission(Permiso.ADMINISTRAR_TENANTS)
 
 @router.get("/organizations", tags=["SuperAdmin B2B"])
 async def listar_organizaciones_endpoint(
@@ -56,6 +52,16 @@ async def crear_organizacion_endpoint(
         monthly_lote_limit=payload.monthly_lote_limit,
         monthly_ton_limit=payload.monthly_ton_limit
     )
+    # Acción de administración: la respuesta sale recién con el evento confirmado
+    await auditar({
+        "organization_id": admin.organization_id,
+        "username": admin.username,
+        "action": "CREAR_ORGANIZACION",
+        "entity_type": "Organization",
+        "entity_id": res.get("organization_id"),
+        "after_data": {"name": payload.name, "tax_id": payload.tax_id, "tier": payload.tier, "admin_username": payload.admin_username},
+        "detail": f"Alta de la empresa cliente {payload.name}.",
+    }, DURABILIDAD_SINCRONA)
     return JSONResponse(status_code=status.HTTP_201_CREATED, content=res)
 
 @router.post("/organizations/{org_id}/toggle_status", tags=["SuperAdmin B2B"])
@@ -67,4 +73,12 @@ async def toggle_organizacion_status_endpoint(
     ok = alternar_estado_empresa(org_id)
     if not ok:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Empresa con ID {org_id} no encontrada.")
+    await auditar({
+        "organization_id": admin.organization_id,
+        "username": admin.username,
+        "action": "ALTERNAR_ESTADO_ORGANIZACION",
+        "entity_type": "Organization",
+        "entity_id": org_id,
+        "detail": f"Activación/suspensión de la empresa cliente {org_id}.",
+    }, DURABILIDAD_SINCRONA)
     return JSONResponse(status_code=status.HTTP_200_OK, content={"status": "updated", "organization_id": org_id})
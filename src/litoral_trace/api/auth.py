@@ -1,11 +1,22 @@
 """Router de Autenticación REST B2B, emisión JWT y contexto Tenant."""
 from __future__ import annotations
-from typing import Any
+import asyncio
+from functools import reduce
+from operator import or_
+from typing import Any, Awaitable, Callable
 from fastapi import APIRouter, Depends, HTTPException, status, Header, Cookie, Response
 from fastapi.security import OAuth2PasswordBearer
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
+from litoral_trace.auth.api_key_registry import registro_api_keys
+from litoral_trace.auth.api_keys import API_KEY_PREFIX
+from litoral_trace.auth.login import autenticar_usuario
+from litoral_trace.auth.rbac import PERMISOS_POR_ROL, Permiso, normalizar_rol
+from litoral_trace.auth.revocation import jti_revocado, revocar_token
+from litoral_trace.auth.token_cache import cache_tokens
 from litoral_trace.auth.tokens import create_jwt_token, verify_jwt_token
+from litoral_trace.db.tenant import establecer_organizacion
+from litoral_trace.services.audit_writer import auditar
 
 router = APIRouter(prefix="/api/v1/auth", tags=["Autenticación B2B"])
 
@@ -22,18 +33,43 @@ class TokenResponse(BaseModel):
     user_info: dict[str, Any]
 
 class UserTenantContext(BaseModel):
+    # Inmutable: la misma instancia se reutiliza desde la caché de tokens en cada request
+    model_config = ConfigDict(frozen=True)
+
     username: str
     organization_id: int
     organization_name: str
     role: str
     email: str
 
+def _contexto_api_key(clave: str) -> UserTenantContext:
+    """Autenticación de clientes máquina (ERP/SACVeFor/VUCE) con API Key."""
+    registro = registro_api_keys()
+    api_key = registro.verificar(clave) if registro is not None else None
+    if api_key is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Error de Autenticación: API Key inválida, revocada o vencida.",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return UserTenantContext(
+        username=api_key.username,
+        organization_id=api_key.organization_id,
+        organization_name=api_key.organization_name,
+        role=api_key.role,
+        email=api_key.email,
+    )
+
 def get_current_tenant_user(
     authorization: str | None = Header(None),
     bearer_token: str | None = Depends(oauth2_scheme),
-    session_jwt: str | None = Cookie(None)
+    session_jwt: str | None = Cookie(None),
+    x_api_key: str | None = Header(None),
 ) -> UserTenantContext:
-    """Dependencia de seguridad que extrae y valida el contexto Tenant desde JWT (Header o Cookie)."""
+    """Dependencia de seguridad que extrae y valida el contexto Tenant desde JWT (Header o Cookie) o API Key."""
+    if isinstance(x_api_key, str) and x_api_key:
+        return _contexto_api_key(x_api_key)
+
     token = None
     if isinstance(bearer_token, str) and bearer_token:
         token = bearer_token
@@ -49,7 +85,22 @@ def get_current_tenant_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    if token.startswith(API_KEY_PREFIX):
+        return _contexto_api_key(token)
+
+    cache = cache_tokens()
+    contexto = cache.obtener(token)
+    if contexto is not None:
+        return contexto
+
+    generacion = cache.generacion
     payload = verify_jwt_token(token)
+    if payload and jti_revocado(payload.get("jti")):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Error de Autenticación: La sesión fue cerrada (token revocado).",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     if not payload:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -57,13 +108,49 @@ def get_current_tenant_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    return UserTenantContext(
+    contexto = UserTenantContext(
         username=payload.get("sub", "anonimo"),
         organization_id=payload.get("org_id", 1),
         organization_name=payload.get("org_name", "Exportadora Forestal del Chaco S.A."),
-        role=payload.get("role", "cliente"),
+        role=normalizar_rol(payload.get("role") or "cliente"),
         email=payload.get("email", "comercial@litoraltrace.com")
     )
+    cache.guardar(token, payload.get("exp"), contexto, generacion, sujeto=contexto.username, jti=payload.get("jti"))
+    return contexto
+
+async def tenant_actual(user: UserTenantContext = Depends(get_current_tenant_user)) -> UserTenantContext:
+    """Fija el tenant del usuario en el ContextVar del request (filtro ORM de db.tenant).
+
+    Es async a propósito: FastAPI ejecuta las dependencias sync en un hilo con una copia del
+    contexto, y un ContextVar fijado allí no llegaría al handler.
+    """
+    establecer_organizacion(user.organization_id)
+    return user
+
+def require_permission(*permisos: Permiso) -> Callable[..., Awaitable[UserTenantContext]]:
+    """Dependencia FastAPI que exige todos los `permisos` al rol del usuario (un AND contra PERMISOS_POR_ROL)."""
+    requerido = int(reduce(or_, permisos, Permiso(0)))
+    nombres = ", ".join(p.name for p in permisos)
+
+    async def verificar_permiso(user: UserTenantContext = Depends(tenant_actual)) -> UserTenantContext:
+        if PERMISOS_POR_ROL.get(user.role, 0) & requerido != requerido:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Acceso Denegado: Su rol ('{user.role}') no posee el permiso requerido ({nombres}).",
+            )
+        return user
+
+    return verificar_permiso
+
+def evento_login(user_data: dict[str, Any]) -> dict[str, Any]:
+    """Evento de auditoría de un inicio de sesión exitoso."""
+    return {
+        "organization_id": user_data["org_id"],
+        "username": user_data["sub"],
+        "action": "LOGIN",
+        "entity_type": "User",
+        "detail": f"Inicio de sesión de {user_data['sub']} ({user_data['role']}).",
+    }
 
 @router.post("/login", response_model=TokenResponse)
 async def login_b2b(payload: LoginRequest, response: Response) -> TokenResponse:
@@ -71,29 +158,22 @@ async def login_b2b(payload: LoginRequest, response: Response) -> TokenResponse:
     username = payload.username.strip()
     password = payload.password.strip()
 
-    if username == "admin" and password == "admin123":
-        user_data = {
-            "sub": "admin",
-            "org_id": 1,
-            "org_name": "Exportadora Forestal del Chaco S.A.",
-            "role": "admin",
-            "email": "comercial@litoraltrace.com"
-        }
-    elif username and password:
-        user_data = {
-            "sub": username,
-            "org_id": 42,
-            "org_name": "Aserradero Gran Chaco S.R.L.",
-            "role": "manager",
-            "email": f"{username}@litoraltrace.com"
-        }
-    else:
+    if not username or not password:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Debe ingresar usuario y contraseña."
         )
 
+    user_data = await autenticar_usuario(username, password)
+    if user_data is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Error de Autenticación: Usuario o contraseña incorrectos.",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
     jwt_token = create_jwt_token(user_data, expires_in_seconds=86400)
+    await auditar(evento_login(user_data))
     
     response.set_cookie(
         key="session_jwt",
@@ -115,7 +195,23 @@ async def login_b2b(payload: LoginRequest, response: Response) -> TokenResponse:
         }
     )
 
+@router.post("/logout")
+async def logout_b2b(
+    response: Response,
+    authorization: str | None = Header(None),
+    session_jwt: str | None = Cookie(None),
+) -> dict[str, Any]:
+    """Cierra la sesión: revoca el JWT presentado hasta su vencimiento y elimina la cookie."""
+    token = None
+    if isinstance(authorization, str) and authorization.lower().startswith("bearer "):
+        token = authorization.split(" ")[1].strip()
+    elif isinstance(session_jwt, str) and session_jwt:
+        token = session_jwt
+    revocado = await asyncio.to_thread(revocar_token, token) if token else False
+    response.delete_cookie("session_jwt")
+    return {"status": "ok", "token_revocado": revocado}
+
 @router.get("/me", response_model=UserTenantContext)
-async def get_current_user_profile(user: UserTenantContext = Depends(get_current_tenant_user)) -> UserTenantContext:
+async def get_current_user_profile(user: UserTenantContext = Depends(tenant_actual)) -> UserTenantContext:
     """Endpoint para obtener el perfil del usuario activo y su organización Tenant."""
     return user
@@ -1,15 +1,37 @@
 """Router REST de Lotes Geoespaciales, Compliance y Procesamiento Batch."""
 from __future__ import annotations
+import asyncio
 import io
-from typing import Any
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Response, status
+from dataclasses import asdict
+from typing import Annotated, Any
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File, Response, status
 from fastapi.responses import StreamingResponse, JSONResponse
 from pydantic import BaseModel, Field
 
-from litoral_trace.api.auth import get_current_tenant_user, UserTenantContext
-from litoral_trace.services.compliance import evaluar_compliance_lote, generar_dds_json_traces_nt
+from litoral_trace.api.auth import UserTenantContext, require_permission
+from litoral_trace.auth.rbac import Permiso
+from litoral_trace.db.session import base_datos_configurada, motor_sync
+from litoral_trace.services.compliance import (
+    deadline_compliance,
+    ejecutar_cpu,
+    evaluar_compliance_lote_async,
+    generar_dds_json_traces_nt,
+)
+from litoral_trace.services.audit_writer import auditar
 from litoral_trace.services.reports import generar_pdf_reporte_bytes
-from litoral_trace.services.batch import generar_plantilla_excel, procesar_lote_masivo
+from litoral_trace.services.batch import PaqueteBatch, evaluar_lote_masivo, generar_plantilla_excel, obtener_paquete
+from litoral_trace.services.listing import (
+    DEFAULT_LIMITE_PAGINA,
+    MAX_LIMITE_PAGINA,
+    FiltrosLote,
+    PaginaLotes,
+    codificar_cursor,
+    decodificar_cursor,
+    listar_lotes,
+    normalizar_campos,
+)
+from litoral_trace.services.pdf_pool import renderizar_certificado_async
+from litoral_trace.services.persistence import REGLA_SALDO_PROVEEDOR, persistir_con_libro_mayor, registro_desde_compliance
 import pandas as pd
 
 router = APIRouter(prefix="/api/v1", tags=["Lotes & Compliance EUDR"])
@@ -22,60 +44,134 @@ class LoteEvaluacionRequest(BaseModel):
     latitud: float = Field(default=-27.45, ge=-90.0, le=90.0)
     longitud: float = Field(default=-59.05, ge=-180.0, le=180.0)
     volumen_ingresado_ton: float = Field(..., ge=0.0)
+    guia_ingreso: str | None = Field(default=None, max_length=100, example="GF-2026-000123")
     volumen_exportar_ton: float = Field(..., ge=0.0)
+    polygon_wkt: str | None = Field(default=None, example="POLYGON((-59.06 -27.46, -59.04 -27.46, -59.04 -27.44, -59.06 -27.46))")
+
+# Cartera de demostración cuando no hay base configurada (DB_URL)
+_LOTES_DEMO = (
+    {
+        "id": 101,
+        "identificador": "Rodal Norte 01",
+        "productor_id": "30-11111111-1",
+        "producto_forestal": "Madera Aserrada (Pino)",
+        "hectareas": 120.0,
+        "latitud": -27.45,
+        "longitud": -58.90,
+        "estatus": "Verde"
+    },
+    {
+        "id": 102,
+        "identificador": "Rodal Sur 02",
+        "productor_id": "30-22222222-2",
+        "producto_forestal": "Carbón Vegetal",
+        "hectareas": 85.0,
+        "latitud": -26.80,
+        "longitud": -60.40,
+        "estatus": "Verde"
+    },
+)
+
+def _pagina_demo(
+    organization_id: int,
+    filtros: FiltrosLote,
+    campos: list[str] | None,
+    cursor: str | None,
+    limite: int,
+    contar: bool | None = None,
+) -> PaginaLotes:
+    columnas = normalizar_campos(campos)
+    despues_de_id = decodificar_cursor(cursor) if cursor else 0
+    contar = not cursor if contar is None else contar
+    condiciones = {c: v for c, v in asdict(filtros).items() if v is not None}
+    filtrados = [
+        {**lote, "organization_id": organization_id} for lote in _LOTES_DEMO
+        if all(lote[c] == v for c, v in condiciones.items())
+    ]
+    restantes = [lote for lote in filtrados if lote["id"] > despues_de_id]
+    siguiente = codificar_cursor(restantes[limite - 1]["id"]) if len(restantes) > limite else None
+    lotes = [{c: lote.get(c) for c in columnas} for lote in restantes[:limite]]
+    return PaginaLotes(lotes=lotes, siguiente_cursor=siguiente, total=len(filtrados) if contar else None, total_estimado=False)
 
 @router.get("/lotes", tags=["Lotes Geoespaciales"])
 async def listar_lotes_tenant(
-    user: UserTenantContext = Depends(get_current_tenant_user)
+    user: UserTenantContext = Depends(require_permission(Permiso.LEER_LOTES)),
+    limite: Annotated[int, Query(ge=1, le=MAX_LIMITE_PAGINA)] = DEFAULT_LIMITE_PAGINA,
+    cursor: Annotated[str | None, Query(description="siguiente_cursor de la página anterior")] = None,
+    estatus: str | None = None,
+    producto_forestal: str | None = None,
+    productor_id: str | None = None,
+    campos: Annotated[str | None, Query(description="Campos separados por coma, p. ej. identificador,estatus")] = None,
+    incluir_total: Annotated[bool | None, Query(description="Por defecto el total solo se calcula en la primera página")] = None,
 ) -> JSONResponse:
-    """Lista todos los lotes geoespaciales registrados bajo la organización del usuario."""
-    lotes_demo = [
-        {
-            "id": 101,
-            "organization_id": user.organization_id,
-            "identificador": "Rodal Norte 01",
-            "productor_id": "30-11111111-1",
-            "producto_forestal": "Madera Aserrada (Pino)",
-            "hectareas": 120.0,
-            "latitud": -27.45,
-            "longitud": -58.90,
-            "estatus": "Verde"
-        },
-        {
-            "id": 102,
-            "organization_id": user.organization_id,
-            "identificador": "Rodal Sur 02",
-            "productor_id": "30-22222222-2",
-            "producto_forestal": "Carbón Vegetal",
-            "hectareas": 85.0,
-            "latitud": -26.80,
-            "longitud": -60.40,
-            "estatus": "Verde"
+    """Lista los lotes de la organización del usuario paginados por cursor, con filtros y selección de campos."""
+    filtros = FiltrosLote(estatus=estatus, producto_forestal=producto_forestal, productor_id=productor_id)
+    seleccion = campos.split(",") if campos is not None else None
+    try:
+        if base_datos_configurada():
+            pagina = await asyncio.to_thread(
+                listar_lotes, motor_sync(), user.organization_id, filtros, seleccion, cursor, limite, contar=incluir_total,
+            )
+        else:
+            pagina = _pagina_demo(user.organization_id, filtros, seleccion, cursor, limite, incluir_total)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content={
+            "organization": user.organization_name,
+            "total": pagina.total,
+            "total_estimado": pagina.total_estimado,
+            "siguiente_cursor": pagina.siguiente_cursor,
+            "lotes": pagina.lotes,
         }
-    ]
-    return JSONResponse(status_code=status.HTTP_200_OK, content={"organization": user.organization_name, "total": len(lotes_demo), "lotes": lotes_demo})
+    )
 
 @router.post("/compliance/evaluate", tags=["Compliance EUDR"])
 async def evaluar_compliance_endpoint(
     payload: LoteEvaluacionRequest,
-    user: UserTenantContext = Depends(get_current_tenant_user)
+    user: UserTenantContext = Depends(require_permission(Permiso.EVALUAR_COMPLIANCE))
 ) -> JSONResponse:
     """Ejecuta la evaluación integral de biomasa (NDVI) y balance de masas para un lote."""
     lote_data = {
         "identificador": payload.identificador,
         "productor_id": payload.productor_id,
+        "guia_ingreso": payload.guia_ingreso,
         "producto_forestal": payload.producto_forestal,
         "hectareas": payload.hectareas,
         "latitud": payload.latitud,
         "longitud": payload.longitud,
-        "polygon_wkt": f"POLYGON(({payload.longitud-0.01} {payload.latitud-0.01}, {payload.longitud+0.01} {payload.latitud-0.01}, {payload.longitud+0.01} {payload.latitud+0.01}, {payload.longitud-0.01} {payload.latitud+0.01}, {payload.longitud-0.01} {payload.latitud-0.01}))"
+        "polygon_wkt": payload.polygon_wkt or f"POLYGON(({payload.longitud-0.01} {payload.latitud-0.01}, {payload.longitud+0.01} {payload.latitud-0.01}, {payload.longitud+0.01} {payload.latitud+0.01}, {payload.longitud-0.01} {payload.latitud+0.01}, {payload.longitud-0.01} {payload.latitud-0.01}))"
     }
 
-    comp_res = evaluar_compliance_lote(lote_data, payload.volumen_ingresado_ton, payload.volumen_exportar_ton)
-    
     dds_json = None
-    if comp_res["dictamen"] == "Verde":
-        dds_json = generar_dds_json_traces_nt(lote_data, payload.volumen_exportar_ton, operador_username=user.email)
+    try:
+        async with asyncio.timeout(deadline_compliance()):
+            comp_res = await evaluar_compliance_lote_async(lote_data, payload.volumen_ingresado_ton, payload.volumen_exportar_ton)
+            if comp_res["dictamen"] == "Verde":
+                dds_json = await ejecutar_cpu(generar_dds_json_traces_nt, lote_data, payload.volumen_exportar_ton, operador_username=user.email)
+    except TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=f"La evaluación del lote {payload.identificador} excedió el plazo de {deadline_compliance():g} s. Reintente más tarde."
+        )
+
+    if base_datos_configurada():
+        # Solo el polígono informado por el cliente se persiste; el cuadrado sintético es para el DDS
+        registro = registro_desde_compliance({**lote_data, "polygon_wkt": payload.polygon_wkt}, comp_res, user.organization_id)
+        rechazos = await asyncio.to_thread(persistir_con_libro_mayor, motor_sync(), [registro])
+        if payload.identificador in rechazos:
+            comp_res = {**comp_res, "dictamen": "Rojo", "regla_aplicada": REGLA_SALDO_PROVEEDOR, "observacion": rechazos[payload.identificador]}
+            dds_json = None
+
+    await auditar({
+        "organization_id": user.organization_id,
+        "username": user.username,
+        "action": "EVALUAR_LOTE",
+        "entity_type": "Lote",
+        "after_data": {"identificador": payload.identificador, "estatus": comp_res["dictamen"], "regla_aplicada": comp_res["regla_aplicada"]},
+        "detail": f"Evaluación EUDR del lote {payload.identificador}.",
+    })
 
     return JSONResponse(
         status_code=status.HTTP_200_OK,
@@ -84,6 +180,7 @@ async def evaluar_compliance_endpoint(
             "productor_id": payload.productor_id,
             "dictamen": comp_res["dictamen"],
             "observacion": comp_res["observacion"],
+            "regla_aplicada": comp_res["regla_aplicada"],
             "balance_masas": {
                 "coeficiente": comp_res["balance_masas"].coeficiente_rendimiento,
                 "vol_max_permitido": comp_res["balance_masas"].volumen_maximo_permitido_ton,
@@ -110,9 +207,14 @@ async def descargar_plantilla_excel_endpoint() -> StreamingResponse:
 @router.post("/batch/upload", tags=["Procesamiento Batch"])
 async def procesar_batch_excel_endpoint(
     file: UploadFile = File(...),
-    user: UserTenantContext = Depends(get_current_tenant_user)
-) -> StreamingResponse:
-    """Procesa una matriz Excel subida por el usuario y genera el paquete de auditoría ZIP."""
+    perezoso: bool = False,
+    user: UserTenantContext = Depends(require_permission(Permiso.CARGA_MASIVA))
+) -> Response:
+    """Procesa una matriz Excel subida por el usuario y genera el paquete de auditoría ZIP.
+
+    Con `perezoso=true` solo se guardan los dictámenes: cada certificado se renderiza al
+    descargarse y el ZIP completo se arma únicamente si se solicita.
+    """
     if not file.filename.endswith((".xlsx", ".xls")):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El archivo subido debe ser una planilla de Excel (.xlsx)")
 
@@ -121,11 +223,85 @@ async def procesar_batch_excel_endpoint(
         df_upload = pd.read_excel(io.BytesIO(contents))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Error al leer la planilla Excel: {e}")
+    if df_upload.empty:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="La planilla Excel no contiene lotes.")
+
+    bind = motor_sync() if base_datos_configurada() else None
+    paquete = await asyncio.to_thread(evaluar_lote_masivo, df_upload, bind=bind, organization_id=user.organization_id, registrar=perezoso)
+    await auditar({
+        "organization_id": user.organization_id,
+        "username": user.username,
+        "action": "EVALUAR_LOTE_MASIVO",
+        "entity_type": "Lote",
+        "after_data": {"archivo": file.filename, "lotes": len(paquete), "paquete_id": paquete.paquete_id},
+        "detail": f"Evaluación masiva de {len(paquete)} lotes ({file.filename}).",
+    })
+    if perezoso:
+        base = f"{router.prefix}/batch/{paquete.paquete_id}"
+        return JSONResponse(
+            status_code=status.HTTP_201_CREATED,
+            content={
+                "paquete_id": paquete.paquete_id,
+                "total": len(paquete),
+                "resumen": paquete.resumen.to_dict(orient="records"),
+                "certificado_url": f"{base}/certificados/{{indice}}",
+                "zip_url": f"{base}/zip",
+                "reporte_consolidado_url": f"{base}/reporte-consolidado",
+            }
+        )
 
-    df_resumen, zip_bytes = procesar_lote_masivo(df_upload)
+    # Los PDF se renderizan en el pool y el ZIP se envía a medida que se arma
+    return _respuesta_zip(paquete, user)
 
+def _respuesta_zip(paquete: PaqueteBatch, user: UserTenantContext) -> StreamingResponse:
     return StreamingResponse(
-        io.BytesIO(zip_bytes),
+        paquete.iterar_zip(),
         media_type="application/zip",
         headers={"Content-Disposition": f"attachment; filename=LitoralTrace_Paquete_Auditoria_{user.username}.zip"}
     )
+
+def _paquete_tenant(paquete_id: str, user: UserTenantContext) -> PaqueteBatch:
+    try:
+        return obtener_paquete(paquete_id, organization_id=user.organization_id)
+    except KeyError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Paquete batch inexistente o expirado. Vuelva a procesar la planilla.")
+
+@router.get("/batch/{paquete_id}/certificados/{indice}", tags=["Procesamiento Batch"])
+async def descargar_certificado_batch_endpoint(
+    paquete_id: str,
+    indice: int,
+    user: UserTenantContext = Depends(require_permission(Permiso.EMITIR_CERTIFICADOS))
+) -> Response:
+    """Renderiza en la primera descarga (y luego sirve desde caché) el certificado de una fila del batch."""
+    paquete = _paquete_tenant(paquete_id, user)
+    if not 0 <= indice < len(paquete):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"El paquete no tiene una fila {indice}.")
+
+    pdf_bytes = await renderizar_certificado_async(paquete.trabajo_certificado(indice))
+    proveedor = paquete.df_eval.iloc[indice]["productor_id"]
+    return Response(
+        content=pdf_bytes,
+        media_type="application/pdf",
+        headers={"Content-Disposition": f"attachment; filename=AUDITORIA_{proveedor}.pdf"}
+    )
+
+@router.get("/batch/{paquete_id}/zip", tags=["Procesamiento Batch"])
+async def descargar_zip_batch_endpoint(
+    paquete_id: str,
+    user: UserTenantContext = Depends(require_permission(Permiso.EMITIR_CERTIFICADOS))
+) -> StreamingResponse:
+    """Arma en streaming el ZIP completo de un batch procesado en modo perezoso."""
+    return _respuesta_zip(_paquete_tenant(paquete_id, user), user)
+
+@router.get("/batch/{paquete_id}/reporte-consolidado", tags=["Procesamiento Batch"])
+async def descargar_reporte_consolidado_endpoint(
+    paquete_id: str,
+    user: UserTenantContext = Depends(require_permission(Permiso.EMITIR_CERTIFICADOS))
+) -> StreamingResponse:
+    """Un único PDF con tabla resumen, una página por lote e índice de marcadores por proveedor."""
+    paquete = _paquete_tenant(paquete_id, user)
+    return StreamingResponse(
+        paquete.iterar_reporte_consolidado(),
+        media_type="application/pdf",
+        headers={"Content-Disposition": f"attachment; filename=LitoralTrace_Reporte_Consolidado_{user.username}.pdf"}
+    )
@@ -0,0 +1,102 @@
+"""Middleware ASGI de Limitación de Tasa por Organización y API Key."""
+from __future__ import annotations
+import json
+
+from starlette.requests import cookie_parser
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from litoral_trace.auth.api_key_registry import registro_api_keys
+from litoral_trace.auth.api_keys import API_KEY_PREFIX
+from litoral_trace.auth.token_cache import cache_tokens
+from litoral_trace.auth.tokens import verify_jwt_token
+from litoral_trace.services.rate_limit import DecisionTasa, consumir_cuota
+
+PREFIJOS_LIMITADOS = ("/api/",)
+
+def _identidad(headers: list[tuple[bytes, bytes]]) -> tuple[int, int | None] | None:
+    """(organization_id, api_key_id) de la credencial, o None si no hay una válida.
+
+    Las requests anónimas o con credenciales inválidas no consumen cuota de ningún tenant: las
+    rechaza la dependencia de autenticación. Un JWT ya verificado se resuelve desde la caché de
+    tokens; la revocación no se evalúa aquí.
+    """
+    autorizacion = clave = cookie = None
+    for nombre, valor in headers:
+        if nombre == b"authorization":
+            autorizacion = valor.decode("latin-1")
+        elif nombre == b"x-api-key":
+            clave = valor.decode("latin-1")
+        elif nombre == b"cookie":
+            cookie = valor.decode("latin-1")
+
+    token = None
+    if autorizacion and autorizacion.lower().startswith("bearer "):
+        token = autorizacion[7:].strip()
+    if not clave and token and token.startswith(API_KEY_PREFIX):
+        clave = token
+    if clave:
+        registro = registro_api_keys()
+        api_key = registro.verificar(clave) if registro is not None else None
+        return (api_key.organization_id, api_key.id) if api_key is not None else None
+
+    if not token and cookie:
+        token = cookie_parser(cookie).get("session_jwt")
+    if not token:
+        return None
+    contexto = cache_tokens().obtener(token)
+    if contexto is not None:
+        return contexto.organization_id, None
+    payload = verify_jwt_token(token)
+    return (payload.get("org_id", 1), None) if payload else None
+
+def _cabeceras(decision: DecisionTasa) -> list[tuple[bytes, bytes]]:
+    cabeceras = [
+        (b"ratelimit-limit", str(decision.limite).encode()),
+        (b"ratelimit-remaining", str(decision.restantes).encode()),
+        (b"ratelimit-reset", str(decision.reinicio).encode()),
+    ]
+    if not decision.permitido:
+        cabeceras.append((b"retry-after", str(decision.reintentar).encode()))
+    return cabeceras
+
+class LimiteTasaMiddleware:
+    """Token bucket por organización y por API Key, con cuotas según el plan de la licencia.
+
+    ASGI puro (sin BaseHTTPMiddleware): la decisión es una lectura de cabeceras, un acierto en la
+    caché de tokens o el registro de API Keys y una operación sobre la tabla compartida. Las
+    respuestas llevan RateLimit-Limit/Remaining/Reset y, al rechazar con 429, Retry-After.
+    """
+
+    def __init__(self, app: ASGIApp, prefijos: tuple[str, ...] = PREFIJOS_LIMITADOS):
+        self.app = app
+        self.prefijos = prefijos
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefijos):
+            await self.app(scope, receive, send)
+            return
+        identidad = _identidad(scope["headers"])
+        if identidad is None:
+            await self.app(scope, receive, send)
+            return
+
+        decision = consumir_cuota(*identidad)
+        cabeceras = _cabeceras(decision)
+        if not decision.permitido:
+            cuerpo = json.dumps({
+                "detail": f"Límite de solicitudes excedido para la organización. Reintente en {decision.reintentar} s."
+            }, ensure_ascii=False).encode("utf-8")
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(cuerpo)).encode())] + cabeceras,
+            })
+            await send({"type": "http.response.body", "body": cuerpo})
+            return
+
+        async def enviar(mensaje: Message) -> None:
+            if mensaje["type"] == "http.response.start":
+                mensaje = {**mensaje, "headers": list(mensaje.get("headers", [])) + cabeceras}
+            await send(mensaje)
+
+        await self.app(scope, receive, enviar)
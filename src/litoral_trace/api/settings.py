@@ -5,7 +5,8 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
 
-from litoral_trace.api.auth import get_current_tenant_user, UserTenantContext
+from litoral_trace.api.auth import UserTenantContext, require_permission
+from litoral_trace.auth.rbac import Permiso
 from litoral_trace.services.licenses import obtener_cuota_tenant, generar_invitacion_demo_prospecto
 
 router = APIRouter(prefix="/api/v1/settings", tags=["Configuración & Licencias B2B"])
@@ -18,7 +19,7 @@ class InviteDemoUserRequest(BaseModel):
 
 @router.get("/license", tags=["Configuración & Licencias B2B"])
 async def consultar_licencia_tenant(
-    user: UserTenantContext = Depends(get_current_tenant_user)
+    user: UserTenantContext = Depends(require_permission(Permiso.LEER_LICENCIA))
 ) -> JSONResponse:
     """Consulta el estado de la licencia, consumo de cuota mensual y límites de la organización."""
     status_obj = obtener_cuota_tenant(user.organization_id)
@@ -27,7 +28,7 @@ async def consultar_licencia_tenant(
 @router.post("/invite_demo_user", tags=["Configuración & Licencias B2B"])
 async def generar_invitacion_demo_endpoint(
     payload: InviteDemoUserRequest,
-    user: UserTenantContext = Depends(get_current_tenant_user)
+    user: UserTenantContext = Depends(require_permission(Permiso.INVITAR_PROSPECTOS))
 ) -> JSONResponse:
     """Genera credenciales de acceso demo comercial para un prospecto en Resistencia o Corrientes."""
     demo_credentials = generar_invitacion_demo_prospecto(
@@ -1,14 +1,17 @@
 """Módulo de autenticación, JWT, API Keys y RBAC para Litoral Trace."""
 from litoral_trace.auth.tokens import create_jwt_token, verify_jwt_token
+from litoral_trace.auth.token_cache import cache_tokens
 from litoral_trace.auth.api_keys import generate_api_key, hash_api_key, verify_api_key_hash
-from litoral_trace.auth.rbac import has_permission, require_role, get_role_level
+from litoral_trace.auth.rbac import Permiso, has_permission, require_role, get_role_level
 
 __all__ = [
     "create_jwt_token",
     "verify_jwt_token",
+    "cache_tokens",
     "generate_api_key",
     "hash_api_key",
     "verify_api_key_hash",
+    "Permiso",
     "has_permission",
     "require_role",
     "get_role_level",
@@ -0,0 +1,211 @@
+"""Registro en Memoria de API Keys Activas y Escritura Agrupada de last_used_at."""
+from __future__ import annotations
+import hashlib
+import os
+import secrets
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any
+
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.engine import Engine
+
+from litoral_trace.auth.api_keys import API_KEY_PREFIX, hash_api_key
+from litoral_trace.auth.rbac import get_role_level, normalizar_rol
+from litoral_trace.db.models import ApiKey, Organization, User
+
+API_KEYS_REFRESCO_ENV = "LITORAL_API_KEYS_REFRESCO"
+API_KEYS_USO_INTERVALO_ENV = "LITORAL_API_KEYS_USO_INTERVALO"
+DEFAULT_API_KEYS_REFRESCO: float = 30.0
+DEFAULT_API_KEYS_USO_INTERVALO: float = 60.0
+LONGITUD_PREFIJO = 16  # ApiKey.key_prefix
+
+# Se compara contra este hash cuando el prefijo no existe: el tiempo no revela prefijos válidos
+_HASH_SENUELO = hash_api_key(API_KEY_PREFIX + "0" * 40)
+
+@dataclass(frozen=True)
+class ApiKeyActiva:
+    id: int
+    organization_id: int
+    organization_name: str
+    username: str
+    email: str
+    role: str
+    key_hash: str
+    expires_at: datetime | None
+    permissions: dict[str, Any] | None
+
+def _utc(valor: datetime | None) -> datetime | None:
+    if valor is None or valor.tzinfo is not None:
+        return valor
+    return valor.replace(tzinfo=timezone.utc)
+
+def _rol_efectivo(rol_usuario: str, permisos: dict[str, Any] | None) -> str:
+    """Una API Key puede restringir el rol de su dueño (permissions.role), nunca ampliarlo."""
+    rol = (permisos or {}).get("role")
+    if isinstance(rol, str) and get_role_level(rol) <= get_role_level(rol_usuario):
+        return normalizar_rol(rol)
+    return normalizar_rol(rol_usuario)
+
+class RegistroApiKeys:
+    """Índice prefijo → claves activas, cargado de la base y recargado cuando la tabla cambia.
+
+    Un hilo consulta la huella (cantidad de claves y último updated_at de claves, usuarios y
+    organizaciones) cada `refresco` segundos y recarga el índice si cambió: las verificaciones
+    corren en el event loop y leen solo memoria. Los usos se acumulan en un dict y otro hilo los
+    vuelca cada `intervalo_uso` segundos en un único UPDATE por lotes.
+    """
+
+    def __init__(self, bind: Engine, refresco: float | None = None, intervalo_uso: float | None = None):
+        self._bind = bind
+        self.refresco = refresco if refresco is not None else float(os.environ.get(API_KEYS_REFRESCO_ENV) or DEFAULT_API_KEYS_REFRESCO)
+        self.intervalo_uso = intervalo_uso if intervalo_uso is not None else float(
+            os.environ.get(API_KEYS_USO_INTERVALO_ENV) or DEFAULT_API_KEYS_USO_INTERVALO
+        )
+        self._indice: dict[str, tuple[ApiKeyActiva, ...]] = {}
+        self._huella: tuple | None = None
+        self._lock_carga = threading.Lock()
+        self._usos: dict[int, datetime] = {}
+        self._lock_usos = threading.Lock()
+        self.recargar()
+        self._cerrado = threading.Event()
+        self._despertar = threading.Event()
+        self._hilo = threading.Thread(target=self._bucle_usos, name="api-keys-last-used", daemon=True)
+        self._hilo.start()
+        self._hilo_indice = threading.Thread(target=self._bucle_indice, name="api-keys-indice", daemon=True)
+        self._hilo_indice.start()
+
+    def _consultar_huella(self, conn) -> tuple:
+        return conn.execute(select(
+            select(func.count(ApiKey.id)).scalar_subquery(),
+            select(func.max(ApiKey.updated_at)).scalar_subquery(),
+            select(func.max(User.updated_at)).scalar_subquery(),
+            select(func.max(Organization.updated_at)).scalar_subquery(),
+        )).one()
+
+    def recargar(self) -> None:
+        """Reconstruye el índice con las claves activas de usuarios y organizaciones activos."""
+        with self._lock_carga, self._bind.connect() as conn:
+            huella = self._consultar_huella(conn)
+            filas = conn.execute(
+                select(
+                    ApiKey.id, ApiKey.organization_id, Organization.name, User.username, User.email, User.role,
+                    ApiKey.key_prefix, ApiKey.key_hash, ApiKey.expires_at, ApiKey.permissions,
+                )
+                .join(User, User.id == ApiKey.user_id)
+                .join(Organization, Organization.id == ApiKey.organization_id)
+                .where(ApiKey.is_active.is_(True), User.is_active.is_(True), Organization.is_active.is_(True))
+            ).all()
+            indice: dict[str, list[ApiKeyActiva]] = {}
+            for f in filas:
+                indice.setdefault(f.key_prefix, []).append(ApiKeyActiva(
+                    f.id, f.organization_id, f.name, f.username, f.email, _rol_efectivo(f.role, f.permissions),
+                    f.key_hash, _utc(f.expires_at), f.permissions,
+                ))
+            self._indice = {prefijo: tuple(claves) for prefijo, claves in indice.items()}
+            self._huella = huella
+
+    def refrescar(self) -> bool:
+        """Recarga el índice solo si la huella cambió desde la última carga; devuelve si recargó."""
+        if self._huella is not None:
+            with self._bind.connect() as conn:
+                if self._consultar_huella(conn) == self._huella:
+                    return False
+        self.recargar()
+        return True
+
+    def invalidar(self) -> None:
+        """Pide una recarga inmediata en segundo plano (alta, revocación o rotación en este proceso)."""
+        self._huella = None
+        self._despertar.set()
+
+    def _bucle_indice(self) -> None:
+        while True:
+            self._despertar.wait(self.refresco)
+            self._despertar.clear()
+            if self._cerrado.is_set():
+                return
+            try:
+                self.refrescar()
+            except Exception:
+                pass  # Se mantiene el último índice conocido
+
+    def verificar(self, clave: str) -> ApiKeyActiva | None:
+        """Busca por prefijo y compara en tiempo constante el SHA-256 de la clave completa (sin E/S)."""
+        clave = clave.strip()
+        calculado = hashlib.sha256(clave.encode("utf-8")).hexdigest()
+        candidatas = self._indice.get(clave[:LONGITUD_PREFIJO], ())
+        encontrada = None
+        for candidata in candidatas:
+            if secrets.compare_digest(calculado, candidata.key_hash):
+                encontrada = candidata
+        if not candidatas:
+            secrets.compare_digest(calculado, _HASH_SENUELO)
+        if encontrada is None:
+            return None
+        ahora = datetime.now(timezone.utc)
+        if encontrada.expires_at is not None and encontrada.expires_at <= ahora:
+            return None
+        with self._lock_usos:
+            self._usos[encontrada.id] = ahora
+        return encontrada
+
+    def volcar_usos(self) -> int:
+        """Escribe los last_used_at acumulados con un único UPDATE ejecutado por lotes."""
+        with self._lock_usos:
+            usos, self._usos = self._usos, {}
+        if not usos:
+            return 0
+        # updated_at se preserva: el uso de una clave no debe disparar la recarga del registro
+        sentencia = (
+            update(ApiKey)
+            .where(ApiKey.id == bindparam("b_id"))
+            .values(last_used_at=bindparam("b_last_used_at"), updated_at=ApiKey.updated_at)
+        )
+        try:
+            with self._bind.begin() as conn:
+                conn.execute(sentencia, [{"b_id": id_, "b_last_used_at": momento} for id_, momento in usos.items()])
+        except Exception:
+            with self._lock_usos:
+                for id_, momento in usos.items():
+                    self._usos.setdefault(id_, momento)
+            raise
+        return len(usos)
+
+    def _bucle_usos(self) -> None:
+        while not self._cerrado.wait(self.intervalo_uso):
+            try:
+                self.volcar_usos()
+            except Exception:
+                pass  # Se reintenta en el próximo intervalo; los usos quedan acumulados
+
+    def cerrar(self) -> None:
+        self._cerrado.set()
+        self._despertar.set()
+        self._hilo.join()
+        self._hilo_indice.join()
+        self.volcar_usos()
+
+_registro: RegistroApiKeys | None = None
+_registro_lock = threading.Lock()
+
+def iniciar_registro_api_keys(bind: Engine, **opciones: Any) -> RegistroApiKeys:
+    """Crea el registro compartido del proceso (reemplaza y cierra uno anterior, si existía)."""
+    global _registro
+    with _registro_lock:
+        previo, _registro = _registro, RegistroApiKeys(bind, **opciones)
+    if previo is not None:
+        previo.cerrar()
+    return _registro
+
+def registro_api_keys() -> RegistroApiKeys | None:
+    return _registro
+
+def cerrar_registro_api_keys() -> None:
+    """Vuelca los last_used_at pendientes (apagado del servidor)."""
+    global _registro
+    with _registro_lock:
+        registro, _registro = _registro, None
+    if registro is not None:
+        registro.cerrar()
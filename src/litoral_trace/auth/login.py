@@ -0,0 +1,174 @@
+"""Login contra la Tabla `users` con bcrypt fuera del Event Loop y last_login_at Agrupado."""
+from __future__ import annotations
+import asyncio
+import os
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any
+
+import bcrypt
+from sqlalchemy import bindparam, or_, select, update
+from sqlalchemy.engine import Engine
+
+from litoral_trace.auth.rbac import normalizar_rol
+from litoral_trace.db.models import Organization, User
+
+BCRYPT_ROUNDS_ENV = "LITORAL_BCRYPT_ROUNDS"
+LOGIN_HILOS_ENV = "LITORAL_LOGIN_HILOS"
+LOGIN_INTERVALO_ENV = "LITORAL_LOGIN_INTERVALO"
+DEFAULT_BCRYPT_ROUNDS: int = 12
+DEFAULT_LOGIN_HILOS: int = 2
+DEFAULT_LOGIN_INTERVALO: float = 10.0
+LONGITUD_MAXIMA_BCRYPT = 72  # bytes; bcrypt ignora (o rechaza, desde 5.0) el resto
+
+# Cuenta de demostración: solo se acepta mientras no haya un servicio de login con base configurado
+USUARIO_DEMO = {
+    "sub": "admin",
+    "org_id": 1,
+    "org_name": "Exportadora Forestal del Chaco S.A.",
+    "role": "admin",
+    "email": "comercial@litoraltrace.com",
+}
+_CLAVE_DEMO = "admin123"
+
+def _bytes_password(password: str) -> bytes:
+    return password.encode("utf-8")[:LONGITUD_MAXIMA_BCRYPT]
+
+def hash_password(password: str, rounds: int | None = None) -> str:
+    """Hash bcrypt para persistir en User.password_hash."""
+    rounds = rounds or int(os.environ.get(BCRYPT_ROUNDS_ENV) or DEFAULT_BCRYPT_ROUNDS)
+    return bcrypt.hashpw(_bytes_password(password), bcrypt.gensalt(rounds)).decode("ascii")
+
+def verificar_password(password: str, password_hash: str) -> bool:
+    try:
+        return bcrypt.checkpw(_bytes_password(password), password_hash.encode("ascii"))
+    except ValueError:
+        return False  # Hash vacío o de otro formato
+
+@lru_cache(maxsize=1)
+def _hash_senuelo() -> str:
+    """Hash con el mismo costo que los reales: un usuario inexistente tarda lo mismo que uno con clave errónea."""
+    return hash_password(secrets.token_urlsafe(16))
+
+class ServicioLogin:
+    """Verificación de credenciales en un pool acotado de hilos.
+
+    bcrypt cuesta ~100 ms de CPU por intento: en `async def` bloquearía el event loop del
+    worker. La consulta y el checkpw corren en `hilos` hilos dedicados (un pico de logins al
+    inicio de turno hace cola allí, sin ocupar el pool por defecto de to_thread), y los
+    last_login_at se acumulan en memoria y se escriben cada `intervalo` segundos en un único
+    UPDATE por lotes.
+    """
+
+    def __init__(self, bind: Engine, hilos: int | None = None, intervalo: float | None = None):
+        self._bind = bind
+        self.hilos = hilos or int(os.environ.get(LOGIN_HILOS_ENV) or DEFAULT_LOGIN_HILOS)
+        self.intervalo = intervalo if intervalo is not None else float(
+            os.environ.get(LOGIN_INTERVALO_ENV) or DEFAULT_LOGIN_INTERVALO
+        )
+        self._pool = ThreadPoolExecutor(max_workers=self.hilos, thread_name_prefix="login-bcrypt")
+        self._accesos: dict[int, datetime] = {}
+        self._lock_accesos = threading.Lock()
+        self._cerrado = threading.Event()
+        self._hilo = threading.Thread(target=self._bucle_accesos, name="login-last-login", daemon=True)
+        self._hilo.start()
+
+    def autenticar(self, username: str, password: str) -> dict[str, Any] | None:
+        """Claims del JWT si las credenciales son válidas (bloqueante: ejecutar fuera del event loop)."""
+        with self._bind.connect() as conn:
+            fila = conn.execute(
+                select(User.id, User.username, User.email, User.role, User.password_hash, User.organization_id, Organization.name)
+                .join(Organization, Organization.id == User.organization_id)
+                .where(
+                    or_(User.username == username, User.email == username),
+                    User.is_active.is_(True),
+                    Organization.is_active.is_(True),
+                )
+            ).first()
+        if fila is None:
+            verificar_password(password, _hash_senuelo())
+            return None
+        if not verificar_password(password, fila.password_hash):
+            return None
+        with self._lock_accesos:
+            self._accesos[fila.id] = datetime.now(timezone.utc)
+        return {
+            "sub": fila.username,
+            "org_id": fila.organization_id,
+            "org_name": fila.name,
+            "role": normalizar_rol(fila.role),
+            "email": fila.email,
+        }
+
+    async def autenticar_async(self, username: str, password: str) -> dict[str, Any] | None:
+        return await asyncio.get_running_loop().run_in_executor(self._pool, self.autenticar, username, password)
+
+    def volcar_accesos(self) -> int:
+        """Escribe los last_login_at acumulados con un único UPDATE ejecutado por lotes."""
+        with self._lock_accesos:
+            accesos, self._accesos = self._accesos, {}
+        if not accesos:
+            return 0
+        # updated_at se preserva: un login no es un cambio del usuario (ni recarga el registro de API Keys)
+        sentencia = (
+            update(User)
+            .where(User.id == bindparam("b_id"))
+            .values(last_login_at=bindparam("b_last_login_at"), updated_at=User.updated_at)
+        )
+        try:
+            with self._bind.begin() as conn:
+                conn.execute(sentencia, [{"b_id": id_, "b_last_login_at": momento} for id_, momento in accesos.items()])
+        except Exception:
+            with self._lock_accesos:
+                for id_, momento in accesos.items():
+                    self._accesos.setdefault(id_, momento)
+            raise
+        return len(accesos)
+
+    def _bucle_accesos(self) -> None:
+        while not self._cerrado.wait(self.intervalo):
+            try:
+                self.volcar_accesos()
+            except Exception:
+                pass  # Se reintenta en el próximo intervalo
+
+    def cerrar(self) -> None:
+        self._cerrado.set()
+        self._hilo.join()
+        self._pool.shutdown(wait=True)
+        self.volcar_accesos()
+
+_servicio: ServicioLogin | None = None
+_servicio_lock = threading.Lock()
+
+def iniciar_servicio_login(bind: Engine, **opciones: Any) -> ServicioLogin:
+    """Crea el servicio de login del proceso (reemplaza y cierra uno anterior, si existía)."""
+    global _servicio
+    with _servicio_lock:
+        previo, _servicio = _servicio, ServicioLogin(bind, **opciones)
+    if previo is not None:
+        previo.cerrar()
+    return _servicio
+
+def servicio_login() -> ServicioLogin | None:
+    return _servicio
+
+def cerrar_servicio_login() -> None:
+    """Vuelca los last_login_at pendientes (apagado del servidor)."""
+    global _servicio
+    with _servicio_lock:
+        servicio, _servicio = _servicio, None
+    if servicio is not None:
+        servicio.cerrar()
+
+async def autenticar_usuario(username: str, password: str) -> dict[str, Any] | None:
+    """Claims del usuario autenticado o None. Sin base configurada solo existe la cuenta demo."""
+    servicio = _servicio
+    if servicio is not None:
+        return await servicio.autenticar_async(username, password)
+    usuario_ok = secrets.compare_digest(username.encode("utf-8"), USUARIO_DEMO["sub"].encode("utf-8"))
+    clave_ok = secrets.compare_digest(password.encode("utf-8"), _CLAVE_DEMO.encode("utf-8"))
+    return dict(USUARIO_DEMO) if usuario_ok and clave_ok else None
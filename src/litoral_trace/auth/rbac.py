@@ -1,6 +1,8 @@
 """Control de Accesos Basado en Roles (RBAC) y jerarquía de permisos B2B."""
 from __future__ import annotations
 import functools
+import sys
+from enum import IntFlag
 from typing import Callable, Any
 
 # Jerarquía numérico-jerárquica de permisos
@@ -12,6 +14,53 @@ ROLE_LEVELS: dict[str, int] = {
     "guest": 0          # Sin permisos de modificación
 }
 
+class Permiso(IntFlag):
+    """Permisos atómicos de la API; cada uno es un bit de la matriz rol × permiso."""
+    LEER_LOTES = 1 << 0
+    LEER_LICENCIA = 1 << 1
+    LEER_BOVEDA = 1 << 2
+    EVALUAR_COMPLIANCE = 1 << 3
+    EMITIR_CERTIFICADOS = 1 << 4
+    LEER_AUDITORIA = 1 << 5
+    CARGA_MASIVA = 1 << 6
+    GESTIONAR_LOTES = 1 << 7
+    INVITAR_PROSPECTOS = 1 << 8
+    GESTIONAR_API_KEYS = 1 << 9
+    GESTIONAR_LICENCIAS = 1 << 10
+    ADMINISTRAR_TENANTS = 1 << 11
+
+# Nivel mínimo de ROLE_LEVELS que otorga cada permiso
+NIVEL_MINIMO_PERMISO: dict[Permiso, int] = {
+    Permiso.LEER_LOTES: ROLE_LEVELS["cliente"],
+    Permiso.LEER_LICENCIA: ROLE_LEVELS["cliente"],
+    Permiso.LEER_BOVEDA: ROLE_LEVELS["cliente"],
+    Permiso.EVALUAR_COMPLIANCE: ROLE_LEVELS["auditor"],
+    Permiso.EMITIR_CERTIFICADOS: ROLE_LEVELS["auditor"],
+    Permiso.LEER_AUDITORIA: ROLE_LEVELS["auditor"],
+    Permiso.CARGA_MASIVA: ROLE_LEVELS["manager"],
+    Permiso.GESTIONAR_LOTES: ROLE_LEVELS["manager"],
+    Permiso.INVITAR_PROSPECTOS: ROLE_LEVELS["manager"],
+    Permiso.GESTIONAR_API_KEYS: ROLE_LEVELS["admin"],
+    Permiso.GESTIONAR_LICENCIAS: ROLE_LEVELS["admin"],
+    Permiso.ADMINISTRAR_TENANTS: ROLE_LEVELS["admin"],
+}
+
+# Matriz rol → bitset (int plano, no IntFlag: el chequeo es un AND de enteros sin pasar por el enum)
+PERMISOS_POR_ROL: dict[str, int] = {
+    sys.intern(rol): sum(int(p) for p, minimo in NIVEL_MINIMO_PERMISO.items() if nivel >= minimo)
+    for rol, nivel in ROLE_LEVELS.items()
+}
+
+_ROLES_CANONICOS: dict[str, str] = {rol: rol for rol in PERMISOS_POR_ROL}
+
+def normalizar_rol(role: str) -> str:
+    """Rol en minúsculas e internado; los roles conocidos devuelven la misma clave de PERMISOS_POR_ROL."""
+    canonico = _ROLES_CANONICOS.get(role)
+    return canonico if canonico is not None else sys.intern(role.lower().strip())
+
+def permisos_de_rol(role: str) -> Permiso:
+    return Permiso(PERMISOS_POR_ROL.get(normalizar_rol(role), 0))
+
 def get_role_level(role: str) -> int:
     """Devuelve el nivel numérico de un rol en la jerarquía."""
     return ROLE_LEVELS.get(role.lower().strip(), 0)
@@ -0,0 +1,207 @@
+"""Revocación de JWT por `jti` con Filtro de Bloom en Memoria por Proceso."""
+from __future__ import annotations
+import hashlib
+import logging
+import math
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Any, Iterable
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+
+from litoral_trace.auth.token_cache import cache_tokens
+from litoral_trace.auth.tokens import verify_jwt_token
+from litoral_trace.db.models import RevokedToken
+
+REVOCACION_REFRESCO_ENV = "LITORAL_REVOCACION_REFRESCO"
+REVOCACION_VENTANA_ENV = "LITORAL_REVOCACION_VENTANA"
+DEFAULT_REVOCACION_REFRESCO: float = 5.0
+# Ids por debajo del último visto que se releen: un id SERIAL puede confirmarse después de uno mayor
+DEFAULT_REVOCACION_VENTANA: int = 256
+TASA_FALSOS_POSITIVOS: float = 0.001
+CAPACIDAD_MINIMA_FILTRO: int = 1024
+
+logger = logging.getLogger(__name__)
+
+class FiltroBloom:
+    """Conjunto probabilístico: sin falsos negativos y con ~`tasa` de falsos positivos a `capacidad` elementos."""
+
+    def __init__(self, capacidad: int, tasa: float = TASA_FALSOS_POSITIVOS):
+        self.capacidad = max(int(capacidad), 1)
+        self.bits = max(int(-self.capacidad * math.log(tasa) / math.log(2) ** 2), 64)
+        self.funciones = max(round(self.bits / self.capacidad * math.log(2)), 1)
+        self._mapa = bytearray((self.bits + 7) // 8)
+        self.elementos = 0
+
+    def _posiciones(self, clave: str) -> Iterable[int]:
+        # Doble hashing (Kirsch-Mitzenmacher): k posiciones a partir de un único BLAKE2b de 128 bits
+        digest = hashlib.blake2b(clave.encode("utf-8"), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.bits for i in range(self.funciones))
+
+    def agregar(self, clave: str) -> None:
+        for posicion in self._posiciones(clave):
+            self._mapa[posicion >> 3] |= 1 << (posicion & 7)
+        self.elementos += 1
+
+    def __contains__(self, clave: object) -> bool:
+        if not isinstance(clave, str):
+            return False
+        mapa = self._mapa
+        return all(mapa[posicion >> 3] & (1 << (posicion & 7)) for posicion in self._posiciones(clave))
+
+class RegistroRevocaciones:
+    """Espejo en memoria de `revoked_tokens`.
+
+    Un hilo trae cada `refresco` segundos las revocaciones con id posterior al último visto menos
+    una `ventana` (los ids se asignan antes del commit y pueden confirmarse fuera de orden); las ya
+    incorporadas se omiten. El filtro se reconstruye completo, sin las ya vencidas, cuando supera su
+    capacidad; si la base falla se conserva el último filtro. Un `jti` ausente del filtro se acepta
+    sin tocar la base; solo los aciertos del filtro se confirman contra la tabla.
+    """
+
+    def __init__(self, bind: Engine, refresco: float | None = None, ventana: int | None = None):
+        self._bind = bind
+        self.refresco = refresco if refresco is not None else float(os.environ.get(REVOCACION_REFRESCO_ENV) or DEFAULT_REVOCACION_REFRESCO)
+        self.ventana = max(ventana if ventana is not None else int(os.environ.get(REVOCACION_VENTANA_ENV) or DEFAULT_REVOCACION_VENTANA), 0)
+        self._filtro = FiltroBloom(CAPACIDAD_MINIMA_FILTRO)
+        self._ultimo_id = 0
+        self._vistos: set[int] = set()  # ids ya incorporados dentro de la ventana
+        self._confirmados: set[str] = set()
+        self._descartados: set[str] = set()  # falsos positivos ya consultados
+        self._lock = threading.Lock()
+        self.consultas_autoritativas = 0
+        self.recargar()
+        self._cerrado = threading.Event()
+        self._hilo = threading.Thread(target=self._bucle, name="revocaciones-refresco", daemon=True)
+        self._hilo.start()
+
+    def recargar(self) -> None:
+        """Reconstruye el filtro con las revocaciones vigentes."""
+        ahora = datetime.now(timezone.utc)
+        # Filas y max(id) en una única sentencia (misma snapshot); el OUTER JOIN conserva el máximo sin filas vigentes
+        maximo = select(func.max(RevokedToken.id).label("maximo")).subquery()
+        with self._lock, self._bind.connect() as conn:
+            resultado = conn.execute(
+                select(maximo.c.maximo, RevokedToken.id, RevokedToken.jti)
+                .select_from(maximo)
+                .outerjoin(RevokedToken, RevokedToken.expires_at > ahora)
+            ).all()
+            ultimo_id = resultado[0].maximo or 0
+            filas = [(fila.id, fila.jti) for fila in resultado if fila.id is not None]
+            filtro = FiltroBloom(max(len(filas) * 2, CAPACIDAD_MINIMA_FILTRO))
+            for _, jti in filas:
+                filtro.agregar(jti)
+            self._filtro, self._ultimo_id = filtro, ultimo_id
+            self._vistos = {id_ for id_, _ in filas if id_ > ultimo_id - self.ventana}
+            self._confirmados, self._descartados = set(), set()
+        cache_tokens().revocar_jtis(jti for _, jti in filas)
+
+    def sincronizar(self) -> None:
+        """Incorpora las revocaciones nuevas y expulsa de la caché local los tokens revocados en otros procesos."""
+        with self._lock, self._bind.connect() as conn:
+            filas = conn.execute(
+                select(RevokedToken.id, RevokedToken.jti)
+                .where(RevokedToken.id > self._ultimo_id - self.ventana, RevokedToken.expires_at > datetime.now(timezone.utc))
+                .order_by(RevokedToken.id)
+            ).all()
+            nuevos = [(id_, jti) for id_, jti in filas if id_ not in self._vistos]
+            if not nuevos:
+                return
+            excede = self._filtro.elementos + len(nuevos) > self._filtro.capacidad
+            if not excede:
+                for _, jti in nuevos:
+                    self._filtro.agregar(jti)
+                self._descartados.difference_update(jti for _, jti in nuevos)
+                self._ultimo_id = max(self._ultimo_id, nuevos[-1][0])
+                self._vistos = {id_ for id_ in self._vistos.union(id_ for id_, _ in nuevos) if id_ > self._ultimo_id - self.ventana}
+        if excede:
+            self.recargar()
+        else:
+            cache_tokens().revocar_jtis(jti for _, jti in nuevos)
+
+    def _bucle(self) -> None:
+        while not self._cerrado.wait(self.refresco):
+            try:
+                self.sincronizar()
+            except Exception:
+                logger.warning("No se pudieron sincronizar las revocaciones de tokens; se mantiene el último filtro.", exc_info=True)
+
+    def cerrar(self) -> None:
+        self._cerrado.set()
+        self._hilo.join()
+
+    def esta_revocado(self, jti: str | None) -> bool:
+        """Consulta la tabla solo ante un acierto del filtro todavía no resuelto."""
+        if not jti:
+            return False
+        if jti not in self._filtro or jti in self._descartados:
+            return False
+        if jti in self._confirmados:
+            return True
+        self.consultas_autoritativas += 1
+        with self._bind.connect() as conn:
+            revocado = conn.execute(select(RevokedToken.id).where(RevokedToken.jti == jti)).first() is not None
+        (self._confirmados if revocado else self._descartados).add(jti)
+        return revocado
+
+    def revocar(self, jti: str, expires_at: datetime, username: str | None = None) -> None:
+        """Persiste la revocación y la aplica de inmediato en este proceso (los demás, al refrescar)."""
+        try:
+            with self._bind.begin() as conn:
+                conn.execute(insert(RevokedToken), [{"jti": jti, "username": username, "expires_at": expires_at}])
+        except IntegrityError:
+            pass  # Ya estaba revocado
+        with self._lock:
+            self._filtro.agregar(jti)
+            self._confirmados.add(jti)
+            self._descartados.discard(jti)
+        cache_tokens().revocar_jtis([jti])
+
+def purgar_revocaciones_vencidas(bind: Engine) -> int:
+    """Borra las revocaciones de tokens ya vencidos (la firma los rechaza por `exp`)."""
+    with bind.begin() as conn:
+        return conn.execute(delete(RevokedToken).where(RevokedToken.expires_at <= datetime.now(timezone.utc))).rowcount
+
+_registro: RegistroRevocaciones | None = None
+_registro_lock = threading.Lock()
+
+def iniciar_registro_revocaciones(bind: Engine, **opciones: Any) -> RegistroRevocaciones:
+    """Crea el registro compartido del proceso (reemplaza y detiene uno anterior, si existía)."""
+    global _registro
+    with _registro_lock:
+        previo, _registro = _registro, RegistroRevocaciones(bind, **opciones)
+    if previo is not None:
+        previo.cerrar()
+    return _registro
+
+def registro_revocaciones() -> RegistroRevocaciones | None:
+    return _registro
+
+def cerrar_registro_revocaciones() -> None:
+    """Detiene el hilo de refresco (apagado del servidor)."""
+    global _registro
+    with _registro_lock:
+        registro, _registro = _registro, None
+    if registro is not None:
+        registro.cerrar()
+
+def jti_revocado(jti: str | None) -> bool:
+    registro = _registro
+    return registro.esta_revocado(jti) if registro is not None else False
+
+def revocar_token(token: str) -> bool:
+    """Logout: revoca un JWT válido hasta su `exp`. Devuelve False si el token ya no era válido."""
+    cache_tokens().revocar_token(token)
+    payload = verify_jwt_token(token)
+    if not payload:
+        return False
+    jti, exp = payload.get("jti"), payload.get("exp")
+    registro = _registro
+    if registro is None or not jti or not exp:
+        return False
+    registro.revocar(jti, datetime.fromtimestamp(exp, timezone.utc), payload.get("sub"))
+    return True
@@ -0,0 +1,133 @@
+"""Caché Acotada de Tokens JWT ya Verificados (token → contexto Tenant validado)."""
+from __future__ import annotations
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Iterable
+
+CACHE_TOKENS_ENV = "LITORAL_CACHE_TOKENS"
+DEFAULT_CACHE_TOKENS: int = 10_000
+
+@dataclass(frozen=True)
+class EstadisticasCacheTokens:
+    entradas: int
+    capacidad: int
+    aciertos: int
+    fallos: int
+
+class CacheTokens:
+    """Mapa token → valor validado que vence junto con el `exp` del token.
+
+    La clave es el token completo y no solo su firma: un acierto no debe aceptar un payload
+    distinto montado sobre una firma válida. Los aciertos no toman el lock (una lectura de dict);
+    solo las altas, bajas y expulsiones se serializan. Ante capacidad agotada se descarta la
+    entrada más antigua.
+    """
+
+    def __init__(self, capacidad: int):
+        self.capacidad = max(int(capacidad), 0)
+        # token -> (instante de vencimiento, sujeto, valor, jti); jti -> token para la revocación
+        self._entradas: dict[str, tuple[float, str | None, Any, str | None]] = {}
+        self._por_jti: dict[str, str] = {}
+        self._generacion = 0
+        self._aciertos = 0
+        self._fallos = 0
+        self._lock = threading.Lock()
+
+    @property
+    def generacion(self) -> int:
+        """Se incrementa con cada revocación: un alta verificada antes de la revocación se descarta."""
+        return self._generacion
+
+    def obtener(self, token: str) -> Any | None:
+        entrada = self._entradas.get(token)
+        if entrada is None:
+            self._fallos += 1
+            return None
+        if time.time() >= entrada[0]:
+            with self._lock:
+                self._descartar(token)
+            self._fallos += 1
+            return None
+        self._aciertos += 1
+        return entrada[2]
+
+    def guardar(
+        self,
+        token: str,
+        exp: int | float | None,
+        valor: Any,
+        generacion: int,
+        sujeto: str | None = None,
+        jti: str | None = None,
+    ) -> None:
+        """Guarda un token recién verificado. `exp` sigue la regla de verify_jwt_token (válido hasta exp inclusive)."""
+        if self.capacidad == 0:
+            return
+        vencimiento = math.floor(exp) + 1 if exp else math.inf
+        with self._lock:
+            if generacion != self._generacion:
+                return
+            if token not in self._entradas and len(self._entradas) >= self.capacidad:
+                self._purgar_vencidos()
+                if len(self._entradas) >= self.capacidad:
+                    self._descartar(next(iter(self._entradas)))
+            self._entradas[token] = (vencimiento, sujeto, valor, jti)
+            if jti:
+                self._por_jti[jti] = token
+
+    def _descartar(self, token: str) -> None:
+        entrada = self._entradas.pop(token, None)
+        if entrada is not None and entrada[3]:
+            self._por_jti.pop(entrada[3], None)
+
+    def _purgar_vencidos(self) -> None:
+        ahora = time.time()
+        for token in [t for t, (vencimiento, *_) in self._entradas.items() if ahora >= vencimiento]:
+            self._descartar(token)
+
+    def revocar_token(self, token: str) -> None:
+        with self._lock:
+            self._generacion += 1
+            self._descartar(token)
+
+    def revocar_jtis(self, jtis: Iterable[str]) -> int:
+        """Descarta los tokens cacheados cuyos `jti` fueron revocados (incluso por otro proceso)."""
+        with self._lock:
+            self._generacion += 1
+            tokens = [self._por_jti[jti] for jti in jtis if jti in self._por_jti]
+            for token in tokens:
+                self._descartar(token)
+            return len(tokens)
+
+    def revocar_sujeto(self, sujeto: str) -> int:
+        """Descarta todas las sesiones cacheadas de un usuario (cambio de rol, baja, logout global)."""
+        with self._lock:
+            self._generacion += 1
+            tokens = [t for t, (_, s, *_) in self._entradas.items() if s == sujeto]
+            for token in tokens:
+                self._descartar(token)
+            return len(tokens)
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._generacion += 1
+            self._entradas.clear()
+            self._por_jti.clear()
+
+    def estadisticas(self) -> EstadisticasCacheTokens:
+        return EstadisticasCacheTokens(len(self._entradas), self.capacidad, self._aciertos, self._fallos)
+
+    def __contains__(self, token: object) -> bool:
+        return token in self._entradas
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+@lru_cache(maxsize=1)
+def cache_tokens() -> CacheTokens:
+    """Caché compartida del proceso, dimensionada por LITORAL_CACHE_TOKENS (0 la deshabilita)."""
+    return CacheTokens(int(os.environ.get(CACHE_TOKENS_ENV) or DEFAULT_CACHE_TOKENS))
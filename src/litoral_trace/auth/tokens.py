@@ -4,6 +4,7 @@ import hmac
 import hashlib
 import json
 import base64
+import secrets
 import time
 from typing import Any
 
@@ -27,7 +28,9 @@ def create_jwt_token(
     full_payload = {
         **payload,
         "iat": now,
-        "exp": now + expires_in_seconds
+        "exp": now + expires_in_seconds,
+        # Identificador único del token: permite revocarlo (logout) antes de su vencimiento
+        "jti": payload.get("jti") or secrets.token_urlsafe(16),
     }
     
     encoded_header = _base64url_encode(json.dumps(header).encode('utf-8'))
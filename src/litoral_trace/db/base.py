@@ -1,7 +1,7 @@
 """Base declarativa y mixins comunes para SQLAlchemy 2.x."""
 from __future__ import annotations
 from datetime import datetime, timezone
-from sqlalchemy import DateTime, func
+from sqlalchemy import DateTime, ForeignKey, func
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 class Base(DeclarativeBase):
@@ -21,3 +21,11 @@ class TimestampMixin:
         onupdate=func.now(),
         nullable=False,
     )
+
+class TenantMixin:
+    """Mixin para entidades propiedad de una organización; db.tenant las restringe al tenant activo."""
+    organization_id: Mapped[int] = mapped_column(
+        ForeignKey("organizations.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
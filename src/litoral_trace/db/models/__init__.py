@@ -3,14 +3,23 @@ from litoral_trace.db.models.organization import Organization
 from litoral_trace.db.models.user import User
 from litoral_trace.db.models.lote import Lote
 from litoral_trace.db.models.audit_log import AuditLog
+from litoral_trace.db.models.audit_checkpoint import AuditCheckpoint
 from litoral_trace.db.models.api_key import ApiKey
 from litoral_trace.db.models.license import License
+from litoral_trace.db.models.coeficiente import CoeficienteRendimiento
+from litoral_trace.db.models.balance_proveedor import BalanceProveedorMensual, IngresoProveedor
+from litoral_trace.db.models.revoked_token import RevokedToken
 
 __all__ = [
     "Organization",
     "User",
     "Lote",
     "AuditLog",
+    "AuditCheckpoint",
     "ApiKey",
     "License",
+    "CoeficienteRendimiento",
+    "BalanceProveedorMensual",
+    "IngresoProveedor",
+    "RevokedToken",
 ]
@@ -5,18 +5,17 @@ from typing import TYPE_CHECKING
 import sqlalchemy as sa
 from sqlalchemy import String, Boolean, DateTime, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from litoral_trace.db.base import Base, TimestampMixin
+from litoral_trace.db.base import Base, TenantMixin, TimestampMixin
 
 if TYPE_CHECKING:
     from litoral_trace.db.models.organization import Organization
     from litoral_trace.db.models.user import User
 
-class ApiKey(Base, TimestampMixin):
+class ApiKey(Base, TimestampMixin, TenantMixin):
     """Clave de API para autenticación programática de clientes B2B (ERP/SACVeFor/VUCE)."""
     __tablename__ = "api_keys"
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    organization_id: Mapped[int] = mapped_column(ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False, index=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     
     name: Mapped[str] = mapped_column(String(100), nullable=False)
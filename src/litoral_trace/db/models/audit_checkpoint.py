@@ -0,0 +1,34 @@
+"""Modelo AuditCheckpoint - Raíces periódicas de la cadena de auditoría por tenant."""
+from __future__ import annotations
+from typing import TYPE_CHECKING
+from sqlalchemy import String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from litoral_trace.db.base import Base, TenantMixin, TimestampMixin
+
+if TYPE_CHECKING:
+    from litoral_trace.db.models.organization import Organization
+
+class AuditCheckpoint(Base, TimestampMixin, TenantMixin):
+    """Punto de control verificado de la cadena de AuditLog de un tenant.
+
+    Cubre el tramo (secuencia_desde, secuencia_hasta] y guarda el hash encadenado del último
+    registro del tramo, la raíz Merkle de sus hashes y una firma HMAC: la verificación retoma desde aquí sin
+    volver a recorrer la tabla completa.
+    """
+    __tablename__ = "audit_checkpoints"
+    __table_args__ = (
+        UniqueConstraint("organization_id", "secuencia_hasta", name="uq_audit_checkpoint_org_secuencia"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    secuencia_desde: Mapped[int] = mapped_column(nullable=False)  # Exclusiva: último registro del checkpoint anterior
+    secuencia_hasta: Mapped[int] = mapped_column(nullable=False)
+    hash_registro: Mapped[str] = mapped_column(String(64), nullable=False)
+    raiz_merkle: Mapped[str] = mapped_column(String(64), nullable=False)
+    firma: Mapped[str] = mapped_column(String(64), nullable=False)  # HMAC-SHA256 del tramo con la clave de manifiestos
+
+    # Relaciones
+    organization: Mapped[Organization] = relationship("Organization", back_populates="audit_checkpoints")
+
+    def __repr__(self) -> str:
+        return f"<AuditCheckpoint org={self.organization_id} secuencia_hasta={self.secuencia_hasta}>"
@@ -3,20 +3,30 @@ from __future__ import annotations
 from datetime import datetime
 from typing import TYPE_CHECKING
 import sqlalchemy as sa
-from sqlalchemy import String, Text, ForeignKey, DateTime, func
+from sqlalchemy import String, Text, ForeignKey, DateTime, UniqueConstraint, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from litoral_trace.db.base import Base, TimestampMixin
+from litoral_trace.db.base import Base, TenantMixin, TimestampMixin
 
 if TYPE_CHECKING:
     from litoral_trace.db.models.organization import Organization
     from litoral_trace.db.models.user import User
 
-class AuditLog(Base, TimestampMixin):
-    """Registro inmutable de auditoría para trazabilidad legal y aduanera EUDR."""
+class AuditLog(Base, TimestampMixin, TenantMixin):
+    """Registro inmutable de auditoría para trazabilidad legal y aduanera EUDR.
+
+    Los registros de cada tenant forman una cadena: `hash_registro` sella el contenido de la
+    fila junto con `hash_previo` (el hash de la fila anterior en `secuencia`), de modo que
+    modificar, borrar o intercalar una fila rompe todos los hashes siguientes.
+
+    En PostgreSQL la tabla está particionada por mes sobre `timestamp` (migración 005) y los meses
+    vencidos se archivan en Parquet (services/audit_archive.py).
+    """
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        UniqueConstraint("organization_id", "secuencia", name="uq_audit_logs_org_secuencia"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    organization_id: Mapped[int] = mapped_column(ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False, index=True)
     user_id: Mapped[int | None] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"), nullable=True, index=True)
     username: Mapped[str | None] = mapped_column(String(100), nullable=True)
     
@@ -31,6 +41,11 @@ class AuditLog(Base, TimestampMixin):
     
     timestamp: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
 
+    # Encadenamiento por tenant (NULL en registros previos a la migración 004)
+    secuencia: Mapped[int | None] = mapped_column(nullable=True)
+    hash_previo: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    hash_registro: Mapped[str | None] = mapped_column(String(64), nullable=True)
+
     # Relaciones
     organization: Mapped[Organization] = relationship("Organization", back_populates="audit_logs")
     user: Mapped[User | None] = relationship("User", back_populates="audit_logs")
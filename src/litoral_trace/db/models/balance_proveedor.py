@@ -0,0 +1,66 @@
+"""Modelo BalanceProveedorMensual - Libro mayor acumulado de balance de masas por proveedor."""
+from __future__ import annotations
+from datetime import date
+from typing import TYPE_CHECKING
+from sqlalchemy import Date, Float, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from litoral_trace.db.base import Base, TenantMixin, TimestampMixin
+
+if TYPE_CHECKING:
+    from litoral_trace.db.models.organization import Organization
+
+class BalanceProveedorMensual(Base, TimestampMixin, TenantMixin):
+    """Totales acumulados de materia prima ingresada y producto exportado por proveedor, producto y mes.
+
+    Cada fila cubre el intervalo [periodo, periodo siguiente) y guarda los acumulados desde el
+    primer movimiento, por lo que el saldo a una fecha es una única búsqueda por índice.
+    """
+    __tablename__ = "balances_proveedor_mensual"
+    __table_args__ = (
+        UniqueConstraint(
+            "organization_id", "productor_id", "producto_forestal", "periodo",
+            name="uq_balance_proveedor_periodo",
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    productor_id: Mapped[str] = mapped_column(String(100), nullable=False)
+    producto_forestal: Mapped[str] = mapped_column(String(100), nullable=False)
+    periodo: Mapped[date] = mapped_column(Date, nullable=False)  # Primer día del mes
+
+    coeficiente_rendimiento: Mapped[float] = mapped_column(Float, nullable=False)
+    ingresado_mes_ton: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    exportado_mes_ton: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    ingresado_acumulado_ton: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    exportado_acumulado_ton: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+
+    # Relaciones
+    organization: Mapped[Organization] = relationship("Organization", back_populates="balances_proveedor")
+
+    def __repr__(self) -> str:
+        return f"<BalanceProveedorMensual productor='{self.productor_id}' producto='{self.producto_forestal}' periodo={self.periodo}>"
+
+
+class IngresoProveedor(Base, TimestampMixin, TenantMixin):
+    """Ingreso de materia prima acreditado en el libro mayor, identificado por su guía o remito.
+
+    La unicidad del documento por organización impide acreditar dos veces el mismo ingreso:
+    las exportaciones se validan contra los ingresos ya asentados, no contra lo que declara el embarque.
+    """
+    __tablename__ = "ingresos_proveedor"
+    __table_args__ = (
+        UniqueConstraint("organization_id", "documento", name="uq_ingreso_proveedor_documento"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    documento: Mapped[str] = mapped_column(String(100), nullable=False)  # Guía forestal / remito de ingreso
+    productor_id: Mapped[str] = mapped_column(String(100), nullable=False)
+    producto_forestal: Mapped[str] = mapped_column(String(100), nullable=False)
+    periodo: Mapped[date] = mapped_column(Date, nullable=False)  # Mes del libro mayor donde se acreditó
+    volumen_ton: Mapped[float] = mapped_column(Float, nullable=False)
+
+    # Relaciones
+    organization: Mapped[Organization] = relationship("Organization", back_populates="ingresos_proveedor")
+
+    def __repr__(self) -> str:
+        return f"<IngresoProveedor documento='{self.documento}' productor='{self.productor_id}' volumen={self.volumen_ton}>"
@@ -0,0 +1,21 @@
+"""Modelo CoeficienteRendimiento - Tabla versionada de rendimientos industriales."""
+from __future__ import annotations
+from sqlalchemy import String, Text, Float, Integer, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+from litoral_trace.db.base import Base, TimestampMixin
+
+class CoeficienteRendimiento(Base, TimestampMixin):
+    """Coeficiente de rendimiento industrial por producto forestal, versionado e inmutable."""
+    __tablename__ = "coeficientes_rendimiento"
+    __table_args__ = (
+        UniqueConstraint("producto_forestal", "version", name="uq_coeficiente_producto_version"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    producto_forestal: Mapped[str] = mapped_column(String(100), nullable=False, index=True)
+    coeficiente: Mapped[float] = mapped_column(Float, nullable=False)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    motivo: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<CoeficienteRendimiento producto='{self.producto_forestal}' v{self.version} coef={self.coeficiente}>"
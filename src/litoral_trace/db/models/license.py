@@ -2,19 +2,18 @@
 from __future__ import annotations
 from datetime import datetime
 from typing import TYPE_CHECKING
-from sqlalchemy import String, Integer, Float, Boolean, DateTime, ForeignKey
+from sqlalchemy import String, Integer, Float, Boolean, DateTime
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from litoral_trace.db.base import Base, TimestampMixin
+from litoral_trace.db.base import Base, TenantMixin, TimestampMixin
 
 if TYPE_CHECKING:
     from litoral_trace.db.models.organization import Organization
 
-class License(Base, TimestampMixin):
+class License(Base, TimestampMixin, TenantMixin):
     """Licencia y límites de cuota por organización."""
     __tablename__ = "licenses"
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    organization_id: Mapped[int] = mapped_column(ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False, index=True)
     
     plan_type: Mapped[str] = mapped_column(String(50), nullable=False, default="pro")  # pro, enterprise, custom
     max_lotes: Mapped[int] = mapped_column(Integer, nullable=False, default=100)
@@ -1,32 +1,42 @@
 """Modelo Lote geoespacial de activos foresto-industriales."""
 from __future__ import annotations
 from typing import TYPE_CHECKING
-from sqlalchemy import Float, String, Text, ForeignKey
+from sqlalchemy import Float, Index, String, Text, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from litoral_trace.db.base import Base, TimestampMixin
+from litoral_trace.db.base import Base, TenantMixin, TimestampMixin
+from litoral_trace.db.types import poligono_wgs84
 
 if TYPE_CHECKING:
     from litoral_trace.db.models.organization import Organization
 
-class Lote(Base, TimestampMixin):
+class Lote(Base, TimestampMixin, TenantMixin):
     """Lote/Rodal geoespacial con soporte PostGIS/WKT y balance de masas EUDR."""
     __tablename__ = "lotes"
+    __table_args__ = (
+        UniqueConstraint("organization_id", "identificador", name="uq_lotes_organizacion_identificador"),
+        # Keyset del listado paginado: WHERE organization_id = :org AND id > :cursor ORDER BY id
+        Index("ix_lotes_organizacion_id", "organization_id", "id"),
+        # Índice R-tree para &&, ST_Intersects y vecino más cercano (<->); en SQLite no aplica
+        Index("ix_lotes_geom", "geom", postgresql_using="gist").ddl_if(dialect="postgresql"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    organization_id: Mapped[int] = mapped_column(ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False, index=True)
     
     identificador: Mapped[str] = mapped_column(String(100), nullable=False, index=True)
     productor_id: Mapped[str] = mapped_column(String(100), nullable=False, index=True)  # CUIT / Guía Forestal / SACVeFor
-    producto_forestal: Mapped[str] = mapped_column(String(100), nullable=False)
+    guia_ingreso: Mapped[str | None] = mapped_column(String(100), nullable=True)  # Documento del ingreso acreditado en el libro mayor
+    producto_forestal: Mapped[str] = mapped_column(String(100), nullable=False, index=True)
     hectareas: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
     
     # Geometría (Centroide WGS84 + Polígono WKT)
     latitud: Mapped[float] = mapped_column(Float, nullable=False)
     longitud: Mapped[float] = mapped_column(Float, nullable=False)
     polygon_wkt: Mapped[str | None] = mapped_column(Text, nullable=True)
+    geom: Mapped[str | None] = mapped_column(poligono_wgs84(), nullable=True)  # geometry(Polygon, 4326) derivado de polygon_wkt
     
     # Métricas de Compliance & Balance de Masas
     estatus: Mapped[str] = mapped_column(String(50), nullable=False, default="Pendiente", index=True)  # Verde, Rojo, Pendiente
+    regla_aplicada: Mapped[str | None] = mapped_column(String(64), nullable=True)  # Regla de compliance que definió el estatus
     volumen_ingresado_ton: Mapped[float | None] = mapped_column(Float, nullable=True, default=0.0)
     volumen_exportar_ton: Mapped[float | None] = mapped_column(Float, nullable=True, default=0.0)
 
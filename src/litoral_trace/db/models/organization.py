@@ -9,8 +9,10 @@ if TYPE_CHECKING:
     from litoral_trace.db.models.user import User
     from litoral_trace.db.models.lote import Lote
     from litoral_trace.db.models.audit_log import AuditLog
+    from litoral_trace.db.models.audit_checkpoint import AuditCheckpoint
     from litoral_trace.db.models.api_key import ApiKey
     from litoral_trace.db.models.license import License
+    from litoral_trace.db.models.balance_proveedor import BalanceProveedorMensual, IngresoProveedor
 
 class Organization(Base, TimestampMixin):
     """Organización / Empresa para aislamiento estricto multi-tenant."""
@@ -28,8 +30,11 @@ class Organization(Base, TimestampMixin):
     users: Mapped[list[User]] = relationship("User", back_populates="organization", cascade="all, delete-orphan")
     lotes: Mapped[list[Lote]] = relationship("Lote", back_populates="organization", cascade="all, delete-orphan")
     audit_logs: Mapped[list[AuditLog]] = relationship("AuditLog", back_populates="organization", cascade="all, delete-orphan")
+    audit_checkpoints: Mapped[list[AuditCheckpoint]] = relationship("AuditCheckpoint", back_populates="organization", cascade="all, delete-orphan")
     api_keys: Mapped[list[ApiKey]] = relationship("ApiKey", back_populates="organization", cascade="all, delete-orphan")
     licenses: Mapped[list[License]] = relationship("License", back_populates="organization", cascade="all, delete-orphan")
+    balances_proveedor: Mapped[list[BalanceProveedorMensual]] = relationship("BalanceProveedorMensual", back_populates="organization", cascade="all, delete-orphan")
+    ingresos_proveedor: Mapped[list[IngresoProveedor]] = relationship("IngresoProveedor", back_populates="organization", cascade="all, delete-orphan")
 
     def __repr__(self) -> str:
         return f"<Organization id={self.id} slug='{self.slug}' tier='{self.tier}'>"
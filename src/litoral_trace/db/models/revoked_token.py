@@ -0,0 +1,22 @@
+"""Modelo RevokedToken - Lista autoritativa de JWT revocados antes de su vencimiento."""
+from __future__ import annotations
+from datetime import datetime
+from sqlalchemy import DateTime, String
+from sqlalchemy.orm import Mapped, mapped_column
+from litoral_trace.db.base import Base, TimestampMixin
+
+class RevokedToken(Base, TimestampMixin):
+    """JWT revocado (logout, robo de sesión) identificado por su claim `jti`.
+
+    La fila solo es necesaria hasta `expires_at`: pasado el `exp` el token ya es rechazado
+    por la verificación de firma y la fila puede purgarse.
+    """
+    __tablename__ = "revoked_tokens"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    jti: Mapped[str] = mapped_column(String(64), nullable=False, unique=True, index=True)
+    username: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
+
+    def __repr__(self) -> str:
+        return f"<RevokedToken jti='{self.jti}' username='{self.username}'>"
@@ -2,21 +2,20 @@
 from __future__ import annotations
 from datetime import datetime
 from typing import TYPE_CHECKING
-from sqlalchemy import String, Boolean, DateTime, ForeignKey
+from sqlalchemy import String, Boolean, DateTime
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from litoral_trace.db.base import Base, TimestampMixin
+from litoral_trace.db.base import Base, TenantMixin, TimestampMixin
 
 if TYPE_CHECKING:
     from litoral_trace.db.models.organization import Organization
     from litoral_trace.db.models.audit_log import AuditLog
     from litoral_trace.db.models.api_key import ApiKey
 
-class User(Base, TimestampMixin):
+class User(Base, TimestampMixin, TenantMixin):
     """Usuario del sistema con asignación multi-tenant a una Organización."""
     __tablename__ = "users"
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    organization_id: Mapped[int] = mapped_column(ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False, index=True)
     
     email: Mapped[str] = mapped_column(String(255), nullable=False, unique=True, index=True)
     username: Mapped[str] = mapped_column(String(100), nullable=False, unique=True, index=True)
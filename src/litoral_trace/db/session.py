@@ -0,0 +1,137 @@
+"""Motor SQLAlchemy Sync (psycopg) con Pool Dimensionado por Worker."""
+from __future__ import annotations
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
+
+from litoral_trace.db.tenant import activar_aislamiento_tenant
+
+DB_URL_ENV = "DB_URL"
+DB_MAX_CONEXIONES_ENV = "LITORAL_DB_MAX_CONEXIONES"
+DB_WORKERS_ENV = "LITORAL_DB_WORKERS"
+DB_RESERVADAS_ENV = "LITORAL_DB_CONEXIONES_RESERVADAS"
+DB_POOL_SYNC_ENV = "LITORAL_DB_POOL_SYNC"
+DB_MAX_OVERFLOW_SYNC_ENV = "LITORAL_DB_MAX_OVERFLOW_SYNC"
+DB_POOL_TIMEOUT_ENV = "LITORAL_DB_POOL_TIMEOUT"
+DB_STATEMENT_TIMEOUT_MS_ENV = "LITORAL_DB_STATEMENT_TIMEOUT_MS"
+
+DEFAULT_DB_MAX_CONEXIONES: int = 100       # max_connections por defecto de PostgreSQL
+DEFAULT_DB_WORKERS: int = 4                # uvicorn --workers del Dockerfile
+DEFAULT_DB_RESERVADAS: int = 10            # superuser_reserved_connections, psql, backups y migraciones
+# Conexiones persistentes del motor sync: login (2 hilos), escritor de auditoría, índice y usos de
+# API Keys (2), revocaciones, planes/coeficientes y particiones de auditoría
+DEFAULT_DB_POOL_SYNC: int = 8
+DB_POOL_SYNC_MINIMO: int = 3               # login y escritor de auditoría, cuando el presupuesto es chico
+DEFAULT_DB_POOL_TIMEOUT: float = 10.0
+DEFAULT_DB_STATEMENT_TIMEOUT_MS: int = 30_000
+DB_POOL_RECYCLE_SEGUNDOS: int = 1800
+APPLICATION_NAME = "litoral_trace"
+
+# Toda sesión ORM del proceso queda restringida al tenant del contexto
+activar_aislamiento_tenant()
+
+@dataclass(frozen=True)
+class ConfiguracionPool:
+    pool_sync: int
+    max_overflow_sync: int = 0
+
+    @property
+    def conexiones_por_worker(self) -> int:
+        return self.pool_sync + self.max_overflow_sync
+
+def normalizar_url(raw_url: str) -> str:
+    """postgres://, postgresql:// (o una URL heredada con asyncpg) → driver psycopg; sqlite sin cambios."""
+    url = str(raw_url or "").strip()
+    for prefijo in ("postgres://", "postgresql://", "postgresql+asyncpg://"):
+        if url.startswith(prefijo):
+            return url.replace(prefijo, "postgresql+psycopg://", 1)
+    return url
+
+def dimensionar_pool(
+    max_conexiones: int = DEFAULT_DB_MAX_CONEXIONES,
+    workers: int = DEFAULT_DB_WORKERS,
+    reservadas: int = DEFAULT_DB_RESERVADAS,
+    pool_sync: int | None = None,
+    max_overflow_sync: int | None = None,
+) -> ConfiguracionPool:
+    """Reparte `max_conexiones - reservadas` entre los workers: workers × conexiones del motor nunca lo supera.
+
+    El motor sync atiende a los hilos de fondo (`pool_sync` persistentes) y a los handlers que
+    llegan por asyncio.to_thread (listados, persistencia de dictámenes y batch) con su overflow.
+    Sin valor explícito, el overflow toma todo lo que queda tras `pool_sync`.
+
+    Raises:
+        ValueError: Si el presupuesto no alcanza o los valores explícitos lo exceden.
+    """
+    por_worker = (max_conexiones - reservadas) // max(workers, 1)
+    if pool_sync is None:
+        pool_sync = max(min(DEFAULT_DB_POOL_SYNC, por_worker // 2), DB_POOL_SYNC_MINIMO)
+    if max_overflow_sync is None:
+        max_overflow_sync = por_worker - pool_sync
+    if pool_sync < 1 or max_overflow_sync < 0 or pool_sync + max_overflow_sync > por_worker:
+        raise ValueError(
+            f"pool_sync={pool_sync} + max_overflow_sync={max_overflow_sync} excede las {por_worker} conexiones "
+            f"disponibles por worker ({workers} workers, max_connections={max_conexiones}, {reservadas} reservadas)."
+        )
+    return ConfiguracionPool(pool_sync=pool_sync, max_overflow_sync=max_overflow_sync)
+
+def _entero_entorno(nombre: str, defecto: int | None = None) -> int | None:
+    valor = os.environ.get(nombre, "").strip()
+    return int(valor) if valor else defecto
+
+def configuracion_pool() -> ConfiguracionPool:
+    """Pool del worker según LITORAL_DB_* (WEB_CONCURRENCY también indica la cantidad de workers)."""
+    return dimensionar_pool(
+        max_conexiones=_entero_entorno(DB_MAX_CONEXIONES_ENV, DEFAULT_DB_MAX_CONEXIONES),
+        workers=_entero_entorno(DB_WORKERS_ENV, _entero_entorno("WEB_CONCURRENCY", DEFAULT_DB_WORKERS)),
+        reservadas=_entero_entorno(DB_RESERVADAS_ENV, DEFAULT_DB_RESERVADAS),
+        pool_sync=_entero_entorno(DB_POOL_SYNC_ENV),
+        max_overflow_sync=_entero_entorno(DB_MAX_OVERFLOW_SYNC_ENV),
+    )
+
+def base_datos_configurada() -> bool:
+    return bool(os.environ.get(DB_URL_ENV, "").strip())
+
+def _url_configurada() -> str:
+    if not base_datos_configurada():
+        raise RuntimeError(f"Base de datos no configurada: defina la variable de entorno {DB_URL_ENV}.")
+    return normalizar_url(os.environ[DB_URL_ENV])
+
+def _statement_timeout_ms() -> int:
+    return _entero_entorno(DB_STATEMENT_TIMEOUT_MS_ENV, DEFAULT_DB_STATEMENT_TIMEOUT_MS)
+
+def opciones_motor(url: str, pool_size: int, max_overflow: int) -> dict[str, Any]:
+    """Argumentos de create_engine para el backend de `url`."""
+    backend = make_url(url)
+    opciones: dict[str, Any] = {"pool_pre_ping": True}
+    if backend.get_backend_name() != "postgresql":
+        return opciones  # sqlite (desarrollo/tests): pool por defecto del dialecto
+    timeout_ms = _statement_timeout_ms()
+    opciones.update(
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=float(os.environ.get(DB_POOL_TIMEOUT_ENV) or DEFAULT_DB_POOL_TIMEOUT),
+        pool_recycle=DB_POOL_RECYCLE_SEGUNDOS,
+    )
+    opciones["connect_args"] = {
+        "options": f"-c statement_timeout={timeout_ms}",
+        "application_name": APPLICATION_NAME,
+    }
+    return opciones
+
+@lru_cache(maxsize=1)
+def motor_sync() -> Engine:
+    """Motor del worker: hilos de fondo (registros en memoria, auditoría, login) y handlers vía asyncio.to_thread."""
+    url = _url_configurada()
+    pool = configuracion_pool()
+    return create_engine(url, **opciones_motor(url, pool.pool_sync, pool.max_overflow_sync))
+
+def cerrar_motores() -> None:
+    """Cierra las conexiones del pool creado (apagado del worker)."""
+    if motor_sync.cache_info().currsize:
+        motor_sync().dispose()
+    motor_sync.cache_clear()
@@ -1,23 +1,42 @@
-"""Aislamiento multi-tenant y middleware de contexto de organización."""
+"""Aislamiento multi-tenant: contexto de organización en un ContextVar y filtro global del ORM."""
 from __future__ import annotations
-from typing import Any
-import streamlit as st
-from sqlalchemy import Select
-from sqlalchemy.orm import Session
-from litoral_trace.db.models import Organization, User, Lote, AuditLog, ApiKey, License
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Any, Iterator
+from sqlalchemy import Select, event
+from sqlalchemy.orm import ORMExecuteState, Session, with_loader_criteria
+from litoral_trace.db.base import TenantMixin
 
-def get_current_organization_id() -> int | None:
-    """Obtiene el ID de organización del usuario autenticado en la sesión actual."""
+# Opción de ejecución para consultas deliberadamente transversales (SuperAdmin, tareas de mantenimiento)
+OPCION_TODOS_LOS_TENANTS = "todos_los_tenants"
+
+_organizacion_actual: ContextVar[int | None] = ContextVar("litoral_organization_id", default=None)
+
+def establecer_organizacion(organization_id: int | None) -> Token[int | None]:
+    """Fija el tenant del contexto actual (request FastAPI, rerun de Streamlit o tarea)."""
+    return _organizacion_actual.set(organization_id)
+
+def restablecer_organizacion(token: Token[int | None]) -> None:
+    _organizacion_actual.reset(token)
+
+@contextmanager
+def contexto_tenant(organization_id: int | None) -> Iterator[None]:
+    """Ejecuta un bloque con el tenant indicado y restaura el anterior al salir."""
+    token = establecer_organizacion(organization_id)
     try:
-        return st.session_state.get("organization_id")
-    except Exception:
-        return None
+        yield
+    finally:
+        restablecer_organizacion(token)
+
+def get_current_organization_id() -> int | None:
+    """Obtiene el ID de organización del contexto actual."""
+    return _organizacion_actual.get()
 
 def require_tenant_context() -> int:
     """Garantiza la existencia de un contexto de organización activo.
-    
+
     Raises:
-        ValueError: Si la sesión no contiene un organization_id válido.
+        ValueError: Si el contexto no contiene un organization_id válido.
     """
     org_id = get_current_organization_id()
     if org_id is None:
@@ -26,16 +45,16 @@ def require_tenant_context() -> int:
 
 def apply_tenant_filter(
     query: Select[Any],
-    model: type[Lote | User | AuditLog | ApiKey | License],
+    model: type[TenantMixin],
     organization_id: int | None = None,
 ) -> Select[Any]:
     """Aplica de forma estricta la cláusula WHERE organization_id = :org_id a la consulta SQL.
-    
+
     Args:
         query: Consulta SELECT base.
         model: Clase del modelo filtrable.
-        organization_id: ID explícito o lectura de la sesión si es None.
-    
+        organization_id: ID explícito o el del contexto actual si es None.
+
     Returns:
         Consulta con el aislamiento multi-tenant garantizado.
     """
@@ -44,7 +63,7 @@ def apply_tenant_filter(
     return query.where(model.organization_id == organization_id)
 
 def verify_tenant_access(
-    entity: Lote | User | AuditLog | ApiKey | License,
+    entity: TenantMixin | None,
     organization_id: int | None = None,
 ) -> bool:
     """Verifica si una entidad específica pertenece a la organización autorizada."""
@@ -53,3 +72,27 @@ def verify_tenant_access(
     if organization_id is None or entity is None:
         return False
     return getattr(entity, "organization_id", None) == organization_id
+
+def _filtrar_por_tenant(estado: ORMExecuteState) -> None:
+    """Agrega organization_id = :tenant a toda consulta ORM sobre modelos TenantMixin.
+
+    Se omiten las cargas de columnas y relaciones: heredan el criterio de la consulta que
+    las originó. Sin tenant en el contexto (hilos de sistema, scripts) no se filtra.
+    """
+    if not (estado.is_select or estado.is_update or estado.is_delete):
+        return
+    if estado.is_column_load or estado.is_relationship_load:
+        return
+    organization_id = _organizacion_actual.get()
+    if organization_id is None or estado.execution_options.get(OPCION_TODOS_LOS_TENANTS, False):
+        return
+    estado.statement = estado.statement.options(with_loader_criteria(
+        TenantMixin,
+        lambda cls: cls.organization_id == organization_id,
+        include_aliases=True,
+    ))
+
+def activar_aislamiento_tenant() -> None:
+    """Registra el filtro global en todas las Session (y AsyncSession); es idempotente."""
+    if not event.contains(Session, "do_orm_execute", _filtrar_por_tenant):
+        event.listen(Session, "do_orm_execute", _filtrar_por_tenant)
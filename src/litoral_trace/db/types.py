@@ -0,0 +1,28 @@
+"""Tipos de columna propios: geometrías PostGIS con variante de texto para SQLite."""
+from __future__ import annotations
+from typing import Any
+from sqlalchemy import Text, func
+from sqlalchemy.types import TypeEngine, UserDefinedType
+
+SRID_WGS84 = 4326
+
+class Geometria(UserDefinedType[str]):
+    """geometry(<tipo>, <srid>) de PostGIS; del lado de Python el valor viaja como WKT."""
+    cache_ok = True
+
+    def __init__(self, tipo: str = "POLYGON", srid: int = SRID_WGS84) -> None:
+        self.tipo = tipo.upper()
+        self.srid = srid
+
+    def get_col_spec(self, **kw: Any) -> str:
+        return f"geometry({self.tipo}, {self.srid})"
+
+    def bind_expression(self, bindvalue: Any) -> Any:
+        return func.ST_GeomFromText(bindvalue, self.srid, type_=self)
+
+    def column_expression(self, col: Any) -> Any:
+        return func.ST_AsText(col, type_=self)
+
+def poligono_wgs84() -> TypeEngine[str]:
+    """Polígono WGS84: geometry en PostgreSQL, WKT plano en SQLite (desarrollo y tests)."""
+    return Geometria("POLYGON", SRID_WGS84).with_variant(Text(), "sqlite")
@@ -3,6 +3,7 @@ from litoral_trace.services.mass_balance import evaluar_balance_masas, MassBalan
 from litoral_trace.services.ndvi import calcular_ndvi_simulado, evaluar_deforestacion_eudr
 from litoral_trace.services.compliance import evaluar_compliance_lote, generar_dds_json_traces_nt
 from litoral_trace.services.reports import generar_pdf_reporte_bytes
+from litoral_trace.services.rules_engine import evaluar_reglas_df, obtener_reglas
 
 __all__ = [
     "evaluar_balance_masas",
@@ -12,4 +13,6 @@ __all__ = [
     "evaluar_compliance_lote",
     "generar_dds_json_traces_nt",
     "generar_pdf_reporte_bytes",
+    "evaluar_reglas_df",
+    "obtener_reglas",
 ]
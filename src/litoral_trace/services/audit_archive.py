@@ -0,0 +1,336 @@
+"""Particiones Mensuales del AuditLog y Archivo Frío en Parquet con Lectura Transparente."""
+from __future__ import annotations
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any, Iterator
+
+import pandas as pd
+from sqlalchemy import delete, distinct, func, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from litoral_trace.db.models import AuditLog
+from litoral_trace.services.audit_chain import crear_checkpoint
+
+AUDIT_ARCHIVO_DIR_ENV = "LITORAL_AUDIT_ARCHIVO_DIR"
+AUDIT_RETENCION_MESES_ENV = "LITORAL_AUDIT_RETENCION_MESES"
+AUDIT_PARTICIONES_REFRESCO_ENV = "LITORAL_AUDIT_PARTICIONES_REFRESCO_S"
+DEFAULT_AUDIT_ARCHIVO_DIR = "archivo_auditoria"
+DEFAULT_AUDIT_RETENCION_MESES: int = 24
+MESES_PARTICIONES_ADELANTE: int = 3
+DEFAULT_AUDIT_PARTICIONES_REFRESCO: float = 6 * 3600.0
+LOTE_EXPORTACION: int = 50_000
+COMPRESION_PARQUET = "zstd"
+
+# Columnas de audit_logs en el orden de la tabla; before/after_data se archivan como texto JSON
+COLUMNAS_ARCHIVO: tuple[str, ...] = (
+    "id", "organization_id", "user_id", "username", "action", "entity_type", "entity_id",
+    "before_data", "after_data", "detail", "ip_address", "timestamp",
+    "secuencia", "hash_previo", "hash_registro", "created_at", "updated_at",
+)
+_COLUMNAS_JSON = ("before_data", "after_data")
+_COLUMNAS_FECHA = ("timestamp", "created_at", "updated_at")
+_PATRON_PARTICION = re.compile(r"^audit_logs_p(\d{4})_(\d{2})$")
+
+@dataclass(frozen=True)
+class ArchivoMensual:
+    mes: date
+    ruta: Path
+    registros: int
+
+def _primer_dia(valor: date | datetime) -> date:
+    return date(valor.year, valor.month, 1)
+
+def _sumar_meses(mes: date, meses: int) -> date:
+    indice = mes.year * 12 + mes.month - 1 + meses
+    return date(indice // 12, indice % 12 + 1, 1)
+
+def _limites_utc(mes: date) -> tuple[datetime, datetime]:
+    inicio = datetime(mes.year, mes.month, 1, tzinfo=timezone.utc)
+    fin = _sumar_meses(mes, 1)
+    return inicio, datetime(fin.year, fin.month, 1, tzinfo=timezone.utc)
+
+def _utc(valor: datetime) -> datetime:
+    # SQLite devuelve fechas sin zona: se interpretan en UTC, igual que al sellar la cadena
+    return valor.replace(tzinfo=timezone.utc) if valor.tzinfo is None else valor.astimezone(timezone.utc)
+
+def nombre_particion(mes: date) -> str:
+    return f"audit_logs_p{mes.year:04d}_{mes.month:02d}"
+
+def directorio_archivo(directorio: str | os.PathLike | None = None) -> Path:
+    return Path(directorio or os.environ.get(AUDIT_ARCHIVO_DIR_ENV) or DEFAULT_AUDIT_ARCHIVO_DIR)
+
+def ruta_archivo(mes: date, directorio: str | os.PathLike | None = None) -> Path:
+    return directorio_archivo(directorio) / f"{nombre_particion(mes)}.parquet"
+
+def meses_retencion() -> int:
+    valor = os.environ.get(AUDIT_RETENCION_MESES_ENV)
+    return max(int(valor), 1) if valor else DEFAULT_AUDIT_RETENCION_MESES
+
+@contextmanager
+def _conexion(bind: Engine | Connection) -> Iterator[Connection]:
+    """Usa la conexión recibida o abre una transacción propia sobre el Engine."""
+    if isinstance(bind, Connection):
+        yield bind
+        return
+    with bind.begin() as conn:
+        yield conn
+
+def _es_particionada(conn: Connection) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    return bool(conn.execute(text(
+        "SELECT c.relkind = 'p' FROM pg_class c WHERE c.oid = to_regclass('audit_logs')"
+    )).scalar())
+
+def crear_particiones(bind: Engine | Connection, hoy: date | None = None, meses_adelante: int = MESES_PARTICIONES_ADELANTE) -> list[str]:
+    """Crea las particiones del mes en curso y de los siguientes (idempotente; no-op sin particionado)."""
+    mes = _primer_dia(hoy or datetime.now(timezone.utc).date())
+    with _conexion(bind) as conn:
+        if not _es_particionada(conn):
+            return []
+        return [
+            conn.execute(text("SELECT crear_particion_audit_logs(:mes)"), {"mes": _sumar_meses(mes, i)}).scalar_one()
+            for i in range(meses_adelante + 1)
+        ]
+
+class ParticionesAuditoria:
+    """Mantiene creadas las particiones del mes en curso y de los siguientes desde la aplicación.
+
+    Corre al iniciar y cada `refresco` segundos, sin depender de que se ejecute el script de
+    mantenimiento; el archivo de meses vencidos sigue a cargo de ese script.
+    """
+
+    def __init__(self, bind: Engine, refresco: float | None = None, meses_adelante: int = MESES_PARTICIONES_ADELANTE):
+        self._bind = bind
+        self.refresco = refresco if refresco is not None else float(os.environ.get(AUDIT_PARTICIONES_REFRESCO_ENV) or DEFAULT_AUDIT_PARTICIONES_REFRESCO)
+        self.meses_adelante = meses_adelante
+        self.particiones: list[str] = []
+        self._cerrado = threading.Event()
+        self._hilo = threading.Thread(target=self._bucle, name="particiones-auditoria", daemon=True)
+        self._hilo.start()
+
+    def recargar(self) -> None:
+        self.particiones = crear_particiones(self._bind, meses_adelante=self.meses_adelante)
+
+    def _bucle(self) -> None:
+        # La primera pasada también corre en el hilo: el arranque no espera al DDL
+        while True:
+            try:
+                self.recargar()
+            except Exception:
+                pass  # Mientras tanto los eventos caen en la partición DEFAULT
+            if self._cerrado.wait(self.refresco):
+                return
+
+    def cerrar(self) -> None:
+        self._cerrado.set()
+        self._hilo.join()
+
+_particiones: ParticionesAuditoria | None = None
+_particiones_lock = threading.Lock()
+
+def iniciar_particiones_auditoria(bind: Engine, **opciones: Any) -> ParticionesAuditoria:
+    """Inicia el mantenimiento de particiones del proceso (reemplaza y cierra uno anterior, si existía)."""
+    global _particiones
+    with _particiones_lock:
+        previo, _particiones = _particiones, ParticionesAuditoria(bind, **opciones)
+    if previo is not None:
+        previo.cerrar()
+    return _particiones
+
+def cerrar_particiones_auditoria() -> None:
+    global _particiones
+    with _particiones_lock:
+        particiones, _particiones = _particiones, None
+    if particiones is not None:
+        particiones.cerrar()
+
+def meses_archivables(bind: Engine | Connection, retencion: int | None = None, hoy: date | None = None) -> list[date]:
+    """Meses completos más antiguos que la retención que todavía están en la base."""
+    corte = _sumar_meses(_primer_dia(hoy or datetime.now(timezone.utc).date()), -(retencion or meses_retencion()))
+    with _conexion(bind) as conn:
+        if _es_particionada(conn):
+            nombres = conn.execute(text(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = 'audit_logs'::regclass"
+            )).scalars()
+            meses = {date(int(m.group(1)), int(m.group(2)), 1) for m in map(_PATRON_PARTICION.match, nombres) if m}
+        else:
+            mas_antiguo = conn.execute(select(func.min(AuditLog.timestamp))).scalar()
+            meses = set()
+            if mas_antiguo is not None:
+                mes = _primer_dia(_utc(mas_antiguo))
+                while mes < corte:
+                    meses.add(mes)
+                    mes = _sumar_meses(mes, 1)
+    return sorted(m for m in meses if m < corte)
+
+def _esquema_parquet():
+    import pyarrow as pa
+
+    fecha = pa.timestamp("us", tz="UTC")
+    tipos = {
+        "id": pa.int64(), "organization_id": pa.int64(), "user_id": pa.int64(), "entity_id": pa.int64(),
+        "secuencia": pa.int64(), "timestamp": fecha, "created_at": fecha, "updated_at": fecha,
+    }
+    return pa.schema([(columna, tipos.get(columna, pa.string())) for columna in COLUMNAS_ARCHIVO])
+
+def _filas_del_mes(conn: Connection, mes: date) -> Iterator[list[tuple]]:
+    # Con particionado, el rango del mes poda la consulta a una única partición
+    inicio, fin = _limites_utc(mes)
+    consulta = (
+        select(*(getattr(AuditLog, c) for c in COLUMNAS_ARCHIVO))
+        .where(AuditLog.timestamp >= inicio, AuditLog.timestamp < fin)
+        .order_by(AuditLog.id)
+    )
+    yield from conn.execution_options(yield_per=LOTE_EXPORTACION).execute(consulta).partitions()
+
+def _lote_arrow(filas: list[tuple], esquema):
+    import pyarrow as pa
+
+    columnas = {c: [] for c in COLUMNAS_ARCHIVO}
+    for fila in filas:
+        for columna, valor in zip(COLUMNAS_ARCHIVO, fila):
+            if columna in _COLUMNAS_JSON and valor is not None:
+                valor = json.dumps(valor, sort_keys=True, ensure_ascii=False)
+            elif columna in _COLUMNAS_FECHA and valor is not None:
+                valor = _utc(valor)
+            columnas[columna].append(valor)
+    return pa.Table.from_pydict(columnas, schema=esquema)
+
+def _sellar_tenants(conn: Connection, mes: date) -> None:
+    """Verifica y cierra con un checkpoint la cadena de cada tenant con registros en el mes.
+
+    Un tramo adulterado no llega al archivo frío, y la cadena sigue teniendo cabeza y ancla de
+    verificación aunque todos sus registros queden fuera de la base.
+    """
+    inicio, fin = _limites_utc(mes)
+    organizaciones = conn.execute(
+        select(distinct(AuditLog.organization_id)).where(AuditLog.timestamp >= inicio, AuditLog.timestamp < fin)
+    ).scalars().all()
+    with Session(bind=conn) as session:
+        for organization_id in organizaciones:
+            crear_checkpoint(session, organization_id)
+
+def archivar_mes(bind: Engine | Connection, mes: date, directorio: str | os.PathLike | None = None) -> ArchivoMensual:
+    """Exporta el mes a Parquet comprimido y lo retira de la base (DETACH + DROP si está particionada).
+
+    El archivo se escribe con nombre temporal y se publica con un rename atómico; la base solo se
+    modifica después de releer del Parquet la misma cantidad de filas que se exportaron.
+    """
+    import pyarrow.parquet as pq
+
+    mes = _primer_dia(mes)
+    destino = ruta_archivo(mes, directorio)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    temporal = destino.with_suffix(".parquet.tmp")
+    esquema = _esquema_parquet()
+    inicio, fin = _limites_utc(mes)
+    with _conexion(bind) as conn:
+        particionada = _es_particionada(conn)
+        _sellar_tenants(conn, mes)
+        exportados = 0
+        with pq.ParquetWriter(temporal, esquema, compression=COMPRESION_PARQUET) as escritor:
+            for filas in _filas_del_mes(conn, mes):
+                escritor.write_table(_lote_arrow(filas, esquema))
+                exportados += len(filas)
+        if pq.ParquetFile(temporal).metadata.num_rows != exportados:
+            temporal.unlink()
+            raise RuntimeError(f"El archivo de {nombre_particion(mes)} no contiene las {exportados} filas exportadas.")
+        if exportados:
+            os.replace(temporal, destino)
+        else:
+            temporal.unlink()
+        if particionada:
+            conn.execute(text(f'ALTER TABLE audit_logs DETACH PARTITION "{nombre_particion(mes)}"'))
+            conn.execute(text(f'DROP TABLE "{nombre_particion(mes)}"'))
+        else:
+            conn.execute(delete(AuditLog).where(AuditLog.timestamp >= inicio, AuditLog.timestamp < fin))
+    return ArchivoMensual(mes, destino, exportados)
+
+def archivar_antiguos(
+    bind: Engine | Connection,
+    directorio: str | os.PathLike | None = None,
+    retencion: int | None = None,
+    hoy: date | None = None,
+) -> list[ArchivoMensual]:
+    """Archiva, de a un mes por transacción, todo lo que excede la retención configurada."""
+    return [archivar_mes(bind, mes, directorio) for mes in meses_archivables(bind, retencion, hoy)]
+
+def _desde_archivo(
+    mes: date,
+    organization_id: int,
+    desde: datetime | None,
+    hasta: datetime | None,
+    filtros: dict[str, Any],
+    directorio: str | os.PathLike | None,
+) -> pd.DataFrame | None:
+    import pyarrow.parquet as pq
+
+    ruta = ruta_archivo(mes, directorio)
+    if not ruta.exists():
+        return None
+    condiciones = [("organization_id", "=", organization_id)] + [(c, "=", v) for c, v in filtros.items()]
+    if desde is not None:
+        condiciones.append(("timestamp", ">=", pd.Timestamp(_utc(desde))))
+    if hasta is not None:
+        condiciones.append(("timestamp", "<", pd.Timestamp(_utc(hasta))))
+    df = pq.read_table(ruta, filters=condiciones).to_pandas()
+    for columna in _COLUMNAS_JSON:
+        df[columna] = [json.loads(v) if isinstance(v, str) else None for v in df[columna]]
+    return df
+
+def consultar_auditoria(
+    bind: Engine | Connection,
+    organization_id: int,
+    desde: datetime | None = None,
+    hasta: datetime | None = None,
+    directorio: str | os.PathLike | None = None,
+    **filtros: Any,
+) -> pd.DataFrame:
+    """Registros de auditoría del tenant en [desde, hasta), leyendo base y archivo frío como una sola tabla.
+
+    `filtros` admite igualdades sobre action, entity_type, entity_id o user_id. Solo se abren los
+    Parquet de los meses del rango que efectivamente fueron archivados.
+    """
+    desconocidos = set(filtros) - {"action", "entity_type", "entity_id", "user_id"}
+    if desconocidos:
+        raise ValueError(f"Filtros de auditoría no soportados: {sorted(desconocidos)}")
+
+    columnas = [getattr(AuditLog, c) for c in COLUMNAS_ARCHIVO]
+    consulta = select(*columnas).where(AuditLog.organization_id == organization_id)
+    consulta = consulta.where(*(getattr(AuditLog, c) == v for c, v in filtros.items()))
+    if desde is not None:
+        consulta = consulta.where(AuditLog.timestamp >= desde)
+    if hasta is not None:
+        consulta = consulta.where(AuditLog.timestamp < hasta)
+    with _conexion(bind) as conn:
+        partes = [pd.DataFrame(conn.execute(consulta).all(), columns=list(COLUMNAS_ARCHIVO))]
+
+    carpeta = directorio_archivo(directorio)
+    meses = sorted(
+        date(int(m.group(1)), int(m.group(2)), 1)
+        for m in (_PATRON_PARTICION.match(r.stem) for r in carpeta.glob("audit_logs_p*.parquet")) if m
+    ) if carpeta.is_dir() else []
+    for mes in meses:
+        inicio, fin = _limites_utc(mes)
+        if (desde is None or _utc(desde) < fin) and (hasta is None or _utc(hasta) > inicio):
+            archivado = _desde_archivo(mes, organization_id, desde, hasta, filtros, directorio)
+            if archivado is not None and not archivado.empty:
+                partes.append(archivado)
+
+    partes = [p for p in partes if not p.empty]
+    if not partes:
+        return pd.DataFrame(columns=list(COLUMNAS_ARCHIVO))
+    df = pd.concat(partes, ignore_index=True)
+    for columna in _COLUMNAS_FECHA:
+        df[columna] = pd.to_datetime(df[columna], utc=True)
+    # Un mes exportado y aún no retirado (corte entre el rename y el DROP) no aparece dos veces
+    return df.drop_duplicates("id").sort_values(["timestamp", "id"], ignore_index=True)
@@ -0,0 +1,268 @@
+"""Cadena de Hashes por Tenant del AuditLog y Verificación Incremental por Checkpoints."""
+from __future__ import annotations
+import hashlib
+import hmac
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Iterable, Mapping
+
+import numpy as np
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from litoral_trace.db.models import AuditCheckpoint, AuditLog
+from litoral_trace.services.merkle import ArbolMerkle, clave_manifiesto, hash_hoja
+
+AUDIT_CHECKPOINT_CADA_ENV = "LITORAL_AUDIT_CHECKPOINT_CADA"
+DEFAULT_AUDIT_CHECKPOINT_CADA: int = 1000
+HASH_GENESIS = "0" * 64
+# Primer argumento de pg_advisory_xact_lock(int, int) reservado a la cadena de auditoría
+CANDADO_CADENA_AUDITORIA: int = 7301
+LOTE_LECTURA: int = 2000
+
+# Columnas selladas por hash_registro (el id autoincremental queda fuera: lo asigna la base)
+CAMPOS_SELLADOS: tuple[str, ...] = (
+    "organization_id", "secuencia", "user_id", "username", "action", "entity_type", "entity_id",
+    "before_data", "after_data", "detail", "ip_address", "timestamp",
+)
+
+@dataclass(frozen=True)
+class ResultadoVerificacion:
+    es_valida: bool
+    registros_verificados: int
+    secuencia_ancla: int          # último registro dado por válido antes del tramo (0 = génesis)
+    secuencia_final: int
+    secuencia_rota: int | None = None
+    mensaje: str = ""
+
+def _valor_json(valor: Any) -> Any:
+    if isinstance(valor, np.generic):
+        return valor.item()
+    raise TypeError(f"Valor no serializable en AuditLog: {valor!r}")
+
+def normalizar_datos(datos: Mapping[str, Any] | None) -> dict[str, Any] | None:
+    """Lleva before/after_data a tipos JSON nativos: lo que se sella es lo que se relee de la base."""
+    if datos is None:
+        return None
+    return json.loads(json.dumps(datos, default=_valor_json))
+
+def _timestamp_canonico(valor: datetime) -> str:
+    # SQLite devuelve fechas sin zona; PostgreSQL, con zona: ambas se comparan en UTC
+    if valor.tzinfo is not None:
+        valor = valor.astimezone(timezone.utc).replace(tzinfo=None)
+    return valor.isoformat(timespec="microseconds")
+
+def hash_registro_auditoria(fila: Mapping[str, Any], hash_previo: str) -> str:
+    """SHA-256 del hash previo más la serialización canónica de las columnas selladas."""
+    canonico = {campo: fila.get(campo) for campo in CAMPOS_SELLADOS}
+    canonico["timestamp"] = _timestamp_canonico(fila["timestamp"])
+    serializado = json.dumps(canonico, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(hash_previo.encode("ascii") + serializado.encode("utf-8")).hexdigest()
+
+def bloquear_cadenas(session: Session, organization_ids: Iterable[int]) -> None:
+    """Serializa a los escritores de cada tenant hasta el fin de la transacción.
+
+    Un candado consultivo cubre también al tenant sin registros y hace que el segundo escritor
+    lea la cabeza recién después del commit del primero (un FOR UPDATE sobre la cabeza no lo
+    garantiza en READ COMMITTED). Se toman en orden de id para no producir deadlocks.
+    """
+    if session.get_bind().dialect.name != "postgresql":
+        return  # SQLite ya serializa las transacciones de escritura
+    for organization_id in sorted(set(organization_ids)):
+        session.execute(select(func.pg_advisory_xact_lock(CANDADO_CADENA_AUDITORIA, organization_id)))
+
+def _cabeza_cadena(session: Session, organization_id: int) -> tuple[int, str]:
+    """Última secuencia y hash del tenant; el llamador ya tomó el candado de bloquear_cadenas().
+
+    Si los registros del tenant ya se archivaron, la cadena continúa desde su último checkpoint.
+    """
+    fila = session.execute(
+        select(AuditLog.secuencia, AuditLog.hash_registro)
+        .where(AuditLog.organization_id == organization_id, AuditLog.secuencia.is_not(None))
+        .order_by(AuditLog.secuencia.desc())
+        .limit(1)
+    ).first()
+    if fila is not None:
+        return fila.secuencia, fila.hash_registro
+    checkpoint = ultimo_checkpoint(session, organization_id)
+    return (checkpoint.secuencia_hasta, checkpoint.hash_registro) if checkpoint else (0, HASH_GENESIS)
+
+def encadenar_eventos(session: Session, eventos: Iterable[Mapping[str, Any]]) -> list[dict[str, Any]]:
+    """Asigna secuencia, timestamp y hashes encadenados a eventos de uno o más tenants (no inserta)."""
+    ahora = datetime.now(timezone.utc)
+    eventos = list(eventos)
+    bloquear_cadenas(session, (int(evento["organization_id"]) for evento in eventos))
+    cabezas: dict[int, tuple[int, str]] = {}
+    filas = []
+    for evento in eventos:
+        fila = {campo: evento.get(campo) for campo in CAMPOS_SELLADOS if campo != "secuencia"}
+        organization_id = fila["organization_id"] = int(fila["organization_id"])
+        if organization_id not in cabezas:
+            cabezas[organization_id] = _cabeza_cadena(session, organization_id)
+        secuencia, hash_previo = cabezas[organization_id]
+        fila["secuencia"] = secuencia + 1
+        fila["timestamp"] = fila["timestamp"] or ahora
+        fila["before_data"] = normalizar_datos(fila["before_data"])
+        fila["after_data"] = normalizar_datos(fila["after_data"])
+        fila["hash_previo"] = hash_previo
+        fila["hash_registro"] = hash_registro_auditoria(fila, hash_previo)
+        cabezas[organization_id] = (fila["secuencia"], fila["hash_registro"])
+        filas.append(fila)
+    return filas
+
+def registrar_eventos(session: Session, eventos: Iterable[Mapping[str, Any]]) -> list[dict[str, Any]]:
+    """Inserta eventos encadenados en un único INSERT multi-fila. La transacción queda a cargo del llamador.
+
+    Cada LITORAL_AUDIT_CHECKPOINT_CADA registros (1000 por defecto) se deja un checkpoint del tenant.
+    """
+    filas = encadenar_eventos(session, eventos)
+    if not filas:
+        return filas
+    session.execute(insert(AuditLog), filas)
+    cada = int(os.environ.get(AUDIT_CHECKPOINT_CADA_ENV) or DEFAULT_AUDIT_CHECKPOINT_CADA)
+    for organization_id in dict.fromkeys(f["organization_id"] for f in filas):
+        checkpoint = ultimo_checkpoint(session, organization_id)
+        cabeza = max(f["secuencia"] for f in filas if f["organization_id"] == organization_id)
+        if cada > 0 and cabeza - (checkpoint.secuencia_hasta if checkpoint else 0) >= cada:
+            crear_checkpoint(session, organization_id)
+    return filas
+
+def registrar_evento(session: Session, **campos: Any) -> dict[str, Any]:
+    return registrar_eventos(session, [campos])[0]
+
+def _firma_checkpoint(organization_id: int, desde: int, hasta: int, hash_registro: str, raiz_merkle: str) -> str:
+    mensaje = f"audit-checkpoint|{organization_id}|{desde}|{hasta}|{hash_registro}|{raiz_merkle}".encode("utf-8")
+    return hmac.new(clave_manifiesto(), mensaje, hashlib.sha256).hexdigest()
+
+def _raiz_tramo(hashes: list[str]) -> str:
+    return ArbolMerkle.desde_hojas([hash_hoja(bytes.fromhex(h)) for h in hashes]).raiz().hex()
+
+def ultimo_checkpoint(session: Session, organization_id: int, antes_de: int | None = None) -> AuditCheckpoint | None:
+    """Checkpoint más reciente del tenant (o el último que termina antes de la secuencia `antes_de`)."""
+    consulta = select(AuditCheckpoint).where(AuditCheckpoint.organization_id == organization_id)
+    if antes_de is not None:
+        consulta = consulta.where(AuditCheckpoint.secuencia_hasta < antes_de)
+    return session.execute(consulta.order_by(AuditCheckpoint.secuencia_hasta.desc()).limit(1)).scalar_one_or_none()
+
+def crear_checkpoint(session: Session, organization_id: int) -> AuditCheckpoint | None:
+    """Verifica el tramo desde el último checkpoint y, si está íntegro, lo cierra con un nuevo checkpoint."""
+    bloquear_cadenas(session, [organization_id])
+    previo = ultimo_checkpoint(session, organization_id)
+    desde = previo.secuencia_hasta if previo else 0
+    resultado, hashes = _verificar_tramo(session, organization_id, desde, previo.hash_registro if previo else HASH_GENESIS)
+    if not resultado.es_valida:
+        raise ValueError(f"No se crea el checkpoint: {resultado.mensaje}")
+    if not hashes:
+        return None
+    raiz = _raiz_tramo(hashes)
+    checkpoint = AuditCheckpoint(
+        organization_id=organization_id,
+        secuencia_desde=desde,
+        secuencia_hasta=resultado.secuencia_final,
+        hash_registro=hashes[-1],
+        raiz_merkle=raiz,
+        firma=_firma_checkpoint(organization_id, desde, resultado.secuencia_final, hashes[-1], raiz),
+    )
+    session.add(checkpoint)
+    session.flush()
+    return checkpoint
+
+def _verificar_tramo(
+    session: Session,
+    organization_id: int,
+    ancla: int,
+    hash_ancla: str,
+    hasta: int | None = None,
+) -> tuple[ResultadoVerificacion, list[str]]:
+    """Recorre en orden los registros con secuencia en (ancla, hasta] recalculando cada hash.
+
+    Los checkpoints que cierran dentro del tramo se contrastan contra el hash recalculado y,
+    cuando el tramo los cubre completos, también contra su raíz Merkle y su firma.
+    """
+    checkpoints = {
+        c.secuencia_hasta: c for c in session.execute(
+            select(AuditCheckpoint).where(
+                AuditCheckpoint.organization_id == organization_id,
+                AuditCheckpoint.secuencia_hasta > ancla,
+                *([AuditCheckpoint.secuencia_hasta <= hasta] if hasta is not None else []),
+            )
+        ).scalars()
+    }
+    columnas = [getattr(AuditLog, c) for c in CAMPOS_SELLADOS] + [AuditLog.hash_previo, AuditLog.hash_registro]
+    consulta = select(*columnas).where(AuditLog.organization_id == organization_id, AuditLog.secuencia > ancla)
+    if hasta is not None:
+        consulta = consulta.where(AuditLog.secuencia <= hasta)
+    filas = session.execute(consulta.order_by(AuditLog.secuencia).execution_options(yield_per=LOTE_LECTURA))
+
+    esperado, hash_previo, verificados = ancla + 1, hash_ancla, 0
+    tramo: list[str] = []
+    inicio_tramo = ancla
+
+    def rota(secuencia: int, mensaje: str) -> tuple[ResultadoVerificacion, list[str]]:
+        return ResultadoVerificacion(False, verificados, ancla, secuencia - 1, secuencia, mensaje), tramo
+
+    for fila in filas:
+        fila = fila._mapping
+        secuencia = fila["secuencia"]
+        if secuencia != esperado:
+            return rota(esperado, f"Falta el registro con secuencia {esperado} (siguiente encontrado: {secuencia}).")
+        if fila["hash_previo"] != hash_previo:
+            return rota(secuencia, f"El registro {secuencia} no apunta al hash del registro anterior.")
+        recalculado = hash_registro_auditoria(fila, hash_previo)
+        if recalculado != fila["hash_registro"]:
+            return rota(secuencia, f"El contenido del registro {secuencia} no coincide con su hash.")
+        tramo.append(recalculado)
+        checkpoint = checkpoints.get(secuencia)
+        if checkpoint is not None:
+            completo = checkpoint.secuencia_desde == inicio_tramo
+            firma = _firma_checkpoint(organization_id, checkpoint.secuencia_desde, secuencia, checkpoint.hash_registro, checkpoint.raiz_merkle)
+            if checkpoint.hash_registro != recalculado or not hmac.compare_digest(firma, checkpoint.firma) or (
+                completo and _raiz_tramo(tramo[-(secuencia - inicio_tramo):]) != checkpoint.raiz_merkle
+            ):
+                return rota(secuencia, f"El checkpoint en la secuencia {secuencia} no coincide con la cadena.")
+            inicio_tramo = secuencia
+        hash_previo, esperado, verificados = recalculado, esperado + 1, verificados + 1
+
+    return ResultadoVerificacion(True, verificados, ancla, esperado - 1, None, "Cadena íntegra."), tramo
+
+def verificar_cadena(
+    session: Session,
+    organization_id: int,
+    desde: datetime | None = None,
+    hasta: datetime | None = None,
+    completa: bool = False,
+) -> ResultadoVerificacion:
+    """Verifica la cadena del tenant sin recorrer más de lo necesario.
+
+    - Sin fechas: desde el último checkpoint hasta el registro más reciente.
+    - Con `desde`/`hasta`: los registros del período, anclados en el checkpoint anterior a él.
+    - `completa=True`: desde el génesis (exportación completa para un auditor externo).
+    """
+    hasta_secuencia = None
+    if completa:
+        ancla = None
+    elif desde is None and hasta is None:
+        ancla = ultimo_checkpoint(session, organization_id)
+    else:
+        en_periodo = select(func.min(AuditLog.secuencia), func.max(AuditLog.secuencia)).where(
+            AuditLog.organization_id == organization_id,
+            AuditLog.secuencia.is_not(None),
+            *([AuditLog.timestamp >= desde] if desde is not None else []),
+            *([AuditLog.timestamp < hasta] if hasta is not None else []),
+        )
+        primera, ultima = session.execute(en_periodo).one()
+        if primera is None:
+            return ResultadoVerificacion(True, 0, 0, 0, None, "Sin registros en el período.")
+        ancla = ultimo_checkpoint(session, organization_id, antes_de=primera)
+        hasta_secuencia = ultima
+
+    if ancla is not None:
+        firma = _firma_checkpoint(organization_id, ancla.secuencia_desde, ancla.secuencia_hasta, ancla.hash_registro, ancla.raiz_merkle)
+        if not hmac.compare_digest(firma, ancla.firma):
+            return ResultadoVerificacion(False, 0, ancla.secuencia_hasta, ancla.secuencia_hasta, ancla.secuencia_hasta, "Firma de checkpoint inválida.")
+        resultado, _ = _verificar_tramo(session, organization_id, ancla.secuencia_hasta, ancla.hash_registro, hasta_secuencia)
+    else:
+        resultado, _ = _verificar_tramo(session, organization_id, 0, HASH_GENESIS, hasta_secuencia)
+    return resultado
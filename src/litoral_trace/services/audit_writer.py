@@ -0,0 +1,214 @@
+"""Escritura Diferida (Write-Behind) del AuditLog con Volcados por Lotes."""
+from __future__ import annotations
+import asyncio
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from typing import Any, Mapping
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from litoral_trace.services.audit_chain import registrar_eventos
+
+AUDIT_LOTE_ENV = "LITORAL_AUDIT_LOTE"
+AUDIT_INTERVALO_ENV = "LITORAL_AUDIT_INTERVALO"
+AUDIT_MAX_INTENTOS_ENV = "LITORAL_AUDIT_MAX_INTENTOS"
+AUDIT_DEAD_LETTER_ENV = "LITORAL_AUDIT_DEAD_LETTER"
+DEFAULT_AUDIT_LOTE: int = 500
+DEFAULT_AUDIT_INTERVALO: float = 0.25  # segundos que un evento puede esperar en memoria
+DEFAULT_AUDIT_MAX_INTENTOS: int = 5
+MAX_ESPERA_REINTENTO: float = 5.0
+
+# Sync: el llamador espera al COMMIT (acciones de administración). Buffer: vuelve de inmediato.
+DURABILIDAD_SINCRONA = "sync"
+DURABILIDAD_BUFFER = "buffered"
+DURABILIDADES = (DURABILIDAD_SINCRONA, DURABILIDAD_BUFFER)
+
+class EscritorAuditoria:
+    """Cola en memoria de eventos de auditoría que un hilo dedicado vuelca en un único INSERT por lote.
+
+    El volcado ocurre al juntar `tamano_lote` eventos, al cumplirse `intervalo` segundos desde el
+    primero pendiente o apenas llega un evento síncrono (que arrastra consigo a los pendientes:
+    commit agrupado). Un único hilo escribe la cadena de hashes del proceso, por lo que los
+    handlers nunca compiten por la cabeza de la cadena.
+
+    Tras un lote fallido sus eventos se reintentan de a uno: una fila inválida no bloquea a las
+    demás y, agotados `max_intentos`, pasa a `no_escritos` (y a `dead_letter`, si está definido).
+    """
+
+    def __init__(
+        self,
+        bind: Engine,
+        tamano_lote: int | None = None,
+        intervalo: float | None = None,
+        capacidad: int | None = None,
+        max_intentos: int | None = None,
+        dead_letter: str | None = None,
+    ):
+        self._bind = bind
+        self.tamano_lote = max(tamano_lote or int(os.environ.get(AUDIT_LOTE_ENV) or DEFAULT_AUDIT_LOTE), 1)
+        self.intervalo = intervalo if intervalo is not None else float(os.environ.get(AUDIT_INTERVALO_ENV) or DEFAULT_AUDIT_INTERVALO)
+        # Con la base caída la cola no crece sin límite: los productores esperan (contrapresión)
+        self.capacidad = max(capacidad or self.tamano_lote * 20, self.tamano_lote)
+        self.max_intentos = max(max_intentos or int(os.environ.get(AUDIT_MAX_INTENTOS_ENV) or DEFAULT_AUDIT_MAX_INTENTOS), 1)
+        self.dead_letter = dead_letter or os.environ.get(AUDIT_DEAD_LETTER_ENV) or None
+        self._pendientes: deque[tuple[dict[str, Any], Future | None, int]] = deque()
+        self._sincronos = 0
+        self._aislar = 0  # eventos de un lote fallido que se reintentan en transacciones individuales
+        self._condicion = threading.Condition()
+        self._cerrando = False
+        self.eventos_escritos = 0
+        self.lotes_escritos = 0
+        self.ultimo_error: BaseException | None = None
+        self.no_escritos: list[dict[str, Any]] = []
+        self._hilo = threading.Thread(target=self._bucle, name="escritor-auditoria", daemon=True)
+        self._hilo.start()
+
+    @property
+    def pendientes(self) -> int:
+        return len(self._pendientes)
+
+    def _encolar(self, evento: Mapping[str, Any], durabilidad: str, bloquear: bool = True) -> Future | None:
+        """Agrega el evento a la cola; con la cola llena espera lugar o, sin `bloquear`, lanza queue.Full."""
+        if durabilidad not in DURABILIDADES:
+            raise ValueError(f"Durabilidad de auditoría desconocida: '{durabilidad}'")
+        fila = dict(evento)
+        # La marca de tiempo es la del evento, no la del volcado
+        fila["timestamp"] = fila.get("timestamp") or datetime.now(timezone.utc)
+        futuro: Future | None = Future() if durabilidad == DURABILIDAD_SINCRONA else None
+        with self._condicion:
+            while len(self._pendientes) >= self.capacidad and not self._cerrando:
+                if not bloquear:
+                    raise queue.Full
+                self._condicion.wait()
+            if self._cerrando:
+                raise RuntimeError("El escritor de auditoría está cerrado.")
+            self._pendientes.append((fila, futuro, 0))
+            if futuro is not None:
+                self._sincronos += 1
+            if futuro is not None or len(self._pendientes) in (1, self.tamano_lote):
+                self._condicion.notify_all()
+        return futuro
+
+    def registrar(self, evento: Mapping[str, Any], durabilidad: str = DURABILIDAD_BUFFER) -> dict[str, Any] | None:
+        """Encola un evento. En modo síncrono bloquea hasta el COMMIT y devuelve la fila encadenada."""
+        futuro = self._encolar(evento, durabilidad)
+        return futuro.result() if futuro is not None else None
+
+    async def registrar_async(self, evento: Mapping[str, Any], durabilidad: str = DURABILIDAD_BUFFER) -> dict[str, Any] | None:
+        """Versión para handlers async: ni la contrapresión ni el COMMIT síncrono ocupan el event loop."""
+        try:
+            futuro = self._encolar(evento, durabilidad, bloquear=False)
+        except queue.Full:
+            futuro = await asyncio.to_thread(self._encolar, evento, durabilidad)
+        return await asyncio.wrap_future(futuro) if futuro is not None else None
+
+    def _tomar_lote(self) -> list[tuple[dict[str, Any], Future | None, int]] | None:
+        with self._condicion:
+            while not self._pendientes and not self._cerrando:
+                self._condicion.wait()
+            limite = time.monotonic() + self.intervalo
+            while not self._cerrando and not self._sincronos and not self._aislar and len(self._pendientes) < self.tamano_lote:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                self._condicion.wait(restante)
+            if not self._pendientes:
+                return None
+            tamano = 1 if self._aislar else self.tamano_lote
+            self._aislar = max(self._aislar - 1, 0)
+            lote = [self._pendientes.popleft() for _ in range(min(len(self._pendientes), tamano))]
+            self._sincronos -= sum(futuro is not None for _, futuro, _ in lote)
+            self._condicion.notify_all()
+            return lote
+
+    def _descartar(self, eventos: list[dict[str, Any]]) -> None:
+        """Conserva los eventos que no pudieron escribirse (y los agrega al archivo dead letter)."""
+        self.no_escritos.extend(eventos)
+        if self.dead_letter and eventos:
+            with open(self.dead_letter, "a", encoding="utf-8") as archivo:
+                for evento in eventos:
+                    archivo.write(json.dumps(evento, default=str, ensure_ascii=False) + "\n")
+
+    def _escribir(self, lote: list[tuple[dict[str, Any], Future | None, int]]) -> None:
+        try:
+            with Session(self._bind) as session, session.begin():
+                filas = registrar_eventos(session, [evento for evento, _, _ in lote])
+        except Exception as exc:
+            self.ultimo_error = exc
+            # Los síncronos reciben el error; los diferidos vuelven al frente de la cola
+            for _, futuro, _ in lote:
+                if futuro is not None:
+                    futuro.set_exception(exc)
+            diferidos = [(evento, None, intentos) for evento, futuro, intentos in lote if futuro is None]
+            aislado = len(lote) == 1
+            if aislado:
+                # Solo el fallo en una transacción propia es atribuible a la fila y consume intentos
+                diferidos = [(evento, None, intentos + 1) for evento, _, intentos in diferidos]
+            agotados = [evento for evento, _, intentos in diferidos if intentos >= self.max_intentos]
+            reintentar = [diferido for diferido in diferidos if diferido[2] < self.max_intentos]
+            with self._condicion:
+                if self._cerrando:
+                    self._descartar([evento for evento, _, _ in diferidos])
+                    return
+                self._descartar(agotados)
+                self._pendientes.extendleft(reversed(reintentar))
+                self._aislar = max(self._aislar, len(reintentar))
+                intentos = reintentar[0][2] if aislado and reintentar else 0
+                self._condicion.wait(min(max(self.intervalo, 0.05) * 2 ** intentos, MAX_ESPERA_REINTENTO))
+            return
+        self.eventos_escritos += len(filas)
+        self.lotes_escritos += 1
+        for fila, (_, futuro, _) in zip(filas, lote):
+            if futuro is not None:
+                futuro.set_result(fila)
+
+    def _bucle(self) -> None:
+        while True:
+            lote = self._tomar_lote()
+            if lote is None:
+                return
+            self._escribir(lote)
+
+    def cerrar(self, timeout: float | None = None) -> bool:
+        """Deja de aceptar eventos, vuelca todo lo pendiente y devuelve True si no quedó nada sin escribir."""
+        with self._condicion:
+            self._cerrando = True
+            self._condicion.notify_all()
+        self._hilo.join(timeout)
+        return not self._hilo.is_alive() and not self._pendientes and not self.no_escritos
+
+_escritor: EscritorAuditoria | None = None
+_escritor_lock = threading.Lock()
+
+def iniciar_escritor_auditoria(bind: Engine, **opciones: Any) -> EscritorAuditoria:
+    """Crea el escritor compartido del proceso (reemplaza y drena uno anterior, si existía)."""
+    global _escritor
+    with _escritor_lock:
+        previo, _escritor = _escritor, EscritorAuditoria(bind, **opciones)
+    if previo is not None:
+        previo.cerrar()
+    return _escritor
+
+def escritor_auditoria() -> EscritorAuditoria | None:
+    return _escritor
+
+async def auditar(evento: Mapping[str, Any], durabilidad: str = DURABILIDAD_BUFFER) -> dict[str, Any] | None:
+    """Registra un evento desde un handler async; sin base configurada (sin escritor) no hace nada."""
+    escritor = _escritor
+    if escritor is None:
+        return None
+    return await escritor.registrar_async(evento, durabilidad)
+
+def cerrar_escritor_auditoria(timeout: float | None = None) -> bool:
+    """Drena el escritor compartido (apagado del servidor)."""
+    global _escritor
+    with _escritor_lock:
+        escritor, _escritor = _escritor, None
+    return escritor.cerrar(timeout) if escritor is not None else True
@@ -1,11 +1,24 @@
 """Módulo de Procesamiento Batch Masivo y Generación de Plantillas Excel."""
 from __future__ import annotations
 import io
+import os
+import threading
+import uuid
 import zipfile
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Any, Iterator
+import numpy as np
 import pandas as pd
+from sqlalchemy.engine import Connection, Engine
 
-from litoral_trace.services.compliance import evaluar_compliance_lote, generar_dds_json_traces_nt
-from litoral_trace.services.reports import generar_pdf_reporte_bytes
+from litoral_trace.services.compliance import generar_dds_json_traces_nt
+from litoral_trace.services.consolidated_report import escribir_reporte_consolidado
+from litoral_trace.services.merkle import NOMBRE_MANIFIESTO, ArbolMerkle, construir_manifiesto, serializar_manifiesto
+from litoral_trace.services.pdf_pool import TrabajoCertificado, renderizar_certificado, renderizar_en_orden
+from litoral_trace.services.persistence import REGLA_SALDO_PROVEEDOR, persistir_con_libro_mayor, registros_desde_evaluacion
+from litoral_trace.services.rules_engine import COLUMNAS_CALCULADAS, evaluar_reglas_df
 
 BATCH_COLUMNAS = [
     "Identificador_Lote",
@@ -15,7 +28,9 @@ BATCH_COLUMNAS = [
     "Latitud",
     "Longitud",
     "Volumen_Ingresado_Ton",
+    "Guia_Ingreso",
     "Volumen_Exportar_Ton",
+    "Poligono_WKT",
 ]
 
 BATCH_FILA_EJEMPLO = [
@@ -26,7 +41,9 @@ BATCH_FILA_EJEMPLO = [
     -27.50,
     -58.90,
     500.0,
+    "GF-2026-000123",
     200.0,
+    "POLYGON((-58.91 -27.51, -58.89 -27.51, -58.89 -27.49, -58.91 -27.49, -58.91 -27.51))",
 ]
 
 def generar_plantilla_excel() -> bytes:
@@ -39,67 +56,267 @@ def generar_plantilla_excel() -> bytes:
         df_template.to_excel(writer, index=False, sheet_name="Plantilla_LitoralTrace")
     return buffer.getvalue()
 
-def procesar_lote_masivo(df_upload: pd.DataFrame) -> tuple[pd.DataFrame, bytes]:
+def normalizar_matriz_batch(df_upload: pd.DataFrame) -> pd.DataFrame:
+    """Traduce la planilla Excel a las columnas de lote del motor de compliance, con valores por defecto."""
+    def texto(columna: str, defecto: pd.Series | str) -> pd.Series:
+        serie = df_upload[columna] if columna in df_upload else pd.Series(np.nan, index=df_upload.index)
+        serie = serie.astype(object).where(serie.notna() & (serie.astype(str).str.strip() != ""), defecto)
+        return serie.astype(str).str.strip()
+
+    def numero(columna: str, defecto: float) -> pd.Series:
+        serie = df_upload[columna] if columna in df_upload else pd.Series(np.nan, index=df_upload.index)
+        serie = pd.to_numeric(serie, errors="coerce")
+        return serie.where(serie.notna() & (serie != 0), defecto).astype(float)
+
+    def opcional(columna: str) -> pd.Series:
+        serie = texto(columna, "")
+        return serie.where(serie != "", None)
+
+    nombres_defecto = pd.Series([f"Lote_{i+1}" for i in range(len(df_upload))], index=df_upload.index)
+    df_lotes = pd.DataFrame({
+        "identificador": texto("Identificador_Lote", nombres_defecto),
+        "productor_id": texto("ID_Proveedor", "N/A"),
+        "producto_forestal": texto("Producto_Forestal", "Madera Aserrada (Pino)"),
+        "hectareas": numero("Hectareas", 0.0),
+        "latitud": numero("Latitud", -27.45),
+        "longitud": numero("Longitud", -59.05),
+        "volumen_ingresado_ton": numero("Volumen_Ingresado_Ton", 0.0),
+        # Guía o remito del ingreso: el libro mayor acredita cada documento una sola vez
+        "guia_ingreso": opcional("Guia_Ingreso"),
+        "volumen_exportar_ton": numero("Volumen_Exportar_Ton", 0.0),
+        "polygon_wkt": opcional("Poligono_WKT"),
+        # Lotes sin Identificador_Lote reciben un nombre por posición que no identifica nada persistible
+        "identificador_informado": opcional("Identificador_Lote").notna(),
+    })
+    # Atributos adicionales de la planilla (ej. Pais_Origen) quedan disponibles para las reglas;
+    # los que coinciden con una columna normalizada o calculada ("Latitud ", "Dictamen") se descartan
+    reservadas = set(df_lotes.columns) | COLUMNAS_CALCULADAS
+    for columna in df_upload.columns:
+        nombre = str(columna).strip().lower()
+        if columna not in BATCH_COLUMNAS and nombre not in reservadas:
+            df_lotes[nombre] = df_upload[columna]
+            reservadas.add(nombre)
+    return df_lotes
+
+PAQUETES_BATCH_MAX_ENV = "LITORAL_PAQUETES_BATCH_MAX"
+DEFAULT_PAQUETES_BATCH_MAX: int = 32
+BLOQUE_ZIP_BYTES: int = 1024 * 1024
+
+class _SalidaStreaming(io.RawIOBase):
+    """Destino no posicionable (zipfile, escritor PDF): acumula lo escrito hasta que se drena."""
+
+    def __init__(self):
+        self._bloques: list[bytes] = []
+        self._pendiente = 0
+        self._posicion = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, datos) -> int:
+        datos = bytes(datos)
+        self._bloques.append(datos)
+        self._pendiente += len(datos)
+        self._posicion += len(datos)
+        return len(datos)
+
+    def tell(self) -> int:
+        return self._posicion
+
+    @property
+    def pendiente(self) -> int:
+        return self._pendiente
+
+    def drenar(self) -> bytes:
+        datos = b"".join(self._bloques)
+        self._bloques.clear()
+        self._pendiente = 0
+        return datos
+
+@dataclass
+class PaqueteBatch:
+    """Dictámenes de un batch: certificados, DDS y ZIP se materializan recién cuando se piden."""
+    paquete_id: str
+    organization_id: int | None
+    df_eval: pd.DataFrame
+    resumen: pd.DataFrame
+
+    def __len__(self) -> int:
+        return len(self.df_eval)
+
+    def indice_de(self, identificador: str) -> int:
+        """Fila del identificador; si la planilla lo repite hay que elegir la fila por índice."""
+        posiciones = np.flatnonzero(self.df_eval["identificador"].to_numpy() == identificador)
+        if len(posiciones) == 0:
+            raise KeyError(identificador)
+        if len(posiciones) > 1:
+            raise ValueError(f"El identificador {identificador} aparece en las filas {posiciones.tolist()} del paquete.")
+        return int(posiciones[0])
+
+    def lote_data(self, indice: int) -> dict[str, Any]:
+        fila = self.df_eval.iloc[indice]
+        lat, lon = fila["latitud"], fila["longitud"]
+        polygon_wkt = fila.get("polygon_wkt") if pd.notna(fila.get("polygon_wkt")) else None
+        return {
+            "identificador": fila["identificador"],
+            "productor_id": fila["productor_id"],
+            "producto_forestal": fila["producto_forestal"],
+            "hectareas": fila["hectareas"],
+            "latitud": lat,
+            "longitud": lon,
+            "polygon_wkt": polygon_wkt or f"POLYGON(({lon-0.01} {lat-0.01}, {lon+0.01} {lat-0.01}, {lon+0.01} {lat+0.01}, {lon-0.01} {lat+0.01}, {lon-0.01} {lat-0.01}))"
+        }
+
+    def trabajo_certificado(self, indice: int) -> TrabajoCertificado:
+        fila = self.df_eval.iloc[indice]
+        return TrabajoCertificado(
+            self.lote_data(indice), fila["dictamen"], fila["observacion"],
+            fila["volumen_ingresado_ton"], fila["volumen_exportar_ton"], fila["coeficiente_rendimiento"],
+        )
+
+    @cached_property
+    def _carpetas(self) -> list[str]:
+        """Carpeta de cada fila en el ZIP: un lote repetido en la planilla lleva su número de fila."""
+        df = self.df_eval
+        bases = (df["dictamen"].astype(str) + "_" + df["productor_id"].astype(str) + "_" + df["identificador"].astype(str)).tolist()
+        repetidas = pd.Series(bases).duplicated(keep=False).to_numpy()
+        return [f"{base}_F{i + 1}/" if repetida else f"{base}/" for i, (base, repetida) in enumerate(zip(bases, repetidas))]
+
+    def carpeta(self, indice: int) -> str:
+        return self._carpetas[indice]
+
+    def certificado_pdf(self, indice: int) -> bytes:
+        """Renderiza (o toma de la caché por contenido) el certificado de una fila."""
+        return renderizar_certificado(self.trabajo_certificado(indice))
+
+    def dds_json(self, indice: int) -> str | None:
+        """DDS TRACES NT de la fila, solo para lotes aptos (Verde)."""
+        fila = self.df_eval.iloc[indice]
+        if fila["dictamen"] != "Verde":
+            return None
+        return generar_dds_json_traces_nt(self.lote_data(indice), fila["volumen_exportar_ton"])
+
+    def iterar_zip(self, tamano_bloque: int = BLOQUE_ZIP_BYTES) -> Iterator[bytes]:
+        """Arma el ZIP completo en streaming: entrega bloques a medida que los PDF salen del pool.
+
+        Cada archivo se agrega como hoja de un árbol Merkle a medida que se escribe; al final
+        se adjunta MANIFIESTO_MERKLE.json con la raíz firmada y la prueba de inclusión de cada archivo.
+        """
+        salida = _SalidaStreaming()
+        arbol = ArbolMerkle()
+        rutas: list[str] = []
+        trabajos = (self.trabajo_certificado(i) for i in range(len(self)))
+        with zipfile.ZipFile(salida, "w", zipfile.ZIP_DEFLATED) as zip_file:
+            def escribir(ruta: str, contenido: bytes) -> None:
+                zip_file.writestr(ruta, contenido)
+                arbol.agregar(ruta, contenido)
+                rutas.append(ruta)
+
+            for i, pdf_bytes in enumerate(renderizar_en_orden(trabajos)):
+                proveedor = self.df_eval.iloc[i]["productor_id"]
+                carpeta = self.carpeta(i)
+                escribir(f"{carpeta}AUDITORIA_{proveedor}.pdf", pdf_bytes)
+
+                # Si es Apto (Verde), adjuntar también el JSON para TRACES NT
+                json_data = self.dds_json(i)
+                if json_data is not None:
+                    escribir(f"{carpeta}DDS_TRACES_NT_{proveedor}.json", json_data.encode("utf-8"))
+                if salida.pendiente >= tamano_bloque:
+                    yield salida.drenar()
+            zip_file.writestr(NOMBRE_MANIFIESTO, serializar_manifiesto(construir_manifiesto(self.paquete_id, arbol, rutas)))
+        yield salida.drenar()
+
+    def zip_bytes(self) -> bytes:
+        return b"".join(self.iterar_zip())
+
+    def iterar_reporte_consolidado(self, tamano_bloque: int = BLOQUE_ZIP_BYTES) -> Iterator[bytes]:
+        """Reporte consolidado (resumen + una página por lote) en un único PDF, emitido en bloques."""
+        salida = _SalidaStreaming()
+        for _ in escribir_reporte_consolidado(self.df_eval, salida):
+            if salida.pendiente >= tamano_bloque:
+                yield salida.drenar()
+        yield salida.drenar()
+
+    def reporte_consolidado_pdf(self) -> bytes:
+        return b"".join(self.iterar_reporte_consolidado())
+
+_PAQUETES: OrderedDict[str, PaqueteBatch] = OrderedDict()
+_PAQUETES_LOCK = threading.Lock()
+
+def registrar_paquete(paquete: PaqueteBatch) -> PaqueteBatch:
+    """Guarda el paquete en memoria del proceso; se descartan primero los más antiguos."""
+    limite = int(os.environ.get(PAQUETES_BATCH_MAX_ENV) or DEFAULT_PAQUETES_BATCH_MAX)
+    with _PAQUETES_LOCK:
+        _PAQUETES[paquete.paquete_id] = paquete
+        while len(_PAQUETES) > max(limite, 1):
+            _PAQUETES.popitem(last=False)
+    return paquete
+
+def obtener_paquete(paquete_id: str, organization_id: int | None = None) -> PaqueteBatch:
+    """Recupera un paquete registrado; otro tenant recibe KeyError igual que un id inexistente."""
+    with _PAQUETES_LOCK:
+        paquete = _PAQUETES.get(paquete_id)
+    if paquete is None or (organization_id is not None and paquete.organization_id != organization_id):
+        raise KeyError(paquete_id)
+    return paquete
+
+def evaluar_lote_masivo(
+    df_upload: pd.DataFrame,
+    bind: Engine | Connection | None = None,
+    organization_id: int | None = None,
+    registrar: bool = True,
+) -> PaqueteBatch:
+    """Evalúa la matriz y conserva solo los dictámenes; ningún PDF se renderiza todavía.
+
+    Args:
+        df_upload: Matriz leída desde la plantilla Excel.
+        bind: Conexión opcional para persistir los dictámenes en la tabla de lotes.
+        organization_id: Tenant propietario de los lotes (requerido si se persiste).
+        registrar: Deja el paquete disponible para descargas posteriores con obtener_paquete().
+    """
+    df_eval = evaluar_reglas_df(normalizar_matriz_batch(df_upload))
+    if bind is not None:
+        if organization_id is None:
+            raise ValueError("Se requiere organization_id para persistir los dictámenes del batch.")
+        rechazos = persistir_con_libro_mayor(
+            bind, registros_desde_evaluacion(df_eval[df_eval["identificador_informado"]], organization_id),
+        )
+        if rechazos:
+            # El saldo acumulado del proveedor prevalece sobre el balance del remito aislado
+            rechazado = df_eval["identificador"].isin(list(rechazos)) & (df_eval["dictamen"] == "Verde")
+            df_eval.loc[rechazado, "dictamen"] = "Rojo"
+            df_eval.loc[rechazado, "regla_aplicada"] = REGLA_SALDO_PROVEEDOR
+            df_eval.loc[rechazado, "observacion"] = df_eval.loc[rechazado, "identificador"].map(rechazos)
+
+    df_resumen = pd.DataFrame({
+        "Lote": df_eval["identificador"].to_numpy(),
+        "Proveedor": df_eval["productor_id"].to_numpy(),
+        "Producto": df_eval["producto_forestal"].to_numpy(),
+        "Vol. Exportar (Ton)": df_eval["volumen_exportar_ton"].to_numpy(),
+        "Dictamen": df_eval["dictamen"].to_numpy(),
+        "Regla Aplicada": df_eval["regla_aplicada"].to_numpy(),
+        "Observación": df_eval["observacion"].to_numpy(),
+    })
+    paquete = PaqueteBatch(uuid.uuid4().hex, organization_id, df_eval, df_resumen)
+    return registrar_paquete(paquete) if registrar else paquete
+
+def procesar_lote_masivo(
+    df_upload: pd.DataFrame,
+    bind: Engine | Connection | None = None,
+    organization_id: int | None = None,
+) -> tuple[pd.DataFrame, bytes]:
     """Procesa una matriz de datos cargada desde Excel y genera paquete ZIP de auditoría.
+
+    Args:
+        df_upload: Matriz leída desde la plantilla Excel.
+        bind: Conexión opcional para persistir los dictámenes en la tabla de lotes.
+        organization_id: Tenant propietario de los lotes (requerido si se persiste).
     
     Returns:
         tuple[Resumen_DataFrame, ZIP_Bytes]
     """
-    resumen_filas = []
-    zip_buffer = io.BytesIO()
-    
     if df_upload is None or df_upload.empty:
-        return pd.DataFrame(resumen_filas), zip_buffer.getvalue()
-
-    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-        for idx, row in df_upload.iterrows():
-            nombre = str(row.get("Identificador_Lote") or f"Lote_{idx+1}").strip()
-            proveedor = str(row.get("ID_Proveedor") or "N/A").strip()
-            producto = str(row.get("Producto_Forestal") or "Madera Aserrada (Pino)").strip()
-            
-            try:
-                hectareas = float(row.get("Hectareas") or 0.0)
-                lat = float(row.get("Latitud") or -27.45)
-                lon = float(row.get("Longitud") or -59.05)
-                vol_in = float(row.get("Volumen_Ingresado_Ton") or 0.0)
-                vol_out = float(row.get("Volumen_Exportar_Ton") or 0.0)
-            except (ValueError, TypeError):
-                hectareas, lat, lon, vol_in, vol_out = 0.0, -27.45, -58.90, 0.0, 0.0
-
-            lote_data = {
-                "identificador": nombre,
-                "productor_id": proveedor,
-                "producto_forestal": producto,
-                "hectareas": hectareas,
-                "latitud": lat,
-                "longitud": lon,
-                "polygon_wkt": f"POLYGON(({lon-0.01} {lat-0.01}, {lon+0.01} {lat-0.01}, {lon+0.01} {lat+0.01}, {lon-0.01} {lat+0.01}, {lon-0.01} {lat-0.01}))"
-            }
-
-            eval_res = evaluar_compliance_lote(lote_data, vol_in, vol_out)
-            dictamen = eval_res["dictamen"]
-            obs = eval_res["observacion"]
-            mb_result = eval_res["balance_masas"]
-
-            resumen_filas.append({
-                "Lote": nombre,
-                "Proveedor": proveedor,
-                "Producto": producto,
-                "Vol. Exportar (Ton)": vol_out,
-                "Dictamen": dictamen,
-                "Observación": obs
-            })
-
-            # Generar PDF de Auditoría
-            pdf_bytes = generar_pdf_reporte_bytes(
-                lote_data, dictamen, obs, vol_in, vol_out, mb_result.coeficiente_rendimiento
-            )
-            carpeta = f"{dictamen}_{proveedor}_{nombre}/"
-            zip_file.writestr(f"{carpeta}AUDITORIA_{proveedor}.pdf", pdf_bytes)
-
-            # Si es Apto (Verde), adjuntar también el JSON para TRACES NT
-            if dictamen == "Verde":
-                json_data = generar_dds_json_traces_nt(lote_data, vol_out)
-                zip_file.writestr(f"{carpeta}DDS_TRACES_NT_{proveedor}.json", json_data.encode("utf-8"))
-
-    return pd.DataFrame(resumen_filas), zip_buffer.getvalue()
+        return pd.DataFrame([]), b""
+
+    paquete = evaluar_lote_masivo(df_upload, bind=bind, organization_id=organization_id, registrar=False)
+    return paquete.resumen, paquete.zip_bytes()
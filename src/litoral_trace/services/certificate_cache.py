@@ -0,0 +1,73 @@
+"""Caché Direccionada por Contenido de Certificados PDF (clave = sello SHA-256)."""
+from __future__ import annotations
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+
+CACHE_CERTIFICADOS_MB_ENV = "LITORAL_CACHE_CERTIFICADOS_MB"
+DEFAULT_CACHE_CERTIFICADOS_MB: float = 64.0
+
+@dataclass(frozen=True)
+class EstadisticasCache:
+    entradas: int
+    bytes_ocupados: int
+    capacidad_bytes: int
+    aciertos: int
+    fallos: int
+
+class CacheCertificados:
+    """LRU acotada por bytes: los certificados menos consultados se descartan primero."""
+
+    def __init__(self, capacidad_bytes: int):
+        self.capacidad_bytes = max(int(capacidad_bytes), 0)
+        self._entradas: OrderedDict[str, bytes] = OrderedDict()
+        self._bytes = 0
+        self._aciertos = 0
+        self._fallos = 0
+        self._lock = threading.Lock()
+
+    def obtener(self, sello: str) -> bytes | None:
+        with self._lock:
+            contenido = self._entradas.get(sello)
+            if contenido is None:
+                self._fallos += 1
+                return None
+            self._entradas.move_to_end(sello)
+            self._aciertos += 1
+            return contenido
+
+    def guardar(self, sello: str, contenido: bytes) -> None:
+        if len(contenido) > self.capacidad_bytes:
+            return
+        with self._lock:
+            previo = self._entradas.pop(sello, None)
+            if previo is not None:
+                self._bytes -= len(previo)
+            self._entradas[sello] = contenido
+            self._bytes += len(contenido)
+            while self._bytes > self.capacidad_bytes:
+                _, descartado = self._entradas.popitem(last=False)
+                self._bytes -= len(descartado)
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def estadisticas(self) -> EstadisticasCache:
+        with self._lock:
+            return EstadisticasCache(len(self._entradas), self._bytes, self.capacidad_bytes, self._aciertos, self._fallos)
+
+    def __contains__(self, sello: object) -> bool:
+        return sello in self._entradas
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+@lru_cache(maxsize=1)
+def cache_certificados() -> CacheCertificados:
+    """Caché compartida del proceso, dimensionada por LITORAL_CACHE_CERTIFICADOS_MB (0 la deshabilita)."""
+    megabytes = float(os.environ.get(CACHE_CERTIFICADOS_MB_ENV) or DEFAULT_CACHE_CERTIFICADOS_MB)
+    return CacheCertificados(int(megabytes * 1024 * 1024))
@@ -1,13 +1,99 @@
 """Servicio Integrado de Compliance EUDR y Generador DDS TRACES NT."""
 from __future__ import annotations
+import asyncio
 import hashlib
 import json
+import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import Any
+from functools import lru_cache, partial
+from typing import Any, Callable, TypeVar
 
-from litoral_trace.services.mass_balance import evaluar_balance_masas
+from litoral_trace.services.mass_balance import MassBalanceResult, evaluar_balance_masas
 from litoral_trace.services.ndvi import calcular_ndvi_simulado, evaluar_deforestacion_eudr
+from litoral_trace.services.rules_engine import obtener_reglas
+
+T = TypeVar("T")
+
+COMPLIANCE_WORKERS_ENV = "LITORAL_COMPLIANCE_WORKERS"
+SATELITAL_WORKERS_ENV = "LITORAL_SATELITAL_WORKERS"
+COMPLIANCE_DEADLINE_ENV = "LITORAL_COMPLIANCE_DEADLINE_S"
+DEFAULT_COMPLIANCE_DEADLINE_S: float = 10.0
+
+@lru_cache(maxsize=1)
+def _executor_cpu() -> ThreadPoolExecutor:
+    """Pool acotado para etapas de cómputo (NDVI, balance, DDS) fuera del event loop."""
+    workers = int(os.environ.get(COMPLIANCE_WORKERS_ENV) or min(4, os.cpu_count() or 1))
+    return ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="compliance-cpu")
+
+@lru_cache(maxsize=1)
+def _executor_io() -> ThreadPoolExecutor:
+    """Pool separado para E/S (telemetría satelital, lecturas de base) que no compite con el cómputo."""
+    workers = int(os.environ.get(SATELITAL_WORKERS_ENV) or 16)
+    return ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="compliance-io")
+
+def deadline_compliance() -> float:
+    """Presupuesto de tiempo (segundos) por solicitud de evaluación."""
+    return float(os.environ.get(COMPLIANCE_DEADLINE_ENV) or DEFAULT_COMPLIANCE_DEADLINE_S)
+
+async def ejecutar_cpu(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Ejecuta una etapa de cómputo sincrónica en el pool acotado sin bloquear el event loop."""
+    return await asyncio.get_running_loop().run_in_executor(_executor_cpu(), partial(fn, *args, **kwargs))
+
+async def ejecutar_io(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Ejecuta una etapa de E/S sincrónica (cliente satelital, consulta de base) en el pool de E/S."""
+    return await asyncio.get_running_loop().run_in_executor(_executor_io(), partial(fn, *args, **kwargs))
+
+# Telemetría no consultada: una regla previa resolvió el lote sin necesitarla
+_SATELITAL_OMITIDA: dict[str, Any] = {"dictamen": None, "base_2020": None, "actual": None, "puntos_ndvi": []}
+
+def _registro_lote(
+    lote_data: dict[str, Any],
+    tipo_cultivo: str,
+    lat: float,
+    lon: float,
+    mb_result: MassBalanceResult,
+) -> dict[str, Any]:
+    return {
+        **lote_data,
+        "producto_forestal": tipo_cultivo,
+        "latitud": lat,
+        "longitud": lon,
+        "coeficiente_rendimiento": mb_result.coeficiente_rendimiento,
+        "volumen_ingresado_ton": mb_result.volumen_ingresado_ton,
+        "volumen_exportar_ton": mb_result.volumen_exportar_ton,
+        "volumen_maximo_permitido_ton": mb_result.volumen_maximo_permitido_ton,
+        "balance_valido": mb_result.es_valido,
+        "mb_observacion": mb_result.mensaje_observacion,
+    }
+
+def _consolidar_dictamen(
+    registro: dict[str, Any],
+    mb_result: MassBalanceResult,
+    puntos_ndvi: list[dict[str, str | float]] | None,
+) -> dict[str, Any]:
+    """Aplica las reglas al registro; sin `puntos_ndvi` la telemetría se informa como no consultada."""
+    if puntos_ndvi is None:
+        satelital = dict(_SATELITAL_OMITIDA)
+    else:
+        sat_dictamen, sat_obs, base_2020, actual = evaluar_deforestacion_eudr(puntos_ndvi)
+        registro = {
+            **registro,
+            "sat_dictamen": sat_dictamen,
+            "sat_observacion": sat_obs,
+            "ndvi_base_2020": base_2020,
+            "ndvi_actual": actual,
+        }
+        satelital = {"dictamen": sat_dictamen, "base_2020": base_2020, "actual": actual, "puntos_ndvi": puntos_ndvi}
+    resultado = obtener_reglas().dictaminar(registro)
+    return {
+        "dictamen": resultado.dictamen,
+        "observacion": resultado.observacion,
+        "regla_aplicada": resultado.regla_aplicada,
+        "balance_masas": mb_result,
+        "satelital": satelital,
+    }
 
 def evaluar_compliance_lote(
     lote_data: dict[str, Any],
@@ -21,36 +107,35 @@ def evaluar_compliance_lote(
     
     # 1. Evaluación de Balance de Masas
     mb_result = evaluar_balance_masas(volumen_ingresado_ton, volumen_exportar_ton, tipo_cultivo)
+    registro = _registro_lote(lote_data, tipo_cultivo, lat, lon, mb_result)
     
-    # 2. Evaluación Satelital
-    puntos_ndvi = calcular_ndvi_simulado(lat, lon)
-    sat_dictamen, sat_obs, base_2020, actual = evaluar_deforestacion_eudr(puntos_ndvi)
+    # 2. Evaluación Satelital, solo si ninguna regla barata ya resolvió el lote
+    puntos_ndvi = calcular_ndvi_simulado(lat, lon) if obtener_reglas().necesita_satelital(registro) else None
     
-    # 3. Dictamen Consolidado
-    if not mb_result.es_valido:
-        dictamen_final = "Rojo"
-        observacion_final = f"BLOQUEADO: {mb_result.mensaje_observacion}"
-    elif sat_dictamen == "Rojo":
-        dictamen_final = "Rojo"
-        observacion_final = f"BLOQUEADO: {sat_obs}"
-    elif sat_dictamen == "Verde" and mb_result.es_valido:
-        dictamen_final = "Verde"
-        observacion_final = f"APROBADO / COMPLIANT. {sat_obs} | {mb_result.mensaje_observacion}"
-    else:
-        dictamen_final = "Pendiente"
-        observacion_final = f"PENDIENTE DE VERIFICACIÓN: {sat_obs}"
-        
-    return {
-        "dictamen": dictamen_final,
-        "observacion": observacion_final,
-        "balance_masas": mb_result,
-        "satelital": {
-            "dictamen": sat_dictamen,
-            "base_2020": base_2020,
-            "actual": actual,
-            "puntos_ndvi": puntos_ndvi
-        }
-    }
+    # 3. Dictamen Consolidado (reglas declarativas en orden de prioridad)
+    return _consolidar_dictamen(registro, mb_result, puntos_ndvi)
+
+async def evaluar_compliance_lote_async(
+    lote_data: dict[str, Any],
+    volumen_ingresado_ton: float,
+    volumen_exportar_ton: float
+) -> dict[str, Any]:
+    """Versión asíncrona de evaluar_compliance_lote sin bloquear el event loop.
+
+    El balance (cómputo) corre en el pool acotado de CPU y, solo si las reglas lo requieren,
+    la descarga de la serie NDVI usa el pool de E/S. El plazo máximo lo impone el llamador
+    con asyncio.timeout().
+    """
+    tipo_cultivo = lote_data.get("producto_forestal", "Madera Aserrada (Pino)")
+    lat = float(lote_data.get("latitud", -27.45))
+    lon = float(lote_data.get("longitud", -59.05))
+
+    mb_result = await ejecutar_cpu(evaluar_balance_masas, volumen_ingresado_ton, volumen_exportar_ton, tipo_cultivo)
+    registro = _registro_lote(lote_data, tipo_cultivo, lat, lon, mb_result)
+    puntos_ndvi = None
+    if obtener_reglas().necesita_satelital(registro):
+        puntos_ndvi = await ejecutar_io(calcular_ndvi_simulado, lat, lon)
+    return await ejecutar_cpu(_consolidar_dictamen, registro, mb_result, puntos_ndvi)
 
 def generar_dds_json_traces_nt(
     lote_data: dict[str, Any],
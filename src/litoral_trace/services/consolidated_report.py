@@ -0,0 +1,157 @@
+"""Reporte Consolidado de Auditoría: un único PDF multi-página para un batch completo."""
+from __future__ import annotations
+from typing import Any, BinaryIO, Iterator
+import pandas as pd
+
+from litoral_trace.services.pdf_writer import EscritorPDF, PaginaPDF, ancho_texto, envolver_texto
+from litoral_trace.services.reports import COLOR_TEXTO_CUERPO, FECHA_CREACION_CANONICA, sello_certificado
+
+MARGEN_MM: float = 10.0
+ANCHO_UTIL_MM: float = 190.0
+FILAS_RESUMEN_POR_PAGINA: int = 38
+
+# (título, columna del df de evaluación o None para el número de página, ancho en mm)
+COLUMNAS_RESUMEN: tuple[tuple[str, str | None, float], ...] = (
+    ("Lote", "identificador", 38.0),
+    ("Proveedor", "productor_id", 34.0),
+    ("Producto", "producto_forestal", 44.0),
+    ("Vol. Exp. (Ton)", "volumen_exportar_ton", 24.0),
+    ("Dictamen", "dictamen", 18.0),
+    ("Regla", "regla_aplicada", 20.0),
+    ("Pág.", None, 12.0),
+)
+
+def recortar_texto(texto: str, ancho_mm: float, estilo: str = "", tamano: float = 10) -> str:
+    """Recorta con puntos suspensivos el texto que no entra en una celda."""
+    if ancho_texto(texto, estilo, tamano) <= ancho_mm:
+        return texto
+    while texto and ancho_texto(texto + "...", estilo, tamano) > ancho_mm:
+        texto = texto[:-1]
+    return texto + "..."
+
+def _encabezado(pagina: PaginaPDF, subtitulo: str) -> None:
+    pagina.texto(MARGEN_MM, 15, "LITORAL TRACE | COMPLIANCE INTELLIGENCE", "B", 11, (100, 100, 100))
+    pagina.texto_en_caja(MARGEN_MM, 9, ANCHO_UTIL_MM, 8, subtitulo, "B", 11, (100, 100, 100), alineacion="R")
+    pagina.linea(MARGEN_MM, 18, MARGEN_MM + ANCHO_UTIL_MM, 18)
+
+def _pie(pagina: PaginaPDF, numero: int, detalle: str) -> None:
+    pagina.texto_en_caja(MARGEN_MM, 277, ANCHO_UTIL_MM, 4, f"Reporte consolidado Litoral Trace Engine v2.4 - Página {numero}", "I", 8, (128, 128, 128), alineacion="C")
+    pagina.texto_en_caja(MARGEN_MM, 281, ANCHO_UTIL_MM, 4, detalle, "I", 8, (128, 128, 128), alineacion="C")
+
+def _paginas_resumen(total_lotes: int) -> int:
+    return max(-(-total_lotes // FILAS_RESUMEN_POR_PAGINA), 1)
+
+def _pagina_resumen(df_eval: pd.DataFrame, inicio: int, numero: int, primera_pagina_lote: int) -> PaginaPDF:
+    pagina = PaginaPDF()
+    _encabezado(pagina, "REPORTE CONSOLIDADO DE AUDITORÍA EUDR")
+    y = 22.0
+    if inicio == 0:
+        pagina.texto_en_caja(MARGEN_MM, y, ANCHO_UTIL_MM, 10, "RESUMEN DEL BATCH (REGLAMENTO UE 2023/1115)", "B", 14, COLOR_TEXTO_CUERPO, alineacion="C")
+        conteo = df_eval["dictamen"].value_counts()
+        totales = " | ".join(f"{dictamen}: {cantidad}" for dictamen, cantidad in conteo.items())
+        pagina.texto(MARGEN_MM, y + 16, f"Lotes auditados: {len(df_eval)}   {totales}", "", 10, COLOR_TEXTO_CUERPO)
+        y += 20
+
+    x = MARGEN_MM
+    for titulo, _, ancho in COLUMNAS_RESUMEN:
+        pagina.rectangulo(x, y, ancho, 7, relleno=(240, 240, 240))
+        pagina.texto_en_caja(x, y, ancho, 7, titulo, "B", 8, COLOR_TEXTO_CUERPO)
+        x += ancho
+    y += 7
+
+    bloque = df_eval.iloc[inicio:inicio + FILAS_RESUMEN_POR_PAGINA]
+    columnas = list(bloque.columns)
+    for desplazamiento, valores in enumerate(bloque.itertuples(index=False, name=None)):
+        fila = dict(zip(columnas, valores))
+        x = MARGEN_MM
+        for _, columna, ancho in COLUMNAS_RESUMEN:
+            if columna is None:
+                valor, alineacion = str(primera_pagina_lote + inicio + desplazamiento), "R"
+            elif columna == "volumen_exportar_ton":
+                valor, alineacion = f"{fila[columna]:.2f}", "R"
+            else:
+                valor, alineacion = recortar_texto(str(fila[columna]), ancho - 2, "", 8), "L"
+            pagina.rectangulo(x, y, ancho, 6)
+            pagina.texto_en_caja(x, y, ancho, 6, valor, "", 8, COLOR_TEXTO_CUERPO, alineacion=alineacion)
+            x += ancho
+        y += 6
+
+    _pie(pagina, numero, "Índice navegable por proveedor disponible en los marcadores del documento")
+    return pagina
+
+def _seccion(pagina: PaginaPDF, y: float, titulo: str, ancho_etiqueta: float, filas: tuple[tuple[str, str], ...]) -> float:
+    pagina.rectangulo(MARGEN_MM, y, ANCHO_UTIL_MM, 7, relleno=(240, 240, 240))
+    pagina.texto_en_caja(MARGEN_MM, y, ANCHO_UTIL_MM, 7, titulo, "B", 10, COLOR_TEXTO_CUERPO)
+    y += 7
+    for etiqueta, valor in filas:
+        pagina.texto_en_caja(MARGEN_MM, y, ancho_etiqueta, 6, etiqueta, "", 10, COLOR_TEXTO_CUERPO)
+        pagina.texto_en_caja(MARGEN_MM + ancho_etiqueta, y, ANCHO_UTIL_MM - ancho_etiqueta, 6, valor, "", 10, COLOR_TEXTO_CUERPO)
+        y += 6
+    return y + 4
+
+def _pagina_lote(fila: dict[str, Any], numero: int) -> PaginaPDF:
+    """Misma información que el certificado individual, sobre los recursos compartidos del reporte."""
+    pagina = PaginaPDF()
+    _encabezado(pagina, "REPORTE DE AUDITORÍA DE RIESGO EUDR")
+    pagina.texto_en_caja(MARGEN_MM, 20, ANCHO_UTIL_MM, 10, "AUDITORÍA DE DEBIDA DILIGENCIA (REGLAMENTO UE 2023/1115)", "B", 14, COLOR_TEXTO_CUERPO, alineacion="C")
+
+    ingresado = float(fila["volumen_ingresado_ton"])
+    exportar = float(fila["volumen_exportar_ton"])
+    coeficiente = float(fila["coeficiente_rendimiento"])
+    y = _seccion(pagina, 33, " 1. IDENTIFICACIÓN DEL ACTIVO Y PROVEEDOR", 50, (
+        ("Lote / Rodal:", str(fila["identificador"])),
+        ("CUIT / Guía Forestal:", str(fila["productor_id"])),
+        ("Materia Prima:", str(fila["producto_forestal"])),
+        ("Superficie Declarada:", f"{fila['hectareas']} ha"),
+    ))
+    y = _seccion(pagina, y, " 2. BALANCE DE MASAS Y RENDIMIENTO INDUSTRIAL", 60, (
+        ("Materia Prima Ingresada:", f"{ingresado:.2f} Toneladas"),
+        ("Coeficiente de Rendimiento:", f"{coeficiente*100:.1f}%"),
+        ("Máximo Exportable Permisible:", f"{ingresado*coeficiente:.2f} Toneladas"),
+        ("Volumen a Exportar Declarado:", f"{exportar:.2f} Toneladas"),
+    ))
+
+    if fila["dictamen"] == "Verde":
+        relleno, color, leyenda = (220, 252, 231), (22, 101, 52), "DICTAMEN: FAVORABLE / COMPLIANT"
+    else:
+        relleno, color, leyenda = (254, 226, 226), (153, 27, 27), "DICTAMEN: BLOQUEADO / RIESGO DETECTADO"
+    pagina.rectangulo(MARGEN_MM, y, ANCHO_UTIL_MM, 10, relleno=relleno)
+    pagina.texto_en_caja(MARGEN_MM, y, ANCHO_UTIL_MM, 10, leyenda, "B", 12, color, alineacion="C")
+    y += 15
+
+    for linea in envolver_texto(str(fila["observacion"]), ANCHO_UTIL_MM - 2, "", 9):
+        pagina.texto_en_caja(MARGEN_MM, y, ANCHO_UTIL_MM, 4, linea, "", 9)
+        y += 4
+
+    lote_data = {c: fila[c] for c in ("identificador", "productor_id", "producto_forestal", "hectareas")}
+    sello = sello_certificado(lote_data, fila["dictamen"], fila["observacion"], ingresado, exportar, coeficiente)
+    _pie(pagina, numero, f"Hash del certificado individual (SHA-256): {sello}")
+    return pagina
+
+def escribir_reporte_consolidado(df_eval: pd.DataFrame, salida: BinaryIO, titulo: str = "Reporte Consolidado de Auditoría EUDR") -> Iterator[int]:
+    """Escribe el reporte consolidado en `salida` página por página.
+
+    Primero la tabla resumen y luego una página por lote; fuentes y recursos se declaran una
+    sola vez para todo el documento. Es un generador que entrega el número de páginas escritas
+    tras cada página, para que el llamador pueda drenar `salida` sin acumular el PDF entero.
+    El índice de marcadores agrupa los lotes por proveedor.
+    """
+    paginas_resumen = _paginas_resumen(len(df_eval))
+    with EscritorPDF(salida, titulo=titulo, fecha_creacion=FECHA_CREACION_CANONICA) as escritor:
+        for n in range(paginas_resumen):
+            pagina_id = escritor.agregar_pagina(
+                _pagina_resumen(df_eval, n * FILAS_RESUMEN_POR_PAGINA, escritor.paginas + 1, paginas_resumen + 1)
+            )
+            if n == 0:
+                escritor.agregar_marcador("Resumen del batch", pagina_id)
+            yield escritor.paginas
+
+        columnas = list(df_eval.columns)
+        for valores in df_eval.itertuples(index=False, name=None):
+            fila = dict(zip(columnas, valores))
+            pagina_id = escritor.agregar_pagina(_pagina_lote(fila, escritor.paginas + 1))
+            escritor.agregar_marcador(
+                f"{fila['identificador']} ({fila['dictamen']})", pagina_id, grupo=f"Proveedor {fila['productor_id']}"
+            )
+            yield escritor.paginas
+    yield escritor.paginas
@@ -0,0 +1,306 @@
+"""Libro Mayor Acumulado de Balance de Masas por Proveedor, Producto y Mes."""
+from __future__ import annotations
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from litoral_trace.db.models import BalanceProveedorMensual, IngresoProveedor
+from litoral_trace.services.mass_balance import DEFAULT_COEFICIENTE, RENDIMIENTO_INDUSTRIAL
+
+TOLERANCIA_TON: float = 1e-9
+
+@dataclass(frozen=True)
+class SaldoProveedor:
+    productor_id: str
+    producto_forestal: str
+    periodo: date | None
+    coeficiente_rendimiento: float
+    ingresado_acumulado_ton: float
+    exportado_acumulado_ton: float
+
+    @property
+    def exportable_acumulado_ton(self) -> float:
+        return self.ingresado_acumulado_ton * self.coeficiente_rendimiento
+
+    @property
+    def disponible_ton(self) -> float:
+        return self.exportable_acumulado_ton - self.exportado_acumulado_ton
+
+@dataclass(frozen=True)
+class ValidacionLibroMayor:
+    es_valido: bool
+    saldo_previo: SaldoProveedor
+    disponible_ton: float
+    mensaje_observacion: str
+
+def inicio_de_mes(fecha: date | datetime) -> date:
+    """Normaliza una fecha al primer día de su mes (clave de período del libro mayor)."""
+    return date(fecha.year, fecha.month, 1)
+
+def _coeficiente(producto_forestal: str, coeficiente: float | None) -> float:
+    if coeficiente is not None:
+        return float(coeficiente)
+    return RENDIMIENTO_INDUSTRIAL.get(producto_forestal.strip(), DEFAULT_COEFICIENTE)
+
+def _clave(organization_id: int, productor_id: str, producto_forestal: str):
+    return (
+        (BalanceProveedorMensual.organization_id == organization_id)
+        & (BalanceProveedorMensual.productor_id == productor_id)
+        & (BalanceProveedorMensual.producto_forestal == producto_forestal)
+    )
+
+def _fila_al(
+    session: Session,
+    organization_id: int,
+    productor_id: str,
+    producto_forestal: str,
+    fecha: date,
+    bloquear: bool = False,
+) -> BalanceProveedorMensual | None:
+    """Último período <= fecha: un único seek sobre uq_balance_proveedor_periodo."""
+    consulta = (
+        select(BalanceProveedorMensual)
+        .where(_clave(organization_id, productor_id, producto_forestal), BalanceProveedorMensual.periodo <= fecha)
+        .order_by(BalanceProveedorMensual.periodo.desc())
+        .limit(1)
+    )
+    if bloquear:
+        consulta = consulta.with_for_update()
+    return session.execute(consulta).scalar_one_or_none()
+
+def saldo_disponible_al(
+    session: Session,
+    organization_id: int,
+    productor_id: str,
+    producto_forestal: str,
+    fecha: date | datetime,
+    coeficiente: float | None = None,
+) -> SaldoProveedor:
+    """Devuelve los acumulados del proveedor vigentes al mes de `fecha` sin recorrer el historial."""
+    productor_id, producto_forestal = productor_id.strip(), producto_forestal.strip()
+    fila = _fila_al(session, organization_id, productor_id, producto_forestal, inicio_de_mes(fecha))
+    return _saldo(productor_id, producto_forestal, fila, _coeficiente(producto_forestal, coeficiente))
+
+def _saldo(productor_id: str, producto_forestal: str, fila: BalanceProveedorMensual | None, coeficiente: float) -> SaldoProveedor:
+    if fila is None:
+        return SaldoProveedor(productor_id, producto_forestal, None, coeficiente, 0.0, 0.0)
+    return SaldoProveedor(
+        productor_id, producto_forestal, fila.periodo, coeficiente,
+        fila.ingresado_acumulado_ton, fila.exportado_acumulado_ton,
+    )
+
+def _minimo_disponible_posterior(
+    session: Session,
+    organization_id: int,
+    productor_id: str,
+    producto_forestal: str,
+    periodo: date,
+    coeficiente: float,
+) -> float | None:
+    """Menor saldo de los meses posteriores (solo relevante para embarques con fecha retroactiva)."""
+    return session.execute(
+        select(func.min(
+            BalanceProveedorMensual.ingresado_acumulado_ton * coeficiente - BalanceProveedorMensual.exportado_acumulado_ton
+        )).where(_clave(organization_id, productor_id, producto_forestal), BalanceProveedorMensual.periodo > periodo)
+    ).scalar()
+
+def validar_embarque(
+    session: Session,
+    organization_id: int,
+    productor_id: str,
+    producto_forestal: str,
+    fecha: date | datetime,
+    volumen_exportar: float,
+    coeficiente: float | None = None,
+    bloquear: bool = False,
+) -> ValidacionLibroMayor:
+    """Valida un embarque contra los ingresos ya asentados del proveedor y no contra el remito aislado.
+
+    El volumen ingresado que declara el embarque no se acredita aquí: cada ingreso entra al libro
+    mayor una sola vez, por su documento, con `registrar_ingreso`.
+
+    Args:
+        volumen_exportar: Producto derivado que el embarque pretende exportar.
+        bloquear: Toma un lock de fila (SELECT ... FOR UPDATE) para validar y registrar de forma atómica.
+    """
+    productor_id, producto_forestal = productor_id.strip(), producto_forestal.strip()
+    coef = _coeficiente(producto_forestal, coeficiente)
+    vol_out = max(float(volumen_exportar or 0.0), 0.0)
+    periodo = inicio_de_mes(fecha)
+
+    saldo = _saldo(productor_id, producto_forestal, _fila_al(session, organization_id, productor_id, producto_forestal, periodo, bloquear), coef)
+    disponible = saldo.disponible_ton
+
+    # Un embarque retroactivo no puede dejar en negativo a los meses ya registrados
+    if vol_out > 0:
+        minimo_posterior = _minimo_disponible_posterior(session, organization_id, productor_id, producto_forestal, periodo, coef)
+        if minimo_posterior is not None:
+            disponible = min(disponible, minimo_posterior)
+
+    es_valido = vol_out <= disponible + TOLERANCIA_TON
+    if es_valido:
+        mensaje = f"Saldo del proveedor suficiente: {vol_out:,.2f} t sobre {disponible:,.2f} t disponibles."
+    else:
+        mensaje = (
+            f"Saldo acumulado del proveedor {productor_id} insuficiente: se declaran {vol_out:,.2f} t "
+            f"y solo quedan {max(disponible, 0.0):,.2f} t disponibles de {producto_forestal}."
+        )
+    return ValidacionLibroMayor(es_valido, saldo, disponible, mensaje)
+
+def _asentar(
+    session: Session,
+    organization_id: int,
+    productor_id: str,
+    producto_forestal: str,
+    periodo: date,
+    coeficiente: float,
+    vol_in: float,
+    vol_out: float,
+) -> None:
+    """Suma el movimiento al mes (creándolo desde los acumulados previos) y desplaza los meses posteriores."""
+    fila = _fila_al(session, organization_id, productor_id, producto_forestal, periodo, bloquear=True)
+    if fila is None or fila.periodo != periodo:
+        fila = BalanceProveedorMensual(
+            organization_id=organization_id,
+            productor_id=productor_id,
+            producto_forestal=producto_forestal,
+            periodo=periodo,
+            coeficiente_rendimiento=coeficiente,
+            ingresado_mes_ton=0.0,
+            exportado_mes_ton=0.0,
+            ingresado_acumulado_ton=fila.ingresado_acumulado_ton if fila is not None else 0.0,
+            exportado_acumulado_ton=fila.exportado_acumulado_ton if fila is not None else 0.0,
+        )
+        session.add(fila)
+
+    fila.coeficiente_rendimiento = coeficiente
+    fila.ingresado_mes_ton += vol_in
+    fila.exportado_mes_ton += vol_out
+    fila.ingresado_acumulado_ton += vol_in
+    fila.exportado_acumulado_ton += vol_out
+    session.flush()
+
+    session.execute(
+        update(BalanceProveedorMensual)
+        .where(_clave(organization_id, productor_id, producto_forestal), BalanceProveedorMensual.periodo > periodo)
+        .values(
+            ingresado_acumulado_ton=BalanceProveedorMensual.ingresado_acumulado_ton + vol_in,
+            exportado_acumulado_ton=BalanceProveedorMensual.exportado_acumulado_ton + vol_out,
+        )
+        .execution_options(synchronize_session="fetch")
+    )
+
+def registrar_ingreso(
+    session: Session,
+    organization_id: int,
+    productor_id: str,
+    producto_forestal: str,
+    fecha: date | datetime,
+    documento: str,
+    volumen_ingresado: float,
+    coeficiente: float | None = None,
+) -> bool:
+    """Acredita un ingreso de materia prima identificado por su guía o remito.
+
+    Devuelve False sin modificar el libro mayor si el documento ya fue acreditado en la organización,
+    de modo que declarar el mismo ingreso en varios embarques no habilita saldo adicional.
+    La transacción queda a cargo del llamador.
+    """
+    documento = (documento or "").strip()
+    if not documento:
+        raise ValueError("El ingreso requiere el número de guía o remito que lo respalda.")
+    productor_id, producto_forestal = productor_id.strip(), producto_forestal.strip()
+    vol_in = max(float(volumen_ingresado or 0.0), 0.0)
+    periodo = inicio_de_mes(fecha)
+
+    existente = session.execute(
+        select(IngresoProveedor.id).where(
+            IngresoProveedor.organization_id == organization_id, IngresoProveedor.documento == documento
+        )
+    ).first()
+    if existente is not None:
+        return False
+    try:
+        # uq_ingreso_proveedor_documento resuelve la carrera entre dos transacciones con la misma guía
+        with session.begin_nested():
+            session.add(IngresoProveedor(
+                organization_id=organization_id,
+                documento=documento,
+                productor_id=productor_id,
+                producto_forestal=producto_forestal,
+                periodo=periodo,
+                volumen_ton=vol_in,
+            ))
+    except IntegrityError:
+        return False
+
+    _asentar(session, organization_id, productor_id, producto_forestal, periodo, _coeficiente(producto_forestal, coeficiente), vol_in, 0.0)
+    return True
+
+def registrar_embarque(
+    session: Session,
+    organization_id: int,
+    productor_id: str,
+    producto_forestal: str,
+    fecha: date | datetime,
+    volumen_exportar: float,
+    coeficiente: float | None = None,
+    validar: bool = True,
+) -> ValidacionLibroMayor:
+    """Valida el embarque contra los ingresos asentados y, si corresponde, descuenta la exportación.
+
+    Un embarque rechazado no modifica el libro mayor. La transacción queda a cargo del llamador.
+    """
+    productor_id, producto_forestal = productor_id.strip(), producto_forestal.strip()
+    coef = _coeficiente(producto_forestal, coeficiente)
+    vol_out = max(float(volumen_exportar or 0.0), 0.0)
+    periodo = inicio_de_mes(fecha)
+
+    validacion = validar_embarque(
+        session, organization_id, productor_id, producto_forestal, periodo, vol_out, coeficiente=coef, bloquear=True,
+    )
+    if validar and not validacion.es_valido:
+        return validacion
+
+    _asentar(session, organization_id, productor_id, producto_forestal, periodo, coef, 0.0, vol_out)
+    return validacion
+
+class HistorialSaldos:
+    """Historial de un proveedor indexado por intervalos [periodo, periodo siguiente) para consultas masivas."""
+
+    def __init__(self, filas: Iterable[BalanceProveedorMensual], coeficiente: float):
+        filas = sorted(filas, key=lambda f: f.periodo)
+        self.coeficiente = coeficiente
+        self._ingresado = np.array([f.ingresado_acumulado_ton for f in filas], dtype=float)
+        self._exportado = np.array([f.exportado_acumulado_ton for f in filas], dtype=float)
+        cortes = [pd.Timestamp(f.periodo) for f in filas] + [pd.Timestamp.max]
+        self._intervalos = pd.IntervalIndex.from_breaks(cortes, closed="left") if filas else None
+
+    def disponible_al(self, fechas: Iterable[date | datetime]) -> np.ndarray:
+        """Saldo disponible (t) para cada fecha; 0 antes del primer movimiento."""
+        fechas = pd.DatetimeIndex(pd.to_datetime(list(fechas))).as_unit("ns")
+        if self._intervalos is None:
+            return np.zeros(len(fechas))
+        posiciones = self._intervalos.get_indexer(fechas)
+        disponible = self._ingresado * self.coeficiente - self._exportado
+        return np.where(posiciones >= 0, disponible[np.maximum(posiciones, 0)], 0.0)
+
+def cargar_historial(
+    session: Session,
+    organization_id: int,
+    productor_id: str,
+    producto_forestal: str,
+    coeficiente: float | None = None,
+) -> HistorialSaldos:
+    """Carga el historial mensual de un proveedor para responder muchas consultas "saldo al día X"."""
+    productor_id, producto_forestal = productor_id.strip(), producto_forestal.strip()
+    filas = session.execute(
+        select(BalanceProveedorMensual).where(_clave(organization_id, productor_id, producto_forestal))
+    ).scalars().all()
+    return HistorialSaldos(filas, _coeficiente(producto_forestal, coeficiente))
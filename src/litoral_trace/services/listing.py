@@ -0,0 +1,165 @@
+"""Listado de lotes del tenant paginado por cursor (keyset sobre organization_id, id)."""
+from __future__ import annotations
+import base64
+import json
+from dataclasses import dataclass
+from typing import Any, Iterable
+
+from sqlalchemy import Select, func, select
+from sqlalchemy.engine import Connection, Engine
+
+from litoral_trace.db.models import Lote
+
+DEFAULT_LIMITE_PAGINA = 50
+MAX_LIMITE_PAGINA = 500
+# Hasta este tamaño el total es exacto; por encima se usa la estimación del planificador de PostgreSQL
+DEFAULT_UMBRAL_CONTEO_EXACTO = 10_000
+
+# Campos seleccionables con ?campos=; el id siempre viaja porque es la clave del cursor
+CAMPOS_LOTE = {
+    "id": Lote.id,
+    "organization_id": Lote.organization_id,
+    "identificador": Lote.identificador,
+    "productor_id": Lote.productor_id,
+    "guia_ingreso": Lote.guia_ingreso,
+    "producto_forestal": Lote.producto_forestal,
+    "hectareas": Lote.hectareas,
+    "latitud": Lote.latitud,
+    "longitud": Lote.longitud,
+    "polygon_wkt": Lote.polygon_wkt,
+    "estatus": Lote.estatus,
+    "regla_aplicada": Lote.regla_aplicada,
+    "volumen_ingresado_ton": Lote.volumen_ingresado_ton,
+    "volumen_exportar_ton": Lote.volumen_exportar_ton,
+}
+CAMPOS_POR_DEFECTO = (
+    "id", "organization_id", "identificador", "productor_id", "producto_forestal",
+    "hectareas", "latitud", "longitud", "estatus",
+)
+
+@dataclass(frozen=True)
+class FiltrosLote:
+    """Igualdades opcionales; cada una tiene índice propio en lotes."""
+    estatus: str | None = None
+    producto_forestal: str | None = None
+    productor_id: str | None = None
+
+    def condiciones(self) -> list[Any]:
+        columnas = ((Lote.estatus, self.estatus), (Lote.producto_forestal, self.producto_forestal), (Lote.productor_id, self.productor_id))
+        return [columna == valor for columna, valor in columnas if valor is not None]
+
+@dataclass(frozen=True)
+class PaginaLotes:
+    lotes: list[dict[str, Any]]
+    siguiente_cursor: str | None
+    total: int | None  # None: no se contó (páginas siguientes a la primera, salvo pedido explícito)
+    total_estimado: bool
+
+def codificar_cursor(ultimo_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"id": ultimo_id}).encode()).decode().rstrip("=")
+
+def decodificar_cursor(cursor: str) -> int:
+    """Último id de la página anterior.
+
+    Raises:
+        ValueError: Si el cursor no fue emitido por este listado.
+    """
+    try:
+        datos = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        ultimo_id = datos["id"]
+    except (ValueError, TypeError, KeyError) as exc:
+        raise ValueError("Cursor de paginación inválido.") from exc
+    if not isinstance(ultimo_id, int) or isinstance(ultimo_id, bool):
+        raise ValueError("Cursor de paginación inválido.")
+    return ultimo_id
+
+def normalizar_campos(campos: Iterable[str] | None) -> tuple[str, ...]:
+    """Valida la selección de campos y antepone id; None devuelve los campos por defecto.
+
+    Raises:
+        ValueError: Si se pide un campo que no existe.
+    """
+    if campos is None:
+        return CAMPOS_POR_DEFECTO
+    pedidos = [c.strip() for c in campos if c.strip()]
+    desconocidos = sorted(set(pedidos) - CAMPOS_LOTE.keys())
+    if desconocidos:
+        raise ValueError(f"Campos desconocidos: {', '.join(desconocidos)}. Disponibles: {', '.join(CAMPOS_LOTE)}.")
+    return tuple(dict.fromkeys(["id", *pedidos]))
+
+def _consulta_pagina(
+    organization_id: int,
+    filtros: FiltrosLote,
+    campos: tuple[str, ...],
+    despues_de_id: int | None,
+    limite: int,
+) -> Select[Any]:
+    query = select(*(CAMPOS_LOTE[c] for c in campos)).where(Lote.organization_id == organization_id, *filtros.condiciones())
+    if despues_de_id is not None:
+        query = query.where(Lote.id > despues_de_id)
+    # Una fila de más indica si hay página siguiente sin contar nada
+    return query.order_by(Lote.id).limit(limite + 1)
+
+def _consulta_filtrada(organization_id: int, filtros: FiltrosLote) -> Select[Any]:
+    return select(Lote.id).where(Lote.organization_id == organization_id, *filtros.condiciones())
+
+def _estimacion_planificador(conn: Connection, query: Select[Any]) -> int:
+    compilada = query.compile(dialect=conn.dialect)
+    plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compilada}", compilada.params).scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+def _total(conn: Connection, organization_id: int, filtros: FiltrosLote, umbral: int) -> tuple[int, bool]:
+    """Conteo exacto acotado a `umbral` filas; si lo alcanza, estimación del planificador (PostgreSQL)."""
+    filtrada = _consulta_filtrada(organization_id, filtros)
+    acotado = conn.execute(select(func.count()).select_from(filtrada.limit(umbral + 1).subquery())).scalar_one()
+    if acotado <= umbral:
+        return acotado, False
+    if conn.dialect.name == "postgresql":
+        return max(_estimacion_planificador(conn, filtrada), acotado), True
+    return conn.execute(select(func.count()).select_from(filtrada.subquery())).scalar_one(), False
+
+def _pagina(
+    conn: Connection,
+    organization_id: int,
+    filtros: FiltrosLote,
+    campos: tuple[str, ...],
+    despues_de_id: int | None,
+    limite: int,
+    umbral_conteo: int,
+    contar: bool,
+) -> PaginaLotes:
+    filas = [dict(fila._mapping) for fila in conn.execute(_consulta_pagina(organization_id, filtros, campos, despues_de_id, limite))]
+    siguiente = codificar_cursor(filas[limite - 1]["id"]) if len(filas) > limite else None
+    total, estimado = _total(conn, organization_id, filtros, umbral_conteo) if contar else (None, False)
+    return PaginaLotes(lotes=filas[:limite], siguiente_cursor=siguiente, total=total, total_estimado=estimado)
+
+def listar_lotes(
+    bind: Engine | Connection,
+    organization_id: int,
+    filtros: FiltrosLote = FiltrosLote(),
+    campos: Iterable[str] | None = None,
+    cursor: str | None = None,
+    limite: int = DEFAULT_LIMITE_PAGINA,
+    umbral_conteo: int = DEFAULT_UMBRAL_CONTEO_EXACTO,
+    contar: bool | None = None,
+) -> PaginaLotes:
+    """Una página de lotes del tenant en orden de id, con filtros y selección de campos.
+
+    Cada página es un range scan desde el último id visto, así que su costo no depende de la
+    profundidad. El total (exacto hasta `umbral_conteo`, estimado por encima) se calcula solo
+    en la primera página o con `contar=True`: el cliente lo conserva mientras recorre el cursor.
+
+    Raises:
+        ValueError: Si el cursor, los campos o el límite son inválidos.
+    """
+    if not 1 <= limite <= MAX_LIMITE_PAGINA:
+        raise ValueError(f"El límite de página debe estar entre 1 y {MAX_LIMITE_PAGINA}.")
+    columnas = normalizar_campos(campos)
+    despues_de_id = decodificar_cursor(cursor) if cursor else None
+    contar = despues_de_id is None if contar is None else contar
+    if isinstance(bind, Engine):
+        with bind.connect() as conn:
+            return _pagina(conn, organization_id, filtros, columnas, despues_de_id, limite, umbral_conteo, contar)
+    return _pagina(bind, organization_id, filtros, columnas, despues_de_id, limite, umbral_conteo, contar)
@@ -1,6 +1,9 @@
 """Motor de Matemática de Balance de Masas (Input-Output) para Compliance EUDR."""
 from __future__ import annotations
 from dataclasses import dataclass
+from typing import Iterable, Mapping
+import numpy as np
+import pandas as pd
 
 # Coeficientes de Rendimiento Industrial por Producto Forestal
 RENDIMIENTO_INDUSTRIAL: dict[str, float] = {
@@ -45,12 +48,6 @@ def evaluar_balance_masas(
     vol_max = vol_in * coeficiente
     
     es_valido = vol_out <= vol_max
-    
-    if es_valido:
-        obs = f"Balance de Masas Conforme: {vol_out:.2f} ton exportables dentro del límite legal ({vol_max:.2f} ton con rendimiento del {coeficiente*100:.0f}%)."
-    else:
-        exceso = vol_out - vol_max
-        obs = f"Alerta de Sobredeclaración: El volumen a exportar ({vol_out:.2f} ton) supera en {exceso:.2f} ton el máximo físico permitido ({vol_max:.2f} ton)."
         
     return MassBalanceResult(
         tipo_cultivo=tipo_cultivo,
@@ -59,5 +56,45 @@ def evaluar_balance_masas(
         volumen_exportar_ton=vol_out,
         volumen_maximo_permitido_ton=vol_max,
         es_valido=es_valido,
-        mensaje_observacion=obs
+        mensaje_observacion=mensaje_balance_masas(vol_in, vol_out, coeficiente)
     )
+
+def mensaje_balance_masas(vol_in: float, vol_out: float, coeficiente: float) -> str:
+    """Redacta la observación legal del balance de masas para un lote ya normalizado."""
+    vol_max = vol_in * coeficiente
+    if vol_out <= vol_max:
+        return f"Balance de Masas Conforme: {vol_out:.2f} ton exportables dentro del límite legal ({vol_max:.2f} ton con rendimiento del {coeficiente*100:.0f}%)."
+    exceso = vol_out - vol_max
+    return f"Alerta de Sobredeclaración: El volumen a exportar ({vol_out:.2f} ton) supera en {exceso:.2f} ton el máximo físico permitido ({vol_max:.2f} ton)."
+
+def evaluar_balance_masas_vectorizado(
+    volumenes_ingresados: Iterable[float],
+    volumenes_exportar: Iterable[float],
+    tipos_cultivo: Iterable[str],
+    coeficientes: Mapping[str, float] | None = None,
+) -> dict[str, np.ndarray]:
+    """Aplica el balance de masas columna a columna sobre un lote completo de embarques.
+
+    Args:
+        volumenes_ingresados: Toneladas de materia prima por lote.
+        volumenes_exportar: Toneladas declaradas a exportar por lote.
+        tipos_cultivo: Especie / producto forestal por lote.
+        coeficientes: Tabla de rendimientos a aplicar (por defecto RENDIMIENTO_INDUSTRIAL).
+
+    Returns:
+        dict[str, np.ndarray]: Columnas coeficiente_rendimiento, volumen_ingresado_ton,
+        volumen_exportar_ton, volumen_maximo_permitido_ton y balance_valido.
+    """
+    tabla = RENDIMIENTO_INDUSTRIAL if coeficientes is None else coeficientes
+    vol_in = np.clip(np.nan_to_num(np.asarray(volumenes_ingresados, dtype=float), nan=0.0), 0.0, None)
+    vol_out = np.clip(np.nan_to_num(np.asarray(volumenes_exportar, dtype=float), nan=0.0), 0.0, None)
+    tipos = pd.Series(tipos_cultivo, dtype=object).astype(str).str.strip()
+    coef = tipos.map(dict(tabla)).fillna(DEFAULT_COEFICIENTE).to_numpy(dtype=float)
+    vol_max = vol_in * coef
+    return {
+        "coeficiente_rendimiento": coef,
+        "volumen_ingresado_ton": vol_in,
+        "volumen_exportar_ton": vol_out,
+        "volumen_maximo_permitido_ton": vol_max,
+        "balance_valido": vol_out <= vol_max,
+    }
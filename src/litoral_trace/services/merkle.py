@@ -0,0 +1,190 @@
+"""Manifiesto Merkle (RFC 6962) para Sellar Paquetes de Auditoría con una Única Firma."""
+from __future__ import annotations
+import hashlib
+import hmac
+import json
+import os
+from typing import Any
+
+from litoral_trace.auth.tokens import DEFAULT_SECRET_KEY
+
+MANIFIESTO_SECRET_ENV = "LITORAL_MANIFIESTO_SECRET"
+NOMBRE_MANIFIESTO = "MANIFIESTO_MERKLE.json"
+ALGORITMO_MANIFIESTO = "RFC6962-SHA256"
+
+def hash_hoja(datos: bytes) -> bytes:
+    return hashlib.sha256(b"\x00" + datos).digest()
+
+def hash_nodo(izquierdo: bytes, derecho: bytes) -> bytes:
+    return hashlib.sha256(b"\x01" + izquierdo + derecho).digest()
+
+def hoja_documento(ruta: str, contenido: bytes) -> bytes:
+    """Hash de hoja de un archivo del paquete: liga la ruta dentro del ZIP con su contenido."""
+    return hash_hoja(ruta.encode("utf-8") + b"\x00" + contenido)
+
+def _particion(n: int) -> int:
+    """Mayor potencia de 2 estrictamente menor que n (punto de corte del árbol RFC 6962)."""
+    return 1 << ((n - 1).bit_length() - 1)
+
+class ArbolMerkle:
+    """Árbol Merkle incremental: cada hoja cuesta O(log n) y la raíz está disponible en todo momento."""
+
+    def __init__(self):
+        self.hojas: list[bytes] = []
+        self._pila: list[tuple[int, bytes]] = []  # subárboles completos (tamaño, hash), de izquierda a derecha
+
+    @classmethod
+    def desde_hojas(cls, hojas: list[bytes]) -> ArbolMerkle:
+        arbol = cls()
+        for hoja in hojas:
+            arbol.agregar_hoja(hoja)
+        return arbol
+
+    def __len__(self) -> int:
+        return len(self.hojas)
+
+    def agregar_hoja(self, hoja: bytes) -> int:
+        """Agrega un hash de hoja ya calculado y devuelve su índice."""
+        self.hojas.append(hoja)
+        tamano, actual = 1, hoja
+        while self._pila and self._pila[-1][0] == tamano:
+            _, izquierdo = self._pila.pop()
+            actual = hash_nodo(izquierdo, actual)
+            tamano *= 2
+        self._pila.append((tamano, actual))
+        return len(self.hojas) - 1
+
+    def agregar(self, ruta: str, contenido: bytes) -> int:
+        return self.agregar_hoja(hoja_documento(ruta, contenido))
+
+    def raiz(self) -> bytes:
+        if not self._pila:
+            return hashlib.sha256(b"").digest()
+        actual = self._pila[-1][1]
+        for _, izquierdo in reversed(self._pila[:-1]):
+            actual = hash_nodo(izquierdo, actual)
+        return actual
+
+    def prueba_inclusion(self, indice: int) -> list[bytes]:
+        """Camino de auditoría de la hoja `indice`: log2(n) hashes hermanos, de la hoja a la raíz."""
+        if not 0 <= indice < len(self.hojas):
+            raise IndexError(indice)
+        return _camino(indice, self.hojas)
+
+    def pruebas_inclusion(self) -> list[list[bytes]]:
+        """Caminos de auditoría de todas las hojas en O(n log n), en vez de O(n) por hoja."""
+        return _caminos(self.hojas)[1] if self.hojas else []
+
+def _raiz_de(hojas: list[bytes]) -> bytes:
+    if len(hojas) == 1:
+        return hojas[0]
+    k = _particion(len(hojas))
+    return hash_nodo(_raiz_de(hojas[:k]), _raiz_de(hojas[k:]))
+
+def _camino(indice: int, hojas: list[bytes]) -> list[bytes]:
+    if len(hojas) == 1:
+        return []
+    k = _particion(len(hojas))
+    if indice < k:
+        return _camino(indice, hojas[:k]) + [_raiz_de(hojas[k:])]
+    return _camino(indice - k, hojas[k:]) + [_raiz_de(hojas[:k])]
+
+def _caminos(hojas: list[bytes]) -> tuple[bytes, list[list[bytes]]]:
+    """Raíz y camino de cada hoja de un subárbol, hashando cada nodo una sola vez."""
+    if len(hojas) == 1:
+        return hojas[0], [[]]
+    k = _particion(len(hojas))
+    raiz_izquierda, caminos_izquierda = _caminos(hojas[:k])
+    raiz_derecha, caminos_derecha = _caminos(hojas[k:])
+    caminos = [camino + [raiz_derecha] for camino in caminos_izquierda] + [camino + [raiz_izquierda] for camino in caminos_derecha]
+    return hash_nodo(raiz_izquierda, raiz_derecha), caminos
+
+def verificar_inclusion(hoja: bytes, indice: int, total: int, prueba: list[bytes], raiz: bytes) -> bool:
+    """Verifica un camino de auditoría RFC 6962 (algoritmo de RFC 9162, sección 2.1.3.2)."""
+    if not 0 <= indice < total:
+        return False
+    fn, sn, actual = indice, total - 1, hoja
+    for hermano in prueba:
+        if sn == 0:
+            return False
+        if fn & 1 or fn == sn:
+            actual = hash_nodo(hermano, actual)
+            while not fn & 1 and fn != 0:
+                fn >>= 1
+                sn >>= 1
+        else:
+            actual = hash_nodo(actual, hermano)
+        fn >>= 1
+        sn >>= 1
+    return sn == 0 and hmac.compare_digest(actual, raiz)
+
+def clave_manifiesto() -> bytes:
+    """Clave HMAC de firma de manifiestos y checkpoints; obligatoria y distinta de la clave de los JWT.
+
+    Raises:
+        RuntimeError: Si LITORAL_MANIFIESTO_SECRET no está definida o reutiliza la clave de sesión.
+    """
+    clave = os.environ.get(MANIFIESTO_SECRET_ENV, "").strip()
+    if not clave:
+        raise RuntimeError(f"Defina {MANIFIESTO_SECRET_ENV}: los manifiestos no se firman con una clave por defecto.")
+    if hmac.compare_digest(clave, DEFAULT_SECRET_KEY):
+        raise RuntimeError(f"{MANIFIESTO_SECRET_ENV} no puede reutilizar la clave de firma de los JWT.")
+    return clave.encode("utf-8")
+
+def _mensaje_firma(paquete_id: str, total: int, raiz_hex: str) -> bytes:
+    return f"{ALGORITMO_MANIFIESTO}|{paquete_id}|{total}|{raiz_hex}".encode("utf-8")
+
+def firmar_raiz(paquete_id: str, total: int, raiz: bytes, clave: bytes | None = None) -> str:
+    return hmac.new(clave or clave_manifiesto(), _mensaje_firma(paquete_id, total, raiz.hex()), hashlib.sha256).hexdigest()
+
+def construir_manifiesto(paquete_id: str, arbol: ArbolMerkle, rutas: list[str], clave: bytes | None = None) -> dict[str, Any]:
+    """Manifiesto del paquete: raíz con una única firma HMAC-SHA256 y, por hoja, su camino de auditoría.
+
+    Con la entrada de un documento (índice y prueba) alcanza para verificarlo en O(log n) sin
+    reconstruir el árbol.
+
+    Raises:
+        ValueError: Si dos archivos comparten ruta (la entrada de uno taparía a la del otro).
+    """
+    if len(set(rutas)) != len(rutas):
+        raise ValueError("El paquete contiene rutas repetidas; cada archivo del manifiesto debe tener una ruta única.")
+    raiz = arbol.raiz()
+    return {
+        "algoritmo": ALGORITMO_MANIFIESTO,
+        "paquete_id": paquete_id,
+        "total_hojas": len(arbol),
+        "raiz": raiz.hex(),
+        "firma_hmac_sha256": firmar_raiz(paquete_id, len(arbol), raiz, clave),
+        "hojas": [
+            {"ruta": ruta, "indice": indice, "hash": hoja.hex(), "prueba": [hermano.hex() for hermano in prueba]}
+            for indice, (ruta, hoja, prueba) in enumerate(zip(rutas, arbol.hojas, arbol.pruebas_inclusion()))
+        ],
+    }
+
+def serializar_manifiesto(manifiesto: dict[str, Any]) -> bytes:
+    return json.dumps(manifiesto, ensure_ascii=False, indent=1).encode("utf-8")
+
+def verificar_manifiesto(manifiesto: dict[str, Any], clave: bytes | None = None) -> bool:
+    """Comprueba la firma de la raíz y que las hojas declaradas reconstruyan esa raíz."""
+    firma = firmar_raiz(manifiesto["paquete_id"], manifiesto["total_hojas"], bytes.fromhex(manifiesto["raiz"]), clave)
+    if not hmac.compare_digest(firma, manifiesto["firma_hmac_sha256"]):
+        return False
+    arbol = ArbolMerkle.desde_hojas([bytes.fromhex(hoja["hash"]) for hoja in manifiesto["hojas"]])
+    return len(arbol) == manifiesto["total_hojas"] and arbol.raiz().hex() == manifiesto["raiz"]
+
+def verificar_documento(ruta: str, contenido: bytes, indice: int, prueba: list[bytes], manifiesto: dict[str, Any], clave: bytes | None = None) -> bool:
+    """Verifica un único archivo del paquete con su camino de auditoría y la raíz firmada."""
+    raiz = bytes.fromhex(manifiesto["raiz"])
+    firma = firmar_raiz(manifiesto["paquete_id"], manifiesto["total_hojas"], raiz, clave)
+    if not hmac.compare_digest(firma, manifiesto["firma_hmac_sha256"]):
+        return False
+    return verificar_inclusion(hoja_documento(ruta, contenido), indice, manifiesto["total_hojas"], prueba, raiz)
+
+def verificar_entrada(ruta: str, contenido: bytes, manifiesto: dict[str, Any], clave: bytes | None = None) -> bool:
+    """Verifica un archivo con la prueba de inclusión que el manifiesto publica para su ruta."""
+    entradas = [hoja for hoja in manifiesto["hojas"] if hoja["ruta"] == ruta]
+    if len(entradas) != 1:
+        return False  # Ruta ausente o ambigua
+    entrada = entradas[0]
+    prueba = [bytes.fromhex(hermano) for hermano in entrada["prueba"]]
+    return verificar_documento(ruta, contenido, entrada["indice"], prueba, manifiesto, clave)
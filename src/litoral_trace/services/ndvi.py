@@ -2,6 +2,8 @@
 from __future__ import annotations
 import math
 from datetime import datetime, date
+from typing import Iterable
+import numpy as np
 
 EUDR_CUTOFF_DATE = "2020-12-31"
 
@@ -55,3 +57,38 @@ def evaluar_deforestacion_eudr(puntos_ndvi: list[dict[str, str | float]], umbral
         obs = f"Cumplimiento EUDR Verificado: Variación de biomasa del {variacion_pct:+.1f}% respecto a la línea base de diciembre 2020."
         
     return dictamen, obs, round(base_2020, 3), round(actual, 3)
+
+def evaluar_deforestacion_lotes(
+    latitudes: Iterable[float],
+    longitudes: Iterable[float],
+) -> dict[str, np.ndarray]:
+    """Evalúa la telemetría NDVI de un conjunto de lotes consultando una sola vez cada coordenada.
+
+    Returns:
+        dict[str, np.ndarray]: Columnas sat_dictamen, sat_observacion, ndvi_base_2020 y ndvi_actual.
+    """
+    coords = np.column_stack([
+        np.asarray(latitudes, dtype=float),
+        np.asarray(longitudes, dtype=float),
+    ])
+    if len(coords) == 0:
+        vacio = np.empty(0, dtype=object)
+        return {"sat_dictamen": vacio, "sat_observacion": vacio.copy(), "ndvi_base_2020": np.zeros(0), "ndvi_actual": np.zeros(0)}
+
+    unicas, inverso = np.unique(coords, axis=0, return_inverse=True)
+    inverso = inverso.reshape(-1)
+    dictamenes = np.empty(len(unicas), dtype=object)
+    observaciones = np.empty(len(unicas), dtype=object)
+    bases = np.zeros(len(unicas), dtype=float)
+    actuales = np.zeros(len(unicas), dtype=float)
+    for i, (lat, lon) in enumerate(unicas):
+        dictamenes[i], observaciones[i], bases[i], actuales[i] = evaluar_deforestacion_eudr(
+            calcular_ndvi_simulado(float(lat), float(lon))
+        )
+
+    return {
+        "sat_dictamen": dictamenes[inverso],
+        "sat_observacion": observaciones[inverso],
+        "ndvi_base_2020": bases[inverso],
+        "ndvi_actual": actuales[inverso],
+    }
@@ -0,0 +1,171 @@
+"""Pool de Procesos Dedicado al Renderizado de Certificados PDF."""
+from __future__ import annotations
+import asyncio
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Iterable, Iterator
+
+from litoral_trace.services.certificate_cache import cache_certificados
+from litoral_trace.services.reports import (
+    MOTOR_NATIVO, generar_pdf_reporte_bytes, plantilla_certificado, plantilla_nativa, sello_certificado
+)
+
+PDF_WORKERS_ENV = "LITORAL_PDF_WORKERS"
+PDF_EN_VUELO_ENV = "LITORAL_PDF_EN_VUELO"
+PDF_START_METHOD_ENV = "LITORAL_PDF_START_METHOD"
+# Procesos uvicorn del servidor, en el mismo orden de precedencia que db.session
+SERVIDOR_WORKERS_ENVS = ("LITORAL_DB_WORKERS", "WEB_CONCURRENCY")
+DEFAULT_SERVIDOR_WORKERS: int = 4          # uvicorn --workers del Dockerfile
+
+@dataclass(frozen=True)
+class TrabajoCertificado:
+    """Argumentos serializables de generar_pdf_reporte_bytes para enviar a un worker."""
+    lote_data: dict[str, Any]
+    dictamen: str
+    observacion: str
+    volumen_ingresado: float
+    volumen_exportar: float
+    coeficiente_rendimiento: float
+    # Ambos motores producen los mismos bytes; el nativo evita instanciar fpdf por certificado
+    motor: str = MOTOR_NATIVO
+
+    @property
+    def sello(self) -> str:
+        return sello_certificado(
+            self.lote_data, self.dictamen, self.observacion, self.volumen_ingresado, self.volumen_exportar, self.coeficiente_rendimiento
+        )
+
+def renderizar_trabajo(trabajo: TrabajoCertificado) -> bytes:
+    return generar_pdf_reporte_bytes(
+        trabajo.lote_data,
+        trabajo.dictamen,
+        trabajo.observacion,
+        trabajo.volumen_ingresado,
+        trabajo.volumen_exportar,
+        trabajo.coeficiente_rendimiento,
+        motor=trabajo.motor,
+    )
+
+def _inicializar_worker() -> None:
+    """Construye clase, fuentes y plantillas al arrancar el proceso, no en el primer certificado."""
+    for favorable in (True, False):
+        plantilla_certificado(favorable)
+        plantilla_nativa(favorable)
+
+def workers_servidor() -> int:
+    for nombre in SERVIDOR_WORKERS_ENVS:
+        valor = os.environ.get(nombre, "").strip()
+        if valor:
+            return max(int(valor), 1)
+    return DEFAULT_SERVIDOR_WORKERS
+
+def workers_pdf() -> int:
+    """Procesos de renderizado por proceso servidor (0 = renderizar en el hilo llamador).
+
+    Cada worker uvicorn crea su propio pool: por defecto los núcleos (menos uno) se reparten entre ellos.
+    """
+    valor = os.environ.get(PDF_WORKERS_ENV)
+    return max(int(valor), 0) if valor else max(((os.cpu_count() or 1) - 1) // workers_servidor(), 1)
+
+def max_en_vuelo() -> int:
+    """Trabajos enviados y no consumidos como máximo: acota memoria y cola del pool."""
+    valor = os.environ.get(PDF_EN_VUELO_ENV)
+    return max(int(valor), 1) if valor else max(workers_pdf(), 1) * 4
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+def obtener_pool() -> ProcessPoolExecutor | None:
+    """Devuelve el pool compartido del proceso, creándolo en el primer uso (None si está deshabilitado)."""
+    global _pool
+    workers = workers_pdf()
+    if workers == 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            contexto = multiprocessing.get_context(os.environ.get(PDF_START_METHOD_ENV) or "spawn")
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=contexto, initializer=_inicializar_worker)
+        return _pool
+
+def cerrar_pool(esperar: bool = True) -> None:
+    """Libera los procesos del pool (apagado del servidor o cambio de configuración)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=esperar, cancel_futures=not esperar)
+
+def _futuro_resuelto(contenido: bytes) -> Future[bytes]:
+    futuro: Future[bytes] = Future()
+    futuro.set_result(contenido)
+    return futuro
+
+def _guardar_en_cache(sello: str, contenido: bytes) -> bytes:
+    # El texto plano de contingencia (fpdf no disponible) no se cachea
+    if contenido.startswith(b"%PDF"):
+        cache_certificados().guardar(sello, contenido)
+    return contenido
+
+def renderizar_en_orden(
+    trabajos: Iterable[TrabajoCertificado],
+    pool: Executor | None = None,
+    en_vuelo: int | None = None,
+) -> Iterator[bytes]:
+    """Renderiza en paralelo y entrega los PDF en el mismo orden en que llegan los trabajos.
+
+    Nunca hay más de `en_vuelo` trabajos pendientes: el productor se detiene hasta que el
+    consumidor retira el PDF más antiguo. Los certificados ya presentes en la caché por
+    contenido se devuelven sin volver a renderizarse.
+    """
+    cache = cache_certificados()
+    pool = pool if pool is not None else obtener_pool()
+    if pool is None:
+        for trabajo in trabajos:
+            sello = trabajo.sello
+            cacheado = cache.obtener(sello)
+            yield cacheado if cacheado is not None else _guardar_en_cache(sello, renderizar_trabajo(trabajo))
+        return
+
+    limite = en_vuelo or max_en_vuelo()
+    pendientes: deque[tuple[str, Future[bytes]]] = deque()
+    try:
+        for trabajo in trabajos:
+            sello = trabajo.sello
+            cacheado = cache.obtener(sello)
+            futuro = _futuro_resuelto(cacheado) if cacheado is not None else pool.submit(renderizar_trabajo, trabajo)
+            pendientes.append((sello, futuro))
+            if len(pendientes) >= limite:
+                sello, futuro = pendientes.popleft()
+                yield _guardar_en_cache(sello, futuro.result())
+        while pendientes:
+            sello, futuro = pendientes.popleft()
+            yield _guardar_en_cache(sello, futuro.result())
+    finally:
+        for _, futuro in pendientes:
+            futuro.cancel()
+
+def renderizar_certificado(trabajo: TrabajoCertificado) -> bytes:
+    """Renderiza un único certificado en el pool (uso interactivo, ej. auditoría manual)."""
+    sello = trabajo.sello
+    cacheado = cache_certificados().obtener(sello)
+    if cacheado is not None:
+        return cacheado
+    pool = obtener_pool()
+    if pool is None:
+        return _guardar_en_cache(sello, renderizar_trabajo(trabajo))
+    return _guardar_en_cache(sello, pool.submit(renderizar_trabajo, trabajo).result())
+
+async def renderizar_certificado_async(trabajo: TrabajoCertificado) -> bytes:
+    """Versión asíncrona para la API: espera el PDF sin ocupar el event loop."""
+    sello = trabajo.sello
+    cacheado = cache_certificados().obtener(sello)
+    if cacheado is not None:
+        return cacheado
+    pool = obtener_pool()
+    if pool is None:
+        return _guardar_en_cache(sello, await asyncio.to_thread(renderizar_trabajo, trabajo))
+    return _guardar_en_cache(sello, await asyncio.wrap_future(pool.submit(renderizar_trabajo, trabajo)))
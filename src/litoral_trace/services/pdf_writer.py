@@ -0,0 +1,238 @@
+"""Escritor PDF Incremental con Recursos Compartidos (fuentes, diccionario de recursos, índice)."""
+from __future__ import annotations
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import BinaryIO
+
+# A4 en milímetros y factor de conversión a puntos PDF
+ANCHO_PAGINA_MM: float = 210.0
+ALTO_PAGINA_MM: float = 297.0
+PT_POR_MM: float = 72 / 25.4
+
+# Fuentes estándar (no se embeben): se declaran una sola vez y todas las páginas las comparten
+FUENTES_ESTANDAR: dict[str, tuple[str, str, str]] = {
+    "": ("F1", "Helvetica", "helvetica"),
+    "B": ("F2", "Helvetica-Bold", "helveticaB"),
+    "I": ("F3", "Helvetica-Oblique", "helveticaI"),
+}
+
+Color = tuple[int, int, int]
+
+@lru_cache(maxsize=None)
+def _anchos_fuente(estilo: str) -> dict[str, int]:
+    """Anchos de glifo (milésimas de em) de la fuente estándar, tomados de las métricas de fpdf2."""
+    from fpdf.fonts import CORE_FONTS_CHARWIDTHS
+    return CORE_FONTS_CHARWIDTHS[FUENTES_ESTANDAR[estilo][2]]
+
+def ancho_texto(texto: str, estilo: str = "", tamano: float = 10) -> float:
+    """Ancho en mm de una línea de texto con la fuente estándar indicada."""
+    anchos = _anchos_fuente(estilo)
+    return sum(anchos.get(c, 500) for c in texto) * tamano / 1000 / PT_POR_MM
+
+def envolver_texto(texto: str, ancho_mm: float, estilo: str = "", tamano: float = 10) -> list[str]:
+    """Corta el texto en líneas que entran en `ancho_mm` (corte por palabras, greedy)."""
+    lineas: list[str] = []
+    for parrafo in texto.splitlines() or [""]:
+        actual = ""
+        for palabra in parrafo.split(" "):
+            candidata = f"{actual} {palabra}" if actual else palabra
+            if actual and ancho_texto(candidata, estilo, tamano) > ancho_mm:
+                lineas.append(actual)
+                actual = palabra
+            else:
+                actual = candidata
+        lineas.append(actual)
+    return lineas
+
+def _texto_pdf(texto: str) -> bytes:
+    codificado = texto.encode("cp1252", errors="replace")
+    return b"(" + codificado.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+def _color(color: Color) -> str:
+    return " ".join(f"{c / 255:.3f}" for c in color)
+
+class PaginaPDF:
+    """Contenido de una página en construcción; coordenadas en mm con origen arriba a la izquierda."""
+
+    def __init__(self):
+        self._operaciones: list[bytes] = []
+
+    def texto(self, x: float, y: float, texto: str, estilo: str = "", tamano: float = 10, color: Color = (0, 0, 0)) -> None:
+        """Escribe una línea con la línea base en (x, y)."""
+        fuente = FUENTES_ESTANDAR[estilo][0]
+        self._operaciones.append(
+            f"BT /{fuente} {tamano:.2f} Tf {_color(color)} rg {x * PT_POR_MM:.2f} {(ALTO_PAGINA_MM - y) * PT_POR_MM:.2f} Td ".encode("ascii")
+            + _texto_pdf(texto) + b" Tj ET"
+        )
+
+    def texto_en_caja(
+        self, x: float, y: float, ancho: float, alto: float, texto: str,
+        estilo: str = "", tamano: float = 10, color: Color = (0, 0, 0), alineacion: str = "L", margen: float = 1.0,
+    ) -> None:
+        """Texto centrado verticalmente en una caja, alineado a izquierda (L), centro (C) o derecha (R)."""
+        if alineacion == "C":
+            x_texto = x + (ancho - ancho_texto(texto, estilo, tamano)) / 2
+        elif alineacion == "R":
+            x_texto = x + ancho - margen - ancho_texto(texto, estilo, tamano)
+        else:
+            x_texto = x + margen
+        self.texto(x_texto, y + alto / 2 + 0.3 * tamano / PT_POR_MM, texto, estilo, tamano, color)
+
+    def linea(self, x1: float, y1: float, x2: float, y2: float, color: Color = (0, 0, 0), grosor: float = 0.2) -> None:
+        self._operaciones.append(
+            f"{grosor * PT_POR_MM:.2f} w {_color(color)} RG {x1 * PT_POR_MM:.2f} {(ALTO_PAGINA_MM - y1) * PT_POR_MM:.2f} m "
+            f"{x2 * PT_POR_MM:.2f} {(ALTO_PAGINA_MM - y2) * PT_POR_MM:.2f} l S".encode("ascii")
+        )
+
+    def rectangulo(self, x: float, y: float, ancho: float, alto: float, relleno: Color | None = None, borde: bool = True) -> None:
+        operador = "B" if relleno is not None and borde else "f" if relleno is not None else "S"
+        relleno_op = f"{_color(relleno)} rg " if relleno is not None else ""
+        self._operaciones.append(
+            f"0.20 w 0 0 0 RG {relleno_op}{x * PT_POR_MM:.2f} {(ALTO_PAGINA_MM - y - alto) * PT_POR_MM:.2f} "
+            f"{ancho * PT_POR_MM:.2f} {alto * PT_POR_MM:.2f} re {operador}".encode("ascii")
+        )
+
+    def contenido(self) -> bytes:
+        return b"\n".join(self._operaciones)
+
+@dataclass
+class _Marcador:
+    titulo: str
+    pagina_id: int
+    hijos: list[_Marcador] = field(default_factory=list)
+
+class EscritorPDF:
+    """Escribe un PDF objeto por objeto sobre un stream binario.
+
+    Cada página se serializa y se libera al terminarla: en memoria solo quedan los offsets
+    de la tabla xref, los ids de página y el índice de marcadores. Fuentes y diccionario de
+    recursos se escriben una única vez y todas las páginas los referencian.
+    """
+
+    def __init__(self, salida: BinaryIO, titulo: str | None = None, fecha_creacion: datetime | None = None, comprimir: bool = True):
+        self._salida = salida
+        self._posicion = 0
+        self._offsets: dict[int, int] = {}
+        self._siguiente_id = 1
+        self._paginas: list[int] = []
+        self._marcadores: list[_Marcador] = []
+        self._grupos: dict[str, _Marcador] = {}
+        self._comprimir = comprimir
+        self._titulo = titulo
+        self._fecha = fecha_creacion or datetime.now(timezone.utc)
+        self._cerrado = False
+
+        self._escribir(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._catalogo_id = self._reservar_id()
+        self._paginas_id = self._reservar_id()
+        fuentes = []
+        for fuente, nombre_base, _ in FUENTES_ESTANDAR.values():
+            fuente_id = self._reservar_id()
+            self._escribir_objeto(fuente_id, f"<< /Type /Font /Subtype /Type1 /BaseFont /{nombre_base} /Encoding /WinAnsiEncoding >>".encode("ascii"))
+            fuentes.append(f"/{fuente} {fuente_id} 0 R")
+        self._recursos_id = self._reservar_id()
+        self._escribir_objeto(self._recursos_id, f"<< /ProcSet [/PDF /Text] /Font << {' '.join(fuentes)} >> >>".encode("ascii"))
+
+    @property
+    def paginas(self) -> int:
+        return len(self._paginas)
+
+    def _reservar_id(self) -> int:
+        objeto_id = self._siguiente_id
+        self._siguiente_id += 1
+        return objeto_id
+
+    def _escribir(self, datos: bytes) -> None:
+        self._salida.write(datos)
+        self._posicion += len(datos)
+
+    def _escribir_objeto(self, objeto_id: int, cuerpo: bytes) -> None:
+        self._offsets[objeto_id] = self._posicion
+        self._escribir(f"{objeto_id} 0 obj\n".encode("ascii") + cuerpo + b"\nendobj\n")
+
+    def agregar_pagina(self, pagina: PaginaPDF) -> int:
+        """Serializa la página (flujo de contenido + objeto Page) y devuelve su id de objeto."""
+        datos = pagina.contenido()
+        filtro = ""
+        if self._comprimir:
+            datos = zlib.compress(datos)
+            filtro = " /Filter /FlateDecode"
+        contenido_id = self._reservar_id()
+        self._escribir_objeto(contenido_id, f"<< /Length {len(datos)}{filtro} >>\nstream\n".encode("ascii") + datos + b"\nendstream")
+        pagina_id = self._reservar_id()
+        self._escribir_objeto(pagina_id, (
+            f"<< /Type /Page /Parent {self._paginas_id} 0 R /MediaBox [0 0 {ANCHO_PAGINA_MM * PT_POR_MM:.2f} {ALTO_PAGINA_MM * PT_POR_MM:.2f}] "
+            f"/Resources {self._recursos_id} 0 R /Contents {contenido_id} 0 R >>"
+        ).encode("ascii"))
+        self._paginas.append(pagina_id)
+        return pagina_id
+
+    def agregar_marcador(self, titulo: str, pagina_id: int, grupo: str | None = None) -> None:
+        """Agrega una entrada al índice; con `grupo` queda anidada bajo ese marcador de primer nivel."""
+        if grupo is None:
+            self._marcadores.append(_Marcador(titulo, pagina_id))
+            return
+        padre = self._grupos.get(grupo)
+        if padre is None:
+            padre = self._grupos[grupo] = _Marcador(grupo, pagina_id)
+            self._marcadores.append(padre)
+        padre.hijos.append(_Marcador(titulo, pagina_id))
+
+    def _escribir_marcadores(self, marcadores: list[_Marcador], padre_id: int) -> tuple[int, int]:
+        ids = [self._reservar_id() for _ in marcadores]
+        for i, (marcador, marcador_id) in enumerate(zip(marcadores, ids)):
+            partes = [
+                f"/Title {_texto_pdf(marcador.titulo).decode('latin-1')}",
+                f"/Parent {padre_id} 0 R",
+                f"/Dest [{marcador.pagina_id} 0 R /XYZ null null null]",
+            ]
+            if i > 0:
+                partes.append(f"/Prev {ids[i - 1]} 0 R")
+            if i < len(ids) - 1:
+                partes.append(f"/Next {ids[i + 1]} 0 R")
+            if marcador.hijos:
+                primero, ultimo = self._escribir_marcadores(marcador.hijos, marcador_id)
+                partes.append(f"/First {primero} 0 R /Last {ultimo} 0 R /Count -{len(marcador.hijos)}")
+            self._escribir_objeto(marcador_id, f"<< {' '.join(partes)} >>".encode("latin-1"))
+        return ids[0], ids[-1]
+
+    def cerrar(self) -> None:
+        """Escribe árbol de páginas, índice, metadatos, xref y trailer."""
+        if self._cerrado:
+            return
+        self._cerrado = True
+        kids = " ".join(f"{p} 0 R" for p in self._paginas)
+        self._escribir_objeto(self._paginas_id, f"<< /Type /Pages /Kids [{kids}] /Count {len(self._paginas)} >>".encode("ascii"))
+
+        catalogo = f"<< /Type /Catalog /Pages {self._paginas_id} 0 R"
+        if self._marcadores:
+            raiz_id = self._reservar_id()
+            primero, ultimo = self._escribir_marcadores(self._marcadores, raiz_id)
+            self._escribir_objeto(raiz_id, f"<< /Type /Outlines /First {primero} 0 R /Last {ultimo} 0 R /Count {len(self._marcadores)} >>".encode("ascii"))
+            catalogo += f" /Outlines {raiz_id} 0 R /PageMode /UseOutlines"
+        self._escribir_objeto(self._catalogo_id, (catalogo + " >>").encode("ascii"))
+
+        info_id = self._reservar_id()
+        info = f"/Producer (Litoral Trace Engine v2.4) /CreationDate (D:{self._fecha.strftime('%Y%m%d%H%M%S')}Z)"
+        if self._titulo:
+            info += f" /Title {_texto_pdf(self._titulo).decode('latin-1')}"
+        self._escribir_objeto(info_id, f"<< {info} >>".encode("latin-1"))
+
+        inicio_xref = self._posicion
+        total = self._siguiente_id
+        filas = [b"xref\n", f"0 {total}\n".encode("ascii"), b"0000000000 65535 f \n"]
+        filas += [f"{self._offsets[i]:010d} 00000 n \n".encode("ascii") for i in range(1, total)]
+        self._escribir(b"".join(filas))
+        self._escribir((
+            f"trailer\n<< /Size {total} /Root {self._catalogo_id} 0 R /Info {info_id} 0 R >>\n"
+            f"startxref\n{inicio_xref}\n%%EOF\n"
+        ).encode("ascii"))
+
+    def __enter__(self) -> EscritorPDF:
+        return self
+
+    def __exit__(self, tipo, valor, traza) -> None:
+        if tipo is None:
+            self.cerrar()
@@ -0,0 +1,213 @@
+"""Persistencia Masiva de Dictámenes de Compliance sobre la tabla de Lotes."""
+from __future__ import annotations
+from contextlib import nullcontext
+from datetime import date, datetime, timezone
+from typing import Any, Iterator, Mapping
+
+import pandas as pd
+import shapely
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from litoral_trace.db.models import Lote
+from litoral_trace.services.ledger import registrar_embarque, registrar_ingreso
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# Columnas del DataFrame evaluado que se vuelcan sobre Lote
+COLUMNAS_PERSISTIDAS = (
+    "identificador",
+    "productor_id",
+    "guia_ingreso",
+    "producto_forestal",
+    "hectareas",
+    "latitud",
+    "longitud",
+    "polygon_wkt",
+    "volumen_ingresado_ton",
+    "volumen_exportar_ton",
+    "estatus",
+    "regla_aplicada",
+)
+
+REGLA_SALDO_PROVEEDOR = "SALDO_PROVEEDOR_INSUFICIENTE"
+
+_INSERTS_POR_DIALECTO = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+def registros_desde_evaluacion(df_eval: pd.DataFrame, organization_id: int) -> list[dict[str, Any]]:
+    """Convierte el DataFrame de evaluar_reglas_df en filas listas para el upsert de Lote."""
+    df = df_eval.rename(columns={"dictamen": "estatus"})
+    if "polygon_wkt" not in df:
+        df = df.assign(polygon_wkt=None)
+    if "hectareas" not in df:
+        df = df.assign(hectareas=0.0)
+    if "guia_ingreso" not in df:
+        df = df.assign(guia_ingreso=None)
+    df = df[list(COLUMNAS_PERSISTIDAS)].astype(object).where(df[list(COLUMNAS_PERSISTIDAS)].notna(), None)
+    registros = df.to_dict("records")
+    for registro in registros:
+        registro["organization_id"] = organization_id
+    return registros
+
+def registro_desde_compliance(
+    lote_data: Mapping[str, Any],
+    resultado: Mapping[str, Any],
+    organization_id: int,
+) -> dict[str, Any]:
+    """Arma la fila de Lote a partir del resultado de evaluar_compliance_lote."""
+    mb = resultado["balance_masas"]
+    return {
+        "organization_id": organization_id,
+        "identificador": lote_data.get("identificador", "Lote sin nombre"),
+        "productor_id": lote_data.get("productor_id", "N/A"),
+        "guia_ingreso": lote_data.get("guia_ingreso"),
+        "producto_forestal": lote_data.get("producto_forestal", mb.tipo_cultivo),
+        "hectareas": float(lote_data.get("hectareas", 0.0) or 0.0),
+        "latitud": float(lote_data.get("latitud", 0.0)),
+        "longitud": float(lote_data.get("longitud", 0.0)),
+        "polygon_wkt": lote_data.get("polygon_wkt"),
+        "volumen_ingresado_ton": mb.volumen_ingresado_ton,
+        "volumen_exportar_ton": mb.volumen_exportar_ton,
+        "estatus": resultado["dictamen"],
+        "regla_aplicada": resultado.get("regla_aplicada"),
+    }
+
+def _trozos(registros: list[dict[str, Any]], chunk_size: int) -> Iterator[list[dict[str, Any]]]:
+    for inicio in range(0, len(registros), chunk_size):
+        yield registros[inicio:inicio + chunk_size]
+
+def _sin_duplicados(trozo: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Una fila por (organization_id, identificador), la última de la planilla: ON CONFLICT no admite
+    afectar dos veces la misma fila en una sentencia."""
+    return list({(registro["organization_id"], registro["identificador"]): registro for registro in trozo}.values())
+
+def _con_geometria(trozo: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Deriva geom de polygon_wkt; un WKT ilegible o que no es polígono deja el lote sin geometría."""
+    geometrias = shapely.from_wkt([registro.get("polygon_wkt") for registro in trozo], on_invalid="ignore")
+    tipos = shapely.get_type_id(geometrias)
+    return [
+        {**registro, "geom": registro.get("polygon_wkt") if tipo == shapely.GeometryType.POLYGON else None}
+        for registro, tipo in zip(trozo, tipos)
+    ]
+
+def _sentencia_upsert(dialecto: str, trozo: list[dict[str, Any]]):
+    """INSERT multi-fila ... ON CONFLICT (organization_id, identificador) DO UPDATE."""
+    if dialecto not in _INSERTS_POR_DIALECTO:
+        raise ValueError(f"Dialecto SQL no soportado para upsert masivo de lotes: '{dialecto}'")
+    stmt = _INSERTS_POR_DIALECTO[dialecto](Lote.__table__).values(_con_geometria(trozo))
+    actualizables = [c for c in COLUMNAS_PERSISTIDAS if c != "identificador"] + ["geom"]
+    return stmt.on_conflict_do_update(
+        index_elements=["organization_id", "identificador"],
+        set_={**{c: stmt.excluded[c] for c in actualizables}, "updated_at": func.now()},
+    )
+
+def persistir_dictamenes(
+    bind: Engine | Connection,
+    registros: list[dict[str, Any]],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> int:
+    """Upsert masivo de lotes evaluados, una sentencia multi-fila por trozo.
+
+    Args:
+        bind: Engine (una transacción independiente por trozo) o Connection
+              (los trozos se ejecutan dentro de la transacción del llamador).
+        registros: Filas de registros_desde_evaluacion / registro_desde_compliance.
+        chunk_size: Filas por sentencia INSERT.
+
+    Returns:
+        Cantidad de filas enviadas (sin los identificadores repetidos dentro de un trozo).
+    """
+    if not registros:
+        return 0
+    dialecto = bind.dialect.name
+    enviadas = 0
+    for trozo in _trozos(registros, chunk_size):
+        trozo = _sin_duplicados(trozo)
+        enviadas += len(trozo)
+        stmt = _sentencia_upsert(dialecto, trozo)
+        if isinstance(bind, Engine):
+            with bind.begin() as conn:
+                conn.execute(stmt)
+        else:
+            bind.execute(stmt)
+    return enviadas
+
+def _estatus_previos(conn: Connection, organization_id: int, identificadores: list[str]) -> dict[str, str]:
+    consulta = select(Lote.identificador, Lote.estatus).where(
+        Lote.organization_id == organization_id, Lote.identificador.in_(identificadores),
+    )
+    return dict(conn.execute(consulta).all())
+
+def asentar_embarques(
+    conn: Connection,
+    registros: list[dict[str, Any]],
+    fecha: date | datetime | None = None,
+) -> tuple[list[dict[str, Any]], dict[str, str]]:
+    """Registra en el libro mayor los lotes aptos que todavía no estaban asentados.
+
+    El ingreso declarado se acredita una única vez por guía de ingreso; la exportación se valida
+    contra los ingresos ya asentados del proveedor. Un lote que ya figuraba como Verde no vuelve a
+    sumarse (reprocesar la planilla no duplica el saldo). Si el saldo no alcanza, el lote pasa a Rojo.
+
+    Returns:
+        Registros con el estatus ajustado y la observación de cada lote rechazado por saldo.
+    """
+    fecha = fecha or datetime.now(timezone.utc)
+    ajustados, rechazos = [], {}
+    por_tenant: dict[int, list[str]] = {}
+    for registro in registros:
+        por_tenant.setdefault(registro["organization_id"], []).append(registro["identificador"])
+    previos = {
+        (organization_id, identificador): estatus
+        for organization_id, identificadores in por_tenant.items()
+        for identificador, estatus in _estatus_previos(conn, organization_id, identificadores).items()
+    }
+    with Session(bind=conn) as session:
+        for registro in registros:
+            clave = (registro["organization_id"], registro["identificador"])
+            if registro["estatus"] == "Verde" and previos.get(clave) != "Verde":
+                guia = (registro.get("guia_ingreso") or "").strip()
+                acreditado = bool(guia) and (registro["volumen_ingresado_ton"] or 0.0) > 0 and registrar_ingreso(
+                    session, registro["organization_id"], registro["productor_id"], registro["producto_forestal"],
+                    fecha, guia, registro["volumen_ingresado_ton"],
+                )
+                validacion = registrar_embarque(
+                    session, registro["organization_id"], registro["productor_id"], registro["producto_forestal"],
+                    fecha, registro["volumen_exportar_ton"],
+                )
+                if not validacion.es_valido:
+                    registro = {**registro, "estatus": "Rojo", "regla_aplicada": REGLA_SALDO_PROVEEDOR}
+                    if not guia:
+                        motivo = " El lote no informa guía de ingreso, por lo que no acredita materia prima."
+                    elif not acreditado and (registro["volumen_ingresado_ton"] or 0.0) > 0:
+                        motivo = f" La guía de ingreso {guia} ya estaba acreditada en el libro mayor."
+                    else:
+                        motivo = ""
+                    rechazos[registro["identificador"]] = validacion.mensaje_observacion + motivo
+            ajustados.append(registro)
+        session.flush()
+    return ajustados, rechazos
+
+def persistir_con_libro_mayor(
+    bind: Engine | Connection,
+    registros: list[dict[str, Any]],
+    fecha: date | datetime | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> dict[str, str]:
+    """Asienta los embarques y hace el upsert de los dictámenes en una única transacción.
+
+    Returns:
+        Observación por identificador de los lotes que el libro mayor pasó a Rojo.
+    """
+    registros = _sin_duplicados(registros)
+    if not registros:
+        return {}
+    with bind.begin() if isinstance(bind, Engine) else nullcontext(bind) as conn:
+        registros, rechazos = asentar_embarques(conn, registros, fecha)
+        persistir_dictamenes(conn, registros, chunk_size)
+    return rechazos
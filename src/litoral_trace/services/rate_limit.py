@@ -0,0 +1,248 @@
+"""Limitación de Tasa por Tenant y API Key con Token Buckets en Memoria Compartida entre Workers."""
+from __future__ import annotations
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+try:
+    import fcntl
+except ImportError:  # Windows: las cubetas quedan locales a cada proceso
+    fcntl = None
+
+from sqlalchemy import or_, select
+from sqlalchemy.engine import Engine
+
+from litoral_trace.db.models import License
+
+RATE_LIMIT_ARCHIVO_ENV = "LITORAL_RATE_LIMIT_ARCHIVO"
+RATE_LIMIT_CUBETAS_ENV = "LITORAL_RATE_LIMIT_CUBETAS"
+PLANES_REFRESCO_ENV = "LITORAL_PLANES_REFRESCO"
+DEFAULT_RATE_LIMIT_CUBETAS: int = 8192
+DEFAULT_PLANES_REFRESCO: float = 60.0
+PLAN_POR_DEFECTO = "pro"
+
+@dataclass(frozen=True)
+class LimiteTasa:
+    tasa: float    # tokens repuestos por segundo (requests sostenidas)
+    rafaga: int    # capacidad de la cubeta
+
+@dataclass(frozen=True)
+class LimitePlan:
+    organizacion: LimiteTasa
+    api_key: LimiteTasa
+
+# Cada API Key tiene su propia cubeta, menor que la de su organización: una integración
+# desbocada no agota la cuota del resto de los usuarios del tenant
+LIMITES_POR_PLAN: dict[str, LimitePlan] = {
+    "demo": LimitePlan(LimiteTasa(2.0, 20), LimiteTasa(1.0, 10)),
+    "pro": LimitePlan(LimiteTasa(10.0, 100), LimiteTasa(5.0, 50)),
+    "enterprise": LimitePlan(LimiteTasa(50.0, 500), LimiteTasa(25.0, 250)),
+    "custom": LimitePlan(LimiteTasa(50.0, 500), LimiteTasa(25.0, 250)),
+}
+
+# Espacios de claves de las cubetas (bits altos de la clave de 64 bits)
+ESPACIO_ORGANIZACION = 1 << 62
+ESPACIO_API_KEY = 2 << 62
+
+@dataclass(frozen=True)
+class DecisionTasa:
+    permitido: bool
+    limite: int           # capacidad de la cubeta más restrictiva
+    restantes: int
+    reinicio: int         # segundos hasta que esa cubeta vuelva a estar llena
+    reintentar: int = 0   # segundos hasta que haya un token (solo si no se permitió)
+
+class TablaCubetas:
+    """Tabla hash de token buckets sobre un archivo mapeado en memoria (por defecto en /dev/shm).
+
+    Todos los workers del host mapean el mismo archivo, de modo que el límite es por tenant y no
+    por proceso. Cada ranura guarda (clave, tokens, último instante) y se resuelve con sondeo
+    lineal acotado; si las ranuras sondeadas están ocupadas se reutiliza la de uso más antiguo
+    (una cubeta inactiva ya estaría llena, así que reiniciarla no regala cuota). Las decisiones se
+    serializan con un flock sobre el archivo más un lock de hilos del proceso.
+    """
+
+    MAGICO = b"LTRL"
+    VERSION = 1
+    _CABECERA = struct.Struct("<4sII")
+    _RANURA = struct.Struct("<Qdd")
+    SONDEOS = 8
+
+    def __init__(self, ruta: str | os.PathLike | None = None, cubetas: int = DEFAULT_RATE_LIMIT_CUBETAS):
+        self.cubetas = max(int(cubetas), self.SONDEOS)
+        tamano = self._CABECERA.size + self.cubetas * self._RANURA.size
+        self._lock = threading.Lock()
+        self._fd: int | None = None
+        if fcntl is None or ruta is None:
+            self.ruta = None
+            self._mapa: mmap.mmap | bytearray = bytearray(tamano)
+            self._CABECERA.pack_into(self._mapa, 0, self.MAGICO, self.VERSION, self.cubetas)
+            return
+        self.ruta = Path(ruta)
+        self._fd = os.open(self.ruta, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            cabecera = os.pread(self._fd, self._CABECERA.size, 0)
+            if len(cabecera) < self._CABECERA.size or self._CABECERA.unpack(cabecera) != (self.MAGICO, self.VERSION, self.cubetas):
+                # Archivo nuevo o de otra configuración: se reinicializa (todas las cubetas llenas)
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, tamano)
+                os.pwrite(self._fd, self._CABECERA.pack(self.MAGICO, self.VERSION, self.cubetas), 0)
+            self._mapa = mmap.mmap(self._fd, tamano)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _ranura(self, clave: int) -> int:
+        """Desplazamiento de la ranura de la clave (o la que se le asigna) dentro de la ventana de sondeo."""
+        mapa, unpack_from, base, tamano = self._mapa, self._RANURA.unpack_from, self._CABECERA.size, self._RANURA.size
+        inicio = ((clave * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) % self.cubetas
+        if unpack_from(mapa, base + inicio * tamano)[0] == clave:
+            return base + inicio * tamano  # caso habitual: la clave está en su ranura de origen
+        libre, antigua, instante_antiguo = -1, inicio, math.inf
+        for i in range(self.SONDEOS):
+            indice = (inicio + i) % self.cubetas
+            ocupante, _, ultimo = unpack_from(mapa, base + indice * tamano)
+            if ocupante == clave:
+                return base + indice * tamano
+            if ocupante == 0:
+                if libre < 0:
+                    libre = indice
+            elif ultimo < instante_antiguo:
+                antigua, instante_antiguo = indice, ultimo
+        return base + (libre if libre >= 0 else antigua) * tamano
+
+    def consumir(self, cubetas: list[tuple[int, LimiteTasa]], costo: float = 1.0) -> DecisionTasa:
+        """Descuenta `costo` de todas las cubetas o de ninguna, y devuelve la de menor margen."""
+        ranura_st = self._RANURA
+        with self._lock:
+            if self._fd is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                # CLOCK_MONOTONIC es común a todos los procesos del host
+                ahora = time.monotonic()
+                estados = []
+                for clave, limite in cubetas:
+                    desplazamiento = self._ranura(clave)
+                    ocupante, tokens, ultimo = ranura_st.unpack_from(self._mapa, desplazamiento)
+                    if ocupante != clave or ultimo > ahora:
+                        tokens = float(limite.rafaga)  # cubeta nueva o reinicio del host
+                    else:
+                        tokens = min(float(limite.rafaga), tokens + (ahora - ultimo) * limite.tasa)
+                    estados.append((desplazamiento, clave, limite, tokens))
+                permitido = all(tokens >= costo for *_, tokens in estados)
+                for desplazamiento, clave, limite, tokens in estados:
+                    ranura_st.pack_into(self._mapa, desplazamiento, clave, tokens - costo if permitido else tokens, ahora)
+            finally:
+                if self._fd is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+        _, _, limite, tokens = min(estados, key=lambda e: e[3] / e[2].rafaga)
+        if permitido:
+            tokens -= costo
+        return DecisionTasa(
+            permitido=permitido,
+            limite=limite.rafaga,
+            restantes=max(int(tokens), 0),
+            reinicio=math.ceil((limite.rafaga - tokens) / limite.tasa),
+            reintentar=0 if permitido else max(math.ceil(max(
+                (costo - t) / l.tasa for *_, l, t in estados
+            )), 1),
+        )
+
+    def cerrar(self) -> None:
+        if self._fd is not None:
+            self._mapa.close()
+            os.close(self._fd)
+            self._fd = None
+
+def ruta_por_defecto() -> Path:
+    """/dev/shm (tmpfs) cuando existe: el estado vive en RAM y se descarta al reiniciar el host."""
+    directorio = Path("/dev/shm")
+    return (directorio if directorio.is_dir() else Path(tempfile.gettempdir())) / "litoral_trace_rate_limit"
+
+@lru_cache(maxsize=1)
+def tabla_cubetas() -> TablaCubetas:
+    """Tabla compartida del host (LITORAL_RATE_LIMIT_ARCHIVO, LITORAL_RATE_LIMIT_CUBETAS)."""
+    return TablaCubetas(
+        os.environ.get(RATE_LIMIT_ARCHIVO_ENV) or ruta_por_defecto(),
+        int(os.environ.get(RATE_LIMIT_CUBETAS_ENV) or DEFAULT_RATE_LIMIT_CUBETAS),
+    )
+
+class PlanesLicencia:
+    """Mapa organización → plan de su licencia activa, recargado en segundo plano cada `refresco` segundos."""
+
+    def __init__(self, bind: Engine, refresco: float | None = None):
+        self._bind = bind
+        self.refresco = refresco if refresco is not None else float(os.environ.get(PLANES_REFRESCO_ENV) or DEFAULT_PLANES_REFRESCO)
+        self._planes: dict[int, str] = {}
+        self.recargar()
+        self._cerrado = threading.Event()
+        self._hilo = threading.Thread(target=self._bucle, name="planes-licencia", daemon=True)
+        self._hilo.start()
+
+    def recargar(self) -> None:
+        ahora = datetime.now(timezone.utc)
+        with self._bind.connect() as conn:
+            filas = conn.execute(
+                select(License.organization_id, License.plan_type)
+                .where(License.is_active.is_(True), or_(License.valid_until.is_(None), License.valid_until > ahora))
+                .order_by(License.id)
+            ).all()
+        # Con varias licencias vigentes prevalece la más reciente
+        self._planes = {org: plan for org, plan in filas}
+
+    def plan(self, organization_id: int) -> str:
+        return self._planes.get(organization_id, PLAN_POR_DEFECTO)
+
+    def _bucle(self) -> None:
+        while not self._cerrado.wait(self.refresco):
+            try:
+                self.recargar()
+            except Exception:
+                pass  # Se mantiene el último mapa conocido
+
+    def cerrar(self) -> None:
+        self._cerrado.set()
+        self._hilo.join()
+
+_planes: PlanesLicencia | None = None
+_planes_lock = threading.Lock()
+
+def iniciar_planes_licencia(bind: Engine, **opciones: Any) -> PlanesLicencia:
+    """Carga los planes de licencia del proceso (reemplaza y cierra un mapa anterior, si existía)."""
+    global _planes
+    with _planes_lock:
+        previo, _planes = _planes, PlanesLicencia(bind, **opciones)
+    if previo is not None:
+        previo.cerrar()
+    return _planes
+
+def cerrar_planes_licencia() -> None:
+    global _planes
+    with _planes_lock:
+        planes, _planes = _planes, None
+    if planes is not None:
+        planes.cerrar()
+
+def limite_plan(organization_id: int) -> LimitePlan:
+    """Límites del plan de la organización; sin planes cargados rige el plan por defecto."""
+    planes = _planes
+    plan = planes.plan(organization_id) if planes is not None else PLAN_POR_DEFECTO
+    return LIMITES_POR_PLAN.get(plan, LIMITES_POR_PLAN[PLAN_POR_DEFECTO])
+
+def consumir_cuota(organization_id: int, api_key_id: int | None = None, costo: float = 1.0) -> DecisionTasa:
+    """Decide una request del tenant (y de su API Key, si la trae) contra la tabla compartida."""
+    limites = limite_plan(organization_id)
+    cubetas = [(ESPACIO_ORGANIZACION | organization_id, limites.organizacion)]
+    if api_key_id is not None:
+        cubetas.append((ESPACIO_API_KEY | api_key_id, limites.api_key))
+    return tabla_cubetas().consumir(cubetas, costo)
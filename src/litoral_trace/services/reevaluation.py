@@ -0,0 +1,249 @@
+"""Reevaluación Dirigida de Lotes ante Cambios en Coeficientes de Rendimiento Industrial."""
+from __future__ import annotations
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Iterable, Mapping
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from litoral_trace.db.models import CoeficienteRendimiento, Lote
+from litoral_trace.services.audit_chain import registrar_eventos
+from litoral_trace.services.mass_balance import RENDIMIENTO_INDUSTRIAL, evaluar_balance_masas_vectorizado
+from litoral_trace.services.rules_engine import obtener_reglas
+
+REGLA_BALANCE_MASAS = "BALANCE_MASAS_EXCEDIDO"
+REGLA_REEVALUACION_PENDIENTE = "REEVALUACION_SATELITAL_PENDIENTE"
+
+COEFICIENTES_REFRESCO_ENV = "LITORAL_COEFICIENTES_REFRESCO_S"
+DEFAULT_COEFICIENTES_REFRESCO: float = 30.0
+
+@dataclass(frozen=True)
+class ResultadoReevaluacion:
+    version: int
+    productos_afectados: tuple[str, ...]
+    lotes_evaluados: int
+    lotes_modificados: int
+
+def version_vigente(session: Session) -> int:
+    """Devuelve el número de la última versión publicada de la tabla (0 si nunca se publicó)."""
+    return session.execute(select(func.max(CoeficienteRendimiento.version))).scalar() or 0
+
+def coeficientes_vigentes(session: Session) -> dict[str, float]:
+    """Obtiene el coeficiente vigente por producto, completando con RENDIMIENTO_INDUSTRIAL."""
+    ultima = (
+        select(CoeficienteRendimiento.producto_forestal, func.max(CoeficienteRendimiento.version).label("version"))
+        .group_by(CoeficienteRendimiento.producto_forestal)
+        .subquery()
+    )
+    filas = session.execute(
+        select(CoeficienteRendimiento.producto_forestal, CoeficienteRendimiento.coeficiente).join(
+            ultima,
+            (CoeficienteRendimiento.producto_forestal == ultima.c.producto_forestal)
+            & (CoeficienteRendimiento.version == ultima.c.version),
+        )
+    ).all()
+    return {**RENDIMIENTO_INDUSTRIAL, **{producto: coef for producto, coef in filas}}
+
+def publicar_coeficientes(
+    session: Session,
+    nuevos: Mapping[str, float],
+    motivo: str | None = None,
+) -> tuple[int, dict[str, tuple[float | None, float]]]:
+    """Publica una nueva versión de la tabla con los coeficientes que efectivamente cambian.
+
+    Returns:
+        tuple[versión publicada, {producto: (coeficiente_anterior, coeficiente_nuevo)}]
+    """
+    vigentes = coeficientes_vigentes(session)
+    cambios = {
+        producto.strip(): (vigentes.get(producto.strip()), float(coef))
+        for producto, coef in nuevos.items()
+        if vigentes.get(producto.strip()) != float(coef)
+    }
+    if not cambios:
+        return version_vigente(session), {}
+
+    version = version_vigente(session) + 1
+    session.execute(insert(CoeficienteRendimiento), [
+        {"producto_forestal": producto, "coeficiente": nuevo, "version": version, "motivo": motivo}
+        for producto, (_, nuevo) in cambios.items()
+    ])
+    return version, cambios
+
+def sincronizar_rendimiento_industrial(session: Session) -> dict[str, float]:
+    """Actualiza en memoria RENDIMIENTO_INDUSTRIAL con la versión vigente de la tabla."""
+    vigentes = coeficientes_vigentes(session)
+    RENDIMIENTO_INDUSTRIAL.update(vigentes)
+    return vigentes
+
+class CoeficientesVigentes:
+    """Mantiene RENDIMIENTO_INDUSTRIAL en la versión publicada: consulta el número de versión
+    cada `refresco` segundos y recarga la tabla solo cuando cambió (publicación desde otro proceso)."""
+
+    def __init__(self, bind: Engine, refresco: float | None = None):
+        self._bind = bind
+        self.refresco = refresco if refresco is not None else float(os.environ.get(COEFICIENTES_REFRESCO_ENV) or DEFAULT_COEFICIENTES_REFRESCO)
+        self.version = -1
+        self.recargar()
+        self._cerrado = threading.Event()
+        self._hilo = threading.Thread(target=self._bucle, name="coeficientes-vigentes", daemon=True)
+        self._hilo.start()
+
+    def recargar(self) -> bool:
+        """Sincroniza si hay una versión nueva; devuelve True si los coeficientes cambiaron."""
+        with Session(self._bind) as session:
+            version = version_vigente(session)
+            if version == self.version:
+                return False
+            sincronizar_rendimiento_industrial(session)
+        self.version = version
+        return True
+
+    def _bucle(self) -> None:
+        while not self._cerrado.wait(self.refresco):
+            try:
+                self.recargar()
+            except Exception:
+                pass  # Se mantienen los últimos coeficientes conocidos
+
+    def cerrar(self) -> None:
+        self._cerrado.set()
+        self._hilo.join()
+
+_coeficientes: CoeficientesVigentes | None = None
+_coeficientes_lock = threading.Lock()
+
+def iniciar_coeficientes_vigentes(bind: Engine, **opciones: Any) -> CoeficientesVigentes:
+    """Carga los coeficientes publicados al arrancar el proceso y los mantiene al día en segundo plano."""
+    global _coeficientes
+    with _coeficientes_lock:
+        previo, _coeficientes = _coeficientes, CoeficientesVigentes(bind, **opciones)
+    if previo is not None:
+        previo.cerrar()
+    return _coeficientes
+
+def cerrar_coeficientes_vigentes() -> None:
+    global _coeficientes
+    with _coeficientes_lock:
+        coeficientes, _coeficientes = _coeficientes, None
+    if coeficientes is not None:
+        coeficientes.cerrar()
+
+def _nuevo_estado(df: pd.DataFrame, valido: np.ndarray, valido_previo: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Recalcula estatus y regla respetando el orden de prioridad del conjunto de reglas vigente.
+
+    Solo la regla de balance de masas puede cambiar: un lote bloqueado por una regla anterior
+    conserva su dictamen y uno liberado del balance queda pendiente de verificación satelital.
+    """
+    ids = [r.id for r in obtener_reglas().reglas]
+    prioridad_balance = ids.index(REGLA_BALANCE_MASAS) if REGLA_BALANCE_MASAS in ids else len(ids)
+    prioridad = df["regla_aplicada"].map({rid: i for i, rid in enumerate(ids)}).fillna(len(ids)).to_numpy()
+
+    regla = df["regla_aplicada"].to_numpy(dtype=object)
+    estatus = df["estatus"].to_numpy(dtype=object)
+    bloqueado_por_balance = (regla == REGLA_BALANCE_MASAS) | (
+        pd.isna(regla) & (estatus == "Rojo") & ~valido_previo
+    )
+    regla_anterior_prevalece = (prioridad < prioridad_balance) & ~pd.isna(regla)
+
+    nuevo_bloqueo = ~valido & ~regla_anterior_prevalece
+    liberado = valido & bloqueado_por_balance
+
+    nuevo_estatus = np.where(nuevo_bloqueo, "Rojo", np.where(liberado, "Pendiente", estatus))
+    nueva_regla = np.where(nuevo_bloqueo, REGLA_BALANCE_MASAS, np.where(liberado, REGLA_REEVALUACION_PENDIENTE, regla))
+    return nuevo_estatus.astype(object), nueva_regla.astype(object)
+
+def reevaluar_lotes_por_coeficientes(
+    session: Session,
+    productos: Iterable[str],
+    coeficientes: Mapping[str, float] | None = None,
+    coeficientes_previos: Mapping[str, float] | None = None,
+    version: int | None = None,
+    username: str = "sistema",
+    chunk_size: int = 5000,
+) -> ResultadoReevaluacion:
+    """Reejecuta únicamente el balance de masas de los lotes cuyo producto usa un coeficiente modificado.
+
+    No consulta NDVI: los cambios de estatus se escriben en bloque junto con un AuditLog
+    por lote con el diff antes/después. La transacción queda a cargo del llamador.
+    """
+    productos = tuple(sorted({p.strip() for p in productos}))
+    coefs = dict(coeficientes) if coeficientes is not None else coeficientes_vigentes(session)
+    previos = dict(coeficientes_previos) if coeficientes_previos is not None else RENDIMIENTO_INDUSTRIAL
+    version = version if version is not None else version_vigente(session)
+    if not productos:
+        return ResultadoReevaluacion(version, productos, 0, 0)
+
+    columnas = ["id", "organization_id", "producto_forestal", "volumen_ingresado_ton", "volumen_exportar_ton", "estatus", "regla_aplicada"]
+    filas = session.execute(
+        select(*(getattr(Lote, c) for c in columnas)).where(Lote.producto_forestal.in_(productos))
+    ).all()
+    df = pd.DataFrame(filas, columns=columnas)
+    if df.empty:
+        return ResultadoReevaluacion(version, productos, 0, 0)
+
+    vol_in, vol_out, tipos = df["volumen_ingresado_ton"].to_numpy(), df["volumen_exportar_ton"].to_numpy(), df["producto_forestal"].to_numpy()
+    mb = evaluar_balance_masas_vectorizado(vol_in, vol_out, tipos, coeficientes=coefs)
+    mb_previo = evaluar_balance_masas_vectorizado(vol_in, vol_out, tipos, coeficientes=previos)
+    nuevo_estatus, nueva_regla = _nuevo_estado(df, mb["balance_valido"], mb_previo["balance_valido"])
+
+    cambiados = np.flatnonzero((nuevo_estatus != df["estatus"].to_numpy(dtype=object)) | (nueva_regla != df["regla_aplicada"].to_numpy(dtype=object)))
+    for inicio in range(0, len(cambiados), chunk_size):
+        bloque = cambiados[inicio:inicio + chunk_size]
+        session.execute(update(Lote), [
+            {"id": int(df.at[i, "id"]), "estatus": nuevo_estatus[i], "regla_aplicada": nueva_regla[i]}
+            for i in bloque
+        ])
+        registrar_eventos(session, [_auditoria_cambio(df, i, nuevo_estatus[i], nueva_regla[i], mb, version, username) for i in bloque])
+
+    return ResultadoReevaluacion(version, productos, len(df), len(cambiados))
+
+def _auditoria_cambio(
+    df: pd.DataFrame,
+    i: int,
+    estatus: str,
+    regla: str | None,
+    mb: Mapping[str, np.ndarray],
+    version: int,
+    username: str,
+) -> dict[str, Any]:
+    return {
+        "organization_id": int(df.at[i, "organization_id"]),
+        "username": username,
+        "action": "REEVALUACION_COEFICIENTE",
+        "entity_type": "Lote",
+        "entity_id": int(df.at[i, "id"]),
+        "before_data": {"estatus": df.at[i, "estatus"], "regla_aplicada": None if pd.isna(df.at[i, "regla_aplicada"]) else df.at[i, "regla_aplicada"]},
+        "after_data": {
+            "estatus": estatus,
+            "regla_aplicada": None if pd.isna(regla) else regla,
+            "coeficiente_rendimiento": float(mb["coeficiente_rendimiento"][i]),
+            "volumen_maximo_permitido_ton": round(float(mb["volumen_maximo_permitido_ton"][i]), 4),
+        },
+        "detail": f"Reevaluación por tabla de coeficientes v{version} ({df.at[i, 'producto_forestal']}).",
+    }
+
+def aplicar_cambio_coeficientes(
+    session: Session,
+    nuevos: Mapping[str, float],
+    motivo: str | None = None,
+    username: str = "sistema",
+) -> ResultadoReevaluacion:
+    """Publica una versión de coeficientes y reevalúa solo los lotes afectados en la misma transacción."""
+    previos = coeficientes_vigentes(session)
+    version, cambios = publicar_coeficientes(session, nuevos, motivo=motivo)
+    if not cambios:
+        return ResultadoReevaluacion(version, (), 0, 0)
+    return reevaluar_lotes_por_coeficientes(
+        session,
+        cambios.keys(),
+        coeficientes={**previos, **{p: nuevo for p, (_, nuevo) in cambios.items()}},
+        coeficientes_previos=previos,
+        version=version,
+        username=username,
+    )
@@ -1,91 +1,432 @@
 """Generador de Certificados de Auditoría de Riesgo en PDF."""
 from __future__ import annotations
 import hashlib
-import time
+import json
+import re
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache
 from typing import Any
 
-def generar_pdf_reporte_bytes(
+# Fuentes del certificado en orden de registro: fija los identificadores /F1../Fn de la plantilla
+FUENTES_CERTIFICADO: tuple[tuple[str, str], ...] = (("Helvetica", "B"), ("Helvetica", ""), ("Helvetica", "I"))
+COLOR_TEXTO_CUERPO: tuple[int, int, int] = (15, 23, 42)
+
+# Cambiar ante cualquier modificación visual del certificado: invalida sellos y caché
+VERSION_CERTIFICADO = "2.4.1"
+# Fecha de creación fija (entrada en vigor del Reglamento UE 2023/1115): mismo contenido, mismos bytes
+FECHA_CREACION_CANONICA = datetime(2023, 6, 29, tzinfo=timezone.utc)
+_PATRON_SELLO = re.compile(rb"/Subject \(sello-sha256:([0-9a-f]{64})\)")
+
+LEYENDA_PIE = "Certificado autogenerado por Litoral Trace Engine v2.4"
+LEYENDA_SELLO = "Hash Inmutable (SHA-256 de los datos certificados): {sello}"
+
+# Motores de renderizado seleccionables por llamada: mismos bytes de salida, distinto costo
+MOTOR_FPDF = "fpdf"
+MOTOR_NATIVO = "nativo"
+
+def sello_certificado(
     lote_data: dict[str, Any],
     dictamen: str,
     observacion: str,
     volumen_ingresado: float,
     volumen_exportar: float,
     coeficiente_rendimiento: float
+) -> str:
+    """SHA-256 de los datos canónicos que el certificado declara; identifica su contenido."""
+    canonico = {
+        "version": VERSION_CERTIFICADO,
+        "identificador": str(lote_data.get("identificador", "N/A")),
+        "productor_id": str(lote_data.get("productor_id", "N/A")),
+        "producto_forestal": str(lote_data.get("producto_forestal", "N/A")),
+        "hectareas": str(lote_data.get("hectareas", 0.0)),
+        "dictamen": dictamen,
+        "observacion": observacion,
+        "volumen_ingresado": round(float(volumen_ingresado), 6),
+        "volumen_exportar": round(float(volumen_exportar), 6),
+        "coeficiente_rendimiento": round(float(coeficiente_rendimiento), 6),
+    }
+    serializado = json.dumps(canonico, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(serializado.encode("utf-8")).hexdigest()
+
+def extraer_sello(pdf_bytes: bytes) -> str | None:
+    """Lee el sello declarado en los metadatos del PDF (None si no es un certificado sellado)."""
+    coincidencia = _PATRON_SELLO.search(pdf_bytes)
+    return coincidencia.group(1).decode("ascii") if coincidencia else None
+
+def verificar_certificado(pdf_bytes: bytes, *args: Any) -> bool:
+    """Recalcula el sello a partir de los datos del lote y lo compara con el declarado en el PDF."""
+    return extraer_sello(pdf_bytes) == sello_certificado(*args)
+
+@dataclass(frozen=True)
+class PlantillaCertificado:
+    """Parte estática del certificado ya serializada como flujo de contenido PDF."""
+    encabezado: bytes
+    y_tras_encabezado: float
+    cuerpo: bytes
+    casillas: tuple[tuple[float, float], ...]  # (x, y) de cada valor variable, en orden de aparición
+    y_observacion: float
+
+def _dibujar_encabezado(pdf: Any) -> None:
+    pdf.set_font("Helvetica", "B", 11)
+    pdf.set_text_color(100, 100, 100)
+    pdf.cell(0, 8, "LITORAL TRACE | COMPLIANCE INTELLIGENCE", border=0)
+    pdf.cell(0, 8, "REPORTE DE AUDITORÍA DE RIESGO EUDR", border=0, align="R")
+    pdf.line(10, 18, 200, 18)
+    pdf.ln(10)
+
+def _dibujar_etiquetas(pdf: Any, titulo: str, ancho: float, etiquetas: tuple[str, ...]) -> list[tuple[float, float]]:
+    pdf.set_font("Helvetica", "B", 10)
+    pdf.cell(0, 7, titulo, border=1, fill=True)
+    pdf.ln(7)
+    pdf.set_font("Helvetica", "", 10)
+    casillas = []
+    for i, etiqueta in enumerate(etiquetas):
+        pdf.cell(ancho, 6, etiqueta, border=0)
+        casillas.append((pdf.get_x(), pdf.get_y()))
+        pdf.ln(6 if i < len(etiquetas) - 1 else 10)
+    return casillas
+
+def _dibujar_cuerpo(pdf: Any, favorable: bool) -> tuple[list[tuple[float, float]], float]:
+    """Dibuja título, marcos, etiquetas y banda de dictamen; devuelve dónde van los valores variables."""
+    pdf.set_font("Helvetica", "B", 14)
+    pdf.set_text_color(*COLOR_TEXTO_CUERPO)
+    pdf.cell(0, 10, "AUDITORÍA DE DEBIDA DILIGENCIA (REGLAMENTO UE 2023/1115)", border=0, align="C")
+    pdf.ln(5)
+
+    pdf.set_fill_color(240, 240, 240)
+    casillas = _dibujar_etiquetas(pdf, " 1. IDENTIFICACIÓN DEL ACTIVO Y PROVEEDOR", 50, (
+        "Lote / Rodal:", "CUIT / Guía Forestal:", "Materia Prima:", "Superficie Declarada:",
+    ))
+    casillas += _dibujar_etiquetas(pdf, " 2. BALANCE DE MASAS Y RENDIMIENTO INDUSTRIAL", 60, (
+        "Materia Prima Ingresada:", "Coeficiente de Rendimiento:", "Máximo Exportable Permisible:", "Volumen a Exportar Declarado:",
+    ))
+
+    if favorable:
+        pdf.set_fill_color(220, 252, 231)
+        pdf.set_text_color(22, 101, 52)
+        pdf.set_font("Helvetica", "B", 12)
+        pdf.cell(0, 10, "DICTAMEN: FAVORABLE / COMPLIANT", border=1, align="C", fill=True)
+    else:
+        pdf.set_fill_color(254, 226, 226)
+        pdf.set_text_color(153, 27, 27)
+        pdf.set_font("Helvetica", "B", 12)
+        pdf.cell(0, 10, "DICTAMEN: BLOQUEADO / RIESGO DETECTADO", border=1, align="C", fill=True)
+    pdf.ln(12)
+    return casillas, pdf.get_y()
+
+@lru_cache(maxsize=1)
+def clase_pdf_certificado() -> type:
+    """Construye una única vez por proceso la subclase de FPDF del certificado."""
+    from fpdf import FPDF
+    from fpdf.enums import PDFResourceType
+
+    class CertificadoPDF(FPDF):
+        def __init__(self, plantilla: PlantillaCertificado | None = None, sello: str = ""):
+            super().__init__()
+            self.plantilla = plantilla
+            self.sello = sello
+            self.set_creation_date(FECHA_CREACION_CANONICA)
+            if sello:
+                self.set_subject(f"sello-sha256:{sello}")
+            # Registro anticipado: los ids de fuente coinciden con los del flujo de la plantilla
+            for familia, estilo in FUENTES_CERTIFICADO:
+                self.set_font(familia, estilo, 10)
+
+        def insertar_contenido(self, contenido: bytes) -> None:
+            """Copia un flujo pre-renderizado en la página actual y declara sus fuentes."""
+            self._out(contenido)
+            for fuente in self.fonts.values():
+                self._resource_catalog.add(PDFResourceType.FONT, fuente.i, self.page)
+            self.current_font_is_set_on_page = False
+
+        def header(self):
+            if self.plantilla is not None:
+                self.insertar_contenido(self.plantilla.encabezado)
+                self.set_y(self.plantilla.y_tras_encabezado)
+                return
+            inicio = len(self.pages[self.page].contents)
+            _dibujar_encabezado(self)
+            self.encabezado_renderizado = bytes(self.pages[self.page].contents[inicio:])
+            self.y_tras_encabezado = self.get_y()
+
+        def footer(self):
+            self.set_y(-20)
+            self.set_font("Helvetica", "I", 8)
+            self.set_text_color(128)
+            self.cell(0, 4, LEYENDA_PIE, border=0, align="C")
+            self.ln(4)
+            self.cell(0, 4, LEYENDA_SELLO.format(sello=self.sello), border=0, align="C")
+
+    return CertificadoPDF
+
+@lru_cache(maxsize=2)
+def plantilla_certificado(favorable: bool) -> PlantillaCertificado:
+    """Renderiza una vez por proceso (y por tipo de dictamen) la parte estática del certificado."""
+    pdf = clase_pdf_certificado()()
+    pdf.add_page()
+    inicio_cuerpo = len(pdf.pages[pdf.page].contents)
+    casillas, y_observacion = _dibujar_cuerpo(pdf, favorable)
+    # Deja el estado gráfico en los valores por defecto que asume una instancia nueva
+    pdf.set_fill_color(0)
+    return PlantillaCertificado(
+        encabezado=pdf.encabezado_renderizado,
+        y_tras_encabezado=pdf.y_tras_encabezado,
+        cuerpo=bytes(pdf.pages[pdf.page].contents[inicio_cuerpo:]),
+        casillas=tuple(casillas),
+        y_observacion=y_observacion,
+    )
+
+@dataclass(frozen=True)
+class PlantillaNativa:
+    """Certificado pre-serializado por fpdf: el escritor nativo solo agrega lo variable."""
+    contenido_fijo: bytes                         # operadores de página, encabezado y cuerpo
+    casillas_pt: tuple[tuple[float, float], ...]  # origen (pt) del texto de cada valor variable
+    color_valores: str
+    color_pie: str
+    k: float                                      # puntos por unidad de usuario (mm)
+    alto: float
+    margen_izquierdo: float
+    margen_celda: float
+    ancho_util: float
+    limite_salto: float
+    y_observacion: float
+    cabecera: bytes                               # documento hasta "/Length "
+    apertura_stream: bytes
+    cola: bytes                                   # fin del stream + fuentes, recursos e info
+    offsets_fijos: tuple[int, ...]                # objetos anteriores al flujo de contenido
+    offsets_cola: tuple[int, ...]                 # objetos posteriores, relativos al inicio de `cola`
+    trailer: str                                  # con {id} y {xref} por completar
+
+_SELLO_RELLENO = "0" * 64
+_ANCHO_CASILLA_MM: float = 6
+_ALTO_LINEA_OBSERVACION_MM: float = 4
+_ALTO_LINEA_PIE_MM: float = 4
+# Fuera del camino nativo (saltos manuales, espacios especiales, guiones blandos): los resuelve fpdf
+_CARACTERES_SOLO_FPDF = frozenset("\n\r\f\t\u00a0\u00ad")
+
+def _id_fuente(estilo: str) -> int:
+    return FUENTES_CERTIFICADO.index(("Helvetica", estilo)) + 1
+
+@lru_cache(maxsize=2)
+def plantilla_nativa(favorable: bool) -> PlantillaNativa:
+    """Extrae de una instancia fpdf los bytes fijos, la geometría y el esqueleto del documento."""
+    plantilla = plantilla_certificado(favorable)
+    clase = clase_pdf_certificado()
+    pdf = clase(plantilla, _SELLO_RELLENO)
+    pdf.add_page()
+    pdf.insertar_contenido(plantilla.cuerpo)
+    contenido_fijo = bytes(pdf.pages[pdf.page].contents)
+    k, alto, c_margin = pdf.k, pdf.h, pdf.c_margin
+    pdf.set_text_color(*COLOR_TEXTO_CUERPO)
+    color_valores = pdf.text_color.serialize().lower()
+    pdf.set_text_color(128)
+    color_pie = pdf.text_color.serialize().lower()
+    tamano_valores = 10 / k
+    casillas_pt = tuple(
+        ((x + c_margin) * k, (alto - y - 0.5 * _ANCHO_CASILLA_MM - 0.3 * tamano_valores) * k)
+        for x, y in plantilla.casillas
+    )
+
+    muestra = bytes(clase(plantilla, _SELLO_RELLENO).output())
+    inicio_longitud = muestra.index(b"/Length ") + len(b"/Length ")
+    fin_longitud = muestra.index(b"\n", inicio_longitud)
+    inicio_datos = muestra.index(b"stream\n", fin_longitud) + len(b"stream\n")
+    fin_datos = muestra.index(b"\nendstream", inicio_datos)
+    inicio_xref = muestra.rindex(b"\nxref\n") + 1
+    filas_xref = muestra[inicio_xref:].split(b"\n")
+    offsets = [int(fila[:10]) for fila in filas_xref[3:2 + int(filas_xref[1].split()[1])]]
+    trailer = muestra[muestra.index(b"trailer", inicio_xref):].decode("latin-1")
+    trailer = re.sub(r"/ID \[<[0-9A-F]+><[0-9A-F]+>\]", "/ID [<{id}><{id}>]", trailer)
+    trailer = re.sub(r"startxref\n\d+", "startxref\n{xref}", trailer)
+
+    return PlantillaNativa(
+        contenido_fijo=contenido_fijo,
+        casillas_pt=casillas_pt,
+        color_valores=color_valores,
+        color_pie=color_pie,
+        k=k,
+        alto=alto,
+        margen_izquierdo=pdf.l_margin,
+        margen_celda=c_margin,
+        ancho_util=pdf.w - pdf.r_margin - pdf.l_margin,
+        limite_salto=pdf.page_break_trigger,
+        y_observacion=plantilla.y_observacion,
+        cabecera=muestra[:inicio_longitud],
+        apertura_stream=muestra[fin_longitud:inicio_datos],
+        cola=muestra[fin_datos:inicio_xref],
+        offsets_fijos=tuple(o for o in offsets if o < inicio_datos),
+        offsets_cola=tuple(o - fin_datos for o in offsets if o > fin_datos),
+        trailer=trailer,
+    )
+
+def _texto_nativo_valido(texto: str) -> bool:
+    if _CARACTERES_SOLO_FPDF.intersection(texto):
+        return False
+    try:
+        texto.encode("latin-1")
+    except UnicodeEncodeError:
+        return False
+    return True
+
+def _texto_fuente_base(texto: str) -> str:
+    """Las fuentes base (Helvetica) solo cubren latin-1: los demás caracteres se imprimen como '?'."""
+    return texto.encode("latin-1", "replace").decode("latin-1")
+
+def _escapar(texto: str) -> bytes:
+    return texto.replace("\\", "\\\\").replace(")", "\\)").replace("(", "\\(").encode("latin-1")
+
+def _cortar_lineas(texto: str, anchos: dict[str, int], tamano_pt: float, k: float, ancho_maximo: float) -> list[tuple[str, int, bool]]:
+    """Reproduce el corte por palabras de fpdf: (línea, espacios, justificada) por renglón."""
+    lineas: list[tuple[str, int, bool]] = []
+    escala = tamano_pt * 0.001
+    i, n = 0, len(texto)
+    while i < n:
+        inicio, suma, espacios = i, 0, 0
+        ultimo_espacio: tuple[int, int] | None = None
+        while i < n:
+            caracter = texto[i]
+            ancho = anchos[caracter]
+            if (suma * escala) / k + (ancho * escala) / k - ancho_maximo > 1e-9:
+                if caracter == " ":
+                    lineas.append((texto[inicio:i], espacios, True))
+                    i += 1
+                elif ultimo_espacio is not None:
+                    corte, espacios_previos = ultimo_espacio
+                    lineas.append((texto[inicio:corte], espacios_previos, True))
+                    i = corte + 1
+                else:
+                    lineas.append((texto[inicio:i], espacios, False))
+                break
+            if caracter == " ":
+                ultimo_espacio = (i, espacios)
+                espacios += 1
+            suma += ancho
+            i += 1
+        else:
+            if suma:
+                lineas.append((texto[inicio:], espacios, False))
+    return lineas
+
+def _renglon(x_pt: float, y_pt: float, texto: str, prefijo: str = "", local: bool = False) -> bytes:
+    linea = f"BT {x_pt:.2f} {y_pt:.2f} Td {prefijo}".encode("ascii") + b"(" + _escapar(texto) + b") Tj ET"
+    return b"q " + linea + b" Q\n" if local else linea + b"\n"
+
+def _generar_pdf_nativo(valores: tuple[str, ...], observacion: str, sello: str, favorable: bool) -> bytes | None:
+    """Arma el certificado sin instanciar fpdf; None si el texto requiere la ruta fpdf."""
+    if not all(_texto_nativo_valido(texto) for texto in (*valores, observacion)) or not observacion:
+        return None
+    from fpdf.fonts import CORE_FONTS_CHARWIDTHS
+
+    plantilla = plantilla_nativa(favorable)
+    k, alto = plantilla.k, plantilla.alto
+    partes = [plantilla.contenido_fijo, f"BT /F{_id_fuente('')} 10.00 Tf ET\n".encode("ascii")]
+    for (x_pt, y_pt), valor in zip(plantilla.casillas_pt, valores):
+        if valor:
+            partes.append(_renglon(x_pt, y_pt, valor, f"{plantilla.color_valores} ", local=True))
+
+    anchos = CORE_FONTS_CHARWIDTHS["helvetica"]
+    margen = plantilla.margen_celda
+    ancho_linea = plantilla.ancho_util
+    lineas = _cortar_lineas(observacion, anchos, 9, k, ancho_linea - margen - margen)
+    y = plantilla.y_observacion
+    if y + len(lineas) * _ALTO_LINEA_OBSERVACION_MM > plantilla.limite_salto - 1e-6:
+        return None  # el texto continúa en otra página
+    partes.append(f"BT /F{_id_fuente('')} 9.00 Tf ET\n".encode("ascii"))
+    x_pt = (plantilla.margen_izquierdo + margen) * k
+    for linea, espacios, justificada in lineas:
+        y_pt = (alto - y - 0.5 * _ALTO_LINEA_OBSERVACION_MM - 0.3 * (9 / k)) * k
+        espaciado = 0.0
+        if justificada and espacios:
+            ancho_texto = (sum(anchos[c] for c in linea) * 9 * 0.001) / k
+            espaciado = (ancho_linea - margen - margen - ancho_texto) / espacios
+        if espaciado:
+            partes.append(_renglon(x_pt, y_pt, linea, f"{espaciado * k:.3f} Tw ", local=True))
+        else:
+            partes.append(_renglon(x_pt, y_pt, linea))
+        y += _ALTO_LINEA_OBSERVACION_MM
+
+    anchos_pie = CORE_FONTS_CHARWIDTHS["helveticaI"]
+    partes.append(f"BT /F{_id_fuente('I')} 8.00 Tf ET\n".encode("ascii"))
+    y = alto - 20
+    for texto in (LEYENDA_PIE, LEYENDA_SELLO.format(sello=sello)):
+        ancho_texto = (sum(anchos_pie[c] for c in texto) * 8 * 0.001) / k
+        x_pie = (plantilla.margen_izquierdo + (ancho_linea - ancho_texto) / 2) * k
+        y_pt = (alto - y - 0.5 * _ALTO_LINEA_PIE_MM - 0.3 * (8 / k)) * k
+        partes.append(_renglon(x_pie, y_pt, texto, f"{plantilla.color_pie} ", local=True))
+        y += _ALTO_LINEA_PIE_MM
+
+    datos = zlib.compress(b"".join(partes))
+    cuerpo = b"".join((
+        plantilla.cabecera, str(len(datos)).encode("ascii"), plantilla.apertura_stream, datos,
+        plantilla.cola.replace(_SELLO_RELLENO.encode("ascii"), sello.encode("ascii"), 1),
+    ))
+    inicio_cola = len(cuerpo) - len(plantilla.cola)
+    offsets = plantilla.offsets_fijos + tuple(inicio_cola + o for o in plantilla.offsets_cola)
+    total = len(offsets) + 1
+    xref = "".join([f"xref\n0 {total}\n0000000000 65535 f \n", *(f"{o:010} 00000 n \n" for o in offsets)])
+    id_documento = hashlib.md5(cuerpo + FECHA_CREACION_CANONICA.strftime("%Y%m%d%H%M%S").encode("utf8"), usedforsecurity=False)
+    trailer = plantilla.trailer.format(id=id_documento.hexdigest().upper(), xref=len(cuerpo))
+    return cuerpo + (xref + trailer).encode("latin-1")
+
+def generar_pdf_reporte_bytes(
+    lote_data: dict[str, Any],
+    dictamen: str,
+    observacion: str,
+    volumen_ingresado: float,
+    volumen_exportar: float,
+    coeficiente_rendimiento: float,
+    motor: str = MOTOR_FPDF,
 ) -> bytes:
-    """Genera el reporte PDF con sello hash de inmutabilidad."""
+    """Genera el reporte PDF con sello hash de inmutabilidad.
+
+    La clase, las fuentes y el diseño estático se construyen una vez por proceso; en cada
+    llamada solo se escriben los campos propios del lote. El sello es el hash de los datos
+    certificados, por lo que mismas entradas producen exactamente los mismos bytes.
+
+    Con `motor=MOTOR_NATIVO` el documento se arma directamente desde la plantilla
+    pre-serializada, sin instanciar fpdf, y produce los mismos bytes que la ruta fpdf. Los
+    textos que ese camino no cubre (saltos de línea manuales, caracteres fuera de latin-1,
+    observaciones de más de una página) se delegan automáticamente a fpdf.
+    """
+    if motor not in (MOTOR_FPDF, MOTOR_NATIVO):
+        raise ValueError(f"Motor de renderizado desconocido: '{motor}'")
     try:
-        from fpdf import FPDF
-        
-        class PDF(FPDF):
-            def header(self):
-                self.set_font("Helvetica", "B", 11)
-                self.set_text_color(100, 100, 100)
-                self.cell(0, 8, "LITORAL TRACE | COMPLIANCE INTELLIGENCE", border=0)
-                self.cell(0, 8, "REPORTE DE AUDITORÍA DE RIESGO EUDR", border=0, align="R")
-                self.line(10, 18, 200, 18)
-                self.ln(10)
-                
-            def footer(self):
-                self.set_y(-20)
-                self.set_font("Helvetica", "I", 8)
-                self.set_text_color(128)
-                h_str = hashlib.sha256(str(time.time()).encode()).hexdigest()[:16]
-                self.cell(0, 4, f"Certificado autogenerado por Litoral Trace Engine v2.4 | Hash Inmutable: {h_str}", border=0, align="C")
-
-        pdf = PDF()
+        sello = sello_certificado(lote_data, dictamen, observacion, volumen_ingresado, volumen_exportar, coeficiente_rendimiento)
+        valores = (
+            str(lote_data.get("identificador", "N/A")),
+            str(lote_data.get("productor_id", "N/A")),
+            str(lote_data.get("producto_forestal", "N/A")),
+            f"{lote_data.get('hectareas', 0.0)} ha",
+            f"{volumen_ingresado:.2f} Toneladas",
+            f"{coeficiente_rendimiento*100:.1f}%",
+            f"{volumen_ingresado*coeficiente_rendimiento:.2f} Toneladas",
+            f"{volumen_exportar:.2f} Toneladas",
+        )
+        if motor == MOTOR_NATIVO:
+            nativo = _generar_pdf_nativo(valores, observacion, sello, dictamen == "Verde")
+            if nativo is not None:
+                return nativo
+
+        plantilla = plantilla_certificado(dictamen == "Verde")
+        pdf = clase_pdf_certificado()(plantilla, sello)
         pdf.add_page()
-        pdf.set_font("Helvetica", "B", 14)
-        pdf.set_text_color(15, 23, 42)
-        pdf.cell(0, 10, "AUDITORÍA DE DEBIDA DILIGENCIA (REGLAMENTO UE 2023/1115)", border=0, align="C")
-        pdf.ln(5)
-
-        # Sección 1
-        pdf.set_fill_color(240, 240, 240)
-        pdf.set_font("Helvetica", "B", 10)
-        pdf.cell(0, 7, " 1. IDENTIFICACIÓN DEL ACTIVO Y PROVEEDOR", border=1, fill=True)
-        pdf.ln(7)
-        pdf.set_font("Helvetica", "", 10)
-        pdf.cell(50, 6, "Lote / Rodal:", border=0); pdf.cell(0, 6, str(lote_data.get("identificador", "N/A")), border=0)
-        pdf.ln(6)
-        pdf.cell(50, 6, "CUIT / Guía Forestal:", border=0); pdf.cell(0, 6, str(lote_data.get("productor_id", "N/A")), border=0)
-        pdf.ln(6)
-        pdf.cell(50, 6, "Materia Prima:", border=0); pdf.cell(0, 6, str(lote_data.get("producto_forestal", "N/A")), border=0)
-        pdf.ln(6)
-        pdf.cell(50, 6, "Superficie Declarada:", border=0); pdf.cell(0, 6, f"{lote_data.get('hectareas', 0.0)} ha", border=0)
-        pdf.ln(10)
-
-        # Sección 2
-        pdf.set_font("Helvetica", "B", 10)
-        pdf.cell(0, 7, " 2. BALANCE DE MASAS Y RENDIMIENTO INDUSTRIAL", border=1, fill=True)
-        pdf.ln(7)
+        pdf.insertar_contenido(plantilla.cuerpo)
+
         pdf.set_font("Helvetica", "", 10)
-        pdf.cell(60, 6, "Materia Prima Ingresada:", border=0); pdf.cell(0, 6, f"{volumen_ingresado:.2f} Toneladas", border=0)
-        pdf.ln(6)
-        pdf.cell(60, 6, "Coeficiente de Rendimiento:", border=0); pdf.cell(0, 6, f"{coeficiente_rendimiento*100:.1f}%", border=0)
-        pdf.ln(6)
-        pdf.cell(60, 6, "Máximo Exportable Permisible:", border=0); pdf.cell(0, 6, f"{volumen_ingresado*coeficiente_rendimiento:.2f} Toneladas", border=0)
-        pdf.ln(6)
-        pdf.cell(60, 6, "Volumen a Exportar Declarado:", border=0); pdf.cell(0, 6, f"{volumen_exportar:.2f} Toneladas", border=0)
-        pdf.ln(10)
-
-        # Dictamen
-        if dictamen == "Verde":
-            pdf.set_fill_color(220, 252, 231)
-            pdf.set_text_color(22, 101, 52)
-            pdf.set_font("Helvetica", "B", 12)
-            pdf.cell(0, 10, "DICTAMEN: FAVORABLE / COMPLIANT", border=1, align="C", fill=True)
-        else:
-            pdf.set_fill_color(254, 226, 226)
-            pdf.set_text_color(153, 27, 27)
-            pdf.set_font("Helvetica", "B", 12)
-            pdf.cell(0, 10, "DICTAMEN: BLOQUEADO / RIESGO DETECTADO", border=1, align="C", fill=True)
+        pdf.set_text_color(*COLOR_TEXTO_CUERPO)
+        for (x, y), valor in zip(plantilla.casillas, valores):
+            pdf.set_xy(x, y)
+            pdf.cell(0, 6, _texto_fuente_base(valor), border=0)
 
         pdf.set_text_color(0)
         pdf.set_font("Helvetica", "", 9)
-        pdf.ln(12)
-        pdf.multi_cell(0, 4, observacion)
+        pdf.set_xy(pdf.l_margin, plantilla.y_observacion)
+        pdf.multi_cell(0, 4, _texto_fuente_base(observacion))
 
         return bytes(pdf.output())
-    except Exception:
+    except ImportError:
+        # fpdf2 no instalado: comprobante de texto plano
         report_text = f"LITORAL TRACE AUDIT REPORT\nDictamen: {dictamen}\nObs: {observacion}\nVolIn: {volumen_ingresado}T\nVolOut: {volumen_exportar}T\n"
         return report_text.encode("utf-8")
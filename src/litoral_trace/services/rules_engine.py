@@ -0,0 +1,349 @@
+"""Motor Declarativo de Reglas Regulatorias EUDR compiladas a predicados vectorizados."""
+from __future__ import annotations
+import functools
+import json
+import operator
+import os
+import string
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Iterator, Mapping
+
+import numpy as np
+import pandas as pd
+
+from litoral_trace.services.mass_balance import evaluar_balance_masas_vectorizado, mensaje_balance_masas
+from litoral_trace.services.ndvi import evaluar_deforestacion_lotes
+
+REGLAS_PATH_DEFAULT = Path(__file__).with_name("compliance_rules.json")
+REGLAS_PATH_ENV = "LITORAL_REGLAS_COMPLIANCE"
+
+# Columnas que solo existen tras consultar la telemetría satelital (costosa)
+COLUMNAS_SATELITALES: frozenset[str] = frozenset({"sat_dictamen", "sat_observacion", "ndvi_base_2020", "ndvi_actual"})
+COLUMNAS_LOTE: frozenset[str] = frozenset({
+    "identificador", "productor_id", "producto_forestal", "hectareas", "latitud", "longitud",
+})
+COLUMNAS_BALANCE: frozenset[str] = frozenset({
+    "coeficiente_rendimiento", "volumen_ingresado_ton", "volumen_exportar_ton", "volumen_maximo_permitido_ton", "balance_valido",
+})
+COLUMNAS_DICTAMEN: frozenset[str] = frozenset({"dictamen", "regla_aplicada", "observacion"})
+
+Columnas = dict[str, np.ndarray]
+Predicado = Callable[[Columnas, int], np.ndarray]
+ProveedorSatelital = Callable[[np.ndarray, np.ndarray], Mapping[str, np.ndarray]]
+
+_COMPARADORES: dict[str, Callable[[Any, Any], Any]] = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+}
+
+# Campos de observación que se derivan por fila solo si la plantilla los necesita
+_CAMPOS_DERIVADOS: dict[str, Callable[[Mapping[str, Any]], Any]] = {
+    "mb_observacion": lambda fila: mensaje_balance_masas(
+        float(fila["volumen_ingresado_ton"]),
+        float(fila["volumen_exportar_ton"]),
+        float(fila["coeficiente_rendimiento"]),
+    ),
+}
+
+# Columnas que produce el motor: una planilla no puede aportarlas ni pisarlas
+COLUMNAS_CALCULADAS: frozenset[str] = COLUMNAS_BALANCE | COLUMNAS_SATELITALES | COLUMNAS_DICTAMEN | frozenset(_CAMPOS_DERIVADOS)
+# Campos que una plantilla de observación puede usar sin que su condición los mencione
+CAMPOS_PLANTILLA: frozenset[str] = COLUMNAS_LOTE | COLUMNAS_BALANCE | COLUMNAS_SATELITALES | frozenset(_CAMPOS_DERIVADOS)
+
+@dataclass(frozen=True)
+class ReglaCompilada:
+    id: str
+    descripcion: str
+    dictamen: str
+    observacion: str
+    predicado: Predicado
+    columnas: frozenset[str]
+    requiere_satelital: bool
+
+@dataclass(frozen=True)
+class DictamenRegla:
+    dictamen: str
+    regla_aplicada: str
+    observacion: str
+
+class _FilaColumnas(Mapping[str, Any]):
+    """Vista perezosa de una fila dentro de un conjunto de columnas NumPy."""
+
+    def __init__(self, columnas: Columnas, idx: int) -> None:
+        self._columnas = columnas
+        self._idx = idx
+
+    def __getitem__(self, clave: str) -> Any:
+        if clave in self._columnas:
+            return self._columnas[clave][self._idx]
+        if clave in _CAMPOS_DERIVADOS:
+            return _CAMPOS_DERIVADOS[clave](self)
+        raise KeyError(clave)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._columnas)
+
+    def __len__(self) -> int:
+        return len(self._columnas)
+
+def _campos_plantilla(plantilla: str) -> frozenset[str]:
+    return frozenset(campo for _, campo, _, _ in string.Formatter().parse(plantilla) if campo)
+
+def _validar_plantilla(origen: str, plantilla: str, columnas_condicion: frozenset[str]) -> None:
+    desconocidos = _campos_plantilla(plantilla) - CAMPOS_PLANTILLA - columnas_condicion
+    if desconocidos:
+        raise ValueError(f"La observación de '{origen}' usa campos desconocidos: {', '.join(sorted(desconocidos))}")
+
+def _columnas_registro(registro: Mapping[str, Any]) -> Columnas:
+    return {k: np.asarray([v], dtype=object if isinstance(v, str) else None) for k, v in registro.items()}
+
+def _sin_columna(n: int) -> np.ndarray:
+    return np.zeros(n, dtype=bool)
+
+def _compilar_condicion(condicion: Mapping[str, Any]) -> tuple[Predicado, frozenset[str]]:
+    """Traduce una condición declarativa a un predicado NumPy sobre columnas completas."""
+    if "all" in condicion or "any" in condicion:
+        es_all = "all" in condicion
+        partes = [_compilar_condicion(c) for c in condicion["all" if es_all else "any"]]
+        columnas = frozenset().union(*(cols for _, cols in partes))
+        combinar = np.logical_and if es_all else np.logical_or
+
+        def predicado_compuesto(cols: Columnas, n: int) -> np.ndarray:
+            resultado = np.full(n, es_all, dtype=bool)
+            for pred, _ in partes:
+                resultado = combinar(resultado, pred(cols, n))
+            return resultado
+        return predicado_compuesto, columnas
+
+    if "not" in condicion:
+        interno, columnas = _compilar_condicion(condicion["not"])
+        return (lambda cols, n: ~interno(cols, n)), columnas
+
+    campo = condicion["campo"]
+    op = condicion["op"]
+
+    if op in ("in", "not_in"):
+        valores = np.asarray(list(condicion.get("valor", [])), dtype=object)
+        negar = op == "not_in"
+
+        def predicado_pertenencia(cols: Columnas, n: int) -> np.ndarray:
+            columna = cols.get(campo)
+            if columna is None:
+                return _sin_columna(n)
+            resultado = np.isin(columna.astype(object), valores)
+            return ~resultado if negar else resultado
+        return predicado_pertenencia, frozenset({campo})
+
+    if op == "is_null":
+        def predicado_nulo(cols: Columnas, n: int) -> np.ndarray:
+            columna = cols.get(campo)
+            return np.ones(n, dtype=bool) if columna is None else pd.isna(columna)
+        return predicado_nulo, frozenset({campo})
+
+    if op not in _COMPARADORES:
+        raise ValueError(f"Operador no soportado en regla de compliance: '{op}'")
+    comparar = _COMPARADORES[op]
+
+    if "campo_ref" in condicion:
+        campo_ref = condicion["campo_ref"]
+
+        def predicado_columnas(cols: Columnas, n: int) -> np.ndarray:
+            a, b = cols.get(campo), cols.get(campo_ref)
+            if a is None or b is None:
+                return _sin_columna(n)
+            return np.asarray(comparar(a, b), dtype=bool)
+        return predicado_columnas, frozenset({campo, campo_ref})
+
+    valor = condicion["valor"]
+
+    def predicado_valor(cols: Columnas, n: int) -> np.ndarray:
+        columna = cols.get(campo)
+        if columna is None:
+            return _sin_columna(n)
+        return np.asarray(comparar(columna, valor), dtype=bool)
+    return predicado_valor, frozenset({campo})
+
+class ConjuntoReglas:
+    """Conjunto ordenado de reglas compiladas. La primera regla que dispara define el dictamen."""
+
+    def __init__(
+        self,
+        version: str,
+        reglas: tuple[ReglaCompilada, ...],
+        dictamen_defecto: str,
+        observacion_defecto: str,
+    ) -> None:
+        self.version = version
+        self.reglas = reglas
+        self.dictamen_defecto = dictamen_defecto
+        self.observacion_defecto = observacion_defecto
+        self.defecto_requiere_satelital = bool(_campos_plantilla(observacion_defecto) & COLUMNAS_SATELITALES)
+
+    def evaluar_columnas(
+        self,
+        columnas: Columnas,
+        n: int,
+        proveedor_satelital: ProveedorSatelital | None = None,
+    ) -> tuple[np.ndarray, Columnas]:
+        """Evalúa todas las reglas columna a columna.
+
+        La telemetría satelital se solicita solo para los lotes que ninguna regla
+        barata previa haya resuelto.
+
+        Returns:
+            tuple[índice de regla por lote (-1 = dictamen por defecto), columnas enriquecidas]
+        """
+        cols = dict(columnas)
+        regla_idx = np.full(n, -1, dtype=np.int32)
+        pendientes = np.ones(n, dtype=bool)
+        satelital_cargada = COLUMNAS_SATELITALES <= cols.keys()
+
+        def cargar_satelital() -> None:
+            proveedor = proveedor_satelital or evaluar_deforestacion_lotes
+            lat, lon = cols["latitud"][pendientes], cols["longitud"][pendientes]
+            parcial = proveedor(lat, lon)
+            for nombre, valores in parcial.items():
+                completa = np.empty(n, dtype=object) if np.asarray(valores).dtype == object else np.full(n, np.nan)
+                completa[pendientes] = valores
+                cols[nombre] = completa
+
+        for i, regla in enumerate(self.reglas):
+            if not pendientes.any():
+                break
+            if regla.requiere_satelital and not satelital_cargada:
+                cargar_satelital()
+                satelital_cargada = True
+            dispara = regla.predicado(cols, n) & pendientes
+            regla_idx[dispara] = i
+            pendientes &= ~dispara
+
+        if pendientes.any() and self.defecto_requiere_satelital and not satelital_cargada:
+            cargar_satelital()
+
+        return regla_idx, cols
+
+    def redactar(self, regla_idx: np.ndarray, cols: Columnas) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Materializa dictamen, regla aplicada y observación por lote a partir del índice de reglas."""
+        dictamenes = np.array([r.dictamen for r in self.reglas] + [self.dictamen_defecto], dtype=object)
+        ids = np.array([r.id for r in self.reglas] + ["DEFECTO"], dtype=object)
+        plantillas = [r.observacion for r in self.reglas] + [self.observacion_defecto]
+        observaciones = np.array(
+            [plantillas[j].format_map(_FilaColumnas(cols, i)) for i, j in enumerate(regla_idx)],
+            dtype=object,
+        )
+        return dictamenes[regla_idx], ids[regla_idx], observaciones
+
+    def necesita_satelital(self, registro: Mapping[str, Any]) -> bool:
+        """Indica si el lote llega a una regla (o al dictamen por defecto) que requiere telemetría NDVI."""
+        cols = _columnas_registro(registro)
+        for regla in self.reglas:
+            if regla.requiere_satelital:
+                return True
+            if regla.predicado(cols, 1)[0]:
+                return False
+        return self.defecto_requiere_satelital
+
+    def dictaminar(self, registro: Mapping[str, Any]) -> DictamenRegla:
+        """Evalúa un único lote ya enriquecido (balance de masas y, si hizo falta, satelital) con las mismas reglas."""
+        regla_idx, cols = self.evaluar_columnas(_columnas_registro(registro), 1)
+        dictamenes, ids, observaciones = self.redactar(regla_idx, cols)
+        return DictamenRegla(dictamen=dictamenes[0], regla_aplicada=ids[0], observacion=observaciones[0])
+
+def cargar_reglas(ruta: str | Path | None = None) -> dict[str, Any]:
+    """Lee la especificación declarativa de reglas (JSON o YAML)."""
+    ruta = Path(ruta or os.environ.get(REGLAS_PATH_ENV) or REGLAS_PATH_DEFAULT)
+    texto = ruta.read_text(encoding="utf-8")
+    if ruta.suffix.lower() in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError as e:
+            raise RuntimeError("Se requiere PyYAML para cargar reglas de compliance en formato YAML.") from e
+        return yaml.safe_load(texto)
+    return json.loads(texto)
+
+def compilar_reglas(spec: Mapping[str, Any]) -> ConjuntoReglas:
+    """Compila la especificación declarativa a predicados vectorizados.
+
+    Raises:
+        ValueError: Si una regla tiene identificador duplicado, operador desconocido o su
+            observación usa un campo que no existe.
+    """
+    compiladas = []
+    vistos: set[str] = set()
+    for regla in spec.get("reglas", []):
+        if regla["id"] in vistos:
+            raise ValueError(f"Regla de compliance duplicada: '{regla['id']}'")
+        vistos.add(regla["id"])
+        predicado, columnas = _compilar_condicion(regla["condicion"])
+        _validar_plantilla(regla["id"], regla["observacion"], columnas)
+        usadas = columnas | _campos_plantilla(regla["observacion"])
+        compiladas.append(ReglaCompilada(
+            id=regla["id"],
+            descripcion=regla.get("descripcion", ""),
+            dictamen=regla["dictamen"],
+            observacion=regla["observacion"],
+            predicado=predicado,
+            columnas=columnas,
+            requiere_satelital=bool(usadas & COLUMNAS_SATELITALES),
+        ))
+
+    defecto = spec.get("dictamen_por_defecto", {})
+    _validar_plantilla("dictamen_por_defecto", defecto.get("observacion", ""), frozenset())
+    return ConjuntoReglas(
+        version=str(spec.get("version", "sin-version")),
+        reglas=tuple(compiladas),
+        dictamen_defecto=defecto.get("dictamen", "Verde"),
+        observacion_defecto=defecto.get("observacion", "APROBADO / COMPLIANT."),
+    )
+
+@functools.lru_cache(maxsize=1)
+def obtener_reglas() -> ConjuntoReglas:
+    """Devuelve el conjunto de reglas vigente, compilado una única vez por proceso."""
+    return compilar_reglas(cargar_reglas())
+
+def recargar_reglas() -> ConjuntoReglas:
+    """Descarta la compilación en caché y vuelve a leer la especificación de reglas."""
+    obtener_reglas.cache_clear()
+    return obtener_reglas()
+
+def evaluar_reglas_df(
+    df_lotes: pd.DataFrame,
+    reglas: ConjuntoReglas | None = None,
+    proveedor_satelital: ProveedorSatelital | None = None,
+) -> pd.DataFrame:
+    """Dictamina un lote completo de embarques de forma columnar.
+
+    Args:
+        df_lotes: Columnas identificador, productor_id, producto_forestal, latitud, longitud,
+                  volumen_ingresado_ton, volumen_exportar_ton (y atributos extra usados por reglas).
+        reglas: Conjunto compilado a aplicar (por defecto el vigente).
+        proveedor_satelital: Fuente NDVI alternativa (lat, lon) -> columnas satelitales.
+
+    Returns:
+        DataFrame con las columnas de entrada más balance de masas, telemetría consultada,
+        dictamen, regla_aplicada y observacion.
+    """
+    reglas = reglas or obtener_reglas()
+    n = len(df_lotes)
+    cols: Columnas = {c: df_lotes[c].to_numpy() for c in df_lotes.columns}
+    cols.update(evaluar_balance_masas_vectorizado(
+        df_lotes["volumen_ingresado_ton"].to_numpy(),
+        df_lotes["volumen_exportar_ton"].to_numpy(),
+        df_lotes["producto_forestal"].to_numpy(),
+    ))
+    cols["latitud"] = df_lotes["latitud"].to_numpy(dtype=float)
+    cols["longitud"] = df_lotes["longitud"].to_numpy(dtype=float)
+
+    regla_idx, cols = reglas.evaluar_columnas(cols, n, proveedor_satelital)
+    dictamenes, ids, observaciones = reglas.redactar(regla_idx, cols)
+
+    resultado = pd.DataFrame(cols, index=df_lotes.index)
+    resultado["dictamen"] = dictamenes
+    resultado["regla_aplicada"] = ids
+    resultado["observacion"] = observaciones
+    return resultado
@@ -0,0 +1,95 @@
+"""Consultas espaciales sobre Lote resueltas por PostGIS con el índice GiST de lotes.geom."""
+from __future__ import annotations
+from typing import Any
+
+from sqlalchemy import Float, Select, func, select
+from sqlalchemy.engine import Connection, Engine
+
+from litoral_trace.db.models import Lote
+from litoral_trace.db.types import SRID_WGS84
+
+DEFAULT_LIMITE_BBOX = 500
+DEFAULT_LIMITE_CERCANOS = 10
+
+# Sin la geometría: el WKT completo no hace falta para listar resultados
+COLUMNAS_ESPACIALES = (
+    Lote.id,
+    Lote.identificador,
+    Lote.productor_id,
+    Lote.producto_forestal,
+    Lote.hectareas,
+    Lote.latitud,
+    Lote.longitud,
+    Lote.estatus,
+)
+
+def _consulta_bbox(
+    organization_id: int,
+    min_lon: float,
+    min_lat: float,
+    max_lon: float,
+    max_lat: float,
+    limite: int,
+) -> Select[Any]:
+    envolvente = func.ST_MakeEnvelope(float(min_lon), float(min_lat), float(max_lon), float(max_lat), SRID_WGS84)
+    return (
+        select(*COLUMNAS_ESPACIALES)
+        .where(Lote.organization_id == organization_id, Lote.geom.bool_op("&&")(envolvente))
+        .order_by(Lote.id)
+        .limit(limite)
+    )
+
+def _consulta_interseccion(organization_id: int, wkt: str) -> Select[Any]:
+    area = func.ST_GeomFromText(wkt, SRID_WGS84)
+    # geography: el área superpuesta en m² reales, no en grados²
+    superpuesta = func.ST_Area(func.geography(func.ST_Intersection(Lote.geom, area))) / 10_000.0
+    return (
+        select(*COLUMNAS_ESPACIALES, superpuesta.label("hectareas_superpuestas"))
+        .where(Lote.organization_id == organization_id, func.ST_Intersects(Lote.geom, area))
+        .order_by(Lote.id)
+    )
+
+def _consulta_cercanos(organization_id: int, latitud: float, longitud: float, limite: int) -> Select[Any]:
+    punto = func.ST_SetSRID(func.ST_MakePoint(float(longitud), float(latitud)), SRID_WGS84)
+    distancia = func.ST_Distance(func.geography(Lote.geom), func.geography(punto))
+    return (
+        select(*COLUMNAS_ESPACIALES, distancia.label("distancia_m"))
+        .where(Lote.organization_id == organization_id, Lote.geom.is_not(None))
+        # <-> recorre el índice GiST en orden de distancia (KNN) sin calcularla para toda la tabla
+        .order_by(Lote.geom.op("<->", return_type=Float)(punto))
+        .limit(limite)
+    )
+
+def _ejecutar(bind: Engine | Connection, query: Select[Any]) -> list[dict[str, Any]]:
+    if bind.dialect.name != "postgresql":
+        raise ValueError(f"Las consultas espaciales requieren PostgreSQL con PostGIS; dialecto: '{bind.dialect.name}'")
+    if isinstance(bind, Engine):
+        with bind.connect() as conn:
+            return [dict(fila._mapping) for fila in conn.execute(query)]
+    return [dict(fila._mapping) for fila in bind.execute(query)]
+
+def lotes_en_bbox(
+    bind: Engine | Connection,
+    organization_id: int,
+    min_lon: float,
+    min_lat: float,
+    max_lon: float,
+    max_lat: float,
+    limite: int = DEFAULT_LIMITE_BBOX,
+) -> list[dict[str, Any]]:
+    """Lotes cuyo polígono toca el rectángulo WGS84 indicado (visor de mapa, exportaciones por zona)."""
+    return _ejecutar(bind, _consulta_bbox(organization_id, min_lon, min_lat, max_lon, max_lat, limite))
+
+def lotes_que_intersectan(bind: Engine | Connection, organization_id: int, wkt: str) -> list[dict[str, Any]]:
+    """Lotes que intersectan un polígono WKT (p. ej. una alerta de deforestación), con las hectáreas afectadas."""
+    return _ejecutar(bind, _consulta_interseccion(organization_id, wkt))
+
+def lotes_cercanos(
+    bind: Engine | Connection,
+    organization_id: int,
+    latitud: float,
+    longitud: float,
+    limite: int = DEFAULT_LIMITE_CERCANOS,
+) -> list[dict[str, Any]]:
+    """Los `limite` lotes más próximos al punto, con la distancia en metros."""
+    return _ejecutar(bind, _consulta_cercanos(organization_id, latitud, longitud, limite))
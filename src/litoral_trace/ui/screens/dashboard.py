@@ -4,9 +4,11 @@ import pandas as pd
 import plotly.express as px
 import streamlit as st
 
-from litoral_trace.services.batch import generar_plantilla_excel, procesar_lote_masivo
+from litoral_trace.db.session import base_datos_configurada, motor_sync
+from litoral_trace.services.batch import evaluar_lote_masivo, generar_plantilla_excel, obtener_paquete
 from litoral_trace.services.compliance import evaluar_compliance_lote, generar_dds_json_traces_nt
-from litoral_trace.services.reports import generar_pdf_reporte_bytes
+from litoral_trace.services.pdf_pool import TrabajoCertificado, renderizar_certificado
+from litoral_trace.services.persistence import REGLA_SALDO_PROVEEDOR, persistir_con_libro_mayor, registro_desde_compliance
 from litoral_trace.ui.components import render_kpi_box
 from litoral_trace.ui.navigation import (
     render_logout_button,
@@ -104,20 +106,57 @@ def dashboard_screen() -> None:
             if st.button("🚀 Ejecutar Stress Test de Auditoría", type="primary"):
                 try:
                     df_upload = pd.read_excel(archivo_subido)
-                    df_resumen, zip_data = procesar_lote_masivo(df_upload)
-                    
-                    st.success("✅ Auditado Exitosamente. Resumen de Veredictos:")
-                    st.dataframe(df_resumen, use_container_width=True, hide_index=True)
-                    
+                    # Solo dictámenes: los certificados se renderizan cuando se descargan
+                    bind = motor_sync() if base_datos_configurada() else None
+                    paquete = evaluar_lote_masivo(df_upload, bind=bind, organization_id=st.session_state.get("organization_id"))
+                    st.session_state["batch_paquete_id"] = paquete.paquete_id
+                except Exception as e:
+                    st.error(f"Error procesando archivo: {e}")
+
+        try:
+            paquete = obtener_paquete(st.session_state["batch_paquete_id"]) if "batch_paquete_id" in st.session_state else None
+        except KeyError:
+            paquete = None
+        if paquete is not None:
+            st.success("✅ Auditado Exitosamente. Resumen de Veredictos:")
+            st.dataframe(paquete.resumen, use_container_width=True, hide_index=True)
+
+            d1, d2 = st.columns(2)
+            with d1:
+                indice = st.selectbox(
+                    "Certificado individual",
+                    range(len(paquete)),
+                    format_func=lambda i: f"{paquete.resumen.iloc[i]['Lote']} ({paquete.resumen.iloc[i]['Dictamen']})",
+                )
+                proveedor = paquete.resumen.iloc[indice]["Proveedor"]
+                st.download_button(
+                    label="📄 Descargar Certificado (PDF)",
+                    data=paquete.certificado_pdf(indice),
+                    file_name=f"AUDITORIA_{proveedor}.pdf",
+                    mime="application/pdf"
+                )
+            with d2:
+                if st.button("📦 Preparar Paquete Completo de Certificados y DDS (.ZIP)"):
+                    st.session_state["batch_zip"] = (paquete.paquete_id, paquete.zip_bytes())
+                zip_listo = st.session_state.get("batch_zip")
+                if zip_listo is not None and zip_listo[0] == paquete.paquete_id:
                     st.download_button(
                         label="📦 Descargar Paquete Completo de Certificados y DDS (.ZIP)",
-                        data=zip_data,
+                        data=zip_listo[1],
                         file_name="LitoralTrace_Paquete_Auditoria.zip",
                         mime="application/zip",
                         type="primary"
                     )
-                except Exception as e:
-                    st.error(f"Error procesando archivo: {e}")
+                if st.button("📑 Preparar Reporte Consolidado (PDF único)"):
+                    st.session_state["batch_reporte"] = (paquete.paquete_id, paquete.reporte_consolidado_pdf())
+                reporte_listo = st.session_state.get("batch_reporte")
+                if reporte_listo is not None and reporte_listo[0] == paquete.paquete_id:
+                    st.download_button(
+                        label="📑 Descargar Reporte Consolidado (PDF)",
+                        data=reporte_listo[1],
+                        file_name="LitoralTrace_Reporte_Consolidado.pdf",
+                        mime="application/pdf"
+                    )
 
     # Tab 3: Auditoría Manual
     with tab_manual:
@@ -140,12 +179,14 @@ def dashboard_screen() -> None:
             lat = st.number_input("Latitud Centroide", value=-27.45)
             lon = st.number_input("Longitud Centroide", value=-58.90)
             vol_in = st.number_input("Volumen Ingresado (Ton)", value=500.0)
+            guia_ingreso = st.text_input("Guía de Ingreso / Remito", value="")
             vol_out = st.number_input("Volumen Declarado para Exportar (Ton)", value=220.0)
 
         if st.button("⚖️ Evaluar Compliance & Emitir Certificado", type="primary"):
             lote_data = {
                 "identificador": nombre_lote,
                 "productor_id": proveedor_id,
+                "guia_ingreso": guia_ingreso.strip() or None,
                 "producto_forestal": producto,
                 "hectareas": hectareas,
                 "latitud": lat,
@@ -154,14 +195,19 @@ def dashboard_screen() -> None:
             }
             
             res = evaluar_compliance_lote(lote_data, vol_in, vol_out)
+            if base_datos_configurada():
+                registro = registro_desde_compliance({**lote_data, "polygon_wkt": None}, res, st.session_state.get("organization_id"))
+                rechazos = persistir_con_libro_mayor(motor_sync(), [registro])
+                if nombre_lote in rechazos:
+                    res = {**res, "dictamen": "Rojo", "regla_aplicada": REGLA_SALDO_PROVEEDOR, "observacion": rechazos[nombre_lote]}
             
             if res["dictamen"] == "Verde":
                 st.success(f"✅ {res['observacion']}")
                 
                 dds_json = generar_dds_json_traces_nt(lote_data, vol_out)
-                pdf_bytes = generar_pdf_reporte_bytes(
+                pdf_bytes = renderizar_certificado(TrabajoCertificado(
                     lote_data, res["dictamen"], res["observacion"], vol_in, vol_out, res["balance_masas"].coeficiente_rendimiento
-                )
+                ))
                 
                 dl1, dl2 = st.columns(2)
                 dl1.download_button("📄 Descargar Certificado (PDF)", data=pdf_bytes, file_name=f"CERTIFICADO_{proveedor_id}.pdf", mime="application/pdf")
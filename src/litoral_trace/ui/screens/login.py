@@ -1,6 +1,7 @@
 """Pantalla de Login B2B Enterprise - Litoral Trace."""
 from __future__ import annotations
 import streamlit as st
+from litoral_trace.db.tenant import establecer_organizacion
 
 def login_screen() -> None:
     # CSS Glassmorphism
@@ -54,6 +55,7 @@ def login_screen() -> None:
                     st.session_state["organization_name"] = "Exportadora Forestal del Chaco S.A."
                     st.session_state["rol"] = "admin"
                     st.session_state["organization_id"] = 1
+                    establecer_organizacion(1)
                     st.success("✅ Acceso autorizado.")
                     st.rerun()
                 else:
@@ -0,0 +1,112 @@
+import unittest
+import time
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from litoral_trace.api.auth import get_current_tenant_user
+from litoral_trace.auth import api_key_registry
+from litoral_trace.auth.api_key_registry import iniciar_registro_api_keys
+from litoral_trace.auth.api_keys import generate_api_key
+from litoral_trace.db.base import Base
+from litoral_trace.db.models import ApiKey, Organization, User
+
+class TestAutenticacionApiKey(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        Base.metadata.create_all(self.engine)
+        self.claves = {nombre: generate_api_key() for nombre in ("erp", "vuce", "vencida")}
+        with Session(self.engine) as session:
+            org = Organization(name="Aserradero Norte", slug="norte")
+            session.add(org)
+            session.flush()
+            user = User(organization_id=org.id, email="erp@norte.com", username="erp-norte", password_hash="x", role="manager")
+            session.add(user)
+            session.flush()
+            for nombre, clave in self.claves.items():
+                session.add(ApiKey(
+                    organization_id=org.id, user_id=user.id, name=nombre, key_prefix=clave.prefix, key_hash=clave.key_hash,
+                    permissions={"role": "auditor"} if nombre == "vuce" else None,
+                    expires_at=datetime.now(timezone.utc) - timedelta(days=1) if nombre == "vencida" else None,
+                ))
+            session.commit()
+            self.org = org.id
+        self.registro = iniciar_registro_api_keys(self.engine, refresco=3600.0, intervalo_uso=3600.0)
+
+    def tearDown(self):
+        api_key_registry.cerrar_registro_api_keys()
+        Base.metadata.drop_all(self.engine)
+
+    def _last_used(self, nombre):
+        with Session(self.engine) as session:
+            return session.execute(select(ApiKey.last_used_at).where(ApiKey.name == nombre)).scalar_one()
+
+    def test_header_y_bearer_resuelven_el_tenant(self):
+        contexto = get_current_tenant_user(x_api_key=self.claves["erp"].full_key)
+        self.assertEqual((contexto.username, contexto.organization_id, contexto.role), ("erp-norte", self.org, "manager"))
+        bearer = get_current_tenant_user(authorization=f"Bearer {self.claves['vuce'].full_key}")
+        # permissions.role restringe el rol del dueño de la clave
+        self.assertEqual(bearer.role, "auditor")
+
+    def test_claves_invalidas_vencidas_o_sin_registro(self):
+        for clave in (self.claves["erp"].full_key + "0", self.claves["erp"].prefix + "f" * 32, self.claves["vencida"].full_key):
+            with self.assertRaises(HTTPException) as ctx:
+                get_current_tenant_user(x_api_key=clave)
+            self.assertEqual(ctx.exception.status_code, 401)
+        api_key_registry.cerrar_registro_api_keys()
+        with self.assertRaises(HTTPException):
+            get_current_tenant_user(x_api_key=self.claves["erp"].full_key)
+
+    def _revocar(self, nombre):
+        with Session(self.engine) as session:
+            session.execute(update(ApiKey).where(ApiKey.name == nombre).values(
+                is_active=False, updated_at=datetime.now(timezone.utc) + timedelta(seconds=5)
+            ))
+            session.commit()
+
+    def test_revocacion_se_detecta_por_la_huella(self):
+        self.assertIsNotNone(self.registro.verificar(self.claves["erp"].full_key))
+        self.assertFalse(self.registro.refrescar())
+        self._revocar("erp")
+        self.assertTrue(self.registro.refrescar())
+        self.assertIsNone(self.registro.verificar(self.claves["erp"].full_key))
+        self.assertIsNotNone(self.registro.verificar(self.claves["vuce"].full_key))
+
+    def test_verificar_no_consulta_la_base(self):
+        with mock.patch.object(self.engine, "connect", side_effect=AssertionError("E/S en el event loop")):
+            for _ in range(10):
+                self.assertIsNotNone(self.registro.verificar(self.claves["erp"].full_key))
+
+    def test_hilo_recarga_tras_invalidar(self):
+        self._revocar("erp")
+        self.assertIsNotNone(self.registro.verificar(self.claves["erp"].full_key))
+        self.registro.invalidar()
+        limite = time.monotonic() + 5
+        while self.registro.verificar(self.claves["erp"].full_key) is not None:
+            self.assertLess(time.monotonic(), limite)
+            time.sleep(0.01)
+
+    def test_last_used_at_se_agrupa_sin_recargar_el_registro(self):
+        self.registro.recargar()
+        with mock.patch.object(self.registro, "recargar", wraps=self.registro.recargar) as recargar:
+            for _ in range(100):
+                self.registro.verificar(self.claves["erp"].full_key)
+            self.registro.verificar(self.claves["vuce"].full_key)
+            self.assertIsNone(self._last_used("erp"))
+            self.assertEqual(self.registro.volcar_usos(), 2)
+            self.assertIsNotNone(self._last_used("erp"))
+            self.assertEqual(self.registro.volcar_usos(), 0)
+            self.registro.verificar(self.claves["erp"].full_key)
+        self.assertEqual(recargar.call_count, 0)
+
+    def test_cierre_vuelca_usos_pendientes(self):
+        get_current_tenant_user(x_api_key=self.claves["vuce"].full_key)
+        api_key_registry.cerrar_registro_api_keys()
+        self.assertIsNotNone(self._last_used("vuce"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import asyncio
+import os
+import time
+from unittest import mock
+
+from fastapi import HTTPException, Response
+
+from litoral_trace.api.auth import login_b2b, LoginRequest, get_current_tenant_user
+from litoral_trace.api.lotes import evaluar_compliance_endpoint, LoteEvaluacionRequest
+from litoral_trace.services import compliance
+from litoral_trace.services.compliance import evaluar_compliance_lote, evaluar_compliance_lote_async
+
+LOTE = {
+    "identificador": "Rodal Async 01",
+    "productor_id": "30-12345678-9",
+    "producto_forestal": "Madera Aserrada (Pino)",
+    "latitud": -27.45,
+    "longitud": -58.90,
+}
+
+class TestComplianceAsincronico(unittest.TestCase):
+    def test_resultado_identico_a_version_sincronica(self):
+        sync = evaluar_compliance_lote(LOTE, 500.0, 220.0)
+        res = asyncio.run(evaluar_compliance_lote_async(LOTE, 500.0, 220.0))
+        self.assertEqual(res["dictamen"], sync["dictamen"])
+        self.assertEqual(res["regla_aplicada"], sync["regla_aplicada"])
+        self.assertEqual(res["balance_masas"], sync["balance_masas"])
+        self.assertEqual(res["satelital"]["actual"], sync["satelital"]["actual"])
+
+    def test_etapa_lenta_no_bloquea_event_loop(self):
+        original = compliance.calcular_ndvi_simulado
+        lento = mock.Mock(side_effect=lambda lat, lon: (time.sleep(0.3), original(lat, lon))[1])
+
+        async def escenario():
+            ticks = 0
+
+            async def latido():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            tarea = asyncio.create_task(latido())
+            await evaluar_compliance_lote_async(LOTE, 500.0, 220.0)
+            tarea.cancel()
+            return ticks
+
+        with mock.patch.object(compliance, "calcular_ndvi_simulado", lento):
+            ticks = asyncio.run(escenario())
+        self.assertGreater(ticks, 10)
+
+    def test_deadline_excedido_responde_504(self):
+        token_res = asyncio.run(login_b2b(LoginRequest(username="admin", password="admin123"), Response()))
+        user = get_current_tenant_user(authorization=f"Bearer {token_res.access_token}")
+        payload = LoteEvaluacionRequest(
+            identificador="Rodal Lento", productor_id="30-12345678-9",
+            volumen_ingresado_ton=500.0, volumen_exportar_ton=220.0,
+        )
+        original = compliance.calcular_ndvi_simulado
+        lento = mock.Mock(side_effect=lambda lat, lon: (time.sleep(0.5), original(lat, lon))[1])
+
+        with mock.patch.object(compliance, "calcular_ndvi_simulado", lento), \
+                mock.patch.dict(os.environ, {compliance.COMPLIANCE_DEADLINE_ENV: "0.05"}):
+            with self.assertRaises(HTTPException) as ctx:
+                asyncio.run(evaluar_compliance_endpoint(payload, user=user))
+        self.assertEqual(ctx.exception.status_code, 504)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import unittest
+import os
+import tempfile
+import threading
+from datetime import date, datetime, timezone
+from pathlib import Path
+from unittest import mock
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from litoral_trace.db.base import Base
+from litoral_trace.db.models import AuditCheckpoint, AuditLog, Organization
+from litoral_trace.services import audit_archive, audit_chain
+from litoral_trace.services.merkle import MANIFIESTO_SECRET_ENV
+from litoral_trace.services.audit_archive import (
+    archivar_antiguos, consultar_auditoria, crear_particiones, meses_archivables, nombre_particion, ruta_archivo,
+)
+from litoral_trace.services.audit_chain import registrar_eventos, verificar_cadena
+
+HOY = date(2026, 10, 15)
+
+def _en(anio, mes, dia=10):
+    return datetime(anio, mes, dia, 12, 0, tzinfo=timezone.utc)
+
+class TestArchivoAuditoria(unittest.TestCase):
+    def setUp(self):
+        self.entorno = mock.patch.dict(os.environ, {audit_chain.AUDIT_CHECKPOINT_CADA_ENV: "0", MANIFIESTO_SECRET_ENV: "clave-de-prueba"})
+        self.entorno.start()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directorio = Path(self.tmp.name)
+        self.engine = create_engine("sqlite:///:memory:", echo=False)
+        Base.metadata.create_all(self.engine)
+        with Session(self.engine) as session:
+            orgs = [Organization(name="Aserradero Norte", slug="norte"), Organization(name="Aserradero Sur", slug="sur")]
+            session.add_all(orgs)
+            session.flush()
+            self.org, self.otra = orgs[0].id, orgs[1].id
+            for fecha, acciones in ((_en(2024, 1), 3), (_en(2024, 2), 2), (_en(2026, 9), 4)):
+                registrar_eventos(session, [{
+                    "organization_id": self.org, "action": "LOTE_EVALUADO" if i % 2 else "LOGIN",
+                    "entity_type": "Lote", "entity_id": i, "after_data": {"estatus": "Verde", "ton": 12.5},
+                    "timestamp": fecha,
+                } for i in range(acciones)])
+            registrar_eventos(session, [{"organization_id": self.otra, "action": "LOGIN", "entity_type": "User", "timestamp": _en(2024, 1)}])
+            session.commit()
+
+    def tearDown(self):
+        Base.metadata.drop_all(self.engine)
+        self.tmp.cleanup()
+        self.entorno.stop()
+
+    def test_nombres_y_meses_fuera_de_retencion(self):
+        self.assertEqual(nombre_particion(date(2026, 3, 1)), "audit_logs_p2026_03")
+        self.assertEqual(meses_archivables(self.engine, retencion=12, hoy=HOY)[:2], [date(2024, 1, 1), date(2024, 2, 1)])
+        self.assertEqual(meses_archivables(self.engine, retencion=12, hoy=HOY)[-1], date(2025, 9, 1))
+        self.assertEqual(meses_archivables(self.engine, retencion=40, hoy=HOY), [])
+        # Sin tabla particionada (SQLite) no hay DDL que ejecutar
+        self.assertEqual(crear_particiones(self.engine, hoy=HOY), [])
+
+    def test_archiva_a_parquet_y_lee_transparente(self):
+        completo = consultar_auditoria(self.engine, self.org, directorio=self.directorio)
+        archivados = archivar_antiguos(self.engine, self.directorio, retencion=12, hoy=HOY)
+        self.assertEqual({(a.mes, a.registros) for a in archivados if a.registros}, {(date(2024, 1, 1), 4), (date(2024, 2, 1), 2)})
+        self.assertTrue(ruta_archivo(date(2024, 1, 1), self.directorio).exists())
+        self.assertEqual(len(list(self.directorio.glob("*.parquet"))), 2)
+
+        with Session(self.engine) as session:
+            self.assertEqual(session.execute(select(func.count()).select_from(AuditLog)).scalar_one(), 4)
+        leido = consultar_auditoria(self.engine, self.org, directorio=self.directorio)
+        self.assertEqual(list(leido["id"]), list(completo["id"]))
+        self.assertEqual(list(leido["hash_registro"]), list(completo["hash_registro"]))
+        self.assertEqual(leido.iloc[1]["after_data"], {"estatus": "Verde", "ton": 12.5})
+
+        periodo = consultar_auditoria(self.engine, self.org, desde=_en(2024, 2, 1), hasta=_en(2026, 9, 11),
+                                      directorio=self.directorio, action="LOGIN")
+        self.assertEqual(len(periodo), 3)
+        self.assertTrue((periodo["action"] == "LOGIN").all())
+        self.assertEqual(len(consultar_auditoria(self.engine, self.otra, directorio=self.directorio)), 1)
+        with self.assertRaises(ValueError):
+            consultar_auditoria(self.engine, self.org, detail="x")
+
+    def test_la_cadena_continua_tras_archivar(self):
+        archivar_antiguos(self.engine, self.directorio, retencion=12, hoy=HOY)
+        with Session(self.engine) as session:
+            checkpoint = session.execute(
+                select(AuditCheckpoint).where(AuditCheckpoint.organization_id == self.otra)
+            ).scalar_one()
+            self.assertEqual(checkpoint.secuencia_hasta, 1)
+            # El tenant sin registros en la base retoma la secuencia desde su checkpoint
+            fila = registrar_eventos(session, [{"organization_id": self.otra, "action": "LOGIN", "entity_type": "User"}])[0]
+            self.assertEqual((fila["secuencia"], fila["hash_previo"]), (2, checkpoint.hash_registro))
+            session.commit()
+            self.assertTrue(verificar_cadena(session, self.otra).es_valida)
+            self.assertTrue(verificar_cadena(session, self.org).es_valida)
+
+class TestParticionesAuditoria(unittest.TestCase):
+    def test_crea_particiones_al_iniciar_y_periodicamente(self):
+        llamadas, segunda = [], threading.Event()
+
+        def crear(bind, meses_adelante):
+            llamadas.append(meses_adelante)
+            if len(llamadas) == 1:
+                raise OSError("base caída")  # un fallo no detiene el mantenimiento
+            segunda.set()
+            return ["audit_logs_p2026_10"]
+
+        with mock.patch.object(audit_archive, "crear_particiones", side_effect=crear):
+            particiones = audit_archive.iniciar_particiones_auditoria(object(), refresco=0.01, meses_adelante=2)
+            self.assertTrue(segunda.wait(5))
+            audit_archive.cerrar_particiones_auditoria()
+        self.assertEqual(llamadas[:2], [2, 2])
+        self.assertEqual(particiones.particiones, ["audit_logs_p2026_10"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+import unittest
+import os
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+import numpy as np
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from litoral_trace.db.base import Base
+from litoral_trace.db.models import AuditCheckpoint, AuditLog, Organization
+from litoral_trace.services import audit_chain
+from litoral_trace.services.audit_chain import (
+    HASH_GENESIS, crear_checkpoint, encadenar_eventos, registrar_evento, registrar_eventos, verificar_cadena,
+)
+from litoral_trace.services.merkle import MANIFIESTO_SECRET_ENV
+
+def _eventos(org_id, n, **extra):
+    return [{
+        "organization_id": org_id,
+        "username": "auditor",
+        "action": "LOTE_EVALUADO",
+        "entity_type": "Lote",
+        "entity_id": i,
+        "after_data": {"estatus": "Verde", "hectareas": np.float64(10.5 + i)},
+        **extra,
+    } for i in range(n)]
+
+class TestCadenaAuditoria(unittest.TestCase):
+    def setUp(self):
+        self.entorno = mock.patch.dict(os.environ, {audit_chain.AUDIT_CHECKPOINT_CADA_ENV: "0", MANIFIESTO_SECRET_ENV: "clave-de-prueba"})
+        self.entorno.start()
+        self.engine = create_engine("sqlite:///:memory:", echo=False)
+        Base.metadata.create_all(self.engine)
+        with Session(self.engine) as session:
+            orgs = [Organization(name="Aserradero Norte", slug="norte"), Organization(name="Aserradero Sur", slug="sur")]
+            session.add_all(orgs)
+            session.commit()
+            self.org, self.otra = orgs[0].id, orgs[1].id
+
+    def tearDown(self):
+        Base.metadata.drop_all(self.engine)
+        self.entorno.stop()
+
+    def test_escritores_se_serializan_con_candado_consultivo_por_tenant(self):
+        sentencias = []
+
+        def ejecutar(stmt):
+            sentencias.append(str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})))
+            resultado = mock.Mock()
+            resultado.first.return_value = None
+            resultado.scalar_one_or_none.return_value = None
+            return resultado
+
+        session = mock.Mock(execute=ejecutar)
+        session.get_bind.return_value.dialect = postgresql.dialect()
+        filas = encadenar_eventos(session, _eventos(9, 2) + _eventos(3, 1))
+        self.assertEqual([f["secuencia"] for f in filas], [1, 2, 1])
+        # Candados en orden de tenant y antes de leer cualquier cabeza (también para tenants sin registros)
+        self.assertEqual(sentencias[:2], [
+            f"SELECT pg_advisory_xact_lock({audit_chain.CANDADO_CADENA_AUDITORIA}, 3) AS pg_advisory_xact_lock_1",
+            f"SELECT pg_advisory_xact_lock({audit_chain.CANDADO_CADENA_AUDITORIA}, 9) AS pg_advisory_xact_lock_1",
+        ])
+        self.assertFalse(any("FOR UPDATE" in sql for sql in sentencias))
+
+    def test_cadena_por_tenant_y_verificacion_completa(self):
+        with Session(self.engine) as session:
+            registrar_eventos(session, _eventos(self.org, 5) + _eventos(self.otra, 3))
+            registrar_evento(session, organization_id=self.org, action="LOGIN", entity_type="User")
+            session.commit()
+            logs = session.execute(
+                select(AuditLog).where(AuditLog.organization_id == self.org).order_by(AuditLog.secuencia)
+            ).scalars().all()
+            self.assertEqual([l.secuencia for l in logs], list(range(1, 7)))
+            self.assertEqual(logs[0].hash_previo, HASH_GENESIS)
+            self.assertTrue(all(b.hash_previo == a.hash_registro for a, b in zip(logs, logs[1:])))
+
+            resultado = verificar_cadena(session, self.org, completa=True)
+            self.assertTrue(resultado.es_valida, resultado.mensaje)
+            self.assertEqual(resultado.registros_verificados, 6)
+            self.assertEqual(verificar_cadena(session, self.otra).registros_verificados, 3)
+
+    def test_detecta_modificacion_borrado_y_reenlace(self):
+        with Session(self.engine) as session:
+            registrar_eventos(session, _eventos(self.org, 6))
+            session.commit()
+            session.execute(update(AuditLog).where(AuditLog.secuencia == 4).values(detail="editado"))
+            resultado = verificar_cadena(session, self.org, completa=True)
+            self.assertFalse(resultado.es_valida)
+            self.assertEqual(resultado.secuencia_rota, 4)
+            self.assertEqual(resultado.registros_verificados, 3)
+            session.rollback()
+
+            session.execute(AuditLog.__table__.delete().where(AuditLog.secuencia == 2))
+            self.assertEqual(verificar_cadena(session, self.org, completa=True).secuencia_rota, 2)
+            session.rollback()
+
+            # Recalcular el hash de la fila editada no alcanza: la siguiente deja de apuntarle
+            fila = session.execute(select(AuditLog).where(AuditLog.secuencia == 3)).scalar_one()
+            fila.detail = "editado"
+            fila.hash_registro = audit_chain.hash_registro_auditoria(
+                {c: getattr(fila, c) for c in audit_chain.CAMPOS_SELLADOS}, fila.hash_previo
+            )
+            session.flush()
+            self.assertEqual(verificar_cadena(session, self.org, completa=True).secuencia_rota, 4)
+
+    def test_checkpoints_acotan_la_verificacion_incremental(self):
+        with mock.patch.dict(os.environ, {audit_chain.AUDIT_CHECKPOINT_CADA_ENV: "10"}):
+            with Session(self.engine) as session:
+                for _ in range(5):
+                    registrar_eventos(session, _eventos(self.org, 7))
+                session.commit()
+                checkpoints = session.execute(select(AuditCheckpoint).order_by(AuditCheckpoint.secuencia_hasta)).scalars().all()
+                self.assertEqual([(c.secuencia_desde, c.secuencia_hasta) for c in checkpoints], [(0, 14), (14, 28)])
+
+                incremental = verificar_cadena(session, self.org)
+                self.assertTrue(incremental.es_valida)
+                self.assertEqual((incremental.secuencia_ancla, incremental.registros_verificados), (28, 7))
+                registrar_eventos(session, _eventos(self.org, 2))
+                self.assertEqual(verificar_cadena(session, self.org).registros_verificados, 9)
+
+                completa = verificar_cadena(session, self.org, completa=True)
+                self.assertTrue(completa.es_valida, completa.mensaje)
+                self.assertEqual(completa.registros_verificados, 37)
+
+                session.execute(update(AuditCheckpoint).where(AuditCheckpoint.secuencia_hasta == 28).values(raiz_merkle="0" * 64))
+                self.assertFalse(verificar_cadena(session, self.org, completa=True).es_valida)
+                self.assertFalse(verificar_cadena(session, self.org, desde=datetime(2000, 1, 1)).es_valida)
+
+    def test_verificacion_por_periodo_y_checkpoint_sobre_cadena_rota(self):
+        with Session(self.engine) as session:
+            antes = datetime.now(timezone.utc) - timedelta(days=40)
+            registrar_eventos(session, _eventos(self.org, 4, timestamp=antes))
+            crear_checkpoint(session, self.org)
+            registrar_eventos(session, _eventos(self.org, 3))
+            session.commit()
+
+            periodo = verificar_cadena(session, self.org, desde=datetime.now(timezone.utc) - timedelta(days=1))
+            self.assertTrue(periodo.es_valida)
+            self.assertEqual((periodo.secuencia_ancla, periodo.registros_verificados), (4, 3))
+            vacio = verificar_cadena(session, self.org, hasta=antes - timedelta(days=1))
+            self.assertEqual(vacio.registros_verificados, 0)
+
+            session.execute(update(AuditLog).where(AuditLog.secuencia == 6).values(action="OTRA"))
+            with self.assertRaises(ValueError):
+                crear_checkpoint(session, self.org)
+
+if __name__ == "__main__":
+    unittest.main()
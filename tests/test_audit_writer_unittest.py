@@ -0,0 +1,175 @@
+import unittest
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from litoral_trace.db.base import Base
+from litoral_trace.db.models import AuditLog, Organization
+from litoral_trace.services import audit_chain, audit_writer
+from litoral_trace.services.audit_chain import verificar_cadena
+from litoral_trace.services.audit_writer import DURABILIDAD_BUFFER, DURABILIDAD_SINCRONA, EscritorAuditoria
+
+def _esperar(condicion, timeout=5.0):
+    limite = time.monotonic() + timeout
+    while not condicion():
+        if time.monotonic() > limite:
+            raise AssertionError("Tiempo de espera agotado")
+        time.sleep(0.01)
+
+class TestEscritorAuditoria(unittest.TestCase):
+    def setUp(self):
+        self.entorno = mock.patch.dict(os.environ, {audit_chain.AUDIT_CHECKPOINT_CADA_ENV: "0"})
+        self.entorno.start()
+        self.engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        Base.metadata.create_all(self.engine)
+        with Session(self.engine) as session:
+            org = Organization(name="Aserradero Norte", slug="norte")
+            session.add(org)
+            session.commit()
+            self.org = org.id
+
+    def tearDown(self):
+        audit_writer.cerrar_escritor_auditoria()
+        Base.metadata.drop_all(self.engine)
+        self.entorno.stop()
+
+    def _evento(self, i, **extra):
+        return {"organization_id": self.org, "username": "operador", "action": "DESCARGA_CERTIFICADO",
+                "entity_type": "Lote", "entity_id": i, **extra}
+
+    def _total(self):
+        with Session(self.engine) as session:
+            return session.execute(select(func.count()).select_from(AuditLog)).scalar_one()
+
+    def test_diferidos_se_vuelcan_por_lotes_y_al_cerrar(self):
+        escritor = EscritorAuditoria(self.engine, tamano_lote=50, intervalo=30.0)
+        for i in range(120):
+            self.assertIsNone(escritor.registrar(self._evento(i)))
+        # Dos lotes completos salen por tamaño; el resto espera al intervalo o al cierre
+        _esperar(lambda: escritor.eventos_escritos == 100)
+        self.assertEqual(escritor.lotes_escritos, 2)
+        self.assertTrue(escritor.cerrar(timeout=5))
+        self.assertEqual(self._total(), 120)
+        with self.assertRaises(RuntimeError):
+            escritor.registrar(self._evento(0))
+        with Session(self.engine) as session:
+            self.assertTrue(verificar_cadena(session, self.org, completa=True).es_valida)
+
+    def test_intervalo_vuelca_eventos_sueltos(self):
+        escritor = EscritorAuditoria(self.engine, tamano_lote=1000, intervalo=0.05)
+        escritor.registrar(self._evento(1))
+        _esperar(lambda: self._total() == 1)
+        escritor.cerrar()
+
+    def test_sincrono_espera_el_commit_y_arrastra_pendientes(self):
+        escritor = EscritorAuditoria(self.engine, tamano_lote=100, intervalo=30.0)
+        for i in range(5):
+            escritor.registrar(self._evento(i))
+        fila = escritor.registrar(self._evento(99, action="ADMIN_TOGGLE_ORG"), DURABILIDAD_SINCRONA)
+        self.assertEqual(fila["secuencia"], 6)
+        self.assertEqual(self._total(), 6)
+        self.assertEqual(escritor.lotes_escritos, 1)
+        fila_async = asyncio.run(escritor.registrar_async(self._evento(100), DURABILIDAD_SINCRONA))
+        self.assertEqual(fila_async["secuencia"], 7)
+        with self.assertRaises(ValueError):
+            escritor.registrar(self._evento(0), "eventual")
+        escritor.cerrar()
+
+    def test_fallo_de_escritura_reintenta_diferidos_y_propaga_sincronos(self):
+        escritor = EscritorAuditoria(self.engine, tamano_lote=100, intervalo=30.0)
+        real, fallos = audit_writer.registrar_eventos, [OSError("base caída")]
+
+        def registrar_con_fallo(session, eventos):
+            if fallos:
+                raise fallos.pop()
+            return real(session, eventos)
+
+        with mock.patch.object(audit_writer, "registrar_eventos", side_effect=registrar_con_fallo):
+            escritor.registrar(self._evento(1), DURABILIDAD_BUFFER)
+            with self.assertRaises(OSError):
+                escritor.registrar(self._evento(2), DURABILIDAD_SINCRONA)
+            self.assertIsInstance(escritor.ultimo_error, OSError)
+            self.assertTrue(escritor.cerrar(timeout=5))
+        self.assertEqual(self._total(), 1)
+
+    def test_fila_invalida_se_aisla_y_va_a_dead_letter(self):
+        dead_letter = os.path.join(tempfile.mkdtemp(), "auditoria.jsonl")
+        escritor = EscritorAuditoria(self.engine, tamano_lote=10, intervalo=0.01, max_intentos=2, dead_letter=dead_letter)
+        real = audit_writer.registrar_eventos
+
+        def rechazar_veneno(session, eventos):
+            if any(evento["entity_id"] == 3 for evento in eventos):
+                raise ValueError("fila inválida")
+            return real(session, eventos)
+
+        with mock.patch.object(audit_writer, "registrar_eventos", side_effect=rechazar_veneno):
+            for i in range(6):
+                escritor.registrar(self._evento(i))
+            _esperar(lambda: escritor.eventos_escritos == 5)
+            self.assertFalse(escritor.cerrar(timeout=5))
+        self.assertEqual(self._total(), 5)
+        self.assertEqual([evento["entity_id"] for evento in escritor.no_escritos], [3])
+        with open(dead_letter, encoding="utf-8") as archivo:
+            self.assertEqual([json.loads(linea)["entity_id"] for linea in archivo], [3])
+
+    def test_contrapresion_async_no_bloquea_el_event_loop(self):
+        escritor = EscritorAuditoria(self.engine, tamano_lote=1, intervalo=30.0, capacidad=1)
+        liberar = threading.Event()
+        real = audit_writer.registrar_eventos
+
+        def escritura_lenta(session, eventos):
+            liberar.wait(5)
+            return real(session, eventos)
+
+        async def escenario():
+            latidos = 0
+
+            async def latir():
+                nonlocal latidos
+                while True:
+                    latidos += 1
+                    await asyncio.sleep(0.01)
+
+            latido = asyncio.create_task(latir())
+            # El primero ocupa al escritor, el segundo llena la cola y el tercero debe esperar lugar
+            for i in range(2):
+                await escritor.registrar_async(self._evento(i))
+            _esperar(lambda: escritor.pendientes == 1)
+            tercero = asyncio.create_task(escritor.registrar_async(self._evento(2)))
+            await asyncio.sleep(0.2)
+            self.assertFalse(tercero.done())
+            self.assertGreater(latidos, 5)
+            liberar.set()
+            await asyncio.wait_for(tercero, 5)
+            latido.cancel()
+
+        with mock.patch.object(audit_writer, "registrar_eventos", side_effect=escritura_lenta):
+            asyncio.run(escenario())
+            self.assertTrue(escritor.cerrar(timeout=5))
+        self.assertEqual(self._total(), 3)
+
+    def test_auditar_sin_escritor_no_hace_nada(self):
+        self.assertIsNone(asyncio.run(audit_writer.auditar(self._evento(1))))
+        audit_writer.iniciar_escritor_auditoria(self.engine, tamano_lote=10, intervalo=30.0)
+        fila = asyncio.run(audit_writer.auditar(self._evento(2, action="CREAR_ORGANIZACION"), DURABILIDAD_SINCRONA))
+        self.assertEqual(fila["secuencia"], 1)
+        self.assertEqual(self._total(), 1)
+
+    def test_escritor_compartido_del_proceso(self):
+        escritor = audit_writer.iniciar_escritor_auditoria(self.engine, tamano_lote=10, intervalo=30.0)
+        self.assertIs(audit_writer.escritor_auditoria(), escritor)
+        escritor.registrar(self._evento(1))
+        self.assertTrue(audit_writer.cerrar_escritor_auditoria())
+        self.assertIsNone(audit_writer.escritor_auditoria())
+        self.assertEqual(self._total(), 1)
+
+if __name__ == "__main__":
+    unittest.main()
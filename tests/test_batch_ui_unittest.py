@@ -1,10 +1,18 @@
 import unittest
 import io
+import os
+from unittest import mock
 import pandas as pd
 from litoral_trace.ui.theme import PALETTE, ENTERPRISE_THEME_CSS
 from litoral_trace.services.batch import generar_plantilla_excel, procesar_lote_masivo, BATCH_COLUMNAS
+from litoral_trace.services.merkle import MANIFIESTO_SECRET_ENV
 
 class TestBatchAndUI(unittest.TestCase):
+    def setUp(self):
+        entorno = mock.patch.dict(os.environ, {MANIFIESTO_SECRET_ENV: "clave-de-prueba"})
+        entorno.start()
+        self.addCleanup(entorno.stop)
+
     def test_theme_palette_and_css(self):
         self.assertIn("primary", PALETTE)
         self.assertIn("success", PALETTE)
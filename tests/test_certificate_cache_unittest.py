@@ -0,0 +1,46 @@
+import unittest
+import os
+from unittest import mock
+
+from litoral_trace.services import pdf_pool
+from litoral_trace.services.certificate_cache import CacheCertificados, cache_certificados
+from litoral_trace.services.pdf_pool import TrabajoCertificado, renderizar_certificado, renderizar_en_orden
+from litoral_trace.services.reports import extraer_sello, generar_pdf_reporte_bytes, verificar_certificado
+
+LOTE = {"identificador": "Rodal Sur 02", "productor_id": "30-22222222-2", "producto_forestal": "Carbón Vegetal", "hectareas": 85.0}
+ARGS = (LOTE, "Verde", "APROBADO / COMPLIANT.", 400.0, 90.0, 0.25)
+
+class TestSelloYCacheCertificados(unittest.TestCase):
+    def setUp(self):
+        cache_certificados().limpiar()
+
+    def test_sello_deterministico_y_verificable(self):
+        pdf = generar_pdf_reporte_bytes(*ARGS)
+        self.assertEqual(pdf, generar_pdf_reporte_bytes(*ARGS))
+        self.assertEqual(len(extraer_sello(pdf)), 64)
+        self.assertTrue(verificar_certificado(pdf, *ARGS))
+        self.assertFalse(verificar_certificado(pdf, LOTE, "Verde", "APROBADO / COMPLIANT.", 400.0, 95.0, 0.25))
+
+    def test_lru_por_bytes(self):
+        cache = CacheCertificados(capacidad_bytes=10)
+        cache.guardar("a", b"1234")
+        cache.guardar("b", b"5678")
+        self.assertEqual(cache.obtener("a"), b"1234")  # "a" pasa a ser la más reciente
+        cache.guardar("c", b"90ab")
+        self.assertNotIn("b", cache)
+        self.assertIn("a", cache)
+        cache.guardar("enorme", b"x" * 11)
+        self.assertNotIn("enorme", cache)
+        self.assertLessEqual(cache.estadisticas().bytes_ocupados, 10)
+
+    def test_reimpresion_devuelve_bytes_cacheados(self):
+        trabajo = TrabajoCertificado(*ARGS)
+        with mock.patch.dict(os.environ, {pdf_pool.PDF_WORKERS_ENV: "0"}):
+            primero = renderizar_certificado(trabajo)
+            with mock.patch.object(pdf_pool, "renderizar_trabajo", side_effect=AssertionError("no debe re-renderizar")):
+                self.assertIs(renderizar_certificado(trabajo), primero)
+                self.assertEqual(list(renderizar_en_orden([trabajo, trabajo])), [primero, primero])
+        self.assertGreaterEqual(cache_certificados().estadisticas().aciertos, 3)
+
+if __name__ == "__main__":
+    unittest.main()
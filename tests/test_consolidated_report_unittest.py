@@ -0,0 +1,115 @@
+import unittest
+import io
+import re
+import zlib
+
+import pandas as pd
+
+from litoral_trace.services.batch import evaluar_lote_masivo
+from litoral_trace.services.consolidated_report import FILAS_RESUMEN_POR_PAGINA, escribir_reporte_consolidado
+from litoral_trace.services.pdf_writer import envolver_texto, ancho_texto
+
+def _matriz(n, proveedores=3):
+    return pd.DataFrame([{
+        "Identificador_Lote": f"RODAL-{i:03d}",
+        "ID_Proveedor": f"30-{i % proveedores:08d}-1",
+        "Producto_Forestal": "Madera Aserrada (Pino)",
+        "Hectareas": 50.0,
+        "Latitud": -27.45,
+        "Longitud": -58.90,
+        "Volumen_Ingresado_Ton": 100.0,
+        "Volumen_Exportar_Ton": 45.0 if i % 3 else 90.0,
+    } for i in range(n)])
+
+def _objetos(pdf_bytes):
+    """Objetos indirectos por id, leídos desde la tabla xref (valida también los offsets)."""
+    inicio_xref = int(re.search(rb"startxref\n(\d+)", pdf_bytes).group(1))
+    cabecera = re.match(rb"xref\n0 (\d+)\n", pdf_bytes[inicio_xref:])
+    total = int(cabecera.group(1))
+    filas = pdf_bytes[inicio_xref + cabecera.end():].split(b"\n")[1:total]
+    objetos = {}
+    for objeto_id, fila in enumerate(filas, start=1):
+        offset = int(fila[:10])
+        fin = pdf_bytes.index(b"endobj", offset)
+        assert pdf_bytes[offset:].startswith(f"{objeto_id} 0 obj".encode()), objeto_id
+        objetos[objeto_id] = pdf_bytes[offset:fin]
+    return objetos
+
+def _texto_paginas(objetos):
+    textos = []
+    for cuerpo in objetos.values():
+        if b"/Type /Page " not in cuerpo:
+            continue
+        contenido_id = int(re.search(rb"/Contents (\d+) 0 R", cuerpo).group(1))
+        flujo = objetos[contenido_id]
+        datos = flujo[flujo.index(b"stream\n") + 7:flujo.rindex(b"\nendstream")]
+        textos.append(zlib.decompress(datos).decode("cp1252"))
+    return textos
+
+class TestReporteConsolidado(unittest.TestCase):
+    def _reporte(self, n, proveedores=3):
+        paquete = evaluar_lote_masivo(_matriz(n, proveedores), registrar=False)
+        return paquete, paquete.reporte_consolidado_pdf()
+
+    def test_una_pagina_por_lote_mas_resumen(self):
+        paquete, pdf_bytes = self._reporte(50)
+        self.assertTrue(pdf_bytes.startswith(b"%PDF-1.4"))
+        self.assertTrue(pdf_bytes.rstrip().endswith(b"%%EOF"))
+        objetos = _objetos(pdf_bytes)
+        paginas = _texto_paginas(objetos)
+        self.assertEqual(len(paginas), 50 + 2)
+        self.assertIn("/Count 52", next(c.decode() for c in objetos.values() if b"/Type /Pages" in c))
+        self.assertIn("RESUMEN DEL BATCH", paginas[0])
+        self.assertIn("(RODAL-000)", paginas[0])
+        self.assertIn("(RODAL-049)", paginas[1])
+        self.assertIn("(RODAL-007)", paginas[2 + 7])
+
+    def test_fuentes_y_recursos_compartidos(self):
+        _, chico = self._reporte(5)
+        _, grande = self._reporte(120)
+        for pdf_bytes in (chico, grande):
+            objetos = _objetos(pdf_bytes)
+            fuentes = [c for c in objetos.values() if b"/Type /Font" in c]
+            self.assertEqual(len(fuentes), 3)
+            recursos = {re.search(rb"/Resources (\d+) 0 R", c).group(1) for c in objetos.values() if b"/Type /Page " in c}
+            self.assertEqual(len(recursos), 1)
+        # El costo marginal por lote es una página, no un documento completo
+        self.assertLess((len(grande) - len(chico)) / 115, 2500)
+
+    def test_indice_de_marcadores_por_proveedor(self):
+        paquete, pdf_bytes = self._reporte(12, proveedores=4)
+        objetos = _objetos(pdf_bytes)
+        raiz = next(c for c in objetos.values() if b"/Type /Outlines" in c)
+        self.assertIn(b"/Count 5", raiz)  # resumen + 4 proveedores
+        titulos = re.findall(rb"/Title \(([^)]*)\)", pdf_bytes)
+        self.assertEqual(titulos.count(b"Resumen del batch"), 1)
+        grupos = [t for t in titulos if t.startswith(b"Proveedor ")]
+        self.assertEqual(len(grupos), 4)
+        self.assertEqual(len([t for t in titulos if t.startswith(b"RODAL-")]), 12)
+        grupo = next(c for c in objetos.values() if b"/Title (Proveedor 30-00000001-1)" in c)
+        self.assertIn(b"/Count -3", grupo)
+        catalogo = next(c for c in objetos.values() if b"/Type /Catalog" in c)
+        self.assertIn(b"/PageMode /UseOutlines", catalogo)
+
+    def test_emision_por_bloques_y_determinista(self):
+        paquete, pdf_bytes = self._reporte(40)
+        bloques = list(paquete.iterar_reporte_consolidado(tamano_bloque=4096))
+        self.assertGreater(len(bloques), 3)
+        self.assertTrue(all(len(b) < 4096 + 8192 for b in bloques))
+        self.assertEqual(b"".join(bloques), pdf_bytes)
+
+    def test_paginas_resumen_adicionales(self):
+        salida = io.BytesIO()
+        df_eval = evaluar_lote_masivo(_matriz(FILAS_RESUMEN_POR_PAGINA * 2 + 1), registrar=False).df_eval
+        paginas = list(escribir_reporte_consolidado(df_eval, salida))
+        self.assertEqual(paginas[-1], 3 + len(df_eval))
+
+    def test_envolver_texto_respeta_ancho(self):
+        texto = "Balance de masas excedido: el volumen declarado supera el máximo exportable " * 4
+        lineas = envolver_texto(texto, 100, "", 9)
+        self.assertGreater(len(lineas), 1)
+        self.assertTrue(all(ancho_texto(l, "", 9) <= 100 for l in lineas))
+        self.assertEqual(" ".join(lineas).split(), texto.split())
+
+if __name__ == "__main__":
+    unittest.main()
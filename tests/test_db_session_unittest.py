@@ -0,0 +1,82 @@
+import unittest
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from sqlalchemy import text
+
+from litoral_trace.db import session as db_session
+from litoral_trace.db.session import dimensionar_pool, normalizar_url, opciones_motor
+
+class TestConfiguracionMotores(unittest.TestCase):
+    def test_normalizar_url(self):
+        url = "postgresql://u:p@db:5432/litoral"
+        self.assertEqual(normalizar_url(url), "postgresql+psycopg://u:p@db:5432/litoral")
+        self.assertEqual(normalizar_url("postgres://u:p@db/l"), "postgresql+psycopg://u:p@db/l")
+        self.assertEqual(normalizar_url("postgresql+psycopg://u@db/l"), "postgresql+psycopg://u@db/l")
+        self.assertEqual(normalizar_url("postgresql+asyncpg://u@db/l"), "postgresql+psycopg://u@db/l")
+        self.assertEqual(normalizar_url("sqlite:///x.db"), "sqlite:///x.db")
+
+    def test_pool_entra_en_max_connections(self):
+        for max_conexiones, workers in ((100, 4), (200, 4), (50, 2), (30, 4)):
+            pool = dimensionar_pool(max_conexiones=max_conexiones, workers=workers)
+            self.assertLessEqual(workers * pool.conexiones_por_worker + db_session.DEFAULT_DB_RESERVADAS, max_conexiones)
+            self.assertGreaterEqual(pool.max_overflow_sync, 0)
+        # 22 conexiones por worker: 8 persistentes para los hilos de fondo y 14 de overflow para los handlers
+        self.assertEqual(dimensionar_pool(), db_session.ConfiguracionPool(pool_sync=8, max_overflow_sync=14))
+        self.assertEqual(dimensionar_pool(pool_sync=4).max_overflow_sync, 18)
+        self.assertEqual(dimensionar_pool(max_conexiones=30, workers=4).pool_sync, db_session.DB_POOL_SYNC_MINIMO)
+
+    def test_motor_sync_usa_el_overflow_de_los_handlers(self):
+        with mock.patch.dict(os.environ, {db_session.DB_URL_ENV: "postgresql://u@db/l"}), \
+                mock.patch.object(db_session, "create_engine") as crear:
+            db_session.motor_sync.cache_clear()
+            db_session.motor_sync()
+            db_session.motor_sync.cache_clear()
+        opciones = crear.call_args.kwargs
+        self.assertEqual((opciones["pool_size"], opciones["max_overflow"]), (8, 14))
+
+    def test_pool_explicito_que_excede_el_presupuesto(self):
+        with self.assertRaises(ValueError):
+            dimensionar_pool(max_conexiones=100, workers=4, pool_sync=10, max_overflow_sync=20)
+        with self.assertRaises(ValueError):
+            dimensionar_pool(max_conexiones=20, workers=4)
+        with mock.patch.dict(os.environ, {"WEB_CONCURRENCY": "8", db_session.DB_MAX_CONEXIONES_ENV: "200"}):
+            pool = db_session.configuracion_pool()
+        self.assertLessEqual(8 * pool.conexiones_por_worker, 200 - db_session.DEFAULT_DB_RESERVADAS)
+
+    def test_opciones_postgres(self):
+        with mock.patch.dict(os.environ, {db_session.DB_STATEMENT_TIMEOUT_MS_ENV: "5000"}):
+            opciones = opciones_motor("postgresql+psycopg://u@db/l", 12, 4)
+        self.assertEqual((opciones["pool_size"], opciones["max_overflow"], opciones["pool_pre_ping"]), (12, 4, True))
+        self.assertIn("statement_timeout=5000", opciones["connect_args"]["options"])
+        self.assertNotIn("pool_size", opciones_motor("sqlite:///x.db", 5, 5))
+
+    def test_sin_db_url(self):
+        with mock.patch.dict(os.environ, {db_session.DB_URL_ENV: ""}):
+            self.assertFalse(db_session.base_datos_configurada())
+            db_session.motor_sync.cache_clear()
+            with self.assertRaises(RuntimeError):
+                db_session.motor_sync()
+
+class TestMotoresSqlite(unittest.TestCase):
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{Path(self.directorio.name) / 'litoral.db'}"
+        entorno = mock.patch.dict(os.environ, {db_session.DB_URL_ENV: url})
+        entorno.start()
+        self.addCleanup(entorno.stop)
+
+    def tearDown(self):
+        db_session.cerrar_motores()
+        self.directorio.cleanup()
+
+    def test_motor_sync_compartido(self):
+        motor = db_session.motor_sync()
+        self.assertIs(motor, db_session.motor_sync())
+        with motor.connect() as conn:
+            self.assertEqual(conn.execute(text("SELECT 1")).scalar_one(), 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+import asyncio
+import io
+import json
+import os
+import zipfile
+from unittest import mock
+
+import pandas as pd
+from fastapi import HTTPException, Response, UploadFile
+
+from litoral_trace.api.auth import login_b2b, LoginRequest, get_current_tenant_user
+from litoral_trace.api.lotes import descargar_certificado_batch_endpoint, procesar_batch_excel_endpoint
+from litoral_trace.services import merkle, pdf_pool
+from litoral_trace.services.batch import evaluar_lote_masivo, obtener_paquete, procesar_lote_masivo
+from litoral_trace.services.certificate_cache import cache_certificados
+
+def _matriz(n):
+    return pd.DataFrame([{
+        "Identificador_Lote": f"RODAL-{i:03d}",
+        "ID_Proveedor": f"30-{i:08d}-1",
+        "Producto_Forestal": "Madera Aserrada (Pino)",
+        "Hectareas": 50.0,
+        "Latitud": -27.45,
+        "Longitud": -58.90,
+        "Volumen_Ingresado_Ton": 100.0,
+        "Volumen_Exportar_Ton": 45.0 if i % 3 else 90.0,
+    } for i in range(n)])
+
+class TestBatchPerezoso(unittest.TestCase):
+    def setUp(self):
+        cache_certificados().limpiar()
+        self.entorno = mock.patch.dict(os.environ, {pdf_pool.PDF_WORKERS_ENV: "0", merkle.MANIFIESTO_SECRET_ENV: "clave-de-prueba"})
+        self.entorno.start()
+
+    def tearDown(self):
+        self.entorno.stop()
+
+    def test_certificados_se_renderizan_solo_al_descargar(self):
+        original = pdf_pool.renderizar_trabajo
+        with mock.patch.object(pdf_pool, "renderizar_trabajo", side_effect=original) as render:
+            paquete = evaluar_lote_masivo(_matriz(30), organization_id=7)
+            self.assertEqual(render.call_count, 0)
+            pdf = paquete.certificado_pdf(paquete.indice_de("RODAL-004"))
+            self.assertTrue(pdf.startswith(b"%PDF"))
+            self.assertIs(paquete.certificado_pdf(4), pdf)
+            self.assertEqual(render.call_count, 1)
+        self.assertIs(obtener_paquete(paquete.paquete_id, organization_id=7), paquete)
+        with self.assertRaises(KeyError):
+            obtener_paquete(paquete.paquete_id, organization_id=8)
+
+    def test_zip_en_streaming_equivale_al_batch_completo(self):
+        df = _matriz(12)
+        _, zip_completo = procesar_lote_masivo(df)
+        paquete = evaluar_lote_masivo(df)
+        bloques = list(paquete.iterar_zip(tamano_bloque=4096))
+        self.assertGreater(len(bloques), 1)
+        with zipfile.ZipFile(io.BytesIO(b"".join(bloques))) as streaming, zipfile.ZipFile(io.BytesIO(zip_completo)) as completo:
+            self.assertIsNone(streaming.testzip())
+            self.assertEqual(streaming.namelist(), completo.namelist())
+            pdf = next(n for n in streaming.namelist() if n.endswith(".pdf"))
+            self.assertEqual(streaming.read(pdf), completo.read(pdf))
+
+    def test_endpoint_perezoso_y_descarga_individual(self):
+        token = asyncio.run(login_b2b(LoginRequest(username="admin", password="admin123"), Response())).access_token
+        user = get_current_tenant_user(authorization=f"Bearer {token}")
+        buffer = io.BytesIO()
+        _matriz(5).to_excel(buffer, index=False)
+        buffer.seek(0)
+
+        res = asyncio.run(procesar_batch_excel_endpoint(file=UploadFile(file=buffer, filename="matriz.xlsx"), perezoso=True, user=user))
+        self.assertEqual(res.status_code, 201)
+        body = json.loads(res.body)
+        self.assertEqual(body["total"], 5)
+
+        pdf = asyncio.run(descargar_certificado_batch_endpoint(body["paquete_id"], 2, user=user))
+        self.assertEqual(pdf.media_type, "application/pdf")
+        self.assertTrue(pdf.body.startswith(b"%PDF"))
+        with self.assertRaises(HTTPException) as ctx:
+            asyncio.run(descargar_certificado_batch_endpoint(body["paquete_id"], 99, user=user))
+        self.assertEqual(ctx.exception.status_code, 404)
+
+if __name__ == "__main__":
+    unittest.main()
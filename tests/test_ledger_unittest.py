@@ -0,0 +1,78 @@
+import unittest
+from datetime import date
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from litoral_trace.db.base import Base
+from litoral_trace.db.models import Organization, BalanceProveedorMensual
+from litoral_trace.services.ledger import (
+    cargar_historial,
+    registrar_embarque,
+    registrar_ingreso,
+    saldo_disponible_al,
+)
+
+PINO = "Madera Aserrada (Pino)"
+
+class TestLibroMayorProveedores(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite:///:memory:", echo=False)
+        Base.metadata.create_all(self.engine)
+        with Session(self.engine) as session:
+            org = Organization(name="Aserradero Pino", slug="aserradero-pino")
+            session.add(org)
+            session.commit()
+            self.org_id = org.id
+
+    def tearDown(self):
+        Base.metadata.drop_all(self.engine)
+
+    def test_ingreso_repetido_no_habilita_exportaciones_duplicadas(self):
+        with Session(self.engine) as session:
+            self.assertTrue(registrar_ingreso(session, self.org_id, "P-1", PINO, date(2026, 3, 5), "GF-500", 500.0))
+            primero = registrar_embarque(session, self.org_id, "P-1", PINO, date(2026, 3, 5), 250.0)
+            self.assertTrue(primero.es_valido)
+            # Cada embarque vuelve a declarar el mismo ingreso de 500 t: la guía ya está acreditada
+            for dia in (10, 15, 20):
+                self.assertFalse(registrar_ingreso(session, self.org_id, "P-1", PINO, date(2026, 3, dia), "GF-500", 500.0))
+                siguiente = registrar_embarque(session, self.org_id, "P-1", PINO, date(2026, 3, dia), 250.0)
+                self.assertFalse(siguiente.es_valido)
+                self.assertIn("insuficiente", siguiente.mensaje_observacion)
+
+            saldo = saldo_disponible_al(session, self.org_id, "P-1", PINO, date(2026, 3, 31))
+            self.assertEqual(saldo.ingresado_acumulado_ton, 500.0)
+            self.assertEqual(saldo.exportado_acumulado_ton, 250.0)
+            self.assertAlmostEqual(saldo.disponible_ton, 0.0)
+
+    def test_saldo_al_dia_y_embarque_retroactivo(self):
+        with Session(self.engine) as session:
+            registrar_ingreso(session, self.org_id, "P-1", PINO, date(2026, 1, 10), "GF-1", 400.0)
+            registrar_embarque(session, self.org_id, "P-1", PINO, date(2026, 1, 10), 100.0)
+            registrar_ingreso(session, self.org_id, "P-1", PINO, date(2026, 4, 2), "GF-2", 200.0)
+            registrar_embarque(session, self.org_id, "P-1", PINO, date(2026, 4, 2), 150.0)
+            self.assertAlmostEqual(saldo_disponible_al(session, self.org_id, "P-1", PINO, date(2026, 2, 15)).disponible_ton, 100.0)
+            self.assertAlmostEqual(saldo_disponible_al(session, self.org_id, "P-1", PINO, date(2026, 5, 1)).disponible_ton, 50.0)
+            self.assertEqual(saldo_disponible_al(session, self.org_id, "P-1", PINO, date(2025, 12, 31)).periodo, None)
+
+            # Marzo tendría 100 t, pero abril quedaría con 50 t: no se admiten 80 t retroactivas
+            self.assertFalse(registrar_embarque(session, self.org_id, "P-1", PINO, date(2026, 3, 1), 80.0).es_valido)
+            self.assertTrue(registrar_embarque(session, self.org_id, "P-1", PINO, date(2026, 3, 1), 40.0).es_valido)
+            session.commit()
+
+            abril = session.execute(
+                select(BalanceProveedorMensual).where(BalanceProveedorMensual.periodo == date(2026, 4, 1))
+            ).scalar_one()
+            self.assertEqual(abril.exportado_acumulado_ton, 290.0)
+            self.assertEqual(abril.exportado_mes_ton, 150.0)
+
+            historial = cargar_historial(session, self.org_id, "P-1", PINO)
+            disponible = historial.disponible_al([date(2025, 6, 1), date(2026, 1, 31), date(2026, 3, 15), date(2027, 1, 1)])
+            self.assertEqual(disponible.tolist(), [0.0, 100.0, 60.0, 10.0])
+
+    def test_exportacion_sin_ingreso_asentado_se_rechaza(self):
+        with Session(self.engine) as session:
+            validacion = registrar_embarque(session, self.org_id, "P-1", PINO, date(2026, 3, 5), 10.0)
+            self.assertFalse(validacion.es_valido)
+            self.assertIsNone(saldo_disponible_al(session, self.org_id, "P-1", PINO, date(2026, 3, 31)).periodo)
+            with self.assertRaises(ValueError):
+                registrar_ingreso(session, self.org_id, "P-1", PINO, date(2026, 3, 5), "  ", 100.0)
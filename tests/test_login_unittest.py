@@ -0,0 +1,126 @@
+import unittest
+import asyncio
+import time
+from unittest import mock
+
+from fastapi import HTTPException, Response
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from litoral_trace.api.auth import LoginRequest, login_b2b
+from litoral_trace.auth import login
+from litoral_trace.auth.login import autenticar_usuario, hash_password, iniciar_servicio_login, verificar_password
+from litoral_trace.auth.tokens import verify_jwt_token
+from litoral_trace.db.base import Base
+from litoral_trace.db.models import AuditLog, Organization, User
+from litoral_trace.services import audit_chain, audit_writer
+
+class TestHashPassword(unittest.TestCase):
+    def test_hash_y_verificacion(self):
+        hash_ = hash_password("Quebracho-2026", rounds=4)
+        self.assertTrue(hash_.startswith("$2b$04$"))
+        self.assertTrue(verificar_password("Quebracho-2026", hash_))
+        self.assertFalse(verificar_password("quebracho-2026", hash_))
+        self.assertFalse(verificar_password("cualquiera", "no-es-bcrypt"))
+        # Más de 72 bytes: bcrypt 5 rechaza la clave; se trunca como en las versiones previas
+        self.assertTrue(verificar_password("x" * 100, hash_password("x" * 80, rounds=4)))
+
+    def test_demo_sin_base_configurada(self):
+        self.assertEqual(asyncio.run(autenticar_usuario("admin", "admin123"))["role"], "admin")
+        self.assertIsNone(asyncio.run(autenticar_usuario("cualquiera", "clave")))
+        with self.assertRaises(HTTPException) as ctx:
+            asyncio.run(login_b2b(LoginRequest(username="cualquiera", password="clave"), Response()))
+        self.assertEqual(ctx.exception.status_code, 401)
+
+class TestServicioLogin(unittest.TestCase):
+    def setUp(self):
+        entorno = mock.patch.dict("os.environ", {login.BCRYPT_ROUNDS_ENV: "4"})
+        entorno.start()
+        self.addCleanup(entorno.stop)
+        login._hash_senuelo.cache_clear()
+        self.addCleanup(login._hash_senuelo.cache_clear)
+        self.engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        Base.metadata.create_all(self.engine)
+        with Session(self.engine) as session:
+            org = Organization(name="Aserradero Norte", slug="norte")
+            session.add(org)
+            session.flush()
+            for nombre, rol, activo in (("operaria", "Auditor", True), ("baja", "manager", False)):
+                session.add(User(
+                    organization_id=org.id, email=f"{nombre}@norte.com", username=nombre,
+                    password_hash=hash_password("Clave-Segura"), role=rol, is_active=activo,
+                ))
+            session.commit()
+            self.org = org.id
+        self.servicio = iniciar_servicio_login(self.engine, hilos=2, intervalo=3600.0)
+
+    def tearDown(self):
+        login.cerrar_servicio_login()
+        Base.metadata.drop_all(self.engine)
+
+    def _last_login(self, username):
+        with Session(self.engine) as session:
+            return session.execute(select(User.last_login_at).where(User.username == username)).scalar_one()
+
+    def test_credenciales_contra_la_tabla(self):
+        claims = self.servicio.autenticar("operaria", "Clave-Segura")
+        self.assertEqual((claims["sub"], claims["org_id"], claims["role"]), ("operaria", self.org, "auditor"))
+        self.assertEqual(self.servicio.autenticar("operaria@norte.com", "Clave-Segura")["sub"], "operaria")
+        self.assertIsNone(self.servicio.autenticar("operaria", "otra"))
+        self.assertIsNone(self.servicio.autenticar("baja", "Clave-Segura"))
+        # Con base configurada la cuenta demo deja de existir
+        self.assertIsNone(asyncio.run(autenticar_usuario("admin", "admin123")))
+
+    def test_usuario_inexistente_paga_el_hash_senuelo(self):
+        with mock.patch.object(login, "verificar_password", wraps=login.verificar_password) as verificar:
+            self.assertIsNone(self.servicio.autenticar("fantasma", "Clave-Segura"))
+        self.assertEqual(verificar.call_args.args[1], login._hash_senuelo())
+
+    def test_login_b2b_emite_token_del_usuario(self):
+        respuesta = asyncio.run(login_b2b(LoginRequest(username="operaria", password="Clave-Segura"), Response()))
+        payload = verify_jwt_token(respuesta.access_token)
+        self.assertEqual((payload["sub"], payload["org_id"], payload["role"]), ("operaria", self.org, "auditor"))
+
+    def test_login_b2b_queda_auditado(self):
+        with mock.patch.dict("os.environ", {audit_chain.AUDIT_CHECKPOINT_CADA_ENV: "0"}):
+            audit_writer.iniciar_escritor_auditoria(self.engine, tamano_lote=10, intervalo=30.0)
+            asyncio.run(login_b2b(LoginRequest(username="operaria", password="Clave-Segura"), Response()))
+            self.assertTrue(audit_writer.cerrar_escritor_auditoria())
+        with Session(self.engine) as session:
+            evento = session.execute(select(AuditLog)).scalar_one()
+        self.assertEqual((evento.organization_id, evento.username, evento.action), (self.org, "operaria", "LOGIN"))
+
+    def test_last_login_at_se_agrupa(self):
+        for _ in range(3):
+            self.servicio.autenticar("operaria", "Clave-Segura")
+        self.assertIsNone(self._last_login("operaria"))
+        self.assertEqual(self.servicio.volcar_accesos(), 1)
+        self.assertIsNotNone(self._last_login("operaria"))
+        self.assertEqual(self.servicio.volcar_accesos(), 0)
+
+    def test_bcrypt_no_bloquea_el_event_loop(self):
+        lento = lambda password, hash_: time.sleep(0.05) or True
+
+        async def escenario():
+            latidos = 0
+
+            async def latido():
+                nonlocal latidos
+                while True:
+                    await asyncio.sleep(0.005)
+                    latidos += 1
+
+            tarea = asyncio.create_task(latido())
+            resultados = await asyncio.gather(*(autenticar_usuario("operaria", "Clave-Segura") for _ in range(6)))
+            tarea.cancel()
+            return resultados, latidos
+
+        with mock.patch.object(login, "verificar_password", side_effect=lento):
+            resultados, latidos = asyncio.run(escenario())
+        self.assertTrue(all(r is not None for r in resultados))
+        # 6 logins de 50 ms en 2 hilos: ~150 ms durante los que el loop siguió atendiendo
+        self.assertGreater(latidos, 10)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+import asyncio
+import json
+from unittest import mock
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from litoral_trace.api.auth import UserTenantContext
+from litoral_trace.api.lotes import listar_lotes_tenant
+from litoral_trace.db.base import Base
+from litoral_trace.db.models import Lote, Organization
+from litoral_trace.services import listing
+from litoral_trace.services.listing import FiltrosLote, _consulta_pagina, listar_lotes
+
+def _lote(org_id, i):
+    return Lote(
+        organization_id=org_id, identificador=f"L-{org_id}-{i:02d}", productor_id=f"30-{i % 3}",
+        producto_forestal="Carbón Vegetal" if i % 2 else "Madera Aserrada (Pino)",
+        latitud=-27.4, longitud=-58.9, estatus="Rojo" if i % 5 == 0 else "Verde",
+    )
+
+class TestListadoKeyset(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(self.engine)
+        with Session(self.engine) as session:
+            session.add_all([Organization(id=1, name="Norte", slug="norte"), Organization(id=2, name="Sur", slug="sur")])
+            session.add_all([_lote(1, i) for i in range(25)] + [_lote(2, i) for i in range(3)])
+            session.commit()
+
+    def tearDown(self):
+        Base.metadata.drop_all(self.engine)
+
+    def test_recorre_todas_las_paginas_sin_repetir(self):
+        vistos, cursor, paginas = [], None, 0
+        while True:
+            pagina = listar_lotes(self.engine, 1, cursor=cursor, limite=10)
+            vistos += [lote["identificador"] for lote in pagina.lotes]
+            paginas += 1
+            # Solo la primera página cuenta; las siguientes son un único range scan
+            self.assertEqual((pagina.total, pagina.total_estimado), (25, False) if cursor is None else (None, False))
+            cursor = pagina.siguiente_cursor
+            if cursor is None:
+                break
+        self.assertEqual(paginas, 3)
+        self.assertEqual(vistos, [f"L-1-{i:02d}" for i in range(25)])
+
+    def test_filtros_y_campos(self):
+        pagina = listar_lotes(self.engine, 1, FiltrosLote(estatus="Rojo", producto_forestal="Carbón Vegetal"), campos=["estatus"])
+        self.assertEqual(pagina.total, 2)  # i = 5 y 15
+        self.assertEqual(len(pagina.lotes), 2)
+        self.assertEqual(set(pagina.lotes[0]), {"id", "estatus"})
+        self.assertEqual(listar_lotes(self.engine, 2, FiltrosLote(productor_id="30-0")).total, 1)
+        with self.assertRaises(ValueError):
+            listar_lotes(self.engine, 1, campos=["password_hash"])
+        with self.assertRaises(ValueError):
+            listar_lotes(self.engine, 1, cursor="no-es-un-cursor")
+
+    def test_total_solo_en_la_primera_pagina_o_a_pedido(self):
+        primera = listar_lotes(self.engine, 1, limite=10)
+        with mock.patch.object(listing, "_total", wraps=listing._total) as total:
+            self.assertIsNone(listar_lotes(self.engine, 1, cursor=primera.siguiente_cursor, limite=10).total)
+            self.assertEqual(total.call_count, 0)
+            self.assertEqual(listar_lotes(self.engine, 1, cursor=primera.siguiente_cursor, limite=10, contar=True).total, 25)
+        self.assertIsNone(listar_lotes(self.engine, 1, limite=10, contar=False).total)
+
+    def test_total_acotado(self):
+        pagina = listar_lotes(self.engine, 1, limite=5, umbral_conteo=8)
+        # Fuera de PostgreSQL no hay estimación del planificador: se recurre al conteo exacto
+        self.assertEqual((pagina.total, pagina.total_estimado), (25, False))
+        self.assertEqual(listar_lotes(self.engine, 2, umbral_conteo=8).total, 3)
+
+    def test_pagina_es_un_range_scan_del_indice(self):
+        sql = str(_consulta_pagina(1, FiltrosLote(), ("id",), 500, 50).compile(dialect=postgresql.dialect()))
+        self.assertIn("lotes.id >", sql)
+        self.assertNotIn("OFFSET", sql)
+        consulta = _consulta_pagina(1, FiltrosLote(), ("id", "estatus"), 10, 50).compile(
+            dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True},
+        )
+        with self.engine.connect() as conn:
+            plan = " ".join(str(fila[-1]) for fila in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {consulta}"))
+        # En SQLite id es el rowid: el índice simple de organization_id equivale a (organization_id, id)
+        self.assertRegex(plan, r"USING INDEX ix_lotes_organiza[ct]ion_id \(organization_id=\? AND (id|rowid)>\?\)")
+        self.assertNotIn("TEMP B-TREE", plan)
+
+class TestEndpointListado(unittest.TestCase):
+    def setUp(self):
+        self.user = UserTenantContext(
+            username="admin", email="admin@litoral.com", organization_id=7,
+            organization_name="Demo", role="admin",
+        )
+
+    def _listar(self, **params):
+        res = asyncio.run(listar_lotes_tenant(user=self.user, **params))
+        return json.loads(res.body)
+
+    def test_paginacion_sin_base_configurada(self):
+        primera = self._listar(limite=1, campos="identificador")
+        self.assertEqual(primera["lotes"], [{"id": 101, "identificador": "Rodal Norte 01"}])
+        self.assertEqual(primera["total"], 2)
+        segunda = self._listar(limite=1, cursor=primera["siguiente_cursor"])
+        self.assertEqual(segunda["lotes"][0]["organization_id"], 7)
+        self.assertIsNone(segunda["siguiente_cursor"])
+        self.assertIsNone(segunda["total"])
+        self.assertEqual(self._listar(limite=1, cursor=primera["siguiente_cursor"], incluir_total=True)["total"], 2)
+        self.assertEqual(self._listar(producto_forestal="Carbón Vegetal")["total"], 1)
+
+    def test_parametros_invalidos(self):
+        with self.assertRaises(HTTPException) as ctx:
+            self._listar(campos="identificador,secreto")
+        self.assertEqual(ctx.exception.status_code, 400)
+
+if __name__ == "__main__":
+    unittest.main()
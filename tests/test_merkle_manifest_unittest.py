@@ -0,0 +1,139 @@
+import unittest
+import hashlib
+import io
+import json
+import math
+import os
+import zipfile
+from unittest import mock
+
+import pandas as pd
+
+from litoral_trace.services import merkle, pdf_pool
+from litoral_trace.services.batch import evaluar_lote_masivo
+from litoral_trace.services.merkle import (
+    ArbolMerkle, NOMBRE_MANIFIESTO, hash_hoja, hash_nodo, verificar_documento, verificar_entrada, verificar_inclusion, verificar_manifiesto,
+)
+
+def _matriz(n):
+    return pd.DataFrame([{
+        "Identificador_Lote": f"RODAL-{i:03d}",
+        "ID_Proveedor": f"30-{i:08d}-1",
+        "Producto_Forestal": "Madera Aserrada (Pino)",
+        "Hectareas": 50.0,
+        "Latitud": -27.45,
+        "Longitud": -58.90,
+        "Volumen_Ingresado_Ton": 100.0,
+        "Volumen_Exportar_Ton": 45.0 if i % 3 else 90.0,
+    } for i in range(n)])
+
+class TestArbolMerkle(unittest.TestCase):
+    def test_raiz_segun_rfc6962(self):
+        self.assertEqual(ArbolMerkle().raiz(), hashlib.sha256(b"").digest())
+        hojas = [hash_hoja(bytes([i])) for i in range(5)]
+        arbol = ArbolMerkle.desde_hojas(hojas)
+        # MTH(D[5]) = H(MTH(D[0:4]), D[4]): el corte es la mayor potencia de 2 menor que n
+        esperado = hash_nodo(
+            hash_nodo(hash_nodo(hojas[0], hojas[1]), hash_nodo(hojas[2], hojas[3])),
+            hojas[4],
+        )
+        self.assertEqual(arbol.raiz(), esperado)
+
+    def test_pruebas_de_inclusion_logaritmicas(self):
+        for total in (1, 2, 3, 7, 8, 9, 100):
+            arbol = ArbolMerkle()
+            for i in range(total):
+                arbol.agregar(f"doc_{i}.pdf", os.urandom(16))
+            raiz = arbol.raiz()
+            for indice in range(total):
+                prueba = arbol.prueba_inclusion(indice)
+                self.assertLessEqual(len(prueba), math.ceil(math.log2(total)) if total > 1 else 0)
+                self.assertTrue(verificar_inclusion(arbol.hojas[indice], indice, total, prueba, raiz))
+                if total > 1:
+                    self.assertFalse(verificar_inclusion(arbol.hojas[indice], (indice + 1) % total, total, prueba, raiz))
+                    self.assertFalse(verificar_inclusion(hash_hoja(b"otro"), indice, total, prueba, raiz))
+
+class TestManifiestoPaquete(unittest.TestCase):
+    def setUp(self):
+        self.entorno = mock.patch.dict(os.environ, {pdf_pool.PDF_WORKERS_ENV: "0", merkle.MANIFIESTO_SECRET_ENV: "clave-de-prueba"})
+        self.entorno.start()
+
+    def tearDown(self):
+        self.entorno.stop()
+
+    def _zip(self, n=9):
+        paquete = evaluar_lote_masivo(_matriz(n), registrar=False)
+        return zipfile.ZipFile(io.BytesIO(paquete.zip_bytes()))
+
+    def test_zip_incluye_manifiesto_firmado(self):
+        with self._zip() as zip_file:
+            manifiesto = json.loads(zip_file.read(NOMBRE_MANIFIESTO))
+            archivos = [n for n in zip_file.namelist() if n != NOMBRE_MANIFIESTO]
+            self.assertEqual([h["ruta"] for h in manifiesto["hojas"]], archivos)
+            self.assertEqual(manifiesto["total_hojas"], len(archivos))
+            self.assertTrue(verificar_manifiesto(manifiesto))
+            with mock.patch.dict(os.environ, {merkle.MANIFIESTO_SECRET_ENV: "otra-clave"}):
+                self.assertFalse(verificar_manifiesto(manifiesto))
+
+            adulterado = dict(manifiesto, hojas=list(manifiesto["hojas"]))
+            adulterado["hojas"][0] = dict(adulterado["hojas"][0], hash=hash_hoja(b"x").hex())
+            self.assertFalse(verificar_manifiesto(adulterado))
+
+    def test_verificacion_de_un_documento_aislado(self):
+        with self._zip() as zip_file:
+            manifiesto = json.loads(zip_file.read(NOMBRE_MANIFIESTO))
+            arbol = ArbolMerkle.desde_hojas([bytes.fromhex(h["hash"]) for h in manifiesto["hojas"]])
+            indice = 4
+            ruta = manifiesto["hojas"][indice]["ruta"]
+            contenido = zip_file.read(ruta)
+            prueba = arbol.prueba_inclusion(indice)
+            self.assertTrue(verificar_documento(ruta, contenido, indice, prueba, manifiesto))
+            self.assertFalse(verificar_documento(ruta, contenido + b" ", indice, prueba, manifiesto))
+            otra_ruta = manifiesto["hojas"][indice + 1]["ruta"]
+            self.assertFalse(verificar_documento(otra_ruta, contenido, indice, prueba, manifiesto))
+
+    def test_manifiesto_publica_la_prueba_de_cada_documento(self):
+        with self._zip(n=13) as zip_file:
+            manifiesto = json.loads(zip_file.read(NOMBRE_MANIFIESTO))
+            arbol = ArbolMerkle.desde_hojas([bytes.fromhex(h["hash"]) for h in manifiesto["hojas"]])
+            for indice, hoja in enumerate(manifiesto["hojas"]):
+                self.assertEqual(hoja["prueba"], [h.hex() for h in arbol.prueba_inclusion(indice)])
+                self.assertTrue(verificar_entrada(hoja["ruta"], zip_file.read(hoja["ruta"]), manifiesto))
+            ruta = manifiesto["hojas"][0]["ruta"]
+            self.assertFalse(verificar_entrada(ruta, b"adulterado", manifiesto))
+            self.assertFalse(verificar_entrada("no/existe.pdf", b"", manifiesto))
+
+    def test_identificador_repetido_del_mismo_proveedor(self):
+        matriz = _matriz(4)
+        matriz.loc[2] = matriz.loc[0]  # misma fila declarada dos veces: mismo dictamen y misma carpeta base
+        paquete = evaluar_lote_masivo(matriz, registrar=False)
+        with zipfile.ZipFile(io.BytesIO(paquete.zip_bytes())) as zip_file:
+            nombres = zip_file.namelist()
+            self.assertEqual(len(nombres), len(set(nombres)))
+            manifiesto = json.loads(zip_file.read(NOMBRE_MANIFIESTO))
+            rutas = [h["ruta"] for h in manifiesto["hojas"]]
+            self.assertEqual(len(rutas), len(set(rutas)))
+            for ruta in rutas:
+                self.assertTrue(verificar_entrada(ruta, zip_file.read(ruta), manifiesto))
+        self.assertEqual([paquete.carpeta(0), paquete.carpeta(2)], ["Rojo_30-00000000-1_RODAL-000_F1/", "Rojo_30-00000000-1_RODAL-000_F3/"])
+        self.assertEqual(paquete.carpeta(1), "Verde_30-00000001-1_RODAL-001/")
+        with self.assertRaises(ValueError):
+            paquete.indice_de("RODAL-000")
+        self.assertEqual(paquete.indice_de("RODAL-001"), 1)
+
+        arbol = ArbolMerkle()
+        for ruta in ("a.pdf", "a.pdf"):
+            arbol.agregar(ruta, b"x")
+        with self.assertRaises(ValueError):
+            merkle.construir_manifiesto("p", arbol, ["a.pdf", "a.pdf"])
+
+    def test_clave_obligatoria_y_distinta_de_la_de_sesion(self):
+        with mock.patch.dict(os.environ, {merkle.MANIFIESTO_SECRET_ENV: ""}):
+            with self.assertRaises(RuntimeError):
+                merkle.clave_manifiesto()
+        with mock.patch.dict(os.environ, {merkle.MANIFIESTO_SECRET_ENV: merkle.DEFAULT_SECRET_KEY}):
+            with self.assertRaises(RuntimeError):
+                self._zip(n=2)
+
+if __name__ == "__main__":
+    unittest.main()
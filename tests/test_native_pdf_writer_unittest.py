@@ -0,0 +1,88 @@
+import unittest
+import random
+import string
+
+import pandas as pd
+
+from litoral_trace.services import reports
+from litoral_trace.services.batch import evaluar_lote_masivo
+from litoral_trace.services.pdf_pool import TrabajoCertificado, renderizar_trabajo
+from litoral_trace.services.reports import (
+    MOTOR_FPDF, MOTOR_NATIVO, extraer_sello, generar_pdf_reporte_bytes, verificar_certificado,
+)
+
+LOTE = {
+    "identificador": "Rodal Ñandú (Norte) 01",
+    "productor_id": "30-12345678-9",
+    "producto_forestal": "Extracto de Quebracho (Tanino)",
+    "hectareas": 120.5,
+}
+
+def _ambos(*args):
+    return (
+        generar_pdf_reporte_bytes(*args, motor=MOTOR_FPDF),
+        generar_pdf_reporte_bytes(*args, motor=MOTOR_NATIVO),
+    )
+
+class TestEscritorNativoGolden(unittest.TestCase):
+    def test_observaciones_del_motor_de_reglas(self):
+        df = pd.DataFrame([{
+            "Identificador_Lote": f"RODAL-{i:03d}",
+            "ID_Proveedor": f"30-{i:08d}-1",
+            "Producto_Forestal": "Madera Aserrada (Pino)",
+            "Hectareas": 10.0 * i,
+            "Latitud": -27.45 + i * 0.01,
+            "Longitud": -58.90,
+            "Volumen_Ingresado_Ton": 100.0,
+            "Volumen_Exportar_Ton": 45.0 if i % 3 else 90.0,
+        } for i in range(24)])
+        paquete = evaluar_lote_masivo(df, registrar=False)
+        self.assertGreater(paquete.df_eval["dictamen"].nunique(), 1)
+        for i in range(len(paquete)):
+            trabajo = paquete.trabajo_certificado(i)
+            fpdf_bytes, nativo = _ambos(
+                trabajo.lote_data, trabajo.dictamen, trabajo.observacion,
+                trabajo.volumen_ingresado, trabajo.volumen_exportar, trabajo.coeficiente_rendimiento,
+            )
+            self.assertTrue(nativo.startswith(b"%PDF"))
+            self.assertEqual(nativo, fpdf_bytes, paquete.df_eval.iloc[i]["observacion"])
+
+    def test_textos_sinteticos_justificados(self):
+        aleatorio = random.Random(2023)
+        alfabeto = string.ascii_letters + string.digits + "áéíóúñÑ()\\.,;:%-/"
+        for _ in range(200):
+            palabras = [
+                "".join(aleatorio.choice(alfabeto) for _ in range(aleatorio.choice((1, 3, 8, 15, 90))))
+                for _ in range(aleatorio.randint(1, 50))
+            ]
+            observacion = aleatorio.choice((" ", "  ")).join(palabras) + aleatorio.choice(("", " "))
+            lote = dict(LOTE, productor_id=aleatorio.choice(("", "30-1", palabras[0])))
+            fpdf_bytes, nativo = _ambos(lote, aleatorio.choice(("Verde", "Rojo")), observacion, 512.3, 200.0, aleatorio.random())
+            self.assertEqual(nativo, fpdf_bytes, observacion)
+
+    def test_textos_no_soportados_se_delegan_a_fpdf(self):
+        for observacion in ("Primera línea\nSegunda línea", "Riesgo → bloqueo", "palabra " * 4000, ""):
+            self.assertIsNone(reports._generar_pdf_nativo(("x",) * 8, observacion, "0" * 64, False))
+            fpdf_bytes, nativo = _ambos(LOTE, "Rojo", observacion, 100.0, 90.0, 0.45)
+            self.assertEqual(nativo, fpdf_bytes)
+            self.assertTrue(fpdf_bytes.startswith(b"%PDF-"))
+
+    def test_sello_verificable_y_motor_invalido(self):
+        args = (LOTE, "Verde", "Balance de masas dentro del rendimiento permitido.", 100.0, 40.0, 0.45)
+        nativo = generar_pdf_reporte_bytes(*args, motor=MOTOR_NATIVO)
+        self.assertEqual(extraer_sello(nativo), reports.sello_certificado(*args))
+        self.assertTrue(verificar_certificado(nativo, *args))
+        with self.assertRaises(ValueError):
+            generar_pdf_reporte_bytes(*args, motor="reportlab")
+
+    def test_trabajos_del_pool_seleccionan_motor(self):
+        base = dict(lote_data=LOTE, dictamen="Rojo", observacion="Exceso de volumen.", volumen_ingresado=100.0,
+                    volumen_exportar=90.0, coeficiente_rendimiento=0.45)
+        nativo = TrabajoCertificado(**base)
+        self.assertEqual(nativo.motor, MOTOR_NATIVO)
+        clasico = TrabajoCertificado(**base, motor=MOTOR_FPDF)
+        self.assertEqual(nativo.sello, clasico.sello)
+        self.assertEqual(renderizar_trabajo(nativo), renderizar_trabajo(clasico))
+
+if __name__ == "__main__":
+    unittest.main()
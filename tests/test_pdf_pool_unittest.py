@@ -0,0 +1,76 @@
+import unittest
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from litoral_trace.services import pdf_pool
+from litoral_trace.services.pdf_pool import TrabajoCertificado, cerrar_pool, renderizar_certificado, renderizar_en_orden
+
+def _trabajo(i):
+    return TrabajoCertificado({"identificador": f"R-{i:03d}", "productor_id": "30-1", "producto_forestal": "Carbón Vegetal", "hectareas": 10.0},
+                              "Verde" if i % 2 else "Rojo", f"Observación {i}", 100.0 + i, 20.0, 0.25)
+
+class _PoolContador(ThreadPoolExecutor):
+    """Ejecutor de prueba que registra el máximo de trabajos pendientes simultáneos."""
+    def __init__(self):
+        super().__init__(max_workers=4)
+        self.pendientes = 0
+        self.maximo = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        with self._lock:
+            self.pendientes += 1
+            self.maximo = max(self.maximo, self.pendientes)
+        return super().submit(fn, *args, **kwargs)
+
+def _render_falso(trabajo):
+    # Los primeros trabajos terminan últimos: el orden de salida no puede depender del de finalización
+    time.sleep(0.02 * (12 - int(trabajo.lote_data["identificador"][2:])) / 12)
+    return trabajo.lote_data["identificador"].encode()
+
+class TestPoolRenderizadoPDF(unittest.TestCase):
+    def test_orden_y_cola_acotada(self):
+        pool = _PoolContador()
+        resultados = []
+        with mock.patch.object(pdf_pool, "renderizar_trabajo", _render_falso):
+            for pdf in renderizar_en_orden((_trabajo(i) for i in range(12)), pool=pool, en_vuelo=3):
+                pool.pendientes -= 1
+                resultados.append(pdf)
+        pool.shutdown()
+        self.assertLessEqual(pool.maximo, 3)
+        self.assertEqual(resultados, [f"R-{i:03d}".encode() for i in range(12)])
+
+    def test_pool_de_procesos_devuelve_pdf_en_orden(self):
+        with mock.patch.dict(os.environ, {pdf_pool.PDF_WORKERS_ENV: "2"}):
+            cerrar_pool()
+            try:
+                pdfs = list(renderizar_en_orden(_trabajo(i) for i in range(6)))
+                individual = renderizar_certificado(_trabajo(7))
+            finally:
+                cerrar_pool()
+        self.assertEqual(len(pdfs), 6)
+        self.assertTrue(all(p.startswith(b"%PDF") for p in pdfs + [individual]))
+
+    def test_sin_workers_renderiza_en_el_hilo_llamador(self):
+        with mock.patch.dict(os.environ, {pdf_pool.PDF_WORKERS_ENV: "0"}):
+            self.assertIsNone(pdf_pool.obtener_pool())
+            self.assertTrue(renderizar_certificado(_trabajo(1)).startswith(b"%PDF"))
+
+    def test_workers_por_defecto_se_reparten_entre_procesos_uvicorn(self):
+        sin_config = {k: v for k, v in os.environ.items() if k not in (pdf_pool.PDF_WORKERS_ENV, *pdf_pool.SERVIDOR_WORKERS_ENVS)}
+        with mock.patch.dict(os.environ, sin_config, clear=True), mock.patch.object(os, "cpu_count", return_value=17):
+            self.assertEqual(pdf_pool.workers_pdf(), 4)  # 16 núcleos / 4 workers del Dockerfile
+            os.environ["WEB_CONCURRENCY"] = "8"
+            self.assertEqual(pdf_pool.workers_pdf(), 2)
+            os.environ["LITORAL_DB_WORKERS"] = "2"
+            self.assertEqual(pdf_pool.workers_pdf(), 8)
+            os.environ["LITORAL_DB_WORKERS"] = "32"
+            self.assertEqual(pdf_pool.workers_pdf(), 1)
+            os.environ[pdf_pool.PDF_WORKERS_ENV] = "3"
+            self.assertEqual(pdf_pool.workers_pdf(), 3)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+import unittest
+import asyncio
+import os
+from unittest import mock
+
+import pandas as pd
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from litoral_trace.api import lotes as api_lotes
+from litoral_trace.api.auth import UserTenantContext
+from litoral_trace.db.base import Base
+from litoral_trace.db.models import BalanceProveedorMensual, Organization, Lote
+from litoral_trace.services.batch import procesar_lote_masivo
+from litoral_trace.services.compliance import evaluar_compliance_lote
+from litoral_trace.services.ledger import registrar_embarque, saldo_disponible_al
+from litoral_trace.services.listing import listar_lotes
+from litoral_trace.services.merkle import MANIFIESTO_SECRET_ENV
+from litoral_trace.services.persistence import (
+    persistir_dictamenes,
+    registro_desde_compliance,
+)
+
+def _fila(nombre, vol_out, guia=None):
+    return {
+        "Identificador_Lote": nombre, "ID_Proveedor": "30-11111111-1", "Producto_Forestal": "Madera Aserrada (Pino)",
+        "Hectareas": 10.0, "Latitud": -27.45, "Longitud": -58.90, "Volumen_Ingresado_Ton": 100.0, "Volumen_Exportar_Ton": vol_out,
+        "Guia_Ingreso": guia or f"G-{nombre}",
+    }
+
+class TestPersistenciaDictamenes(unittest.TestCase):
+    def setUp(self):
+        entorno = mock.patch.dict(os.environ, {MANIFIESTO_SECRET_ENV: "clave-de-prueba"})
+        entorno.start()
+        self.addCleanup(entorno.stop)
+        # Una sola conexión: el endpoint persiste desde un hilo del pool
+        self.engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        Base.metadata.create_all(self.engine)
+        with Session(self.engine) as session:
+            org = Organization(name="Exportadora", slug="exp")
+            session.add(org)
+            session.commit()
+            self.org_id = org.id
+
+    def tearDown(self):
+        Base.metadata.drop_all(self.engine)
+
+    def test_batch_persiste_y_upsert_actualiza_sin_duplicar(self):
+        procesar_lote_masivo(pd.DataFrame([_fila("R-1", 40.0), _fila("R-2", 90.0)]), bind=self.engine, organization_id=self.org_id)
+        procesar_lote_masivo(pd.DataFrame([_fila("R-2", 30.0)]), bind=self.engine, organization_id=self.org_id)
+
+        with Session(self.engine) as session:
+            lotes = {l.identificador: l for l in session.execute(select(Lote)).scalars()}
+        self.assertEqual(len(lotes), 2)
+        self.assertEqual(lotes["R-1"].estatus, "Verde")
+        self.assertEqual(lotes["R-2"].estatus, "Verde")
+        self.assertEqual(lotes["R-2"].volumen_exportar_ton, 30.0)
+        self.assertEqual(lotes["R-2"].regla_aplicada, "DEFECTO")
+
+    def test_persistencia_por_trozos_y_lectura_paginada(self):
+        lote = {"identificador": "X", "productor_id": "P", "producto_forestal": "Carbón Vegetal", "latitud": -27.5, "longitud": -58.9}
+        res = evaluar_compliance_lote(lote, 100.0, 50.0)
+        registros = [registro_desde_compliance({**lote, "identificador": f"X-{i}"}, res, self.org_id) for i in range(7)]
+        self.assertEqual(persistir_dictamenes(self.engine, registros, chunk_size=3), 7)
+
+        pagina = listar_lotes(self.engine, self.org_id, limite=5)
+        self.assertEqual(len(pagina.lotes), 5)
+        self.assertEqual(pagina.lotes[0]["estatus"], "Rojo")
+        siguiente = listar_lotes(self.engine, self.org_id, limite=5, cursor=pagina.siguiente_cursor)
+        self.assertEqual(len(siguiente.lotes), 2)
+        self.assertEqual(listar_lotes(self.engine, self.org_id + 1).lotes, [])
+
+    def test_batch_con_identificadores_repetidos_y_sin_nombre(self):
+        filas = [_fila(f"R-{i % 3}", 10.0 + i) for i in range(7)] + [_fila(None, 20.0), _fila("", 25.0)]
+        filas[0]["Poligono_WKT"] = "POLYGON((-58.91 -27.46, -58.89 -27.46, -58.89 -27.44, -58.91 -27.46))"
+        resumen, _ = procesar_lote_masivo(pd.DataFrame(filas), bind=self.engine, organization_id=self.org_id)
+        self.assertEqual(len(resumen), 9)
+
+        with Session(self.engine) as session:
+            lotes = {l.identificador: l for l in session.execute(select(Lote)).scalars()}
+        # Gana la última aparición; los nombres generados (Lote_8, Lote_9) no se persisten
+        self.assertEqual(sorted(lotes), ["R-0", "R-1", "R-2"])
+        self.assertEqual(lotes["R-0"].volumen_exportar_ton, 16.0)
+        self.assertEqual(lotes["R-2"].volumen_exportar_ton, 15.0)
+
+        procesar_lote_masivo(pd.DataFrame(filas[:1]), bind=self.engine, organization_id=self.org_id)
+        with Session(self.engine) as session:
+            lote = session.execute(select(Lote).where(Lote.identificador == "R-0")).scalar_one()
+        self.assertTrue(lote.polygon_wkt.startswith("POLYGON"))
+        self.assertEqual(lote.geom, lote.polygon_wkt)
+
+    def test_endpoint_de_evaluacion_persiste_el_dictamen(self):
+        user = UserTenantContext(username="op", email="op@exp.com", organization_id=self.org_id, organization_name="Exportadora", role="admin")
+        payload = api_lotes.LoteEvaluacionRequest(
+            identificador="API-1", productor_id="30-1", volumen_ingresado_ton=100.0, volumen_exportar_ton=90.0,
+        )
+        with mock.patch.object(api_lotes, "base_datos_configurada", return_value=True), \
+                mock.patch.object(api_lotes, "motor_sync", return_value=self.engine):
+            asyncio.run(api_lotes.evaluar_compliance_endpoint(payload, user=user))
+        with Session(self.engine) as session:
+            lote = session.execute(select(Lote)).scalar_one()
+        self.assertEqual((lote.identificador, lote.estatus, lote.regla_aplicada), ("API-1", "Rojo", "BALANCE_MASAS_EXCEDIDO"))
+        # Sin polígono del cliente no se guarda el cuadrado sintético del DDS
+        self.assertIsNone(lote.geom)
+
+    def test_batch_asienta_embarques_en_el_libro_mayor(self):
+        filas = [_fila("R-1", 40.0), _fila("R-2", 50.0)]
+        procesar_lote_masivo(pd.DataFrame(filas), bind=self.engine, organization_id=self.org_id)
+        # Reprocesar la misma planilla no vuelve a sumar los ingresos
+        procesar_lote_masivo(pd.DataFrame(filas), bind=self.engine, organization_id=self.org_id)
+        with Session(self.engine) as session:
+            saldo = saldo_disponible_al(session, self.org_id, "30-11111111-1", "Madera Aserrada (Pino)", pd.Timestamp.now(tz="UTC"))
+            self.assertEqual((saldo.ingresado_acumulado_ton, saldo.exportado_acumulado_ton), (200.0, 90.0))
+            # Exportaciones asentadas por otro canal agotan el saldo del proveedor
+            registrar_embarque(session, self.org_id, "30-11111111-1", "Madera Aserrada (Pino)", pd.Timestamp.now(tz="UTC"), 100.0, validar=False)
+            session.commit()
+
+        resumen, _ = procesar_lote_masivo(pd.DataFrame([_fila("R-3", 45.0)]), bind=self.engine, organization_id=self.org_id)
+        self.assertEqual(resumen.loc[0, "Dictamen"], "Rojo")
+        self.assertEqual(resumen.loc[0, "Regla Aplicada"], "SALDO_PROVEEDOR_INSUFICIENTE")
+        self.assertIn("insuficiente", resumen.loc[0, "Observación"])
+        with Session(self.engine) as session:
+            lote = session.execute(select(Lote).where(Lote.identificador == "R-3")).scalar_one()
+            self.assertEqual((lote.estatus, lote.regla_aplicada), ("Rojo", "SALDO_PROVEEDOR_INSUFICIENTE"))
+            # El ingreso de R-3 queda acreditado, pero el embarque rechazado no descuenta exportaciones
+            filas_libro = session.execute(select(BalanceProveedorMensual)).scalars().all()
+            self.assertEqual([(f.ingresado_acumulado_ton, f.exportado_acumulado_ton) for f in filas_libro], [(300.0, 190.0)])
+
+    def test_lotes_con_la_misma_guia_acreditan_el_ingreso_una_sola_vez(self):
+        filas = [_fila(f"D-{i}", 50.0, guia="GF-COMPARTIDA") for i in range(3)]
+        resumen, _ = procesar_lote_masivo(pd.DataFrame(filas), bind=self.engine, organization_id=self.org_id)
+
+        self.assertEqual(resumen["Dictamen"].tolist(), ["Verde", "Rojo", "Rojo"])
+        self.assertIn("GF-COMPARTIDA ya estaba acreditada", resumen.loc[1, "Observación"])
+        with Session(self.engine) as session:
+            saldo = saldo_disponible_al(session, self.org_id, "30-11111111-1", "Madera Aserrada (Pino)", pd.Timestamp.now(tz="UTC"))
+            self.assertEqual((saldo.ingresado_acumulado_ton, saldo.exportado_acumulado_ton), (100.0, 50.0))
+
+    def test_persistir_requiere_tenant(self):
+        with self.assertRaises(ValueError):
+            procesar_lote_masivo(pd.DataFrame([_fila("R-1", 40.0)]), bind=self.engine)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+import unittest
+import asyncio
+import multiprocessing
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from litoral_trace.api.auth import UserTenantContext, get_current_tenant_user
+from litoral_trace.api.rate_limit import LimiteTasaMiddleware
+from litoral_trace.auth.tokens import create_jwt_token
+from litoral_trace.db.base import Base
+from litoral_trace.db.models import License, Organization
+from litoral_trace.services import rate_limit
+from litoral_trace.services.rate_limit import LIMITES_POR_PLAN, LimiteTasa, TablaCubetas
+
+class _Respuesta:
+    def __init__(self, mensajes):
+        inicio = mensajes[0]
+        self.status_code = inicio["status"]
+        self.headers = {k.decode().lower(): v.decode() for k, v in inicio["headers"]}
+
+def _get(app, ruta, headers=None):
+    """GET directo sobre la aplicación ASGI."""
+    mensajes = []
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": ruta, "raw_path": ruta.encode(), "root_path": "", "query_string": b"", "server": ("test", 80),
+        "client": ("127.0.0.1", 1234), "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(mensaje):
+        mensajes.append(mensaje)
+
+    asyncio.run(app(scope, receive, send))
+    return _Respuesta(mensajes)
+
+def _consumir_en_otro_proceso(ruta, veces):
+    tabla = TablaCubetas(ruta, cubetas=64)
+    for _ in range(veces):
+        tabla.consumir([(7, LimiteTasa(0.001, 10))])
+    tabla.cerrar()
+
+class TestTablaCubetas(unittest.TestCase):
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.ruta = Path(self.directorio.name) / "cubetas"
+
+    def tearDown(self):
+        self.directorio.cleanup()
+
+    def test_rafaga_y_reposicion(self):
+        tabla = TablaCubetas(self.ruta, cubetas=64)
+        limite = LimiteTasa(2.0, 5)
+        with mock.patch("time.monotonic", return_value=1000.0):
+            decisiones = [tabla.consumir([(1, limite)]) for _ in range(6)]
+        self.assertEqual([d.permitido for d in decisiones], [True] * 5 + [False])
+        self.assertEqual((decisiones[0].limite, decisiones[0].restantes, decisiones[4].restantes), (5, 4, 0))
+        self.assertEqual(decisiones[5].reintentar, 1)
+        with mock.patch("time.monotonic", return_value=1001.0):
+            self.assertEqual([tabla.consumir([(1, limite)]).permitido for _ in range(3)], [True, True, False])
+        tabla.cerrar()
+
+    def test_todas_las_cubetas_o_ninguna(self):
+        tabla = TablaCubetas(self.ruta, cubetas=64)
+        organizacion, clave = (1, LimiteTasa(0.001, 3)), (2, LimiteTasa(0.001, 2))
+        self.assertTrue(all(tabla.consumir([organizacion, clave]).permitido for _ in range(2)))
+        rechazo = tabla.consumir([organizacion, clave])
+        self.assertFalse(rechazo.permitido)
+        self.assertEqual(rechazo.limite, 2)
+        # La cuota de la organización no se descontó con el rechazo de la API Key
+        self.assertTrue(tabla.consumir([organizacion]).permitido)
+        self.assertFalse(tabla.consumir([organizacion]).permitido)
+        tabla.cerrar()
+
+    def test_estado_compartido_entre_procesos(self):
+        TablaCubetas(self.ruta, cubetas=64).cerrar()
+        proceso = multiprocessing.get_context("fork").Process(target=_consumir_en_otro_proceso, args=(self.ruta, 7))
+        proceso.start()
+        proceso.join(30)
+        self.assertEqual(proceso.exitcode, 0)
+        tabla = TablaCubetas(self.ruta, cubetas=64)
+        self.assertEqual(tabla.consumir([(7, LimiteTasa(0.001, 10))]).restantes, 2)
+        tabla.cerrar()
+
+    def test_desborde_reutiliza_la_cubeta_mas_antigua(self):
+        tabla = TablaCubetas(self.ruta, cubetas=8)
+        limite = LimiteTasa(1.0, 1)
+        for clave in range(1, 40):
+            self.assertTrue(tabla.consumir([(clave, limite)]).permitido)
+        self.assertFalse(tabla.consumir([(39, limite)]).permitido)
+        tabla.cerrar()
+
+class TestLimiteTasaMiddleware(unittest.TestCase):
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        entorno = mock.patch.dict(os.environ, {rate_limit.RATE_LIMIT_ARCHIVO_ENV: str(Path(self.directorio.name) / "cubetas")})
+        entorno.start()
+        self.addCleanup(entorno.stop)
+        rate_limit.tabla_cubetas.cache_clear()
+        self.engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        Base.metadata.create_all(self.engine)
+        with Session(self.engine) as session:
+            for org_id, plan in ((1, "demo"), (2, "enterprise")):
+                session.add(Organization(id=org_id, name=f"Org {org_id}", slug=f"org-{org_id}"))
+                session.add(License(organization_id=org_id, plan_type=plan))
+            session.commit()
+        rate_limit.iniciar_planes_licencia(self.engine, refresco=3600.0)
+
+        app = FastAPI()
+        app.add_middleware(LimiteTasaMiddleware)
+
+        @app.get("/api/v1/recurso")
+        def recurso(user: UserTenantContext = Depends(get_current_tenant_user)):
+            return {"org": user.organization_id}
+
+        @app.get("/salud")
+        def salud():
+            return {"ok": True}
+
+        self.app = app
+
+    def tearDown(self):
+        rate_limit.cerrar_planes_licencia()
+        rate_limit.tabla_cubetas().cerrar()
+        rate_limit.tabla_cubetas.cache_clear()
+        Base.metadata.drop_all(self.engine)
+        self.directorio.cleanup()
+
+    def _token(self, org_id):
+        return {"Authorization": f"Bearer {create_jwt_token({'sub': f'u{org_id}', 'org_id': org_id})}"}
+
+    def test_cuota_segun_plan_y_cabeceras(self):
+        rafaga_demo = LIMITES_POR_PLAN["demo"].organizacion.rafaga
+        respuestas = [_get(self.app, "/api/v1/recurso", headers=self._token(1)) for _ in range(rafaga_demo + 1)]
+        self.assertTrue(all(r.status_code == 200 for r in respuestas[:-1]))
+        self.assertEqual(respuestas[0].headers["ratelimit-limit"], str(rafaga_demo))
+        self.assertEqual(respuestas[0].headers["ratelimit-remaining"], str(rafaga_demo - 1))
+        self.assertEqual(respuestas[-1].status_code, 429)
+        self.assertIn("retry-after", respuestas[-1].headers)
+        # Otro token de la misma organización comparte la cubeta; otra organización no
+        self.assertEqual(_get(self.app, "/api/v1/recurso", headers=self._token(1)).status_code, 429)
+        enterprise = _get(self.app, "/api/v1/recurso", headers=self._token(2))
+        self.assertEqual(enterprise.status_code, 200)
+        self.assertEqual(enterprise.headers["ratelimit-limit"], str(LIMITES_POR_PLAN["enterprise"].organizacion.rafaga))
+
+    def test_rutas_fuera_de_la_api_y_anonimas_no_consumen(self):
+        self.assertNotIn("ratelimit-limit", _get(self.app, "/salud", headers=self._token(1)).headers)
+        anonima = _get(self.app, "/api/v1/recurso")
+        self.assertEqual(anonima.status_code, 401)
+        self.assertNotIn("ratelimit-limit", anonima.headers)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+import asyncio
+
+from fastapi import Depends, FastAPI, HTTPException
+
+from litoral_trace.api.admin import require_superadmin_role
+from litoral_trace.api.auth import UserTenantContext, get_current_tenant_user, require_permission
+from litoral_trace.auth.rbac import PERMISOS_POR_ROL, ROLE_LEVELS, Permiso, normalizar_rol, permisos_de_rol
+from litoral_trace.auth.token_cache import cache_tokens
+from litoral_trace.auth.tokens import create_jwt_token
+
+def _usuario(rol):
+    return UserTenantContext(username="u", organization_id=1, organization_name="Org", role=rol, email="u@org.com")
+
+class TestMatrizPermisos(unittest.TestCase):
+    def test_matriz_respeta_la_jerarquia(self):
+        self.assertEqual(set(PERMISOS_POR_ROL), set(ROLE_LEVELS))
+        self.assertEqual(PERMISOS_POR_ROL["guest"], 0)
+        self.assertEqual(permisos_de_rol("admin"), Permiso(sum(Permiso)))
+        # Cada rol conserva los permisos de los roles de menor nivel
+        por_nivel = sorted(ROLE_LEVELS, key=ROLE_LEVELS.get)
+        for menor, mayor in zip(por_nivel, por_nivel[1:]):
+            self.assertEqual(PERMISOS_POR_ROL[menor] & PERMISOS_POR_ROL[mayor], PERMISOS_POR_ROL[menor])
+        self.assertIn(Permiso.EVALUAR_COMPLIANCE, permisos_de_rol("auditor"))
+        self.assertNotIn(Permiso.CARGA_MASIVA, permisos_de_rol("auditor"))
+        self.assertNotIn(Permiso.ADMINISTRAR_TENANTS, permisos_de_rol("manager"))
+
+    def test_roles_internados(self):
+        self.assertIs(normalizar_rol("Manager"), next(r for r in PERMISOS_POR_ROL if r == "manager"))
+        self.assertIs(normalizar_rol(" AUDITOR "), next(r for r in PERMISOS_POR_ROL if r == "auditor"))
+        self.assertEqual(normalizar_rol("Desconocido"), "desconocido")
+
+    def test_rol_del_token_llega_normalizado(self):
+        cache_tokens().limpiar()
+        contexto = get_current_tenant_user(session_jwt=create_jwt_token({"sub": "x", "role": " Auditor"}))
+        self.assertIs(contexto.role, next(r for r in PERMISOS_POR_ROL if r == "auditor"))
+        cache_tokens().limpiar()
+
+class TestRequirePermission(unittest.TestCase):
+    def test_dependencia_acepta_y_rechaza(self):
+        verificar = require_permission(Permiso.CARGA_MASIVA, Permiso.LEER_LOTES)
+        self.assertEqual(asyncio.run(verificar(_usuario("manager"))).role, "manager")
+        for rol in ("auditor", "cliente", "desconocido"):
+            with self.assertRaises(HTTPException) as ctx:
+                asyncio.run(verificar(_usuario(rol)))
+            self.assertEqual(ctx.exception.status_code, 403)
+
+    def test_superadmin(self):
+        self.assertEqual(asyncio.run(require_superadmin_role(_usuario("admin"))).role, "admin")
+        with self.assertRaises(HTTPException):
+            asyncio.run(require_superadmin_role(_usuario("manager")))
+
+    def test_integrada_en_fastapi(self):
+        app = FastAPI()
+
+        @app.get("/carga")
+        def carga(user: UserTenantContext = Depends(require_permission(Permiso.CARGA_MASIVA))):
+            return {"usuario": user.username}
+
+        respuestas = {}
+        for rol in ("manager", "auditor"):
+            cache_tokens().limpiar()
+            token = create_jwt_token({"sub": rol, "role": rol})
+            mensajes = []
+            scope = {
+                "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+                "path": "/carga", "raw_path": b"/carga", "root_path": "", "query_string": b"", "server": ("test", 80),
+                "client": ("127.0.0.1", 1), "headers": [(b"authorization", f"Bearer {token}".encode())],
+            }
+
+            async def receive():
+                return {"type": "http.request", "body": b"", "more_body": False}
+
+            async def send(mensaje):
+                mensajes.append(mensaje)
+
+            asyncio.run(app(scope, receive, send))
+            respuestas[rol] = mensajes[0]["status"]
+        cache_tokens().limpiar()
+        self.assertEqual(respuestas, {"manager": 200, "auditor": 403})
+
+if __name__ == "__main__":
+    unittest.main()
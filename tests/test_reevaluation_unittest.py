@@ -0,0 +1,100 @@
+import unittest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from litoral_trace.db.base import Base
+from litoral_trace.db.models import Organization, Lote, AuditLog, CoeficienteRendimiento
+from litoral_trace.services.mass_balance import RENDIMIENTO_INDUSTRIAL, evaluar_balance_masas
+from litoral_trace.services.reevaluation import (
+    CoeficientesVigentes,
+    aplicar_cambio_coeficientes,
+    coeficientes_vigentes,
+    publicar_coeficientes,
+)
+
+class TestReevaluacionCoeficientes(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite:///:memory:", echo=False)
+        Base.metadata.create_all(self.engine)
+        with Session(self.engine) as session:
+            org = Organization(name="Aserradero Eucalipto", slug="aserradero-euca")
+            session.add(org)
+            session.flush()
+            comunes = {"organization_id": org.id, "productor_id": "P-1", "latitud": -27.4, "longitud": -58.9}
+            session.add_all([
+                # 200 * 0.45 = 90 -> válido hoy, excedido con 0.40
+                Lote(identificador="EUCA-VERDE", producto_forestal="Madera Aserrada (Eucalipto)", estatus="Verde",
+                     regla_aplicada="DEFECTO", volumen_ingresado_ton=200.0, volumen_exportar_ton=85.0, **comunes),
+                # Bloqueado por balance hoy, liberado con 0.55
+                Lote(identificador="EUCA-ROJO", producto_forestal="Madera Aserrada (Eucalipto)", estatus="Rojo",
+                     regla_aplicada="BALANCE_MASAS_EXCEDIDO", volumen_ingresado_ton=100.0, volumen_exportar_ton=50.0, **comunes),
+                # Bloqueo por regla previa al balance: no se toca
+                Lote(identificador="EUCA-EXCLUIDO", producto_forestal="Madera Aserrada (Eucalipto)", estatus="Rojo",
+                     regla_aplicada="PROVEEDOR_LISTA_EXCLUSION", volumen_ingresado_ton=100.0, volumen_exportar_ton=90.0, **comunes),
+                Lote(identificador="PINO-01", producto_forestal="Madera Aserrada (Pino)", estatus="Verde",
+                     regla_aplicada="DEFECTO", volumen_ingresado_ton=100.0, volumen_exportar_ton=45.0, **comunes),
+            ])
+            session.commit()
+
+    def tearDown(self):
+        Base.metadata.drop_all(self.engine)
+
+    def _estatus(self, session):
+        return {l.identificador: (l.estatus, l.regla_aplicada) for l in session.execute(select(Lote)).scalars()}
+
+    def test_publicar_versiona_solo_cambios(self):
+        with Session(self.engine) as session:
+            version, cambios = publicar_coeficientes(session, {"Madera Aserrada (Eucalipto)": 0.40, "Madera Aserrada (Pino)": 0.50})
+            self.assertEqual(version, 1)
+            self.assertEqual(list(cambios), ["Madera Aserrada (Eucalipto)"])
+            self.assertEqual(coeficientes_vigentes(session)["Madera Aserrada (Eucalipto)"], 0.40)
+            version2, _ = publicar_coeficientes(session, {"Madera Aserrada (Eucalipto)": 0.42})
+            self.assertEqual(version2, 2)
+            self.assertEqual(len(session.execute(select(CoeficienteRendimiento)).scalars().all()), 2)
+
+    def test_reduccion_de_coeficiente_bloquea_lotes_afectados(self):
+        with Session(self.engine) as session:
+            res = aplicar_cambio_coeficientes(session, {"Madera Aserrada (Eucalipto)": 0.40}, motivo="Revisión INTA")
+            session.commit()
+            self.assertEqual(res.lotes_evaluados, 3)
+            self.assertEqual(res.lotes_modificados, 1)
+            estados = self._estatus(session)
+            self.assertEqual(estados["EUCA-VERDE"], ("Rojo", "BALANCE_MASAS_EXCEDIDO"))
+            self.assertEqual(estados["EUCA-EXCLUIDO"], ("Rojo", "PROVEEDOR_LISTA_EXCLUSION"))
+            self.assertEqual(estados["PINO-01"], ("Verde", "DEFECTO"))
+
+            logs = session.execute(select(AuditLog)).scalars().all()
+            self.assertEqual(len(logs), 1)
+            self.assertEqual(logs[0].before_data["estatus"], "Verde")
+            self.assertEqual(logs[0].after_data["estatus"], "Rojo")
+            self.assertEqual(logs[0].after_data["coeficiente_rendimiento"], 0.40)
+
+    def test_aumento_de_coeficiente_deja_pendiente_verificacion_satelital(self):
+        with Session(self.engine) as session:
+            res = aplicar_cambio_coeficientes(session, {"Madera Aserrada (Eucalipto)": 0.55})
+            session.commit()
+            self.assertEqual(res.lotes_modificados, 1)
+            self.assertEqual(self._estatus(session)["EUCA-ROJO"], ("Pendiente", "REEVALUACION_SATELITAL_PENDIENTE"))
+
+    def test_sin_cambios_no_reevalua(self):
+        with Session(self.engine) as session:
+            res = aplicar_cambio_coeficientes(session, {"Madera Aserrada (Eucalipto)": 0.45})
+            self.assertEqual(res.lotes_evaluados, 0)
+
+    def test_coeficientes_publicados_llegan_a_los_evaluadores(self):
+        producto = "Madera Aserrada (Eucalipto)"
+        original = RENDIMIENTO_INDUSTRIAL[producto]
+        self.addCleanup(RENDIMIENTO_INDUSTRIAL.__setitem__, producto, original)
+        coeficientes = CoeficientesVigentes(self.engine, refresco=3600)
+        self.addCleanup(coeficientes.cerrar)
+        self.assertFalse(coeficientes.recargar())  # Sin versión nueva no hay recarga
+        # Publicación desde otro proceso (script de reevaluación)
+        with Session(self.engine) as session:
+            aplicar_cambio_coeficientes(session, {producto: 0.40})
+            session.commit()
+        self.assertTrue(coeficientes.recargar())
+        self.assertEqual(coeficientes.version, 1)
+        self.assertEqual(evaluar_balance_masas(200.0, 85.0, producto).coeficiente_rendimiento, 0.40)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+import re
+import zlib
+
+from litoral_trace.services.reports import (
+    clase_pdf_certificado,
+    generar_pdf_reporte_bytes,
+    plantilla_certificado,
+)
+
+LOTE = {"identificador": "Rodal Norte 01", "productor_id": "30-11111111-1", "producto_forestal": "Madera Aserrada (Pino)", "hectareas": 120.0}
+
+def _contenido(pdf_bytes):
+    flujos = []
+    for m in re.finditer(rb"/Filter /FlateDecode\s*/Length (\d+)\s*>>\s*stream\r?\n", pdf_bytes):
+        flujos.append(zlib.decompress(pdf_bytes[m.end():m.end() + int(m.group(1))]))
+    return b"".join(flujos)
+
+class TestMotorCertificados(unittest.TestCase):
+    def test_plantilla_se_construye_una_vez_por_proceso(self):
+        generar_pdf_reporte_bytes(LOTE, "Verde", "Aprobado", 100.0, 40.0, 0.5)
+        generar_pdf_reporte_bytes(LOTE, "Rojo", "Bloqueado", 100.0, 90.0, 0.5)
+        clases, misses = clase_pdf_certificado.cache_info().misses, plantilla_certificado.cache_info().misses
+        for i in range(20):
+            generar_pdf_reporte_bytes({**LOTE, "identificador": f"R-{i}"}, "Verde" if i % 2 else "Rojo", "Obs", 100.0, 40.0, 0.5)
+        self.assertEqual(clase_pdf_certificado.cache_info().misses, clases)
+        self.assertEqual(plantilla_certificado.cache_info().misses, misses)
+
+    def test_campos_variables_y_encabezado_en_cada_pagina(self):
+        pdf_bytes = generar_pdf_reporte_bytes(LOTE, "Rojo", "Balance excedido. " * 400, 200.0, 150.0, 0.5)
+        self.assertTrue(pdf_bytes.startswith(b"%PDF"))
+        self.assertIn(b"/Count 2", pdf_bytes)
+        contenido = _contenido(pdf_bytes)
+        self.assertEqual(contenido.count(b"(LITORAL TRACE | COMPLIANCE INTELLIGENCE) Tj"), 2)
+        self.assertIn(b"DICTAMEN: BLOQUEADO / RIESGO DETECTADO", contenido)
+        for valor in (b"Rodal Norte 01", b"30-11111111-1", b"200.00 Toneladas", b"50.0%", b"100.00 Toneladas", b"150.00 Toneladas"):
+            self.assertIn(valor, contenido)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+import os
+from unittest import mock
+import numpy as np
+import pandas as pd
+
+from litoral_trace.services import compliance
+from litoral_trace.services.rules_engine import compilar_reglas, cargar_reglas, evaluar_reglas_df, obtener_reglas
+from litoral_trace.services.compliance import evaluar_compliance_lote
+from litoral_trace.services.batch import normalizar_matriz_batch, procesar_lote_masivo
+from litoral_trace.services.merkle import MANIFIESTO_SECRET_ENV
+
+def _df_lotes(filas):
+    base = {
+        "identificador": "RODAL-01",
+        "productor_id": "30-11111111-1",
+        "producto_forestal": "Madera Aserrada (Pino)",
+        "latitud": -27.45,
+        "longitud": -58.90,
+        "volumen_ingresado_ton": 100.0,
+        "volumen_exportar_ton": 40.0,
+    }
+    return pd.DataFrame([{**base, **f} for f in filas])
+
+class TestRulesEngine(unittest.TestCase):
+    def setUp(self):
+        entorno = mock.patch.dict(os.environ, {MANIFIESTO_SECRET_ENV: "clave-de-prueba"})
+        entorno.start()
+        self.addCleanup(entorno.stop)
+
+    def test_reglas_por_defecto_reproducen_dictamen_historico(self):
+        df = evaluar_reglas_df(_df_lotes([{}, {"volumen_exportar_ton": 90.0}]))
+        self.assertEqual(list(df["dictamen"]), ["Verde", "Rojo"])
+        self.assertEqual(list(df["regla_aplicada"]), ["DEFECTO", "BALANCE_MASAS_EXCEDIDO"])
+        self.assertTrue(df["observacion"].iloc[0].startswith("APROBADO / COMPLIANT."))
+        self.assertIn("Alerta de Sobredeclaración", df["observacion"].iloc[1])
+
+    def test_regla_barata_evita_consulta_ndvi(self):
+        consultas = []
+
+        def satelital(lat, lon):
+            consultas.append(len(lat))
+            n = len(lat)
+            return {
+                "sat_dictamen": np.array(["Verde"] * n, dtype=object),
+                "sat_observacion": np.array(["ok"] * n, dtype=object),
+                "ndvi_base_2020": np.full(n, 0.6),
+                "ndvi_actual": np.full(n, 0.6),
+            }
+
+        df = evaluar_reglas_df(_df_lotes([{}, {"volumen_exportar_ton": 90.0}, {"volumen_exportar_ton": 95.0}]), proveedor_satelital=satelital)
+        self.assertEqual(consultas, [1])
+        self.assertEqual(list(df["dictamen"]), ["Verde", "Rojo", "Rojo"])
+
+    def test_regla_personalizada_lista_exclusion_y_satelital(self):
+        spec = cargar_reglas()
+        spec["reglas"][0]["condicion"]["valor"] = ["30-99999999-9"]
+        reglas = compilar_reglas(spec)
+        df = evaluar_reglas_df(_df_lotes([{"productor_id": "30-99999999-9"}, {}]), reglas=reglas)
+        self.assertEqual(df["regla_aplicada"].iloc[0], "PROVEEDOR_LISTA_EXCLUSION")
+        self.assertIn("30-99999999-9", df["observacion"].iloc[0])
+        self.assertEqual(df["dictamen"].iloc[1], "Verde")
+
+    def test_operador_desconocido_rechazado(self):
+        spec = {"reglas": [{"id": "X", "dictamen": "Rojo", "observacion": "x", "condicion": {"campo": "a", "op": "~", "valor": 1}}]}
+        with self.assertRaises(ValueError):
+            compilar_reglas(spec)
+
+    def test_campo_de_plantilla_desconocido_rechazado(self):
+        spec = cargar_reglas()
+        spec["reglas"][0]["observacion"] = "BLOQUEADO: {proveedor}"
+        with self.assertRaises(ValueError):
+            compilar_reglas(spec)
+        spec = cargar_reglas()
+        spec["dictamen_por_defecto"]["observacion"] = "OK {pais_origen}"
+        with self.assertRaises(ValueError):
+            compilar_reglas(spec)
+        # Un campo que la propia condición exige sí es válido en su observación
+        self.assertEqual(compilar_reglas(cargar_reglas()).reglas[1].id, "PAIS_ALTO_RIESGO")
+
+    def test_lote_individual_sin_ndvi_si_una_regla_barata_resuelve(self):
+        lote = {"identificador": "R1", "productor_id": "P1", "producto_forestal": "Carbón Vegetal", "latitud": -27.5, "longitud": -58.9}
+        with mock.patch.object(compliance, "calcular_ndvi_simulado", wraps=compliance.calcular_ndvi_simulado) as ndvi:
+            res = evaluar_compliance_lote(lote, volumen_ingresado_ton=100.0, volumen_exportar_ton=50.0)
+            self.assertEqual(ndvi.call_count, 0)
+            self.assertEqual(res["satelital"]["puntos_ndvi"], [])
+            self.assertEqual(evaluar_compliance_lote(lote, 100.0, 10.0)["regla_aplicada"], "DEFECTO")
+            self.assertEqual(ndvi.call_count, 1)
+
+    def test_columnas_extra_no_pisan_las_normalizadas(self):
+        df = normalizar_matriz_batch(pd.DataFrame([{
+            "Identificador_Lote": "A", "Latitud": -27.1, "Latitud ": "x", "Dictamen": "Verde", "Pais_Origen": "AR",
+        }]))
+        self.assertEqual(df["latitud"].iloc[0], -27.1)
+        self.assertNotIn("dictamen", df)
+        self.assertEqual(df["pais_origen"].iloc[0], "AR")
+
+    def test_evaluar_compliance_lote_informa_regla(self):
+        lote = {"identificador": "R1", "productor_id": "P1", "producto_forestal": "Carbón Vegetal", "latitud": -27.5, "longitud": -58.9}
+        res = evaluar_compliance_lote(lote, volumen_ingresado_ton=100.0, volumen_exportar_ton=50.0)
+        self.assertEqual(res["dictamen"], "Rojo")
+        self.assertEqual(res["regla_aplicada"], "BALANCE_MASAS_EXCEDIDO")
+        self.assertTrue(res["observacion"].startswith("BLOQUEADO: "))
+        self.assertIs(obtener_reglas(), obtener_reglas())
+
+    def test_batch_expone_regla_aplicada(self):
+        df_input = pd.DataFrame([
+            {"Identificador_Lote": "A", "ID_Proveedor": "P1", "Producto_Forestal": "Madera Aserrada (Pino)", "Hectareas": 10.0,
+             "Latitud": -27.45, "Longitud": -58.90, "Volumen_Ingresado_Ton": 100.0, "Volumen_Exportar_Ton": 90.0},
+        ])
+        df_resumen, _ = procesar_lote_masivo(df_input)
+        self.assertEqual(df_resumen.iloc[0]["Regla Aplicada"], "BALANCE_MASAS_EXCEDIDO")
+
+if __name__ == "__main__":
+    unittest.main()
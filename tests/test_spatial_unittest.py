@@ -0,0 +1,70 @@
+import unittest
+from sqlalchemy import create_engine, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from litoral_trace.db.base import Base
+from litoral_trace.db.models import Lote, Organization
+from litoral_trace.services import spatial
+from litoral_trace.services.persistence import persistir_dictamenes
+
+POLIGONO = "POLYGON((-58.91 -27.41, -58.89 -27.41, -58.89 -27.39, -58.91 -27.39, -58.91 -27.41))"
+
+def _sql(sentencia):
+    return str(sentencia.compile(dialect=postgresql.dialect()))
+
+def _registro(org_id, identificador, polygon_wkt):
+    return {
+        "organization_id": org_id, "identificador": identificador, "productor_id": "20-1",
+        "producto_forestal": "Madera Aserrada (Pino)", "hectareas": 4.0, "latitud": -27.4, "longitud": -58.9,
+        "polygon_wkt": polygon_wkt, "volumen_ingresado_ton": 10.0, "volumen_exportar_ton": 5.0,
+        "estatus": "Verde", "regla_aplicada": "DEFECTO",
+    }
+
+class TestColumnaGeometria(unittest.TestCase):
+    def test_ddl_postgis_e_indice_gist(self):
+        ddl = _sql(CreateTable(Lote.__table__))
+        self.assertIn("geom geometry(POLYGON, 4326)", ddl)
+        indice = next(i for i in Lote.__table__.indexes if i.name == "ix_lotes_geom")
+        self.assertEqual(_sql(CreateIndex(indice)), "CREATE INDEX ix_lotes_geom ON lotes USING gist (geom)")
+
+    def test_wkt_entra_y_sale_por_postgis(self):
+        self.assertIn("ST_AsText(lotes.geom)", _sql(select(Lote.geom)))
+        self.assertNotIn("ST_AsText", _sql(select(Lote.id).where(Lote.geom.is_not(None))))
+
+    def test_persistencia_deriva_geom_en_sqlite(self):
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(Organization.__table__.insert().values(id=1, name="Norte", slug="norte"))
+        persistir_dictamenes(engine, [
+            _registro(1, "P-1", POLIGONO), _registro(1, "P-2", "POINT(-58.9 -27.4)"),
+            _registro(1, "P-3", "POLYGON((roto"), _registro(1, "P-4", None),
+        ])
+        with engine.connect() as conn:
+            geometrias = dict(conn.execute(select(Lote.identificador, Lote.geom)).all())
+        self.assertEqual(geometrias, {"P-1": POLIGONO, "P-2": None, "P-3": None, "P-4": None})
+
+class TestConsultasEspaciales(unittest.TestCase):
+    def test_bbox_usa_el_operador_indexable(self):
+        sql = _sql(spatial._consulta_bbox(1, -59.0, -28.0, -58.0, -27.0, 100))
+        self.assertIn("lotes.geom && ST_MakeEnvelope(", sql)
+        self.assertIn("lotes.organization_id =", sql)
+        self.assertNotIn("polygon_wkt", sql)
+
+    def test_interseccion_con_hectareas_afectadas(self):
+        sql = _sql(spatial._consulta_interseccion(1, POLIGONO))
+        self.assertIn("ST_Intersects(lotes.geom, ST_GeomFromText(", sql)
+        self.assertIn("ST_Area(geography(ST_Intersection(lotes.geom", sql)
+
+    def test_vecinos_ordenados_por_knn(self):
+        sql = _sql(spatial._consulta_cercanos(1, -27.4, -58.9, 5))
+        self.assertIn("ORDER BY lotes.geom <-> ST_SetSRID(ST_MakePoint(", sql)
+        self.assertIn("AS distancia_m", sql)
+
+    def test_requiere_postgresql(self):
+        with self.assertRaises(ValueError):
+            spatial.lotes_cercanos(create_engine("sqlite:///:memory:"), 1, -27.4, -58.9)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import unittest
+import asyncio
+import subprocess
+import sys
+from pathlib import Path
+
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, delete, func, select, update
+from sqlalchemy.orm import Session
+
+from litoral_trace.api.auth import UserTenantContext, tenant_actual
+from litoral_trace.auth.token_cache import cache_tokens
+from litoral_trace.auth.tokens import create_jwt_token
+from litoral_trace.db.base import Base
+from litoral_trace.db.models import Lote, Organization, User
+from litoral_trace.db.tenant import (
+    OPCION_TODOS_LOS_TENANTS,
+    activar_aislamiento_tenant,
+    contexto_tenant,
+    get_current_organization_id,
+    require_tenant_context,
+)
+
+RAIZ = Path(__file__).resolve().parents[1]
+
+def _lote(org_id, identificador):
+    return Lote(
+        organization_id=org_id, identificador=identificador, productor_id="20-1", producto_forestal="Madera Aserrada (Pino)",
+        latitud=-27.4, longitud=-58.9,
+    )
+
+class TestContextoTenant(unittest.TestCase):
+    def test_contextvar_aislado_por_tarea(self):
+        self.assertIsNone(get_current_organization_id())
+        with self.assertRaises(ValueError):
+            require_tenant_context()
+
+        async def request(org_id):
+            with contexto_tenant(org_id):
+                await asyncio.sleep(0.01)
+                return get_current_organization_id()
+
+        async def concurrentes():
+            return await asyncio.gather(*(request(i) for i in (1, 2, 3)))
+
+        self.assertEqual(asyncio.run(concurrentes()), [1, 2, 3])
+        self.assertIsNone(get_current_organization_id())
+
+    def test_no_importa_streamlit(self):
+        codigo = "import sys, litoral_trace.db.tenant, litoral_trace.db.session; print('streamlit' in sys.modules)"
+        salida = subprocess.run(
+            [sys.executable, "-c", codigo], capture_output=True, text=True, env={"PYTHONPATH": str(RAIZ / "src")}, check=True,
+        )
+        self.assertEqual(salida.stdout.strip(), "False")
+
+class TestFiltroGlobalOrm(unittest.TestCase):
+    def setUp(self):
+        activar_aislamiento_tenant()
+        self.engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(self.engine)
+        with Session(self.engine) as session:
+            session.add_all([Organization(id=1, name="Norte", slug="norte"), Organization(id=2, name="Sur", slug="sur")])
+            session.add_all([_lote(1, "N-1"), _lote(1, "N-2"), _lote(2, "S-1")])
+            session.add(User(organization_id=2, email="s@sur.com", username="sur", password_hash="x"))
+            session.commit()
+
+    def tearDown(self):
+        Base.metadata.drop_all(self.engine)
+
+    def _identificadores(self, session, **opciones):
+        return sorted(session.scalars(select(Lote.identificador).execution_options(**opciones)).all())
+
+    def test_consultas_restringidas_al_tenant(self):
+        with Session(self.engine) as session:
+            self.assertEqual(self._identificadores(session), ["N-1", "N-2", "S-1"])  # sin contexto: tareas de sistema
+            with contexto_tenant(2):
+                self.assertEqual(self._identificadores(session), ["S-1"])
+                self.assertIsNone(session.get(Lote, 1))
+                self.assertEqual(session.scalar(select(func.count()).select_from(User)), 1)
+                # Las relaciones cargadas desde una entidad del tenant heredan el criterio
+                org = session.get(Organization, 1)
+                self.assertEqual(org.lotes, [])
+                self.assertEqual(self._identificadores(session, **{OPCION_TODOS_LOS_TENANTS: True}), ["N-1", "N-2", "S-1"])
+
+    def test_update_y_delete_no_cruzan_tenants(self):
+        with Session(self.engine) as session:
+            with contexto_tenant(1):
+                session.execute(update(Lote).values(estatus="Rojo"))
+                session.execute(delete(Lote).where(Lote.identificador == "S-1"))
+                session.commit()
+            estados = dict(session.execute(select(Lote.identificador, Lote.estatus)).all())
+        self.assertEqual(estados, {"N-1": "Rojo", "N-2": "Rojo", "S-1": "Pendiente"})
+
+class TestDependenciaFastApi(unittest.TestCase):
+    def test_tenant_actual_llega_al_handler(self):
+        app = FastAPI()
+
+        @app.get("/tenant")
+        async def handler(user: UserTenantContext = Depends(tenant_actual)):
+            return {"org": get_current_organization_id()}
+
+        @app.get("/tenant-sync")
+        def handler_sync(user: UserTenantContext = Depends(tenant_actual)):
+            return {"org": get_current_organization_id()}
+
+        cache_tokens().limpiar()
+        token = create_jwt_token({"sub": "u", "org_id": 9})
+        for ruta in ("/tenant", "/tenant-sync"):
+            mensajes = []
+            scope = {
+                "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+                "path": ruta, "raw_path": ruta.encode(), "root_path": "", "query_string": b"", "server": ("test", 80),
+                "client": ("127.0.0.1", 1), "headers": [(b"authorization", f"Bearer {token}".encode())],
+            }
+
+            async def receive():
+                return {"type": "http.request", "body": b"", "more_body": False}
+
+            async def send(mensaje):
+                mensajes.append(mensaje)
+
+            asyncio.run(app(scope, receive, send))
+            self.assertEqual(mensajes[1]["body"], b'{"org":9}')
+        cache_tokens().limpiar()
+        self.assertIsNone(get_current_organization_id())
+
+if __name__ == "__main__":
+    unittest.main()
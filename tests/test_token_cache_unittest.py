@@ -0,0 +1,74 @@
+import unittest
+import time
+from unittest import mock
+
+from fastapi import HTTPException
+
+from litoral_trace.api import auth as api_auth
+from litoral_trace.api.auth import get_current_tenant_user
+from litoral_trace.auth.token_cache import CacheTokens, cache_tokens
+from litoral_trace.auth.tokens import _base64url_decode, _base64url_encode, create_jwt_token
+
+USUARIO = {"sub": "operador", "org_id": 7, "org_name": "Aserradero Sur", "role": "auditor", "email": "op@sur.com"}
+
+class TestCacheTokens(unittest.TestCase):
+    def setUp(self):
+        cache_tokens().limpiar()
+
+    def tearDown(self):
+        cache_tokens().limpiar()
+
+    def test_acierto_no_vuelve_a_verificar(self):
+        token = create_jwt_token(USUARIO)
+        with mock.patch.object(api_auth, "verify_jwt_token", wraps=api_auth.verify_jwt_token) as verificar:
+            primero = get_current_tenant_user(authorization=f"Bearer {token}")
+            for _ in range(50):
+                self.assertIs(get_current_tenant_user(session_jwt=token), primero)
+        self.assertEqual(verificar.call_count, 1)
+        self.assertEqual((primero.organization_id, primero.role), (7, "auditor"))
+
+    def test_payload_alterado_con_firma_valida_no_acierta(self):
+        token = create_jwt_token(USUARIO)
+        get_current_tenant_user(authorization=f"Bearer {token}")
+        cabecera, payload, firma = token.split(".")
+        escalado = _base64url_decode(payload).replace(b'"auditor"', b'"admin"')
+        with self.assertRaises(HTTPException):
+            get_current_tenant_user(authorization=f"Bearer {cabecera}.{_base64url_encode(escalado)}.{firma}")
+
+    def test_entrada_vence_con_el_exp_del_token(self):
+        cache = CacheTokens(10)
+        cache.guardar("t", int(time.time()) - 1, "ctx", cache.generacion)
+        self.assertIsNone(cache.obtener("t"))
+        self.assertNotIn("t", cache)
+        cache.guardar("t", int(time.time()) + 60, "ctx", cache.generacion)
+        self.assertEqual(cache.obtener("t"), "ctx")
+        with mock.patch("time.time", return_value=time.time() + 120):
+            self.assertIsNone(cache.obtener("t"))
+
+    def test_revocacion_y_alta_concurrente(self):
+        cache = CacheTokens(10)
+        generacion = cache.generacion
+        cache.guardar("a", None, "ctx-a", generacion, sujeto="ana")
+        cache.guardar("b", None, "ctx-b", generacion, sujeto="ana")
+        cache.guardar("c", None, "ctx-c", generacion, sujeto="beto")
+        self.assertEqual(cache.revocar_sujeto("ana"), 2)
+        self.assertEqual(len(cache), 1)
+        # Un token verificado antes de la revocación no se da de alta después de ella
+        cache.guardar("a", None, "ctx-a", generacion, sujeto="ana")
+        self.assertIsNone(cache.obtener("a"))
+        cache.revocar_token("c")
+        self.assertIsNone(cache.obtener("c"))
+
+    def test_capacidad_acotada(self):
+        cache = CacheTokens(3)
+        for i in range(5):
+            cache.guardar(f"t{i}", None, i, cache.generacion)
+        self.assertEqual(len(cache), 3)
+        self.assertNotIn("t0", cache)
+        self.assertEqual(cache.obtener("t4"), 4)
+        deshabilitada = CacheTokens(0)
+        deshabilitada.guardar("t", None, 1, deshabilitada.generacion)
+        self.assertEqual(len(deshabilitada), 0)
+
+if __name__ == "__main__":
+    unittest.main()
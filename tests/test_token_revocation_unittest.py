@@ -0,0 +1,135 @@
+import unittest
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from fastapi import HTTPException, Response
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.pool import StaticPool
+
+from litoral_trace.api.auth import get_current_tenant_user, logout_b2b
+from litoral_trace.auth import revocation
+from litoral_trace.auth.revocation import FiltroBloom, iniciar_registro_revocaciones, purgar_revocaciones_vencidas
+from litoral_trace.auth.token_cache import cache_tokens
+from litoral_trace.auth.tokens import create_jwt_token, verify_jwt_token
+from litoral_trace.db.base import Base
+from litoral_trace.db.models import RevokedToken
+
+USUARIO = {"sub": "operador", "org_id": 7, "org_name": "Aserradero Sur", "role": "auditor", "email": "op@sur.com"}
+
+class TestFiltroBloom(unittest.TestCase):
+    def test_sin_falsos_negativos_y_tasa_acotada(self):
+        filtro = FiltroBloom(5000)
+        revocados = [f"jti-{i}" for i in range(5000)]
+        for jti in revocados:
+            filtro.agregar(jti)
+        self.assertTrue(all(jti in filtro for jti in revocados))
+        falsos = sum(f"otro-{i}" in filtro for i in range(20000))
+        self.assertLess(falsos / 20000, 0.005)
+
+class TestRevocacionTokens(unittest.TestCase):
+    def setUp(self):
+        cache_tokens().limpiar()
+        self.engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        Base.metadata.create_all(self.engine)
+        self.registro = iniciar_registro_revocaciones(self.engine, refresco=3600.0)
+
+    def tearDown(self):
+        revocation.cerrar_registro_revocaciones()
+        cache_tokens().limpiar()
+        Base.metadata.drop_all(self.engine)
+
+    def test_tokens_llevan_jti_unico(self):
+        a, b = verify_jwt_token(create_jwt_token(USUARIO)), verify_jwt_token(create_jwt_token(USUARIO))
+        self.assertTrue(a["jti"])
+        self.assertNotEqual(a["jti"], b["jti"])
+
+    def test_logout_revoca_aunque_el_token_este_en_cache(self):
+        token = create_jwt_token(USUARIO)
+        self.assertEqual(get_current_tenant_user(authorization=f"Bearer {token}").username, "operador")
+        resultado = asyncio.run(logout_b2b(Response(), authorization=f"Bearer {token}"))
+        self.assertTrue(resultado["token_revocado"])
+        with self.assertRaises(HTTPException) as ctx:
+            get_current_tenant_user(authorization=f"Bearer {token}")
+        self.assertEqual(ctx.exception.status_code, 401)
+        # Otro token del mismo usuario sigue vigente
+        self.assertEqual(get_current_tenant_user(session_jwt=create_jwt_token(USUARIO)).username, "operador")
+
+    def test_solo_los_aciertos_del_filtro_consultan_la_base(self):
+        for _ in range(200):
+            get_current_tenant_user(session_jwt=create_jwt_token(USUARIO))
+        self.assertEqual(self.registro.consultas_autoritativas, 0)
+        token = create_jwt_token(USUARIO)
+        self.registro._filtro.agregar(verify_jwt_token(token)["jti"])  # fuerza un falso positivo
+        for _ in range(2):
+            cache_tokens().limpiar()
+            self.assertEqual(get_current_tenant_user(session_jwt=token).username, "operador")
+        # El falso positivo se confirma una sola vez contra la tabla
+        self.assertEqual(self.registro.consultas_autoritativas, 1)
+
+    def test_revocacion_de_otro_proceso_expulsa_la_cache_al_refrescar(self):
+        token = create_jwt_token(USUARIO)
+        get_current_tenant_user(session_jwt=token)
+        self.assertIn(token, cache_tokens())
+        payload = verify_jwt_token(token)
+        with self.engine.begin() as conn:
+            conn.execute(insert(RevokedToken), [{
+                "jti": payload["jti"], "username": "operador", "expires_at": datetime.fromtimestamp(payload["exp"], timezone.utc),
+            }])
+        # Antes del refresco el token sigue en la caché local; el refresco en segundo plano lo expulsa
+        self.assertEqual(get_current_tenant_user(session_jwt=token).username, "operador")
+        self.registro.sincronizar()
+        with self.assertRaises(HTTPException):
+            get_current_tenant_user(session_jwt=token)
+
+    def test_refresco_en_segundo_plano_y_falla_de_la_base(self):
+        vence = datetime.now(timezone.utc) + timedelta(hours=1)
+        with self.engine.begin() as conn:
+            conn.execute(insert(RevokedToken), [{"jti": "previo", "expires_at": vence}])
+        registro = iniciar_registro_revocaciones(self.engine, refresco=0.01)
+        with self.engine.begin() as conn:
+            conn.execute(insert(RevokedToken), [{"jti": "nuevo", "expires_at": vence}])
+        limite = time.monotonic() + 5
+        while "nuevo" not in registro._filtro and time.monotonic() < limite:
+            time.sleep(0.01)
+        self.assertIn("nuevo", registro._filtro)
+
+        # Con la base caída el hilo registra la falla y el filtro anterior sigue respondiendo
+        with mock.patch.object(registro, "sincronizar", side_effect=RuntimeError("base caída")), \
+                self.assertLogs("litoral_trace.auth.revocation", "WARNING") as logs:
+            limite = time.monotonic() + 5
+            while not logs.records and time.monotonic() < limite:
+                time.sleep(0.01)
+        self.assertIn("previo", registro._filtro)
+        self.assertIn("nuevo", registro._filtro)
+        self.assertFalse(registro.esta_revocado("sin-revocar"))
+
+    def test_id_confirmado_fuera_de_orden_no_se_pierde(self):
+        vence = datetime.now(timezone.utc) + timedelta(hours=1)
+        with self.engine.begin() as conn:
+            conn.execute(insert(RevokedToken), [{"id": 5, "jti": "confirmado-primero", "expires_at": vence}])
+        self.registro.recargar()
+        self.assertEqual(self.registro._ultimo_id, 5)
+        # El id 4 se asignó antes pero su transacción confirmó después de la lectura
+        with self.engine.begin() as conn:
+            conn.execute(insert(RevokedToken), [{"id": 4, "jti": "confirmado-despues", "expires_at": vence}])
+        elementos = self.registro._filtro.elementos
+        self.registro.sincronizar()
+        self.assertIn("confirmado-despues", self.registro._filtro)
+        # Lo ya incorporado dentro de la ventana no se vuelve a contar
+        self.assertEqual(self.registro._filtro.elementos, elementos + 1)
+        self.assertTrue(self.registro.esta_revocado("confirmado-despues"))
+
+    def test_purga_de_revocaciones_vencidas(self):
+        with self.engine.begin() as conn:
+            conn.execute(insert(RevokedToken), [
+                {"jti": "viejo", "expires_at": datetime.now(timezone.utc) - timedelta(hours=1)},
+                {"jti": "vigente", "expires_at": datetime.now(timezone.utc) + timedelta(hours=1)},
+            ])
+        self.assertEqual(purgar_revocaciones_vencidas(self.engine), 1)
+        with self.engine.connect() as conn:
+            self.assertEqual(conn.execute(select(func.count()).select_from(RevokedToken)).scalar_one(), 1)
+
+if __name__ == "__main__":
+    unittest.main()